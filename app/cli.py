@@ -0,0 +1,501 @@
+"""
+Headless-запуск очередей без GUI и PyQt (сервер, cron, systemd).
+
+    python -m app.cli run-queues queues_state.json [--queues 1,3] [--no-ai] [--model file.gguf]
+    python -m app.cli schedule queues_state.json [--max-concurrent 2] [--no-ai]
+    python -m app.cli runs [--queue NAME] [--limit 20]
+    python -m app.cli cluster-run queues_state.json --workers 3 [--db jobs.db]
+    python -m app.cli cluster-worker --db jobs.db [--replay DIR]
+"""
+
+import os
+
+# До импорта ядра: сигналы ядра работают на обычных колбэках (app.core.signals)
+os.environ.setdefault("AVITO_HEADLESS", "1")
+
+import sys
+import json
+import glob
+import math
+import time
+import asyncio
+import argparse
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.config import (
+    RESULTS_DIR, MODELS_DIR, AI_SERVER_PORT, AI_CTX_SIZE, AI_GPU_LAYERS,
+    CLUSTER_IDLE_EXIT_SEC, CLUSTER_RUN_TIMEOUT_SEC,
+)
+from app.core.results_store import close_results_file, new_results_path, save_results_file
+from app.core.log_manager import logger
+
+
+def load_queue_configs(path: str, indices: Optional[List[int]] = None) -> List[Dict]:
+    """Читает queues_state.json (формат QueueStateManager) и возвращает активные очереди"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    configs = []
+    for key in sorted(data.keys(), key=lambda k: int(k) if str(k).isdigit() else 0):
+        try:
+            idx = int(key)
+        except (TypeError, ValueError):
+            continue
+        state = data[key]
+        if not isinstance(state, dict):
+            continue
+        if indices is not None and idx not in indices:
+            continue
+        if indices is None and not state.get("queue_enabled", True):
+            continue
+        if not state.get("search_tags"):
+            logger.warning(f"Очередь #{idx + 1} пропущена: нет тегов...")
+            continue
+        cfg = dict(state)
+        cfg["original_index"] = idx
+        cfg["queue_name"] = state.get("name") or f"queue_{idx + 1}"
+        configs.append(cfg)
+    return configs
+
+
+def calc_max_pages(max_items: Optional[int]) -> int:
+    if max_items and max_items > 0:
+        return (math.ceil(max_items / 50) * 5) + 3
+    return 100
+
+
+def save_results(items: List[Dict], queue_name: str, results_dir: str = RESULTS_DIR) -> str:
+    """Новый файл результатов в том же формате, что и в GUI (снапшот + журнал, запись в каталог)"""
+    path = new_results_path(queue_name, results_dir)
+    save_results_file(path, items)
+    # Процесс может сразу завершиться: файл дописывается на диск, зеркало не держится в памяти
+    close_results_file(path)
+    return path
+
+
+class HeadlessRunner:
+    """Парсер + память + ИИ на простых колбэках, без Qt и без GUI"""
+
+    def __init__(self, use_ai: bool = True, model_name: Optional[str] = None, debug_mode: bool = False,
+                 on_progress: Optional[Callable[[str, int], None]] = None,
+                 results_dir: str = RESULTS_DIR):
+        self.use_ai = use_ai
+        self.model_name = model_name
+        self.debug_mode = debug_mode
+        self.on_progress = on_progress
+        self.results_dir = results_dir
+        self._memory = None
+        self._server = None
+        self._stop_requested = False
+        self._parsers = set()
+        self._lock = threading.Lock()
+        # Один llama-сервер на раннер: при параллельных очередях анализ идет по очереди
+        self._ai_lock = threading.Lock()
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            from app.core.memory import MemoryManager
+            self._memory = MemoryManager()
+        return self._memory
+
+    def request_stop(self):
+        self._stop_requested = True
+        with self._lock:
+            parsers = list(self._parsers)
+        for parser in parsers:
+            parser.request_stop()
+
+    # --- Парсинг ---
+
+    def scrape(self, config: Dict, on_page_items: Optional[Callable[[List[Dict]], None]] = None,
+               extra_kwargs: Optional[Dict] = None) -> Dict:
+        from app.core.parser import AvitoParser
+        from app.core.seen_index import get_seen_index
+
+        name = config.get("queue_name", "")
+        stats = {"requests": 0, "items": [], "listed_ids": []}
+        max_items = config.get("max_items", 0) or None
+        search_mode = config.get("search_mode", "full")
+
+        def on_requests(parser_count, ai_count):
+            stats["requests"] += parser_count
+
+        last_progress = [-10]
+
+        def on_progress(value):
+            if self.on_progress:
+                self.on_progress(name, value)
+            elif value >= last_progress[0] + 10:
+                last_progress[0] = value
+                logger.info(f"[{name}] прогресс: {value}%")
+
+        kwargs = dict(
+            max_pages=calc_max_pages(max_items),
+            max_items_per_page=max_items if search_mode == "primary" else None,
+            max_total_items=max_items,
+            min_price=config.get("min_price") or None,
+            max_price=config.get("max_price") or None,
+            sort_type=config.get("sort_type", "date"),
+            search_all_regions=config.get("all_regions", False),
+            search_mode=search_mode,
+            forced_categories=config.get("forced_categories"),
+            filter_defects=config.get("filter_defects", False),
+            skip_duplicates=config.get("skip_duplicates", False),
+            allow_rewrite_duplicates=config.get("allow_rewrite_duplicates", False),
+            seen_index=get_seen_index(),
+            skip_seen_history=config.get("skip_seen_history", False),
+            queue_name=name,
+            on_page_items=on_page_items,
+            listed_ids=stats["listed_ids"],
+        )
+        if extra_kwargs:
+            kwargs.update(extra_kwargs)
+
+        with AvitoParser(debug_mode=self.debug_mode) as parser:
+            with self._lock:
+                self._parsers.add(parser)
+            parser.progress_value.connect(on_progress)
+            parser.update_requests_count.connect(on_requests)
+            try:
+                stats["items"] = parser.search_items(
+                    config.get("search_tags", []),
+                    config.get("ignore_tags", []),
+                    **kwargs
+                ) or []
+            finally:
+                with self._lock:
+                    self._parsers.discard(parser)
+        return stats
+
+    # --- ИИ ---
+
+    def _ensure_ai(self) -> bool:
+        from app.core.ai.server_manager import ServerManager
+        from app.core.ai.llama_client import LlamaClient
+
+        if self._server is None:
+            model_path = None
+            if self.model_name:
+                model_path = os.path.join(MODELS_DIR, self.model_name)
+            else:
+                files = sorted(glob.glob(os.path.join(MODELS_DIR, "*.gguf")))
+                model_path = files[0] if files else None
+            if not model_path or not os.path.exists(model_path):
+                logger.error("Модель не найдена, ИИ-анализ пропущен...")
+                return False
+
+            self._server = ServerManager(model_path, port=AI_SERVER_PORT)
+            self._server.error_occurred.connect(lambda msg: logger.error(msg))
+            self._server.start_server(ctx_size=AI_CTX_SIZE, gpu_layers=AI_GPU_LAYERS or -1)
+            if not self._server.is_running():
+                return False
+
+        async def wait_healthy(timeout: float = 180.0) -> bool:
+            client = LlamaClient(self._server.get_port())
+            try:
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    if await client.is_healthy():
+                        return True
+                    await asyncio.sleep(1.0)
+                return False
+            finally:
+                await client.close()
+
+        ok = asyncio.run(wait_healthy())
+        if not ok:
+            logger.error("AI сервер не ответил на /health...")
+        return ok
+
+    def analyze(self, items: List[Dict], config: Dict) -> int:
+        """Анализирует товары тем же промптом, что и GUI. Возвращает число проанализированных"""
+        if not items:
+            return 0
+        with self._ai_lock:
+            if not self._ensure_ai():
+                return 0
+            return self._analyze(items, config)
+
+    def _analyze(self, items: List[Dict], config: Dict) -> int:
+        from app.core.ai.llama_client import LlamaClient
+        from app.core.ai.prompts import PromptBuilder
+        from app.core.ai.analysis import analyze_batch, apply_analysis_result
+        from app.core.text_utils import TextMatcher
+
+        memory = self.memory if config.get("store_in_memory", False) else None
+        context = {
+            "priority": PromptBuilder.select_priority(len(items), "", bool(memory), config.get("search_tags", [])),
+            "user_instructions": "",
+            "search_mode": config.get("search_mode", "full"),
+        }
+        model = os.path.basename(self._server.model_path)
+
+        async def run_all() -> int:
+            client = LlamaClient(self._server.get_port())
+            done = 0
+            try:
+                TextMatcher.precompute_corpus(items)
+                # Тот же цикл, что у AIProcessingWorker: промпт по рынку всей выдачи и памяти
+                async for i, _, cleaned in analyze_batch(client, model, memory, items, items, 0, context,
+                                                         is_running=lambda: not self._stop_requested):
+                    if not cleaned:
+                        continue
+                    try:
+                        apply_analysis_result(items[i], json.loads(cleaned))
+                        done += 1
+                    except Exception as e:
+                        logger.dev(f"AI JSON parse error: {e}", level="ERROR")
+                    logger.info(f"[{config.get('queue_name', '')}] ИИ: {i + 1}/{len(items)}")
+            finally:
+                await client.close()
+                TextMatcher.clear_cache()
+            return done
+
+        return asyncio.run(run_all())
+
+    # --- Очереди ---
+
+    def run_queue(self, config: Dict, extra_kwargs: Optional[Dict] = None) -> Dict:
+        name = config.get("queue_name", "")
+        started = time.time()
+        result = {"queue_name": name, "items": 0, "analyzed": 0, "requests": 0, "ids": [], "listed_ids": [],
+                  "file": None, "error": None, "duration": 0.0}
+        try:
+            logger.info(f"Очередь '{name}': старт...")
+            scraped = self.scrape(config, extra_kwargs=extra_kwargs)
+            items = scraped["items"]
+            result["requests"] = scraped["requests"]
+            result["items"] = len(items)
+            result["ids"] = [str(i.get("id")) for i in items if i.get("id")]
+            result["listed_ids"] = scraped["listed_ids"]
+
+            if items and self.use_ai and config.get("include_ai", False):
+                result["analyzed"] = self.analyze(items, config)
+
+            if items and config.get("store_in_memory", False):
+                self.memory.add_items(items)
+
+            if items:
+                result["file"] = save_results(items, name, self.results_dir)
+                logger.success(f"Очередь '{name}': сохранено {len(items)} шт. в {os.path.basename(result['file'])}")
+            else:
+                logger.warning(f"Очередь '{name}': результатов нет...")
+        except Exception as e:
+            result["error"] = str(e)
+            logger.error(f"Очередь '{name}': {e}")
+        result["duration"] = round(time.time() - started, 1)
+        return result
+
+    def run(self, configs: List[Dict]) -> List[Dict]:
+        results = []
+        for config in configs:
+            if self._stop_requested:
+                break
+            results.append(self.run_queue(config))
+        return results
+
+    def close(self):
+        if self._server is not None:
+            self._server.stop_server()
+            self._server = None
+
+
+def _parse_indices(value: Optional[str]) -> Optional[List[int]]:
+    if not value:
+        return None
+    # В CLI очереди нумеруются с 1, как в интерфейсе
+    return [int(x) - 1 for x in value.split(",") if x.strip()]
+
+
+def cmd_run_queues(args) -> int:
+    configs = load_queue_configs(args.state_file, _parse_indices(args.queues))
+    if not configs:
+        logger.error("Нет активных очередей с тегами для поиска!")
+        return 2
+
+    runner = HeadlessRunner(use_ai=not args.no_ai, model_name=args.model, debug_mode=args.debug,
+                            results_dir=args.results_dir or RESULTS_DIR)
+    try:
+        results = runner.run(configs)
+    except KeyboardInterrupt:
+        runner.request_stop()
+        return 130
+    finally:
+        runner.close()
+
+    for r in results:
+        status = "ERROR" if r["error"] else "OK"
+        print(f"{status}\t{r['queue_name']}\titems={r['items']}\tanalyzed={r['analyzed']}\t"
+              f"requests={r['requests']}\t{r['duration']}s\t{r['file'] or '-'}")
+    return 1 if any(r["error"] for r in results) else 0
+
+
+def cmd_schedule(args) -> int:
+    from app.core.scheduler import QueueScheduler
+
+    configs = load_queue_configs(args.state_file)
+    runner = HeadlessRunner(use_ai=not args.no_ai, model_name=args.model, debug_mode=args.debug,
+                            results_dir=args.results_dir or RESULTS_DIR)
+    kwargs = {}
+    if args.max_concurrent:
+        kwargs["max_concurrent"] = args.max_concurrent
+    if args.jitter is not None:
+        kwargs["jitter_sec"] = args.jitter
+    if args.missed:
+        kwargs["missed_policy"] = args.missed
+
+    scheduler = QueueScheduler(runner.run_queue, **kwargs)
+    if not scheduler.set_queues(configs):
+        logger.error("Ни у одной включенной очереди нет расписания (ключ \"schedule\")!")
+        return 2
+
+    scheduler.start()
+    try:
+        while not scheduler.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        logger.info("Остановка планировщика...")
+        runner.request_stop()
+    finally:
+        scheduler.stop(wait=True, timeout=60)
+        scheduler.store.close()
+        runner.close()
+    return 0
+
+
+def cmd_runs(args) -> int:
+    from app.core.scheduler import SchedulerStore
+
+    store = SchedulerStore()
+    try:
+        for r in store.get_runs(args.queue, limit=args.limit):
+            print(f"{r['started_at']}\t{r['queue_key']}\t{r['status']}\tnew={r['new_items']}\t"
+                  f"total={r['total_items']}\trequests={r['requests']}\t{r['duration']}s\t"
+                  f"{'incr' if r['incremental'] else 'full'}")
+    finally:
+        store.close()
+    return 0
+
+
+def cmd_cluster_run(args) -> int:
+    from app.core.distributed.job_queue import JobQueue
+    from app.core.distributed.coordinator import Coordinator
+    from app.core.distributed.node import make_parser
+
+    configs = load_queue_configs(args.state_file, _parse_indices(args.queues))
+    if not configs:
+        logger.error("Нет активных очередей с тегами для поиска!")
+        return 2
+
+    queue = JobQueue(args.db) if args.db else JobQueue()
+    failed = False
+    try:
+        for config in configs:
+            name = config["queue_name"]
+            max_items = config.get("max_items", 0) or None
+            coordinator = Coordinator(queue)
+            coordinator.submit_search(
+                config.get("search_tags", []),
+                config.get("ignore_tags", []),
+                max_pages=calc_max_pages(max_items),
+                max_total_items=max_items,
+                min_price=config.get("min_price") or None,
+                max_price=config.get("max_price") or None,
+                sort_type=config.get("sort_type", "date"),
+                search_all_regions=config.get("all_regions", False),
+                search_mode=config.get("search_mode", "full"),
+                forced_categories=config.get("forced_categories"),
+                filter_defects=config.get("filter_defects", False),
+                queue_name=name,
+                parser_factory=(lambda: make_parser(args.replay)) if args.replay else None,
+            )
+            if args.workers:
+                coordinator.spawn_local_workers(args.workers, replay_dir=args.replay,
+                                                idle_exit_sec=CLUSTER_IDLE_EXIT_SEC)
+            finished = coordinator.wait(
+                timeout=args.timeout or CLUSTER_RUN_TIMEOUT_SEC,
+                on_progress=lambda p: logger.progress(
+                    f"[{name}] задачи: {p['done']}/{p['total']}, товаров: {p['items']}", token="cluster"))
+            coordinator.stop_workers()
+            if not finished:
+                logger.error(f"[{name}] прогон {coordinator.run_id} не завершился за отведенное время")
+
+            items = coordinator.results()
+            stats = queue.progress(coordinator.run_id)
+            ok = finished and not stats["failed"]
+            failed = failed or not ok
+            path = save_results(items, name, args.results_dir or RESULTS_DIR) if items else "-"
+            print(f"{'OK' if ok else 'ERROR'}\t{name}\titems={len(items)}\t"
+                  f"jobs={stats['done']}/{stats['total']}\t{path}")
+    finally:
+        queue.close()
+    return 1 if failed else 0
+
+
+def cmd_cluster_worker(args) -> int:
+    from app.core.distributed.node import run_worker_process
+
+    done = run_worker_process(args.db, worker_id=args.worker_id, replay_dir=args.replay,
+                              idle_exit_sec=args.idle_exit, run_id=args.run_id)
+    print(f"jobs={done}")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="AvitoAssist без GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run-queues", help="Выполнить очереди из queues_state.json")
+    run.add_argument("state_file", help="Путь к queues_state.json")
+    run.add_argument("--queues", help="Номера очередей через запятую (по умолчанию — все включенные)")
+    run.add_argument("--no-ai", action="store_true", help="Не запускать ИИ-анализ")
+    run.add_argument("--model", help="Имя .gguf модели в папке models")
+    run.add_argument("--results-dir", help="Куда сохранять результаты")
+    run.add_argument("--debug", action="store_true", help="Отладочный режим браузера")
+    run.set_defaults(func=cmd_run_queues)
+
+    sched = sub.add_parser("schedule", help="Запускать очереди по их расписаниям (ключ \"schedule\" в queues_state.json, до Ctrl+C)")
+    sched.add_argument("state_file", help="Путь к queues_state.json")
+    sched.add_argument("--max-concurrent", type=int, help="Сколько очередей может идти одновременно")
+    sched.add_argument("--jitter", type=float, help="Случайная задержка запуска, сек")
+    sched.add_argument("--missed", choices=["run_once", "skip"], help="Что делать с пропущенными запусками")
+    sched.add_argument("--no-ai", action="store_true", help="Не запускать ИИ-анализ")
+    sched.add_argument("--model", help="Имя .gguf модели в папке models")
+    sched.add_argument("--results-dir", help="Куда сохранять результаты")
+    sched.add_argument("--debug", action="store_true", help="Отладочный режим браузера")
+    sched.set_defaults(func=cmd_schedule)
+
+    runs = sub.add_parser("runs", help="Статистика прогонов планировщика")
+    runs.add_argument("--queue", help="Имя очереди")
+    runs.add_argument("--limit", type=int, default=20)
+    runs.set_defaults(func=cmd_runs)
+
+    crun = sub.add_parser("cluster-run", help="Раздать очереди узлам через очередь задач")
+    crun.add_argument("state_file", help="Путь к queues_state.json")
+    crun.add_argument("--queues", help="Номера очередей через запятую")
+    crun.add_argument("--db", help="Файл очереди задач (общий для узлов)")
+    crun.add_argument("--workers", type=int, default=2, help="Сколько локальных узлов запустить (0 — только внешние)")
+    crun.add_argument("--replay", help="Каталог сохраненных страниц вместо браузера")
+    crun.add_argument("--results-dir", help="Куда сохранять результаты")
+    crun.add_argument("--timeout", type=float, help="Сколько ждать одну очередь, сек")
+    crun.set_defaults(func=cmd_cluster_run)
+
+    cworker = sub.add_parser("cluster-worker", help="Узел: брать задачи из очереди и парсить")
+    cworker.add_argument("--db", required=True, help="Файл очереди задач")
+    cworker.add_argument("--worker-id", help="Имя узла")
+    cworker.add_argument("--replay", help="Каталог сохраненных страниц вместо браузера")
+    cworker.add_argument("--idle-exit", type=float, help="Выйти после N секунд без задач")
+    cworker.add_argument("--run-id", help="Брать задачи только из этого прогона")
+    cworker.set_defaults(func=cmd_cluster_worker)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -79,6 +79,70 @@ USER_AGENTS = [
 
 # Parser
 ALL_PAGES_LIMIT = 100
+# Парсер в отдельном процессе (изоляция от GUI/GIL и от падений Chrome)
+PARSER_PROCESS_ISOLATION = True
+
+# Streaming (постраничная выдача результатов)
+STREAM_MAX_PENDING_BATCHES = 4
+STREAM_ACK_TIMEOUT = 30.0
+
+# Планировщик очередей
+SCHEDULER_TICK_SEC = 5.0
+SCHEDULER_MAX_CONCURRENT = 1
+SCHEDULER_JITTER_SEC = 60
+SCHEDULER_MISSED_POLICY = "run_once"   # run_once | skip
+SCHEDULER_WATERMARK_SIZE = 200
+INCREMENTAL_STOP_AFTER_KNOWN = 10
+
+# Параллельные очереди и общий бюджет запросов
+QUEUE_PARALLELISM = 1
+REQUEST_BUDGET_PER_MIN = 60
+REQUEST_BUDGET_BURST = 5
+
+# Распределенный парсинг (очередь задач на SQLite)
+CLUSTER_LEASE_SEC = 60.0
+CLUSTER_HEARTBEAT_SEC = 10.0
+CLUSTER_MAX_ATTEMPTS = 3
+# Простой узла до выхода дольше аренды: иначе задачу умершего узла некому забрать
+CLUSTER_IDLE_EXIT_SEC = CLUSTER_LEASE_SEC * 2
+CLUSTER_RUN_TIMEOUT_SEC = 3600.0
+
+# Пул выходов (прокси). "direct" — прямое подключение хоста
+EGRESS_PROXIES = []
+EGRESS_RATE_PER_MIN = 20
+EGRESS_BURST = 3
+EGRESS_BAN_COOLDOWN = 120
+EGRESS_BAN_COOLDOWN_MAX = 1800
+EGRESS_BAN_WINDOW = 3600
+EGRESS_SWITCH_AFTER = 5.0
+
+# Файлы результатов: снапшот + append-only журнал изменений
+RESULTS_LOG_COMPACT_RATIO = 0.5
+RESULTS_LOG_COMPACT_MIN_BYTES = 256 * 1024
+RESULTS_WRITE_DEBOUNCE_SEC = 0.5
+RESULTS_LOAD_CHUNK = 500
+RESULTS_LOAD_READ_SIZE = 64 * 1024
+ITEM_COMPRESS_MIN_LEN = 200
+
+# Экспорт таблиц (CSV/XLSX) в фоне
+EXPORT_PROGRESS_EVERY = 500
+EXPORT_WIDTH_SAMPLE = 200
+
+# Базы памяти ИИ (SQLite): соединение на поток
+MEMORY_DB_BUSY_TIMEOUT_MS = 10000
+MEMORY_DB_SYNCHRONOUS = "NORMAL"
+MEMORY_DB_CACHED_STATEMENTS = 256
+# Размер страницы при постраничном чтении товаров памяти (просмотр базы, экспорт)
+MEMORY_PAGE_SIZE = 1000
+# Импорт резервной копии памяти: записей в одной транзакции
+MEMORY_IMPORT_BATCH = 2000
+# Минимальная похожесть чанка на запрос для RAG (0..1)
+RAG_MIN_SCORE = 0.3
+# История цен: окно тренда и порог "стабильной" цены, %
+PRICE_TREND_DAYS = 30
+PRICE_TREND_STABLE_PERCENT = 3.0
+# Рыночная статистика в памяти: период полураспада веса цены для взвешенной медианы, дни
+MARKET_STATS_HALF_LIFE_DAYS = 14
 
 # Delays
 MIN_REQUEST_DELAY = 2.0
@@ -102,6 +166,7 @@ COOLDOWN_DURATION_MAX = 15.0
 AI_CTX_SIZE = 8192
 AI_GPU_LAYERS = -1
 AI_SERVER_PORT = 51134
+AI_PIPELINE_MAX_PENDING = 8
 AI_BACKEND_PREFERENCE = "auto"
 DEFAULT_MODEL_NAME = "google_gemma-3-4b-it-Q8_0.gguf"
 DEFAULT_MODEL_REPO = "bartowski/google_gemma-3-4b-it-GGUF"
\ No newline at end of file
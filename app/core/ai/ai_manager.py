@@ -6,14 +6,16 @@ import re
 import requests
 import gc
 import time
+import queue
 from typing import List, Dict, Optional
 
 from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer, Qt
 
-from app.config import AI_CTX_SIZE, AI_GPU_LAYERS, AI_SERVER_PORT, MODELS_DIR
+from app.config import AI_CTX_SIZE, AI_GPU_LAYERS, AI_SERVER_PORT, AI_PIPELINE_MAX_PENDING, MODELS_DIR
 from app.core.ai.server_manager import ServerManager
 from app.core.ai.llama_client import LlamaClient
 from app.core.ai.prompts import PromptBuilder
+from app.core.ai.analysis import analyze_batch, build_item_prompt, request_verdict, save_items_to_memory
 from app.core.text_utils import TextMatcher
 from app.core.log_manager import logger
 
@@ -21,10 +23,12 @@ from app.core.log_manager import logger
 class AIProcessingWorker(QThread):
     progress_value = pyqtSignal(int)
     result_signal = pyqtSignal(int, str, dict)
+    task_done_signal = pyqtSignal(int)
     finished_signal = pyqtSignal()
     error_signal = pyqtSignal(str)
 
-    def __init__(self, port: int, items: List[Dict], prompts: List[str], rag_messages: List[Optional[str]], context: Dict, model_name: str):
+    def __init__(self, port: int, items: List[Dict], prompts: List[str], rag_messages: List[Optional[str]], context: Dict, model_name: str,
+                 task_queue: Optional[queue.Queue] = None, memory_manager=None):
         super().__init__()
         self.port = port
         self.items = items
@@ -32,6 +36,10 @@ class AIProcessingWorker(QThread):
         self.rag_messages = rag_messages
         self.context = context
         self.model_name = model_name
+        # Конвейерный режим: пачки (start, items) приходят по мере парсинга, None — конец.
+        # Сохранение в память и сборка промптов (RAG, статистика рынка) идут здесь, а не в GUI-потоке
+        self.task_queue = task_queue
+        self.memory_manager = memory_manager
         self._is_running = True
 
     def stop(self):
@@ -44,56 +52,23 @@ class AIProcessingWorker(QThread):
     async def _process_async(self):
         client = LlamaClient(self.port)
         try:
-            total = len(self.items)
-            
-            gen_params = {
-                "response_format": {"type": "json_object"}, 
-                "temperature": 0.3,
-                "top_k": 64,
-                "top_p": 0.95,
-                "min_p": 0.05,
-                "repeat_penalty": 1.05,
-                "max_tokens": 1024,
-                "mirostat_mode": 0
-            }
-
-            for i, item in enumerate(self.items):
-                if not self._is_running: break
-                
-                if i < len(self.rag_messages) and self.rag_messages[i]:
-                    logger.success(self.rag_messages[i])
-
-                logger.progress(f"Нейросеть анализирует: {i + 1}/{total}...", token="ai_batch")
-                self.progress_value.emit(int(((i + 1) / total) * 100))
-                
-                prompt_text = self.prompts[i] if i < len(self.prompts) else self.prompts[-1]
-                
-                clean_item = {
-                    k: v for k, v in item.items() 
-                    if k in ['title', 'price', 'description', 'city', 'condition', 'seller_id', 'views', 'date_text', 'link']
-                }
-                item_dump = json.dumps(clean_item, ensure_ascii=False)
-
-                system_instruction = PromptBuilder.SYSTEM_BASE
-
-                messages = [
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": f"{prompt_text}\n\nВОТ ДАННЫЕ ТОВАРА:\n{item_dump}"}
-                ]
-
-                response = await client.chat_completion(
-                    model=self.model_name,
-                    messages=messages,
-                    params=gen_params
-                )
-
-                if response:
-                    cleaned = self._clean_json(response)
-                    self.result_signal.emit(i, cleaned, self.context)
-                    if i % 5 == 0:
-                        gc.collect()
-                else:
-                    self.error_signal.emit(f"Пустой ответ ИИ для #{i}...")
+            if self.task_queue is not None:
+                while self._is_running:
+                    try:
+                        task = self.task_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if task is None:
+                        break
+                    await self._process_batch(client, *task)
+            else:
+                total = len(self.items)
+                for i, item in enumerate(self.items):
+                    if not self._is_running: break
+                    rag_message = self.rag_messages[i] if i < len(self.rag_messages) else None
+                    prompt_text = self.prompts[i] if i < len(self.prompts) else self.prompts[-1]
+                    self._report_progress(i, rag_message, total)
+                    self._report_result(i, await request_verdict(client, self.model_name, prompt_text, item))
             
             logger.success("Анализ завершен...")
             self.finished_signal.emit()
@@ -105,18 +80,38 @@ class AIProcessingWorker(QThread):
             await client.close()
             TextMatcher.clear_cache()
 
-    def _clean_json(self, text: str) -> str:
-        if not text: return "{}"
-
-        match_code = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-        if match_code:
-            return match_code.group(1)
-        
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            return match.group(0)
-
-        return text.replace("```json", "").replace("```", "").strip()
+    async def _process_batch(self, client: LlamaClient, start: int, batch: List[Dict]):
+        context = self.context
+        save_items_to_memory(self.memory_manager, batch, context)
+
+        # Рынок для сравнения — все товары, поданные до конца этой пачки включительно
+        pool = self.items[:start + len(batch)]
+        done = start
+        async for i, rag_message, cleaned in analyze_batch(
+                client, self.model_name, self.memory_manager, batch, pool, start, context,
+                is_running=lambda: self._is_running):
+            self._report_progress(i, rag_message, len(self.items))
+            self._report_result(i, cleaned)
+            self.task_done_signal.emit(i)
+            done = i + 1
+        # После остановки оставшиеся товары пачки тоже считаются обработанными (back-pressure)
+        for i in range(done, start + len(batch)):
+            self.task_done_signal.emit(i)
+
+    def _report_progress(self, i: int, rag_message: Optional[str], total: int):
+        if rag_message:
+            logger.success(rag_message)
+
+        logger.progress(f"Нейросеть анализирует: {i + 1}/{total}...", token="ai_batch")
+        self.progress_value.emit(int(((i + 1) / max(total, 1)) * 100))
+
+    def _report_result(self, i: int, cleaned: Optional[str]):
+        if cleaned:
+            self.result_signal.emit(i, cleaned, self.context)
+            if i % 5 == 0:
+                gc.collect()
+        else:
+            self.error_signal.emit(f"Пустой ответ ИИ для #{i}...")
 
 
 class AIChatWorker(QThread):
@@ -301,6 +296,7 @@ class AIManager(QObject):
     error_signal = pyqtSignal(str)
     server_ready_signal = pyqtSignal()
     chat_response_signal = pyqtSignal(str)
+    pipeline_capacity_changed = pyqtSignal()
 
     def __init__(self, memory_manager=None):
         super().__init__()
@@ -333,6 +329,13 @@ class AIManager(QObject):
         self.analysis_timer.timeout.connect(self._tick_analysis_timer)
         self.start_ts = 0
 
+        self._pipeline_queue: Optional[queue.Queue] = None
+        self._pipeline_context: Dict = {}
+        self._pipeline_pending = 0
+        self._pipeline_ids = set()
+        self._pipeline_closed = True
+        self._pipeline_started = False
+
     def _find_default_model(self) -> Optional[str]:
         if not os.path.exists(MODELS_DIR):
             os.makedirs(MODELS_DIR, exist_ok=True)
@@ -420,31 +423,8 @@ class AIManager(QObject):
         except Exception as e:
             logger.error(f"AI Health ошибка: {e}")
 
-    def _save_items_to_database(self, items: List[Dict], context: Dict):
-        """Сохраняет все проанализированные items в raw_items для культивации."""
-        if not self.memory_manager:
-            return
-
-        product_key = context.get('product_key')
-        category = context.get('category')
-
-        saved_count = 0
-        for item in items:
-            try:
-                self.memory_manager.add_raw_item(
-                    item=item,
-                    categories=[category] if category else None,
-                    product_keys=[product_key] if product_key else None
-                )
-                saved_count += 1
-            except Exception as e:
-                logger.dev(f"Failed to save item to raw_data: {e}", level="DEBUG")
-
-        if saved_count > 0:
-            logger.info(f"Сохранено {saved_count} items в базу для культивации", token="ai-mem")
-
     def start_processing(self, items: List[Dict], prompt: Optional[str], debug_mode: bool, context: Dict):
-        self._save_items_to_database(items, context)
+        save_items_to_memory(self.memory_manager, items, context)
 
         self.ensure_server()
         if not self._server_ready:
@@ -470,47 +450,8 @@ class AIManager(QObject):
             instr = context.get('user_instructions', "")
             
             for item in items:
-                rag = None
-                log_msg = None
-
-                if self.memory_manager:
-                    rag = self.memory_manager.get_rag_context_for_item(item.get('title', ''))
-
-                if rag:
-                    knowledge_text = rag.get('knowledge', '')
-                    is_smart_chunk = knowledge_text and "Нет детального" not in knowledge_text
-
-                    status_icon = "✅ Чанк активен" if is_smart_chunk else "⚠️ Live-статистика"
-                    preview = knowledge_text[:40] + "..." if is_smart_chunk else "Опора на мат. ожидание"
-
-                    stats_str = (
-                        f"📊 {rag.get('sample_count', 0)} лотов | "
-                        f"Med: {rag.get('median_price', 0)}₽ | "
-                        f"Avg: {rag.get('avg_price', 0)}₽"
-                    )
-
-                    log_msg = (
-                        f"🧠 ПАМЯТЬ ({item.get('title', '')[:20]}...):\n"
-                        f"   └─ {stats_str}\n"
-                        f"   └─ Режим: {status_icon} -> {preview}"
-                    )
-
+                p, log_msg = self._build_item_prompt(item, items, prio, instr, search_mode)
                 rag_messages_list.append(log_msg)
-
-                similar_items = TextMatcher.filter_similar_items(
-                    target_title=item.get('title', ''), 
-                    all_items=items,
-                    threshold=0.35
-                )
-
-                p = PromptBuilder.build_analysis_prompt(
-                    items=similar_items,
-                    priority=prio, 
-                    current_item=item, 
-                    user_instructions=instr, 
-                    rag_context=rag,
-                    search_mode=search_mode
-                )
                 prompts_list.append(p)
 
         if self.processing_worker and self.processing_worker.isRunning():
@@ -525,14 +466,120 @@ class AIManager(QObject):
             context=context,
             model_name=self._model_name
         )
+        self._connect_processing_worker()
+        self.processing_worker.start()
+
+    def _build_item_prompt(self, item: Dict, pool: List[Dict], prio, instr: str, search_mode: str):
+        return build_item_prompt(self.memory_manager, item, pool, prio, instr, search_mode)
+
+    def _connect_processing_worker(self):
         self.processing_worker.progress_value.connect(self.ai_progress_value.emit)
         self.processing_worker.result_signal.connect(self.result_signal.emit)
         self.processing_worker.finished_signal.connect(self.finished_signal.emit)
         self.processing_worker.finished_signal.connect(self.all_finished_signal.emit)
         self.processing_worker.finished_signal.connect(self._on_processing_finished)
         self.processing_worker.error_signal.connect(self.error_signal.emit)
+
+    # === Конвейерный анализ (параллельно с парсингом) ===
+
+    def start_pipeline(self, context: Dict, debug_mode: bool = False):
+        """
+        Открывает конвейер: товары подаются через feed_pipeline по мере парсинга.
+        Индексы result_signal — позиции в context['items'], который растет по мере подачи.
+        Воркер стартует с первой пачкой: пустой конвейер закрывается без finished_signal.
+        """
+        self.close_pipeline()
+        context['items'] = []
+        self._pipeline_context = context
+        self._pipeline_queue = queue.Queue()
+        self._pipeline_pending = 0
+        self._pipeline_ids = set()
+        self._pipeline_closed = False
+        self._pipeline_started = False
+
+        # Модель загружается, пока парсер собирает первую страницу
+        self.ensure_server()
+
+    def _launch_pipeline(self):
+        self._pipeline_started = True
+        self.start_ts = time.time()
+        self.analysis_timer.start(1000)
+
+        if self._server_ready:
+            self._start_pipeline_worker()
+        else:
+            self.server_ready_signal.connect(self._start_pipeline_worker, Qt.ConnectionType.SingleShotConnection)
+
+    def _start_pipeline_worker(self):
+        if self._pipeline_queue is None:
+            return
+        if self.processing_worker and self.processing_worker.isRunning():
+            if self.processing_worker.task_queue is self._pipeline_queue:
+                return
+            self.processing_worker.stop()
+            self.processing_worker.wait()
+
+        self.processing_worker = AIProcessingWorker(
+            port=self.server_manager.get_port(),
+            items=self._pipeline_context['items'],
+            prompts=[],
+            rag_messages=[],
+            context=self._pipeline_context,
+            model_name=self._model_name,
+            task_queue=self._pipeline_queue,
+            memory_manager=self.memory_manager
+        )
+        self._connect_processing_worker()
+        self.processing_worker.task_done_signal.connect(self._on_pipeline_task_done)
         self.processing_worker.start()
 
+    def feed_pipeline(self, items: List[Dict]) -> int:
+        """Добавляет пачку товаров в открытый конвейер. Возвращает число принятых"""
+        if self._pipeline_queue is None or not items:
+            return 0
+
+        context = self._pipeline_context
+        fresh = []
+        for item in items:
+            iid = str(item.get('id', ''))
+            if iid and iid in self._pipeline_ids:
+                continue
+            self._pipeline_ids.add(iid)
+            fresh.append(item)
+        if not fresh:
+            return 0
+
+        start = len(context['items'])
+        context['items'].extend(fresh)
+        self._pipeline_pending += len(fresh)
+        self._pipeline_queue.put((start, fresh))
+        if not self._pipeline_started:
+            self._launch_pipeline()
+        return len(fresh)
+
+    def pipeline_has_capacity(self) -> bool:
+        return self._pipeline_pending < AI_PIPELINE_MAX_PENDING
+
+    def is_pipeline_open(self) -> bool:
+        return self._pipeline_queue is not None and not self._pipeline_closed
+
+    def pipeline_size(self) -> int:
+        return len(self._pipeline_context.get('items') or [])
+
+    def close_pipeline(self):
+        """Конец подачи: воркер доработает очередь и отправит finished_signal"""
+        if self._pipeline_queue is not None and not self._pipeline_closed:
+            if self._pipeline_started:
+                self._pipeline_queue.put(None)
+            else:
+                # Ничего не подано — воркер не запускался, и сигналов завершения не будет
+                self._pipeline_queue = None
+        self._pipeline_closed = True
+
+    def _on_pipeline_task_done(self, index: int):
+        self._pipeline_pending = max(0, self._pipeline_pending - 1)
+        self.pipeline_capacity_changed.emit()
+
     def start_cultivation_for_chunk(self, chunk_id, chunk_type, prompt, on_complete, user_instructions: str = ""):
         if any(item['id'] == chunk_id for item in self._cultivation_queue):
             return
@@ -614,16 +661,28 @@ class AIManager(QObject):
 
         last_msg = messages[-1]['content'].lower()
         db_search_context = ""
-        
+        market = None
+
         if self.memory_manager:
             import re
             keywords = [w for w in re.split(r'\W+', last_msg) if len(w) > 3 and w not in ['цена', 'сколько', 'стоит']]
             
             if keywords:
                 search_query = " ".join(keywords[:2])
-                items = self.memory_manager.get_raw_items(search_query=search_query, limit=50)
-                
-                if items:
+                market = self.memory_manager.find_market_stats(search_query)
+                items = [] if market else self.memory_manager.get_raw_items(
+                    search_query=search_query, limit=50, with_relations=False)
+
+                if market:
+                    db_search_context = (
+                        f"\n[ГЛОБАЛЬНАЯ БАЗА ЗНАНИЙ ПО ЗАПРОСУ '{search_query}' (ключ {market['product_key']})]:\n"
+                        f"- Лотов в базе: {market['count']}\n"
+                        f"- Диапазон цен: {market['min']} - {market['max']} руб.\n"
+                        f"- Медиана: {market['median']} руб. | Средняя: {market['mean']} руб.\n"
+                        f"- Квартили: {market['q25']} - {market['q75']} руб. | "
+                        f"Медиана свежих цен: {market['weighted_median']} руб."
+                    )
+                elif items:
                     prices = [i['price'] for i in items if i['price'] > 0]
                     if prices:
                         avg_p = sum(prices) // len(prices)
@@ -656,11 +715,14 @@ class AIManager(QObject):
             search_key = last_msg[:60]
             rag_data = self.memory_manager.get_rag_context_for_item(search_key)
             
-            if rag_data:
-                q25 = rag_data.get('q25_price', rag_data.get('median_price', 0))
-                median = rag_data.get('median_price', 0)
-                sample = rag_data.get('sample_count', 0)
-                
+            if rag_data or market:
+                if rag_data:
+                    q25 = rag_data.get('q25_price', rag_data.get('median_price', 0))
+                    median = rag_data.get('median_price', 0)
+                    sample = rag_data.get('sample_count', 0)
+                else:
+                    q25, median, sample = market['q25'], market['median'], market['count']
+
                 rag_injection = (
                     f"\n\n[АКТУАЛЬНЫЕ ДАННЫЕ ИЗ ПАМЯТИ ПО ТОВАРУ]\n"
                     f"• Лотов в базе: {sample}\n"
@@ -707,6 +769,9 @@ class AIManager(QObject):
         logger.info(f"Прошедшее время анализа: {time_str}...", token="ai_timer")
 
     def _on_processing_finished(self):
+        if self.processing_worker and self.processing_worker.task_queue is self._pipeline_queue:
+            self._pipeline_queue = None
+            self._pipeline_pending = 0
         self.analysis_timer.stop()
         logger.delete_log("ai_batch") 
 
@@ -714,6 +779,8 @@ class AIManager(QObject):
         return (self.processing_worker and self.processing_worker.isRunning()) or (self.chat_worker and self.chat_worker.isRunning())
 
     def stop(self):
+        self.close_pipeline()
+        self._pipeline_queue = None
         if self.processing_worker:
             self.processing_worker.stop()
             self.processing_worker.wait()
@@ -0,0 +1,156 @@
+import re
+import json
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.ai.prompts import PromptBuilder
+from app.core.text_utils import TextMatcher
+from app.core.log_manager import logger
+
+# Общие части анализа товара без Qt: используются AIManager и headless CLI
+
+GEN_PARAMS = {
+    "response_format": {"type": "json_object"},
+    "temperature": 0.3,
+    "top_k": 64,
+    "top_p": 0.95,
+    "min_p": 0.05,
+    "repeat_penalty": 1.05,
+    "max_tokens": 1024,
+    "mirostat_mode": 0
+}
+
+ITEM_FIELDS = ['title', 'price', 'description', 'city', 'condition', 'seller_id', 'views', 'date_text', 'link']
+
+
+def build_item_messages(prompt_text: str, item: Dict) -> List[Dict]:
+    clean_item = {k: v for k, v in item.items() if k in ITEM_FIELDS}
+    item_dump = json.dumps(clean_item, ensure_ascii=False)
+
+    return [
+        {"role": "system", "content": PromptBuilder.SYSTEM_BASE},
+        {"role": "user", "content": f"{prompt_text}\n\nВОТ ДАННЫЕ ТОВАРА:\n{item_dump}"}
+    ]
+
+
+def clean_json(text: str) -> str:
+    if not text: return "{}"
+
+    match_code = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if match_code:
+        return match_code.group(1)
+
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        return match.group(0)
+
+    return text.replace("```json", "").replace("```", "").strip()
+
+
+def save_items_to_memory(memory_manager, items: List[Dict], context: Dict) -> int:
+    """Сохраняет товары анализа в raw_items для культивации, возвращает число сохраненных"""
+    if not memory_manager or not items:
+        return 0
+
+    product_key = context.get('product_key')
+    category = context.get('category')
+
+    try:
+        statuses = memory_manager.add_raw_items(
+            items,
+            categories=[category] if category else None,
+            product_keys=[product_key] if product_key else None
+        )
+    except Exception as e:
+        logger.dev(f"Failed to save items to raw_data: {e}", level="DEBUG")
+        return 0
+    saved_count = sum(1 for status in statuses if status != "error")
+
+    if saved_count > 0:
+        logger.info(f"Сохранено {saved_count} items в базу для культивации", token="ai-mem")
+    return saved_count
+
+
+def build_item_prompt(memory_manager, item: Dict, pool: List[Dict], prio, instr: str,
+                      search_mode: str) -> Tuple[str, Optional[str]]:
+    """Промпт анализа товара (рынок из pool, статистика ключа и RAG из памяти) и строка лога про память"""
+    rag = None
+    market_stats = None
+    log_msg = None
+
+    if memory_manager:
+        rag = memory_manager.get_rag_context_for_item(item.get('title', ''))
+        market_stats = memory_manager.find_market_stats(item.get('title', ''))
+
+    if rag:
+        knowledge_text = rag.get('knowledge', '')
+        is_smart_chunk = knowledge_text and "Нет детального" not in knowledge_text
+
+        status_icon = "✅ Чанк активен" if is_smart_chunk else "⚠️ Live-статистика"
+        preview = knowledge_text[:40] + "..." if is_smart_chunk else "Опора на мат. ожидание"
+
+        stats_str = (
+            f"📊 {rag.get('sample_count', 0)} лотов | "
+            f"Med: {rag.get('median_price', 0)}₽ | "
+            f"Avg: {rag.get('avg_price', 0)}₽"
+        )
+
+        log_msg = (
+            f"🧠 ПАМЯТЬ ({item.get('title', '')[:20]}...):\n"
+            f"   └─ {stats_str}\n"
+            f"   └─ Режим: {status_icon} -> {preview}"
+        )
+
+    similar_items = TextMatcher.filter_similar_items(
+        target_title=item.get('title', ''),
+        all_items=pool,
+        threshold=0.35
+    )
+
+    prompt = PromptBuilder.build_analysis_prompt(
+        items=similar_items,
+        priority=prio,
+        current_item=item,
+        user_instructions=instr,
+        rag_context=rag,
+        search_mode=search_mode,
+        market_stats=market_stats
+    )
+    return prompt, log_msg
+
+
+async def request_verdict(client, model_name: str, prompt_text: str, item: Dict) -> Optional[str]:
+    """Запрос вердикта по товару: очищенный JSON ответа или None, если ответ пустой"""
+    response = await client.chat_completion(
+        model=model_name,
+        messages=build_item_messages(prompt_text, item),
+        params=GEN_PARAMS
+    )
+    return clean_json(response) if response else None
+
+
+async def analyze_batch(client, model_name: str, memory_manager, batch: List[Dict], pool: List[Dict],
+                        start: int, context: Dict,
+                        is_running: Callable[[], bool] = lambda: True
+                        ) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Анализ пачки товаров по одному: (индекс start + n, строка лога про память, вердикт или None).
+    Промпт строится по рынку pool и памяти; is_running() проверяется перед каждым товаром
+    """
+    prio = context.get('priority', 1)
+    instr = context.get('user_instructions', "")
+    search_mode = context.get('search_mode', 'full')
+
+    for offset, item in enumerate(batch):
+        if not is_running():
+            break
+        prompt_text, rag_message = build_item_prompt(memory_manager, item, pool, prio, instr, search_mode)
+        yield start + offset, rag_message, await request_verdict(client, model_name, prompt_text, item)
+
+
+def apply_analysis_result(item: Dict, data: Dict):
+    """Переносит вердикт ИИ в товар (как в таблице результатов)"""
+    item["ai"] = data
+    item["verdict"] = data.get("verdict")
+    item["reason"] = data.get("reason")
+    item["market_position"] = data.get("market_position")
+    item["defects"] = data.get("defects")
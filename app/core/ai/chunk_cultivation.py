@@ -173,13 +173,15 @@ class ChunkCultivationManager(QObject):
 
         if chunk_type == ChunkType.PRODUCT.value:
             items = self.memory.find_similar_items(chunk_key, limit=50)
-            return ChunkCultivationPrompts.build_product_cultivation_prompt(chunk_key, items)
+            trend = self.memory.get_price_trend(chunk_key)
+            return ChunkCultivationPrompts.build_product_cultivation_prompt(chunk_key, items, trend)
 
         if chunk_type == ChunkType.CATEGORY.value:
             # Get items from raw_data for category cultivation
-            items = self.memory.get_items_for_product_key(chunk_key)[:200]
+            items = self.memory.get_items_for_product_key(chunk_key, with_relations=False, limit=200)
             if items:
                 stats = self.memory.get_raw_data_statistics()
+                stats.update(self.memory.get_price_trend(chunk_key) or {})
             else:
                 stats = {}
             return ChunkCultivationPrompts.build_category_cultivation_prompt(chunk_key, stats)
@@ -106,7 +106,11 @@ class PromptBuilder:
         return AnalysisPriority.PRICE
     
     @staticmethod
-    def _build_market_stats(items: List[Dict], current_title: str) -> Dict:
+    def _build_market_stats(items: List[Dict], current_title: str, memory_stats: Optional[Dict] = None) -> Dict:
+        """
+        Статистика похожих лотов текущей выдачи. Если в выдаче меньше 3 цен, а в памяти
+        есть статистика ключа товара (memory_stats), берется она (source = 'memory').
+        """
         default_stats = {
             "sample_size": 0,
             "avg": 0,
@@ -114,16 +118,27 @@ class PromptBuilder:
             "min": 0,
             "max": 0,
             "cnt": 0,
+            "source": "table",
         }
 
-        if not items or not current_title:
-            return default_stats
-
-        prices = [
-            i.get("price", 0)
-            for i in items
-            if isinstance(i.get("price"), int) and i.get("price") > 500
-        ]
+        prices = []
+        if items and current_title:
+            prices = [
+                i.get("price", 0)
+                for i in items
+                if isinstance(i.get("price"), int) and i.get("price") > 500
+            ]
+
+        if len(prices) <= 2 and memory_stats and memory_stats.get("count", 0) > 2:
+            return {
+                "sample_size": memory_stats["count"],
+                "avg": memory_stats["mean"],
+                "med": memory_stats.get("weighted_median") or memory_stats["median"],
+                "min": memory_stats["min"],
+                "max": memory_stats["max"],
+                "cnt": memory_stats["count"],
+                "source": "memory",
+            }
 
         if not prices:
             return default_stats
@@ -135,14 +150,29 @@ class PromptBuilder:
             "min": min(prices),
             "max": max(prices),
             "cnt": len(prices),
+            "source": "table",
         }
+
+    @staticmethod
+    def _format_memory_market(memory_stats: Optional[Dict]) -> str:
+        if not memory_stats:
+            return ""
+        return (
+            f"РЫНОК ПО ПАМЯТИ (все сохраненные лоты ключа, {memory_stats['count']} шт.):\n"
+            f"- Диапазон: {memory_stats['min']} - {memory_stats['max']} руб.\n"
+            f"- Медиана: {memory_stats['median']} руб. | Средняя: {memory_stats['mean']} руб.\n"
+            f"- Квартили: {memory_stats['q25']} - {memory_stats['q75']} руб. | "
+            f"Медиана свежих цен: {memory_stats['weighted_median']} руб.\n"
+        )
     
     @classmethod
-    def build_analysis_prompt(cls, items: List[Dict], priority: AnalysisPriority, current_item: Dict, user_instructions: str = "", rag_context: Optional[Dict] = None, search_mode: str = 'full') -> str:
-        stats = cls._build_market_stats(items, current_item.get('title'))
+    def build_analysis_prompt(cls, items: List[Dict], priority: AnalysisPriority, current_item: Dict, user_instructions: str = "", rag_context: Optional[Dict] = None, search_mode: str = 'full', market_stats: Optional[Dict] = None) -> str:
+        stats = cls._build_market_stats(items, current_item.get('title'), market_stats)
         
         current_market_str = "Мало данных для статистики."
-        if stats['sample_size'] > 2:
+        if stats['source'] == 'memory':
+            current_market_str = "В текущей выдаче мало похожих лотов, ориентир — рынок по памяти."
+        elif stats['sample_size'] > 2:
             current_market_str = (
                 f"В ТЕКУЩЕЙ ВЫДАЧЕ (похожих лотов: {stats['cnt']}):\n"
                 f"- Диапазон: {stats['min']} - {max(stats['max'], 1)} руб.\n"
@@ -162,8 +192,9 @@ class PromptBuilder:
                 f"- Ист. Средняя: {avg} руб.\n"
                 f"- Знания: {knowledge}\n"
             )
-        else:
+        elif not market_stats:
             rag_block = "В памяти нет данных по этому товару."
+        rag_block = cls._format_memory_market(market_stats) + rag_block
 
         item_price = current_item.get('price', 0)
         item_views = current_item.get('views', 0)
@@ -310,13 +341,20 @@ class PromptBuilder:
 
 class ChunkCultivationPrompts: 
     @staticmethod
-    def build_product_cultivation_prompt(product_key: str, items: list) -> str:  
+    def build_product_cultivation_prompt(product_key: str, items: list, trend: Optional[Dict] = None) -> str:  
         items_text = ""
         for item in items[:40]:
             p = item.get('price', 0)
             t = item.get('title', 'N/A')
             v = item.get('verdict', 'N/A')
             items_text += f"- {t} | {p} руб. | {v}\n"
+
+        trend_text = "нет истории цен, оцени по объявлениям"
+        if trend:
+            trend_text = (
+                f"{trend['trend']} ({trend['trend_percent']:+}% за {trend['days']} дн. наблюдений, "
+                f"медиана {trend['first_median']:.0f} → {trend['last_median']:.0f} руб.) — используй это значение"
+            )
         
         return f"""
         ТЫ — ПРОФЕССИОНАЛЬНЫЙ РЫНОЧНЫЙ АНАЛИТИК по новому и Б/У компьютерному железу.
@@ -325,6 +363,8 @@ class ChunkCultivationPrompts:
         ИСХОДНЫЕ ДАННЫЕ (объявления):
         {items_text}
 
+        ИЗМЕРЕННЫЙ ТРЕНД ЦЕН: {trend_text}
+
         ТРЕБОВАНИЕ: Проанализируй рынок и верни ТОЛЬКО JSON следующей структуры:
 
         {{
@@ -5,7 +5,7 @@ import socket
 import psutil
 import atexit
 import time
-from PyQt6.QtCore import QObject, pyqtSignal
+from app.core.signals import QObject, pyqtSignal
 from app.core.log_manager import logger
 from app.config import AI_BACKEND_PREFERENCE, BASE_APP_DIR
 
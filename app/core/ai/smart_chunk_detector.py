@@ -38,7 +38,7 @@ class SmartChunkDetector:
         to_create = []
         
         try:
-            rows = memory_manager.raw_data.get_items()
+            rows = memory_manager.raw_data.get_items(with_relations=False)
             if not rows:
                 return []
                 
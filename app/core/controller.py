@@ -1,12 +1,20 @@
 import math
+import multiprocessing as mp
+from collections import deque
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass, field
 from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer
 
 from app.core.worker import ParserWorker, CategoryScannerWorker
+from app.core.process_worker import ProcessParserWorker
 from app.core.ai.ai_manager import AIManager
 from app.core.ai.prompts import PromptBuilder
+from app.core.seen_index import get_seen_index
+from app.core.request_budget import RequestBudget
 from app.core.log_manager import logger
+from app.config import (
+    STREAM_MAX_PENDING_BATCHES, PARSER_PROCESS_ISOLATION, QUEUE_PARALLELISM, REQUEST_BUDGET_PER_MIN,
+)
 
 
 @dataclass
@@ -17,12 +25,22 @@ class QueueState:
     is_sequence_running: bool = False
     waiting_for_ai_sequence: bool = False
 
+@dataclass
+class QueueRun:
+    queue_idx: int
+    config: Dict[str, Any]
+    worker: Any
+    thread: QThread
+    progress: int = 0
+
 class ParserController(QObject):
     parser_started = pyqtSignal()
-    parser_finished = pyqtSignal(list)
+    parser_finished = pyqtSignal(list, int)
 
     progress_updated = pyqtSignal(int)
+    queue_progress = pyqtSignal(int, int)
     results_ready = pyqtSignal(list)
+    results_batch_ready = pyqtSignal(list, int)
     ai_progress_updated = pyqtSignal(int)
     ai_result_ready = pyqtSignal(int, str, dict)
     ai_chat_reply = pyqtSignal(str)
@@ -34,7 +52,7 @@ class ParserController(QObject):
 
     filter_group_started = pyqtSignal(list)
     
-    ai_batch_finished = pyqtSignal()
+    ai_batch_finished = pyqtSignal(int)
     ai_all_finished = pyqtSignal()
     
     scan_finished = pyqtSignal(list)
@@ -58,7 +76,34 @@ class ParserController(QObject):
         self.parser_progress_callback = None
         self._is_stopping = False
         self.chunk_manager = None
+        self.session_seen_ids = set()
+        self.seen_index = None
+        self._pipeline_queue_idx: Optional[int] = None
+        # Воркер, чьи пачки ждут места в конвейере ИИ (back-pressure)
+        self._pipeline_worker = None
+        self._deferred_batch_acks = 0
+        # Очередь, чей пакет сейчас у ИИ (-1 — ручной анализ): уходит в ai_batch_finished
+        self._ai_queue_idx = -1
+
+        # Параллельный режим: несколько очередей одновременно под общим бюджетом запросов
+        self.parallelism = QUEUE_PARALLELISM
+        self.request_budget_per_min = REQUEST_BUDGET_PER_MIN
+        self.request_budget: Optional[RequestBudget] = None
+        self._parallel_mode = False
+        self._runs: Dict[int, QueueRun] = {}
+        self._pending_queues: deque = deque()
+        self._ai_backlog: deque = deque()
+        self._ai_busy = False
+        self._parallel_done = 0
     
+    def set_parallelism(self, value: int):
+        self.parallelism = max(1, int(value or 1))
+
+    def set_request_budget(self, rate_per_min: float):
+        self.request_budget_per_min = max(1.0, float(rate_per_min))
+        if self.request_budget:
+            self.request_budget.set_rate(self.request_budget_per_min)
+
     def set_progress_callback(self, callback):
         self.parser_progress_callback = callback
 
@@ -78,6 +123,7 @@ class ParserController(QObject):
             self.ai_manager.all_finished_signal.connect(self.cultivation_finished.emit)
             self.ai_manager.error_signal.connect(self.error_occurred.emit)
             self.ai_manager.chat_response_signal.connect(self.ai_chat_reply.emit)
+            self.ai_manager.pipeline_capacity_changed.connect(self._on_pipeline_capacity_changed)
 
     def _on_ai_text_progress(self, text: str):
         logger.info(text, token="ai_progress")
@@ -98,18 +144,26 @@ class ParserController(QObject):
         self.queue_state.total_queues = len(configs)
         self.queue_state.current_queue_index = 0
         
-        self.session_seen_ids = set() 
+        self.session_seen_ids = set()
+        if self.seen_index is None:
+            try:
+                self.seen_index = get_seen_index()
+            except Exception as e:
+                logger.warning(f"Индекс просмотренных объявлений недоступен: {e}")
 
         self.sequence_started.emit()
         self.ui_lock_requested.emit(True)
 
-        self._execute_queue(0)
+        if self.parallelism > 1 and len(configs) > 1:
+            self._start_parallel()
+        else:
+            self._execute_queue(0)
     
     def request_soft_stop(self):
         if self._is_stopping: return
         self._is_stopping = True
         
-        if not self.queue_state.is_sequence_running and not (self.worker_thread and self.worker_thread.isRunning()):
+        if not self.queue_state.is_sequence_running and not self._running_threads():
             self._finalize_stop()
             return
 
@@ -117,6 +171,8 @@ class ParserController(QObject):
         self.progress_updated.emit("Остановка по запросу пользователя...")
         if self.worker:
             self.worker.request_stop()
+        for run in self._runs.values():
+            run.worker.request_stop()
         
         QTimer.singleShot(2000, self._async_force_stop)
 
@@ -141,6 +197,28 @@ class ParserController(QObject):
             QTimer.singleShot(100, lambda: self._execute_queue(queue_index + 1))
             return
         
+        self.worker_thread = QThread()
+        self.worker = self._create_parser_worker(config)
+        self._deferred_batch_acks = 0
+        self._pipeline_queue_idx = None
+        if self._should_pipeline_ai(config):
+            self._start_ai_pipeline(config, queue_index, self.worker)
+
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker_thread.started.connect(self.parser_started.emit)
+        self.worker.batch_ready.connect(lambda batch: self._on_results_batch(batch, queue_index))
+        self.worker.finished.connect(lambda res: self._on_queue_finished(res, queue_index, config))
+        self.worker.finished.connect(lambda res: self.on_parser_worker_finished(res, queue_index))
+        self.worker.error.connect(self._on_worker_error)
+        self.worker.progress.connect(self.progress_updated.emit)
+        self.worker.progress.connect(lambda v: self.queue_progress.emit(queue_index, v))
+        self.worker.requests_count.connect(self.request_increment.emit)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.error.connect(self.worker_thread.quit)
+        self.worker_thread.start()
+
+    def _create_parser_worker(self, config: Dict, request_budget=None):
         max_items = config.get('max_items', 0)
     
         if max_items and max_items > 0:
@@ -148,8 +226,8 @@ class ParserController(QObject):
         else:
              calc_pages = 100
 
-        self.worker_thread = QThread()
-        self.worker = ParserWorker(
+        worker_cls = ProcessParserWorker if PARSER_PROCESS_ISOLATION else ParserWorker
+        return worker_cls(
             keywords=config.get('search_tags', []),
             ignore_keywords=config.get('ignore_tags', []),
             max_pages=calc_pages,
@@ -164,20 +242,227 @@ class ParserController(QObject):
             filter_defects=config.get('filter_defects', False),
             skip_duplicates = config.get('skip_duplicates', False),
             allow_rewrite_duplicates = config.get('allow_rewrite_duplicates', False),
-            existing_ids=self.session_seen_ids
+            existing_ids=self.session_seen_ids,
+            seen_index=self.seen_index,
+            skip_seen_history=config.get('skip_seen_history', False),
+            queue_name=config.get('queue_name') or config.get('name'),
+            max_pending_batches=STREAM_MAX_PENDING_BATCHES,
+            request_budget=request_budget,
         )
-        self.worker.moveToThread(self.worker_thread)
-        self.worker_thread.started.connect(self.worker.run)
-        self.worker_thread.started.connect(self.parser_started.emit)
-        self.worker.finished.connect(lambda res: self._on_queue_finished(res, queue_index, config))
-        self.worker.finished.connect(lambda res: self.on_parser_worker_finished(res))
-        self.worker.error.connect(self._on_worker_error)
-        self.worker.progress.connect(self.progress_updated.emit)
-        self.worker.requests_count.connect(self.request_increment.emit)
-        self.worker.finished.connect(self.worker_thread.quit)
-        self.worker.error.connect(self.worker_thread.quit)
-        self.worker_thread.start()
+
+    # --- Параллельный режим ---
+
+    def _start_parallel(self):
+        # В режиме процессов бюджет живет в общей памяти spawn-контекста
+        ctx = mp.get_context("spawn") if PARSER_PROCESS_ISOLATION else None
+        self.request_budget = RequestBudget(self.request_budget_per_min, ctx=ctx)
+        self._parallel_mode = True
+        self._parallel_done = 0
+        self._pending_queues = deque(range(self.queue_state.total_queues))
+        self._ai_backlog.clear()
+        self._ai_busy = False
+        self.progress_updated.emit(0)
+        logger.info(
+            f"Параллельный запуск: до {self.parallelism} очередей, "
+            f"бюджет {int(self.request_budget_per_min)} запросов/мин...", token="queue_start"
+        )
+        self._launch_parallel_queues()
+
+    def _launch_parallel_queues(self):
+        while (
+            self.queue_state.is_sequence_running
+            and not self._is_stopping
+            and self._pending_queues
+            and len(self._runs) < self.parallelism
+        ):
+            queue_idx = self._pending_queues.popleft()
+            config = self.queue_state.queues_config[queue_idx]
+            if not config.get('search_tags'):
+                self._parallel_done += 1
+                continue
+            self._start_parallel_run(queue_idx, config)
+        self._check_parallel_done()
+
+    def _start_parallel_run(self, queue_idx: int, config: Dict):
+        thread = QThread()
+        worker = self._create_parser_worker(config, request_budget=self.request_budget.lease(queue_idx))
+        self._runs[queue_idx] = QueueRun(queue_idx, config, worker, thread)
+        if self._should_pipeline_ai(config) and not self._ai_busy:
+            # Конвейер у AIManager один: его получает очередь, стартовавшая при свободном ИИ,
+            # остальные идут в _ai_backlog после парсинга
+            self._ai_busy = True
+            self._start_ai_pipeline(config, queue_idx, worker)
+
+        logger.info(f"Очередь {queue_idx + 1} из {self.queue_state.total_queues}: старт...")
+
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        thread.started.connect(self.parser_started.emit)
+        worker.batch_ready.connect(lambda batch: self._on_parallel_batch(batch, queue_idx))
+        worker.finished.connect(lambda res: self._on_parallel_queue_finished(res, queue_idx))
+        worker.finished.connect(lambda res: self.on_parser_worker_finished(res, queue_idx))
+        # Ошибка одной очереди не останавливает остальные: воркер все равно пришлет finished
+        worker.error.connect(self.error_occurred.emit)
+        worker.progress.connect(lambda v: self._on_parallel_progress(queue_idx, v))
+        worker.requests_count.connect(self.request_increment.emit)
+        worker.finished.connect(thread.quit)
+        thread.start()
+
+    def _on_parallel_batch(self, batch: List[Dict], queue_idx: int):
+        run = self._runs.get(queue_idx)
+        defer_ack = False
+        try:
+            if not self._is_stopping and batch:
+                self.results_batch_ready.emit(batch, queue_idx)
+                defer_ack = self._feed_pipeline(batch, queue_idx)
+        finally:
+            if defer_ack:
+                self._deferred_batch_acks += 1
+            elif run:
+                run.worker.ack_batch()
+
+    def _on_parallel_progress(self, queue_idx: int, value: int):
+        run = self._runs.get(queue_idx)
+        if run:
+            run.progress = value
+        self.queue_progress.emit(queue_idx, value)
+        total = max(1, self.queue_state.total_queues)
+        overall = (self._parallel_done * 100 + sum(r.progress for r in self._runs.values())) / total
+        self.progress_updated.emit(min(100, int(overall)))
+
+    def _on_parallel_queue_finished(self, results: List[Dict], queue_idx: int):
+        run = self._runs.pop(queue_idx, None)
+        if self.request_budget:
+            self.request_budget.release(queue_idx)
+        if run:
+            run.worker.deleteLater()
+            self._retire_thread(run.thread)
+        if self._is_stopping or not self._parallel_mode:
+            return
+
+        self._parallel_done += 1
+        self.queue_progress.emit(queue_idx, 100)
+        config = self.queue_state.queues_config[queue_idx]
+        is_split = config.get('is_split', False)
+
+        if results:
+            for item in results:
+                if 'id' in item:
+                    self.session_seen_ids.add(str(item['id']))
+        else:
+            logger.warning(f"Очередь {queue_idx + 1}: результатов не найдено...")
+
+        if config.get('search_mode', 'full') != 'neuro':
+            self.queue_finished.emit(results, queue_idx, is_split)
+
+        if self._pipeline_queue_idx == queue_idx and self.ai_manager:
+            fed = self.ai_manager.pipeline_size()
+            self._close_ai_pipeline()
+            if fed:
+                # ИИ освободит _ai_busy в _on_ai_batch_finished
+                self._launch_parallel_queues()
+                return
+            self._ai_busy = False
+
+        needs_ai = bool(results) and (config.get('search_mode', 'full') == 'neuro' or config.get('include_ai', False))
+        if needs_ai:
+            # AIManager обрабатывает один пакет за раз: очереди встают в очередь на анализ
+            self._ai_backlog.append((results, config, queue_idx, is_split))
+        else:
+            self.maybe_start_post_ai_analysis(results, config, queue_idx, is_split)
+
+        self._drain_ai_backlog()
+        self._launch_parallel_queues()
+
+    def _drain_ai_backlog(self):
+        if self._ai_busy or self._is_stopping or not self._ai_backlog:
+            return
+        results, config, queue_idx, is_split = self._ai_backlog.popleft()
+        self._ai_busy = True
+        if self._handle_neuro_filter(results, config, queue_idx, is_split):
+            return
+        if not self.maybe_start_post_ai_analysis(results, config, queue_idx, is_split):
+            self._ai_busy = False
+            self._drain_ai_backlog()
+
+    def _check_parallel_done(self):
+        if not self._parallel_mode or self._is_stopping:
+            return
+        if self._runs or self._ai_busy or self._ai_backlog:
+            return
+        if self._pending_queues and self.queue_state.is_sequence_running:
+            return
+        self._parallel_mode = False
+        self.request_budget = None
+        self._finish_sequence()
+
+    def _cleanup_parallel_runs(self):
+        for queue_idx, run in list(self._runs.items()):
+            run.worker.request_stop()
+            if isinstance(run.worker, ProcessParserWorker):
+                run.worker.kill_process()
+            run.worker.deleteLater()
+            self._retire_thread(run.thread)
+            if self.request_budget:
+                self.request_budget.release(queue_idx)
+        self._runs.clear()
+        self._pending_queues.clear()
+        self._ai_backlog.clear()
+        self._ai_busy = False
+        self._parallel_mode = False
+        self.request_budget = None
+
+    def _running_threads(self) -> List[QThread]:
+        threads = [run.thread for run in self._runs.values()]
+        if self.worker_thread:
+            threads.append(self.worker_thread)
+        return [t for t in threads if t.isRunning()]
     
+    def _on_results_batch(self, batch: List[Dict], queue_idx: int):
+        worker = self.worker
+        defer_ack = False
+        try:
+            if not self._is_stopping and batch:
+                self.results_batch_ready.emit(batch, queue_idx)
+                defer_ack = self._feed_pipeline(batch, queue_idx)
+        finally:
+            if defer_ack:
+                self._deferred_batch_acks += 1
+            elif worker:
+                worker.ack_batch()
+
+    def _feed_pipeline(self, batch: List[Dict], queue_idx: int) -> bool:
+        """Подает пачку в конвейер ИИ своей очереди; True — подтверждение пачки нужно отложить"""
+        if self._pipeline_queue_idx != queue_idx or not self.ai_manager:
+            return False
+        self.ai_manager.feed_pipeline(batch)
+        # Back-pressure до парсера: пачка подтверждается, когда у ИИ освободится место
+        return not self.ai_manager.pipeline_has_capacity()
+
+    def _should_pipeline_ai(self, config: Dict) -> bool:
+        return (
+            config.get('include_ai', False)
+            and config.get('pipeline_ai', True)
+            and config.get('search_mode', 'full') != 'neuro'
+        )
+
+    def _start_ai_pipeline(self, config: Dict, queue_idx: int, worker):
+        self.ensure_ai_manager()
+        is_split = config.get('is_split', False)
+        context = self._build_analysis_context(config, queue_idx, is_split, [])
+        self.ai_manager._debug_logs = config.get('ai_debug_mode', False)
+        self.ai_manager.start_pipeline(context, debug_mode=config.get('ai_debug_mode', False))
+        self._pipeline_queue_idx = queue_idx
+        self._pipeline_worker = worker
+        self._ai_queue_idx = queue_idx
+        logger.info(f"Очередь {queue_idx + 1}: ИИ-анализ идет параллельно с парсингом...")
+
+    def _on_pipeline_capacity_changed(self):
+        while self._deferred_batch_acks > 0 and self.ai_manager and self.ai_manager.pipeline_has_capacity():
+            self._deferred_batch_acks -= 1
+            if self._pipeline_worker:
+                self._pipeline_worker.ack_batch()
+
     def _on_queue_finished(self, results: List[Dict], queue_idx: int, config: Dict):
         if self._is_stopping: return
 
@@ -195,6 +480,14 @@ class ParserController(QObject):
 
         self.queue_finished.emit(results, queue_idx, is_split)
 
+        if self._pipeline_queue_idx == queue_idx and self.ai_manager:
+            # Конвейер уже получил все товары пачками — закрываем его, очередь продвинет _on_ai_batch_finished
+            fed = self.ai_manager.pipeline_size()
+            self._close_ai_pipeline()
+            if fed:
+                self.queue_state.waiting_for_ai_sequence = True
+                return
+
         ai_started = self.maybe_start_post_ai_analysis(results, config, queue_idx, is_split)
 
         if not ai_started:
@@ -246,45 +539,42 @@ class ParserController(QObject):
         if store_in_memory and not include_ai:
             if self.memory_manager:
                 logger.info(f"Сохранение {len(results)} товаров в память (без AI анализа)...")
-                for item in results:
-                    self.memory_manager.add_item(item)
+                self.memory_manager.add_items(results)
             return False
 
+        ai_debug = config.get('ai_debug_mode', False)
+        context = self._build_analysis_context(config, queue_idx, is_split, results)
+        self.queue_state.waiting_for_ai_sequence = True
+        
+        self._run_ai_process(results, prompt=None, debug_mode=ai_debug, context=context)
+        return True
+
+    def _build_analysis_context(self, config: Dict, queue_idx: int, is_split: bool, items: List[Dict]) -> Dict:
         user_instructions = "" 
 
         search_tags = config.get('search_tags', [])
         has_rag = config.get('store_in_memory', False)
         
         priority = PromptBuilder.select_priority(
-            table_size=len(results),
+            table_size=len(items),
             user_instructions=user_instructions,
             has_rag=has_rag,
             search_tags=search_tags
         )
-        
-        ai_debug = config.get('ai_debug_mode', False)
-        store = config.get('store_in_memory', False)
-        base_offset = config.get('ai_offset', 0)
 
-        search_mode = config.get('search_mode', 'full')
-        
-        context = {
+        return {
             "mode": "analysis",
-            "offset": base_offset,
+            "offset": config.get('ai_offset', 0),
             "queue_idx": queue_idx,
             "is_split": is_split,
-            "store_in_memory": store,
-            "include_ai": include_ai,
+            "store_in_memory": config.get('store_in_memory', False),
+            "include_ai": config.get('include_ai', False),
             "priority": priority,
             "user_instructions": user_instructions,
             "has_rag": has_rag,
-            "search_mode": search_mode,
-            "items": results,
+            "search_mode": config.get('search_mode', 'full'),
+            "items": items,
         }
-        self.queue_state.waiting_for_ai_sequence = True
-        
-        self._run_ai_process(results, prompt=None, debug_mode=ai_debug, context=context)
-        return True
 
     def _advance_or_finish(self, queue_idx: int):
         if not self.queue_state.is_sequence_running:
@@ -301,20 +591,29 @@ class ParserController(QObject):
         self.ui_lock_requested.emit(False)
     
     def _async_force_stop(self):
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.quit()
+        threads = self._running_threads()
+        if threads:
+            for thread in threads:
+                thread.quit()
             QTimer.singleShot(1500, self._check_thread_stopped)
         else:
             self._finalize_stop()
     
     def _check_thread_stopped(self):
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.terminate()
+        if self._running_threads():
+            workers = [self.worker] + [run.worker for run in self._runs.values()]
+            for worker in workers:
+                if isinstance(worker, ProcessParserWorker):
+                    worker.kill_process()
+            for thread in self._running_threads():
+                thread.terminate()
             QTimer.singleShot(500, self._finalize_stop)
         else:
             self._finalize_stop()
 
     def _finalize_stop(self):
+        self._close_ai_pipeline()
+        self._cleanup_parallel_runs()
         self.cleanup_worker()
         self._is_stopping = False
         self.queue_state.is_sequence_running = False
@@ -330,23 +629,31 @@ class ParserController(QObject):
             self.worker = None
         
         if self.worker_thread:
-            if self.worker_thread.isRunning():
-                self.worker_thread.quit()
-                self.worker_thread.wait(500)
-            
-            if self.worker_thread.isRunning():
-                old_thread = self.worker_thread
-                self.zombie_threads.append(old_thread)
-                def on_zombie_finished():
-                    if old_thread in self.zombie_threads:
-                        self.zombie_threads.remove(old_thread)
-                        old_thread.deleteLater()
-                old_thread.finished.connect(on_zombie_finished)
-            else:
-                self.worker_thread.deleteLater()
-            
+            self._retire_thread(self.worker_thread)
             self.worker_thread = None
+
+    def _retire_thread(self, thread: QThread):
+        if thread.isRunning():
+            thread.quit()
+            thread.wait(500)
+        
+        if thread.isRunning():
+            self.zombie_threads.append(thread)
+            def on_zombie_finished():
+                if thread in self.zombie_threads:
+                    self.zombie_threads.remove(thread)
+                    thread.deleteLater()
+            thread.finished.connect(on_zombie_finished)
+        else:
+            thread.deleteLater()
     
+    def _close_ai_pipeline(self):
+        self._pipeline_queue_idx = None
+        self._pipeline_worker = None
+        self._deferred_batch_acks = 0
+        if self.ai_manager:
+            self.ai_manager.close_pipeline()
+
     def _on_worker_error(self, msg: str):
         self.error_occurred.emit(msg)
 
@@ -459,6 +766,7 @@ class ParserController(QObject):
     def _run_ai_process(self, items: List[Dict], prompt: str, debug_mode: bool, context: Dict):
         if not items: return
         self.ensure_ai_manager()
+        self._ai_queue_idx = context.get('queue_idx', -1)
         self.ai_manager._debug_logs = debug_mode
         self.ai_manager.start_processing(items, prompt, debug_mode=debug_mode, context=context)
     
@@ -482,11 +790,17 @@ class ParserController(QObject):
         logger.info("Культивация завершена...", token="ai-cult")
         self.ui_lock_requested.emit(False)
 
-    def on_parser_worker_finished(self, results: list):
-        self.parser_finished.emit(results) 
+    def on_parser_worker_finished(self, results: list, queue_idx: int):
+        self.parser_finished.emit(results, queue_idx)
 
     def _on_ai_batch_finished(self):
-        self.ai_batch_finished.emit()
+        self.ai_batch_finished.emit(self._ai_queue_idx)
+        if self._parallel_mode:
+            self.queue_state.waiting_for_ai_sequence = False
+            self._ai_busy = False
+            self._drain_ai_backlog()
+            self._launch_parallel_queues()
+            return
         if self.queue_state.waiting_for_ai_sequence:
             self.queue_state.waiting_for_ai_sequence = False
             next_idx = self.queue_state.current_queue_index + 1
@@ -498,7 +812,7 @@ class ParserController(QObject):
             self.ui_lock_requested.emit(False)
 
     def has_active_tasks(self) -> bool:
-        return self.queue_state.is_sequence_running or (self.ai_manager and self.ai_manager.has_pending_tasks())
+        return self.queue_state.is_sequence_running or bool(self._runs) or (self.ai_manager and self.ai_manager.has_pending_tasks())
 
     def get_total_queues(self) -> int:
         return self.queue_state.total_queues
@@ -509,6 +823,7 @@ class ParserController(QObject):
         if self.queue_state.is_sequence_running:
             self.stop_sequence()
             
+        self._cleanup_parallel_runs()
         self.cleanup_worker()
 
         if self.scan_worker:
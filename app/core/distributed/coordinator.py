@@ -0,0 +1,118 @@
+import time
+import uuid
+import multiprocessing as mp
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.distributed.job_queue import JobQueue
+from app.core.distributed.node import run_worker_process
+from app.core.log_manager import logger
+
+# Параметры поиска, которые уходят в process_region на узлах
+JOB_PARAM_KEYS = (
+    "max_pages", "max_items_per_page", "max_total_items", "min_price", "max_price",
+    "search_mode", "filter_defects", "skip_duplicates", "allow_rewrite_duplicates", "queue_name",
+)
+
+
+class Coordinator:
+    """Раздает задачи из _build_tasks узлам через JobQueue и собирает результат"""
+
+    def __init__(self, job_queue: Optional[JobQueue] = None, run_id: Optional[str] = None):
+        self.queue = job_queue or JobQueue()
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:6]
+        self._processes: List[mp.Process] = []
+        self._spawn_kwargs: Dict[str, Any] = {}
+        self._spawned = 0
+
+    @staticmethod
+    def job_params(ignore_keywords: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        params = {k: kwargs[k] for k in JOB_PARAM_KEYS if kwargs.get(k) is not None}
+        if params.get("search_mode") == "primary" and "max_items_per_page" not in params:
+            params["max_items_per_page"] = params.get("max_total_items")
+        params["ignore_keywords"] = list(ignore_keywords or [])
+        return params
+
+    def submit_tasks(self, tasks: List[Tuple[str, str]], ignore_keywords: Optional[List[str]] = None,
+                     **kwargs) -> int:
+        added = self.queue.enqueue(self.run_id, tasks, self.job_params(ignore_keywords, **kwargs))
+        logger.info(f"Координатор: {added} задач в прогоне {self.run_id}...")
+        return added
+
+    def submit_search(self, keywords, ignore_keywords: Optional[List[str]] = None,
+                      parser_factory: Optional[Callable[[], object]] = None, **kwargs) -> int:
+        """Строит задачи так же, как AvitoParser.search_items (умный поиск категорий), и ставит их в очередь"""
+        from app.core.distributed.node import make_parser
+
+        parser = (parser_factory or make_parser)()
+        try:
+            parser.driver_manager._initialize_driver()
+            tasks = parser._build_tasks(
+                keywords,
+                kwargs.get("min_price"),
+                kwargs.get("max_price"),
+                kwargs.get("search_all_regions", False),
+                kwargs.get("forced_categories"),
+                kwargs.get("sort_type", "date"),
+            )
+        finally:
+            parser.cleanup()
+        return self.submit_tasks(tasks, ignore_keywords, **kwargs)
+
+    def spawn_local_workers(self, count: int, replay_dir: Optional[str] = None,
+                            idle_exit_sec: Optional[float] = None, **kwargs) -> List[mp.Process]:
+        """Узлы на этой машине (каждый — отдельный процесс со своим браузером)"""
+        self._spawn_kwargs = dict(replay_dir=replay_dir, idle_exit_sec=idle_exit_sec, **kwargs)
+        for _ in range(count):
+            self._start_worker()
+        return list(self._processes)
+
+    def _start_worker(self) -> mp.Process:
+        self._spawned += 1
+        proc = mp.get_context("spawn").Process(
+            target=run_worker_process,
+            kwargs=dict(db_path=self.queue.db_path, worker_id=f"local-{self._spawned}",
+                        run_id=self.run_id, **self._spawn_kwargs),
+            daemon=True,
+        )
+        proc.start()
+        self._processes.append(proc)
+        return proc
+
+    def _revive_workers(self):
+        """Все локальные узлы завершились, а прогон не закончен — поднимаем их заново"""
+        if not self._processes or any(p.is_alive() for p in self._processes):
+            return
+        count = len(self._processes)
+        logger.warning(f"Координатор: локальные узлы завершились до конца прогона {self.run_id}, перезапуск ({count})...")
+        self._processes.clear()
+        for _ in range(count):
+            self._start_worker()
+
+    def wait(self, timeout: Optional[float] = None, poll_sec: float = 1.0,
+             on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> bool:
+        """
+        Ждет завершения прогона. Локальные узлы, вышедшие раньше времени (упали или
+        ушли по простою, пока задача висела в аренде у умершего узла), перезапускаются.
+        False — прогон не успел завершиться за timeout.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            stats = self.queue.progress(self.run_id)
+            if on_progress:
+                on_progress(stats)
+            if self.queue.is_finished(self.run_id):
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            self._revive_workers()
+            time.sleep(poll_sec)
+
+    def results(self) -> List[Dict]:
+        return self.queue.get_results(self.run_id)
+
+    def stop_workers(self, timeout: float = 10.0):
+        for proc in self._processes:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.kill()
+        self._processes.clear()
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import BASE_APP_DIR, CLUSTER_LEASE_SEC, CLUSTER_MAX_ATTEMPTS
+
+
+class JobQueue:
+    """
+    Надежная очередь задач парсинга на SQLite (одна задача = один URL из _build_tasks).
+
+    Воркер берет задачу в аренду (lease) на CLUSTER_LEASE_SEC и продлевает ее
+    heartbeat'ами. Если воркер умер, аренда истекает и задачу забирает другой.
+    Результаты сливаются по (run_id, ad_id), поэтому повторная обработка задачи
+    не создает дублей.
+    """
+
+    DB_FILENAME = "cluster_jobs.db"
+
+    def __init__(self, db_path: Optional[str] = None, lease_sec: float = CLUSTER_LEASE_SEC,
+                 max_attempts: int = CLUSTER_MAX_ATTEMPTS):
+        self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ensure_db_exists()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # Несколько процессов пишут в один файл: WAL + busy timeout, транзакции вручную
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute("PRAGMA busy_timeout = 30000")
+        return self._conn
+
+    def _ensure_db_exists(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._lock:
+            conn = self._get_connection()
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    label TEXT,
+                    params TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_until REAL,
+                    heartbeat_at REAL,
+                    created_at REAL NOT NULL,
+                    finished_at REAL,
+                    error TEXT,
+                    UNIQUE(run_id, url)
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, lease_until);
+
+                CREATE TABLE IF NOT EXISTS job_results (
+                    run_id TEXT NOT NULL,
+                    ad_id TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    job_id INTEGER,
+                    worker_id TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, ad_id)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    host TEXT,
+                    pid INTEGER,
+                    current_job INTEGER,
+                    last_heartbeat REAL
+                );
+            """)
+
+    # --- Координатор ---
+
+    def enqueue(self, run_id: str, tasks: List[Tuple[str, str]], params: Optional[Dict[str, Any]] = None) -> int:
+        """Ставит задачи (url, label). Повторная постановка того же URL в run_id игнорируется"""
+        now = time.time()
+        params_json = json.dumps(params or {}, ensure_ascii=False)
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (run_id, url, label, params, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(run_id, url, label, params_json, now) for url, label in tasks]
+                )
+                added = conn.total_changes - before
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def progress(self, run_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+            items = self._get_connection().execute(
+                "SELECT COUNT(*) FROM job_results WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+        stats = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for r in rows:
+            stats[r["status"]] = r["n"]
+        stats["total"] = sum(stats[k] for k in ("pending", "leased", "done", "failed"))
+        stats["items"] = items
+        return stats
+
+    def is_finished(self, run_id: str) -> bool:
+        p = self.progress(run_id)
+        return p["total"] > 0 and p["pending"] == 0 and p["leased"] == 0
+
+    def get_results(self, run_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT item FROM job_results WHERE run_id = ? ORDER BY updated_at, ad_id", (run_id,)
+            ).fetchall()
+        return [json.loads(r["item"]) for r in rows]
+
+    def get_jobs(self, run_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT * FROM jobs WHERE run_id = ? ORDER BY id", (run_id,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # --- Воркер ---
+
+    def lease(self, worker_id: str, host: str = "", pid: int = 0,
+              run_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Берет свободную задачу или задачу с истекшей арендой (с run_id — только из этого прогона)"""
+        now = time.time()
+        run_filter, run_params = ("AND run_id = ?", (run_id,)) if run_id else ("", ())
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Задачи, которые слишком часто теряли аренду, помечаются как проваленные
+                conn.execute(f"""
+                    UPDATE jobs SET status = 'failed', error = 'lease expired too many times', finished_at = ?
+                    WHERE status = 'leased' AND lease_until < ? AND attempts >= ? {run_filter}
+                """, (now, now, self.max_attempts) + run_params)
+                row = conn.execute(f"""
+                    SELECT * FROM jobs
+                    WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?)) {run_filter}
+                    ORDER BY attempts, id LIMIT 1
+                """, (now,) + run_params).fetchone()
+                job = None
+                if row:
+                    conn.execute("""
+                        UPDATE jobs SET status = 'leased', worker_id = ?, lease_until = ?,
+                            heartbeat_at = ?, attempts = attempts + 1
+                        WHERE id = ?
+                    """, (worker_id, now + self.lease_sec, now, row["id"]))
+                    job = dict(row)
+                    job["attempts"] += 1
+                    job["worker_id"] = worker_id
+                    job["params"] = json.loads(row["params"] or "{}")
+                conn.execute("""
+                    INSERT INTO workers (worker_id, host, pid, current_job, last_heartbeat) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(worker_id) DO UPDATE SET
+                        current_job = excluded.current_job, last_heartbeat = excluded.last_heartbeat
+                """, (worker_id, host, pid, job["id"] if job else None, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Продлевает аренду. False — задачу уже забрал другой воркер (аренда истекла)"""
+        now = time.time()
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = conn.execute("""
+                    UPDATE jobs SET lease_until = ?, heartbeat_at = ?
+                    WHERE id = ? AND worker_id = ? AND status = 'leased'
+                """, (now + self.lease_sec, now, job_id, worker_id))
+                conn.execute("UPDATE workers SET last_heartbeat = ? WHERE worker_id = ?", (now, worker_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return cur.rowcount > 0
+
+    def submit_items(self, run_id: str, job_id: int, worker_id: str, items: List[Dict]) -> int:
+        """Идемпотентное слияние по ad_id: новые поля дополняют уже сохраненный товар"""
+        now = time.time()
+        rows = [i for i in items if i.get("id")]
+        if not rows:
+            return 0
+        added = 0
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for item in rows:
+                    ad_id = str(item["id"])
+                    existing = conn.execute(
+                        "SELECT item FROM job_results WHERE run_id = ? AND ad_id = ?", (run_id, ad_id)
+                    ).fetchone()
+                    if existing:
+                        merged = json.loads(existing["item"])
+                        merged.update({k: v for k, v in item.items() if v not in (None, "", [], {})})
+                    else:
+                        merged = item
+                        added += 1
+                    conn.execute("""
+                        INSERT INTO job_results (run_id, ad_id, item, job_id, worker_id, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(run_id, ad_id) DO UPDATE SET
+                            item = excluded.item, job_id = excluded.job_id,
+                            worker_id = excluded.worker_id, updated_at = excluded.updated_at
+                    """, (run_id, ad_id, json.dumps(merged, ensure_ascii=False), job_id, worker_id, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        with self._lock:
+            conn = self._get_connection()
+            cur = conn.execute("""
+                UPDATE jobs SET status = 'done', finished_at = ?, lease_until = NULL
+                WHERE id = ? AND worker_id = ? AND status = 'leased'
+            """, (time.time(), job_id, worker_id))
+        return cur.rowcount > 0
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Ошибка задачи: возврат в очередь, пока не исчерпаны попытки"""
+        with self._lock:
+            conn = self._get_connection()
+            cur = conn.execute("""
+                UPDATE jobs SET
+                    status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    error = ?, worker_id = NULL, lease_until = NULL,
+                    finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END
+                WHERE id = ? AND worker_id = ? AND status = 'leased'
+            """, (self.max_attempts, error, self.max_attempts, time.time(), job_id, worker_id))
+        return cur.rowcount > 0
+
+    def release_worker(self, worker_id: str):
+        with self._lock:
+            self._get_connection().execute(
+                "UPDATE workers SET current_job = NULL WHERE worker_id = ?", (worker_id,)
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
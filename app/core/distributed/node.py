@@ -0,0 +1,139 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from typing import Callable, Dict, Optional
+
+from app.config import CLUSTER_HEARTBEAT_SEC
+from app.core.distributed.job_queue import JobQueue
+from app.core.log_manager import logger
+
+
+def make_parser(replay_dir: Optional[str] = None, debug_mode: bool = False):
+    """AvitoParser со своим DriverManager; с replay_dir — на сохраненных страницах"""
+    from app.core.parser import AvitoParser, BanRecoveryStrategy
+
+    parser = AvitoParser(debug_mode=debug_mode)
+    if replay_dir:
+        from app.core.distributed.replay import ReplayDriver, ReplayDriverManager
+
+        parser.driver_manager = ReplayDriverManager(ReplayDriver.from_dir(replay_dir))
+        parser.ban_strategy = BanRecoveryStrategy(parser.driver_manager)
+    return parser
+
+
+class JobWorker:
+    """
+    Узел распределенного парсинга: берет задачи из JobQueue в аренду, парсит их
+    своим браузером и постранично отправляет товары обратно.
+    """
+
+    def __init__(self, job_queue: JobQueue, worker_id: Optional[str] = None,
+                 parser_factory: Optional[Callable[[], object]] = None,
+                 heartbeat_sec: float = CLUSTER_HEARTBEAT_SEC,
+                 idle_exit_sec: Optional[float] = None, poll_sec: float = 1.0,
+                 run_id: Optional[str] = None):
+        self.queue = job_queue
+        self.run_id = run_id
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.parser_factory = parser_factory or make_parser
+        self.heartbeat_sec = heartbeat_sec
+        self.idle_exit_sec = idle_exit_sec
+        self.poll_sec = poll_sec
+        self.jobs_done = 0
+        self._parser = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._parser:
+            self._parser.request_stop()
+
+    def run(self):
+        idle_since = time.time()
+        try:
+            while not self._stop_event.is_set():
+                job = self.queue.lease(self.worker_id, host=socket.gethostname(), pid=os.getpid(),
+                                       run_id=self.run_id)
+                if job is None:
+                    if self.idle_exit_sec is not None and time.time() - idle_since >= self.idle_exit_sec:
+                        break
+                    self._stop_event.wait(self.poll_sec)
+                    continue
+                self._process_job(job)
+                idle_since = time.time()
+        finally:
+            self.queue.release_worker(self.worker_id)
+            if self._parser:
+                self._parser.cleanup()
+                self._parser = None
+
+    def _process_job(self, job: Dict):
+        job_id, run_id = job["id"], job["run_id"]
+        lease_lost = threading.Event()
+        done = threading.Event()
+
+        if self._parser is None:
+            self._parser = self.parser_factory()
+        parser = self._parser
+        parser._stop_requested = False
+
+        def heartbeat():
+            while not done.wait(self.heartbeat_sec):
+                try:
+                    if not self.queue.heartbeat(job_id, self.worker_id):
+                        logger.warning(f"Узел {self.worker_id}: аренда задачи #{job_id} потеряна...")
+                        lease_lost.set()
+                        parser.request_stop()
+                        return
+                except Exception as e:
+                    logger.dev(f"JobQueue heartbeat error: {e}", level="ERROR")
+
+        hb = threading.Thread(target=heartbeat, daemon=True, name=f"hb-{job_id}")
+        hb.start()
+
+        def on_page_items(items):
+            if not lease_lost.is_set():
+                self.queue.submit_items(run_id, job_id, self.worker_id, items)
+
+        try:
+            logger.info(f"Узел {self.worker_id}: задача #{job_id} {job.get('label') or ''}...")
+            parser.driver_manager._initialize_driver()
+            params = dict(job["params"])
+            parser.process_region(
+                base_url=job["url"],
+                seen_ids=set(),
+                results_list=[],
+                on_page_items=on_page_items,
+                **params
+            )
+            if self._stop_event.is_set() and not lease_lost.is_set():
+                self.queue.fail(job_id, self.worker_id, "worker stopped")
+            elif not lease_lost.is_set():
+                self.queue.complete(job_id, self.worker_id)
+                self.jobs_done += 1
+        except Exception as e:
+            logger.error(f"Узел {self.worker_id}: задача #{job_id} — {e}")
+            self.queue.fail(job_id, self.worker_id, str(e))
+        finally:
+            done.set()
+            hb.join(timeout=1)
+
+
+def run_worker_process(db_path: str, worker_id: Optional[str] = None, replay_dir: Optional[str] = None,
+                       idle_exit_sec: Optional[float] = None, heartbeat_sec: float = CLUSTER_HEARTBEAT_SEC,
+                       lease_sec: Optional[float] = None, run_id: Optional[str] = None):
+    """Точка входа процесса-узла (multiprocessing или `python -m app.cli cluster-worker`)"""
+    kwargs = {"lease_sec": lease_sec} if lease_sec else {}
+    queue = JobQueue(db_path, **kwargs)
+    worker = JobWorker(
+        queue, worker_id=worker_id,
+        parser_factory=lambda: make_parser(replay_dir),
+        heartbeat_sec=heartbeat_sec, idle_exit_sec=idle_exit_sec, run_id=run_id,
+    )
+    try:
+        worker.run()
+    finally:
+        queue.close()
+    return worker.jobs_done
@@ -0,0 +1,177 @@
+"""
+Replay-драйвер: отдает заранее сохраненные страницы выдачи вместо Chrome.
+Нужен для прогона парсера, воркеров и координатора на localhost без сети.
+"""
+
+import os
+import json
+import html
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from bs4 import BeautifulSoup
+
+from app.core.driver import DriverManager, DriverConfig
+from app.core.selectors import AvitoSelectors
+
+
+def normalize_url(url: str) -> str:
+    """Ключ страницы: путь + отсортированные параметры (порядок в URL не важен)"""
+    parsed = urlparse(url)
+    qs = parse_qs(parsed.query)
+    query = urlencode(sorted((k, v[0]) for k, v in qs.items()))
+    return f"{parsed.path}?{query}" if query else parsed.path
+
+
+def build_listing_page(items: List[Dict], has_next: bool = False) -> str:
+    """HTML страницы выдачи в верстке Авито (селекторы AvitoSelectors)"""
+    cards = []
+    for item in items:
+        cards.append(
+            '<div data-marker="item">'
+            f'<a data-marker="item-title" href="{html.escape(item["link"])}">{html.escape(item["title"])}</a>'
+            f'<span data-marker="item-price">{item.get("price", 0)} ₽</span>'
+            f'<p data-marker="item-date">{html.escape(item.get("date_text", "сегодня"))}</p>'
+            f'<div class="geo-root">{html.escape(item.get("city", "Москва"))}</div>'
+            '</div>'
+        )
+    next_class = "styles-module-root" if has_next else f"styles-module-root {AvitoSelectors.DISABLED_CLASS}"
+    return (
+        "<html><head><title>Объявления</title></head><body>"
+        + "".join(cards)
+        + f'<a data-marker="pagination-button/nextPage" class="{next_class}">Дальше</a>'
+        + "</body></html>"
+    )
+
+
+class _ReplayElement:
+    def __init__(self, tag):
+        self._tag = tag
+
+    def get_attribute(self, name: str):
+        value = self._tag.get(name)
+        if isinstance(value, list):
+            return " ".join(value)
+        return value
+
+    @property
+    def text(self) -> str:
+        return self._tag.get_text(strip=True)
+
+    def is_displayed(self) -> bool:
+        return True
+
+
+class ReplayDriver:
+    """Минимальное подмножество Selenium WebDriver, которое использует парсер"""
+
+    EMPTY_PAGE = "<html><head><title>Объявления</title></head><body></body></html>"
+
+    def __init__(self, pages: Optional[Dict[str, str]] = None):
+        self.pages: Dict[str, str] = {normalize_url(u): src for u, src in (pages or {}).items()}
+        self.current_url = ""
+        self.page_source = self.EMPTY_PAGE
+        self.requests: List[str] = []
+        self._soup = None
+
+    @classmethod
+    def from_dir(cls, path: str) -> "ReplayDriver":
+        """Каталог с index.json ({url: файл.html}) и сохраненными страницами"""
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        pages = {}
+        for url, filename in index.items():
+            with open(os.path.join(path, filename), "r", encoding="utf-8") as f:
+                pages[url] = f.read()
+        return cls(pages)
+
+    @staticmethod
+    def save_dir(path: str, pages: Dict[str, str]):
+        os.makedirs(path, exist_ok=True)
+        index = {}
+        for i, (url, source) in enumerate(pages.items()):
+            filename = f"page_{i:04d}.html"
+            with open(os.path.join(path, filename), "w", encoding="utf-8") as f:
+                f.write(source)
+            index[url] = filename
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+    def get(self, url: str):
+        self.requests.append(url)
+        self.current_url = url
+        self.page_source = self.pages.get(normalize_url(url), self.EMPTY_PAGE)
+        self._soup = None
+
+    def _get_soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.page_source, "lxml")
+        return self._soup
+
+    @property
+    def title(self) -> str:
+        tag = self._get_soup().title
+        return tag.get_text() if tag else ""
+
+    def execute_script(self, script: str, *args):
+        if "readyState" in script:
+            return "complete"
+        if "scrollHeight" in script and script.strip().startswith("return"):
+            return 1000
+        if "innerText" in script:
+            return self._get_soup().get_text(" ", strip=True)
+        return None
+
+    def find_elements(self, by, selector: str):
+        return [_ReplayElement(t) for t in self._get_soup().select(selector)]
+
+    def find_element(self, by, selector: str):
+        found = self.find_elements(by, selector)
+        if not found:
+            raise LookupError(selector)
+        return found[0]
+
+    def refresh(self):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def get_cookies(self):
+        return []
+
+    def add_cookie(self, cookie):
+        pass
+
+    def set_window_size(self, *args):
+        pass
+
+    def set_page_load_timeout(self, *args):
+        pass
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayDriverManager(DriverManager):
+    """DriverManager без Chrome, задержек и кук: страницы берутся из ReplayDriver"""
+
+    def __init__(self, replay_driver: ReplayDriver):
+        super().__init__(DriverConfig(
+            min_request_delay=0.0,
+            max_request_delay=0.0,
+            cooldown_every_min=10**9,
+            cooldown_every_max=10**9,
+            cooldown_range=(0.0, 0.0),
+            use_cookies=False,
+            delete_cookies_on_start=False,
+            enable_human_behavior=False,
+        ))
+        self._replay = replay_driver
+
+    def _initialize_driver(self):
+        if self._driver is None:
+            self._driver = self._replay
@@ -23,7 +23,10 @@ from app.config import (
     COOLDOWN_DURATION_MAX,
     RANDOM_SCROLL_CHANCE,
     RANDOM_MOUSE_MOVE_CHANCE,
+    EGRESS_PROXIES,
+    EGRESS_RATE_PER_MIN,
 )
+from app.core.log_manager import logger
 
 # Настраиваем логгер для undetected_chromedriver, чтобы не мусорил в консоль
 logging.getLogger('uc').setLevel(logging.ERROR)
@@ -43,10 +46,15 @@ class DriverConfig:
     block_images: bool = False  
     block_css: bool = False
     enable_human_behavior: bool = True
+    # Пул выходов: список прокси ("http://host:port", "direct"); пусто — только IP хоста
+    proxies: Sequence[str] | None = None
+    proxy_rate_per_min: float = EGRESS_RATE_PER_MIN
     
     def __post_init__(self):
         if self.user_agents is None:
             self.user_agents = USER_AGENTS
+        if self.proxies is None:
+            self.proxies = list(EGRESS_PROXIES)
 
 class DriverManager:
     def __init__(self, config: DriverConfig | None = None):
@@ -61,6 +69,14 @@ class DriverManager:
         )
         
         self.speed_multiplier = 1.0
+        # Общий бюджет запросов (RequestBudget/BudgetLease) при параллельных очередях
+        self.request_budget = None
+
+        self.egress_pool = None
+        self.current_exit = None
+        if self.config.proxies:
+            from app.core.egress import get_egress_pool
+            self.egress_pool = get_egress_pool(self.config.proxies, self.config.proxy_rate_per_min)
 
         if (
             self.config.use_cookies
@@ -111,6 +127,12 @@ class DriverManager:
         # но если очень нужно - можно раскомментировать. 
         options.add_argument(f"--user-agent={self.current_ua}")
 
+        if self.egress_pool is not None:
+            if self.current_exit is None:
+                self.current_exit = self.egress_pool.best() or self.egress_pool.exits[0]
+            if self.current_exit.proxy:
+                options.add_argument(f"--proxy-server={self.current_exit.proxy}")
+
         # Настройки контента (разрешаем картинки и CSS для прохождения проверок)
         prefs = {
             "profile.default_content_setting_values.notifications": 2,
@@ -228,6 +250,16 @@ class DriverManager:
     
     def rate_limit_delay(self, stop_check: Callable[[], bool] | None = None):
         cfg = self.config
+        if self.request_budget is not None and not self.request_budget.acquire(stop_check):
+            return
+
+        if self.egress_pool is not None:
+            exit_ = self.egress_pool.acquire(preferred=self.current_exit, stop_check=stop_check)
+            if exit_ is None:
+                return
+            if exit_ is not self.current_exit:
+                self.switch_exit(exit_)
+
         current_time = time.time()
         time_since_last = current_time - self._last_request_time
         
@@ -285,6 +317,32 @@ class DriverManager:
                 cfg.cooldown_every_max
             )
     
+    def switch_exit(self, exit_):
+        """Прокси задается при запуске Chrome, поэтому смена выхода = перезапуск браузера"""
+        previous = self.current_exit.name if self.current_exit else "-"
+        logger.info(f"Смена выхода: {previous} -> {exit_.name}...")
+        self.cleanup()
+        self.current_exit = exit_
+
+    def report_exit_success(self):
+        if self.egress_pool is not None and self.current_exit is not None:
+            self.egress_pool.report_success(self.current_exit)
+
+    def report_exit_error(self):
+        if self.egress_pool is not None and self.current_exit is not None:
+            self.egress_pool.report_error(self.current_exit)
+
+    def rotate_exit_after_ban(self) -> bool:
+        """Бан на текущем выходе: остывание и переход на другой. False — других выходов нет"""
+        if self.egress_pool is None or self.current_exit is None:
+            return False
+        self.egress_pool.report_ban(self.current_exit)
+        next_exit = self.egress_pool.best(exclude=[self.current_exit])
+        if next_exit is None:
+            return False
+        self.switch_exit(next_exit)
+        return True
+
     def cleanup(self):
         if self._driver:
             try:
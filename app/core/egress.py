@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import (
+    BASE_APP_DIR, EGRESS_RATE_PER_MIN, EGRESS_BURST, EGRESS_BAN_COOLDOWN, EGRESS_BAN_COOLDOWN_MAX,
+    EGRESS_BAN_WINDOW, EGRESS_SWITCH_AFTER,
+)
+from app.core.request_budget import TokenBucket
+from app.core.log_manager import logger
+
+
+class EgressExit:
+    """Один выход в сеть (прокси или прямое подключение) со своим лимитом и историей банов"""
+
+    def __init__(self, proxy: Optional[str], rate_per_min: float = EGRESS_RATE_PER_MIN,
+                 burst: float = EGRESS_BURST, name: Optional[str] = None):
+        self.proxy = proxy
+        self.name = name or proxy or "direct"
+        self.bucket = TokenBucket(rate_per_min, burst)
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.bans: deque = deque(maxlen=50)
+        self.consecutive_bans = 0
+        self.cooldown_until = 0.0
+
+    def is_cooling(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.cooldown_until
+
+    def recent_bans(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        return sum(1 for ts in self.bans if now - ts < EGRESS_BAN_WINDOW)
+
+    def health(self, now: Optional[float] = None) -> float:
+        """Доля успешных запросов (со сглаживанием) минус штраф за недавние баны; < 0 — на остывании"""
+        now = now or time.time()
+        if self.is_cooling(now):
+            return -1.0
+        ratio = (self.successes + 1) / (self.requests + 2)
+        return ratio - 0.25 * self.recent_bans(now)
+
+    def state_row(self) -> Tuple:
+        tokens, stamp = self.bucket.get_state()
+        return (self.name, tokens, stamp, self.requests, self.successes, self.errors,
+                json.dumps(list(self.bans)), self.consecutive_bans, self.cooldown_until)
+
+    def load_state(self, row: sqlite3.Row):
+        self.bucket.set_state(row["tokens"], row["stamp"])
+        self.requests = row["requests"]
+        self.successes = row["successes"]
+        self.errors = row["errors"]
+        self.bans = deque(json.loads(row["bans"] or "[]"), maxlen=self.bans.maxlen)
+        self.consecutive_bans = row["consecutive_bans"]
+        self.cooldown_until = row["cooldown_until"]
+
+    def to_dict(self) -> Dict:
+        now = time.time()
+        return {
+            "name": self.name,
+            "proxy": self.proxy,
+            "requests": self.requests,
+            "successes": self.successes,
+            "errors": self.errors,
+            "recent_bans": self.recent_bans(now),
+            "cooling_sec": max(0, int(self.cooldown_until - now)),
+            "health": round(self.health(now), 3),
+        }
+
+
+class EgressState:
+    """
+    Состояние выходов (токены, счетчики, баны, остывание) в SQLite.
+    Файл общий для процессов парсера и узлов на одном хосте, поэтому лимит
+    и остывание выхода действуют на все очереди сразу и переживают перезапуск.
+    """
+
+    DB_FILENAME = "egress_state.db"
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self._conn: Optional[sqlite3.Connection] = None
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._get_connection().execute("""
+            CREATE TABLE IF NOT EXISTS exits (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                stamp REAL NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                successes INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                bans TEXT NOT NULL DEFAULT '[]',
+                consecutive_bans INTEGER NOT NULL DEFAULT 0,
+                cooldown_until REAL NOT NULL DEFAULT 0
+            )
+        """)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA busy_timeout = 30000")
+        return self._conn
+
+    @contextmanager
+    def synced(self, exits: List[EgressExit]):
+        """Транзакция: загрузить выходы из файла, изменить, записать обратно"""
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            by_name = {e.name: e for e in exits}
+            for row in conn.execute("SELECT * FROM exits"):
+                ex = by_name.get(row["name"])
+                if ex is not None:
+                    ex.load_state(row)
+            yield
+            conn.executemany(
+                "INSERT OR REPLACE INTO exits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [e.state_row() for e in exits]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class EgressPool:
+    """
+    Пул выходов: запрос идет через самый "здоровый" выход со свободным токеном.
+    Бан уводит выход на остывание (экспоненциально), очередь продолжает через другие.
+    С state (EgressState) состояние выходов общее для всех процессов на хосте.
+    """
+
+    def __init__(self, exits: List[EgressExit], cooldown_base: float = EGRESS_BAN_COOLDOWN,
+                 cooldown_max: float = EGRESS_BAN_COOLDOWN_MAX, switch_after: float = EGRESS_SWITCH_AFTER,
+                 state: Optional[EgressState] = None):
+        if not exits:
+            raise ValueError("Пул выходов пуст")
+        self.exits = exits
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self.switch_after = switch_after
+        self.state = state
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _synced(self):
+        with self._lock:
+            if self.state is None:
+                yield
+            else:
+                with self.state.synced(self.exits):
+                    yield
+
+    @classmethod
+    def from_proxies(cls, proxies: Sequence[str], rate_per_min: float = EGRESS_RATE_PER_MIN,
+                     burst: float = EGRESS_BURST, **kwargs) -> "EgressPool":
+        """"direct" в списке — прямое подключение хоста как еще один выход"""
+        exits = [
+            EgressExit(None if p in ("direct", "") else p, rate_per_min, burst)
+            for p in proxies
+        ]
+        return cls(exits, **kwargs)
+
+    def best(self, exclude: Sequence[EgressExit] = (), now: Optional[float] = None) -> Optional[EgressExit]:
+        now = now or time.time()
+        with self._synced():
+            candidates = [e for e in self.exits if e not in exclude and not e.is_cooling(now)]
+            if not candidates:
+                return None
+            return max(candidates, key=lambda e: (e.health(now), e.bucket.rate_per_min))
+
+    def acquire(self, preferred: Optional[EgressExit] = None,
+                stop_check: Optional[Callable[[], bool]] = None) -> Optional[EgressExit]:
+        """
+        Ждет токен и возвращает выход для следующего запроса.
+        Текущий выход (preferred) держим, пока его ожидание короче switch_after:
+        смена выхода означает перезапуск браузера.
+        """
+        while True:
+            if stop_check and stop_check():
+                return None
+            now = time.time()
+            with self._synced():
+                active = [e for e in self.exits if not e.is_cooling(now)]
+                if not active:
+                    wake = min(e.cooldown_until for e in self.exits)
+                    wait = max(0.1, wake - now)
+                else:
+                    wait = None
+                    if preferred in active:
+                        w = preferred.bucket.try_acquire()
+                        if w <= 0:
+                            return self._take(preferred)
+                        if w < self.switch_after:
+                            wait = w
+                    if wait is None:
+                        ordered = sorted(active, key=lambda e: e.health(now), reverse=True)
+                        waits = []
+                        for ex in ordered:
+                            if ex is preferred:
+                                continue
+                            w = ex.bucket.try_acquire()
+                            if w <= 0:
+                                return self._take(ex)
+                            waits.append(w)
+                        wait = min(waits) if waits else 0.5
+            time.sleep(min(max(wait, 0.05), 0.5))
+
+    def _take(self, ex: EgressExit) -> EgressExit:
+        ex.requests += 1
+        return ex
+
+    def report_success(self, ex: EgressExit):
+        with self._synced():
+            ex.successes += 1
+            ex.consecutive_bans = 0
+
+    def report_error(self, ex: EgressExit):
+        with self._synced():
+            ex.errors += 1
+
+    def report_ban(self, ex: EgressExit) -> float:
+        """Отмечает бан и возвращает длительность остывания выхода"""
+        with self._synced():
+            now = time.time()
+            ex.bans.append(now)
+            ex.consecutive_bans += 1
+            cooldown = min(self.cooldown_base * (2 ** (ex.consecutive_bans - 1)), self.cooldown_max)
+            ex.cooldown_until = now + cooldown
+        logger.warning(f"Выход {ex.name}: бан, остывание {int(cooldown)}с...")
+        return cooldown
+
+    def snapshot(self) -> List[Dict]:
+        with self._synced():
+            return [e.to_dict() for e in self.exits]
+
+
+_pools: Dict[Tuple, EgressPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_egress_pool(proxies: Sequence[str], rate_per_min: float = EGRESS_RATE_PER_MIN,
+                    state_path: Optional[str] = None) -> EgressPool:
+    """
+    Пул для набора прокси. Внутри процесса объект один на набор, а лимиты и баны
+    выходов хранятся в EgressState, поэтому их делят и очереди в отдельных процессах
+    (PARSER_PROCESS_ISOLATION), и узлы распределенного парсинга на этом хосте.
+    """
+    key = (tuple(proxies), float(rate_per_min), state_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = EgressPool.from_proxies(proxies, rate_per_min, state=EgressState(state_path))
+            _pools[key] = pool
+        return pool
+
@@ -0,0 +1,185 @@
+import os
+import csv
+import json
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.config import EXPORT_PROGRESS_EVERY, EXPORT_WIDTH_SAMPLE
+from app.core.results_store import iter_results
+
+CSV_HEADERS = ['ID', 'Цена', 'Название', 'Ссылка', 'Просмотров', 'Дата', 'Город', 'Описание', 'Вердикт ИИ']
+XLSX_HEADERS = ['ID', 'Цена', 'Название (ссылка)', 'Просмотров', 'Дата', 'Город', 'Описание', 'Вердикт ИИ']
+XLSX_MAX_WIDTH = 50
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class ExportCancelled(Exception):
+    """Экспорт остановлен пользователем"""
+
+
+def _ai_text(item: Dict) -> str:
+    ai_data = item.get('ai') or {}
+    if isinstance(ai_data, str):
+        try:
+            ai_data = json.loads(ai_data)
+        except (ValueError, TypeError):
+            ai_data = {}
+    if not isinstance(ai_data, dict):
+        return ""
+    verdict = ai_data.get('verdict', '')
+    reason = ai_data.get('reason', '')
+    return f"{verdict}: {reason}" if verdict else ""
+
+
+def export_row(item: Dict) -> List:
+    """Значения строки экспорта: id, цена, название, ссылка, просмотры, дата, город, описание, вердикт"""
+    desc = item.get('description', '') or ''
+    desc_short = desc[:100] + '...' if len(desc) > 100 else desc
+    return [
+        item.get('id', ''),
+        item.get('price', ''),
+        item.get('title', ''),
+        item.get('link', ''),
+        item.get('views', ''),
+        item.get('date_text') or item.get('date', ''),
+        item.get('city') or item.get('address', ''),
+        desc_short,
+        _ai_text(item),
+    ]
+
+
+def iter_export_items(items: Optional[Iterable[Dict]] = None, path: Optional[str] = None) -> Iterator[Dict]:
+    """Товары для экспорта: переданная таблица или файл результатов, читаемый порциями"""
+    if items is not None:
+        yield from items
+        return
+    for chunk in iter_results(path):
+        yield from chunk
+
+
+class _Progress:
+    def __init__(self, total: Optional[int], on_progress: Optional[ProgressCallback],
+                 is_cancelled: Optional[Callable[[], bool]]):
+        self.total = total
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled
+        self.done = 0
+
+    def step(self):
+        self.done += 1
+        if self.done % EXPORT_PROGRESS_EVERY == 0:
+            self.check()
+
+    def check(self):
+        if self.is_cancelled and self.is_cancelled():
+            raise ExportCancelled()
+        if self.on_progress:
+            self.on_progress(self.done, self.total)
+
+
+def _write_atomic(filepath: str, write: Callable[[str], None]):
+    """Запись во временный файл и замена: отмена или ошибка не оставляют полуготовый экспорт"""
+    tmp = filepath + ".part"
+    try:
+        write(tmp)
+        os.replace(tmp, filepath)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def export_csv(rows: Iterable[Dict], filepath: str, total: Optional[int] = None,
+               on_progress: Optional[ProgressCallback] = None,
+               is_cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """Потоковая запись CSV (utf-8-sig для Excel). Возвращает число строк"""
+    progress = _Progress(total, on_progress, is_cancelled)
+
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADERS)
+            for item in rows:
+                writer.writerow(export_row(item))
+                progress.step()
+        progress.check()
+
+    _write_atomic(filepath, write)
+    return progress.done
+
+
+def export_xlsx(rows: Iterable[Dict], filepath: str, total: Optional[int] = None,
+                on_progress: Optional[ProgressCallback] = None,
+                is_cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Запись XLSX в write-only режиме openpyxl: строки сразу уходят в файл, в памяти
+    не копятся объекты ячеек. Ширина колонок считается по первым строкам.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    progress = _Progress(total, on_progress, is_cancelled)
+    rows = iter(rows)
+    sample = [export_row(item) for item in islice(rows, EXPORT_WIDTH_SAMPLE)]
+
+    def xlsx_values(values):
+        # Ссылка в XLSX — гиперссылка названия, а не отдельная колонка
+        return values[:3] + values[4:]
+
+    def write(tmp):
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+
+        widths = [len(h) for h in XLSX_HEADERS]
+        for values in sample:
+            for i, v in enumerate(xlsx_values(values)):
+                if v:
+                    widths[i] = max(widths[i], len(str(v)))
+        for i, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(i)].width = min(width + 2, XLSX_MAX_WIDTH)
+
+        header_font = Font(bold=True)
+        link_font = Font(color="0563C1", underline="single")
+        header = []
+        for h in XLSX_HEADERS:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = header_font
+            header.append(cell)
+        ws.append(header)
+
+        def append(values):
+            row = xlsx_values(values)
+            link = values[3]
+            if link:
+                cell = WriteOnlyCell(ws, value=row[2])
+                cell.hyperlink = link
+                cell.font = link_font
+                row[2] = cell
+            ws.append(row)
+            progress.step()
+
+        try:
+            for values in sample:
+                append(values)
+            for item in rows:
+                append(export_row(item))
+            progress.check()
+        finally:
+            # Сохранение закрывает лист и его временный файл openpyxl; при отмене
+            # недописанный .part удалит _write_atomic
+            wb.save(tmp)
+
+    _write_atomic(filepath, write)
+    return progress.done
+
+
+def export_table(filepath: str, items: Optional[Iterable[Dict]] = None, path: Optional[str] = None,
+                 total: Optional[int] = None, on_progress: Optional[ProgressCallback] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """Экспорт таблицы (items) или файла результатов (path) в CSV/XLSX по расширению"""
+    rows = iter_export_items(items, path)
+    if filepath.lower().endswith('.csv'):
+        return export_csv(rows, filepath, total, on_progress, is_cancelled)
+    return export_xlsx(rows, filepath, total, on_progress, is_cancelled)
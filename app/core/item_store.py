@@ -0,0 +1,168 @@
+import sys
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List
+
+from app.config import ITEM_COMPRESS_MIN_LEN
+
+_MISSING = object()
+# Значение берется из словаря ai (verdict/reason/... дублируют поля анализа)
+_FROM_AI = object()
+
+
+class _Packed(bytes):
+    """Сжатый длинный текст (описание, ai_comment)"""
+    __slots__ = ()
+
+
+class CompactItem(MutableMapping):
+    """
+    Товар таблицы результатов с интерфейсом dict.
+
+    Известные поля лежат в __slots__ (без словаря на каждый объект), повторяющиеся
+    короткие строки (город, состояние, дата, вердикт) интернированы, длинные тексты
+    хранятся сжатыми и распаковываются при обращении, а verdict/reason/market_position/defects
+    не дублируют значения из ai.
+    """
+
+    FIELDS = (
+        "id", "link", "price", "title", "date_text", "description", "city", "condition",
+        "seller_id", "views", "parsed_at", "starred", "ai_comment", "ai",
+        "verdict", "reason", "market_position", "defects",
+    )
+    INTERNED = frozenset(("city", "condition", "date_text", "seller_id", "verdict", "market_position"))
+    PACKED = frozenset(("description", "ai_comment"))
+    AI_DERIVED = frozenset(("verdict", "reason", "market_position", "defects"))
+
+    __slots__ = tuple("_" + f for f in FIELDS) + ("_extra",)
+
+    def __init__(self, data: Any = None, **kwargs):
+        for f in self.FIELDS:
+            object.__setattr__(self, "_" + f, _MISSING)
+        self._extra = None
+        if data is not None or kwargs:
+            self.update(data or (), **kwargs)
+
+    @classmethod
+    def from_dict(cls, item) -> "CompactItem":
+        if isinstance(item, CompactItem):
+            return item
+        return cls(item)
+
+    def update(self, other=(), **kwargs):
+        pairs = list(other.items() if hasattr(other, "items") else other) + list(kwargs.items())
+        # ai раньше производных полей, чтобы они могли сослаться на него
+        pairs.sort(key=lambda kv: kv[0] != "ai")
+        for k, v in pairs:
+            self[k] = v
+
+    # --- Хранение ---
+
+    def _pack(self, key: str, value):
+        if key in self.INTERNED and type(value) is str and len(value) <= 64:
+            return sys.intern(value)
+        if key in self.PACKED and type(value) is str and len(value) >= ITEM_COMPRESS_MIN_LEN:
+            return _Packed(zlib.compress(value.encode("utf-8"), 1))
+        if key in self.AI_DERIVED:
+            ai = self._ai
+            if isinstance(ai, dict) and key in ai and ai[key] == value:
+                return _FROM_AI
+        return value
+
+    def _unpack(self, key: str, value):
+        if type(value) is _Packed:
+            return zlib.decompress(value).decode("utf-8")
+        if value is _FROM_AI:
+            return self._ai.get(key)
+        return value
+
+    def __getitem__(self, key):
+        if key in _SLOT_NAMES:
+            value = object.__getattribute__(self, _SLOT_NAMES[key])
+            if value is _MISSING:
+                raise KeyError(key)
+            return self._unpack(key, value)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _SLOT_NAMES:
+            if key == "ai":
+                self._materialize_ai_fields()
+            object.__setattr__(self, _SLOT_NAMES[key], self._pack(key, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _SLOT_NAMES:
+            if object.__getattribute__(self, _SLOT_NAMES[key]) is _MISSING:
+                raise KeyError(key)
+            if key == "ai":
+                self._materialize_ai_fields()
+            object.__setattr__(self, _SLOT_NAMES[key], _MISSING)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def _materialize_ai_fields(self):
+        """Перед заменой ai производные поля получают собственные значения"""
+        ai = self._ai
+        for key in self.AI_DERIVED:
+            slot = _SLOT_NAMES[key]
+            if object.__getattribute__(self, slot) is _FROM_AI:
+                object.__setattr__(self, slot, ai.get(key))
+
+    def __iter__(self) -> Iterator[str]:
+        for f in self.FIELDS:
+            if object.__getattribute__(self, _SLOT_NAMES[f]) is not _MISSING:
+                yield f
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        n = sum(1 for f in self.FIELDS if object.__getattribute__(self, _SLOT_NAMES[f]) is not _MISSING)
+        return n + (len(self._extra) if self._extra else 0)
+
+    def __contains__(self, key) -> bool:
+        if key in _SLOT_NAMES:
+            return object.__getattribute__(self, _SLOT_NAMES[key]) is not _MISSING
+        return bool(self._extra) and key in self._extra
+
+    # --- Совместимость с dict ---
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self) -> Dict:
+        return self.to_dict()
+
+    def to_dict(self) -> Dict:
+        return {k: self[k] for k in self}
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, CompactItem)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"CompactItem({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (CompactItem, (self.to_dict(),))
+
+
+_SLOT_NAMES = {f: "_" + f for f in CompactItem.FIELDS}
+
+
+def compact_items(items: Iterable) -> List[CompactItem]:
+    """Список товаров в компактном представлении (уже компактные не копируются)"""
+    return [CompactItem.from_dict(i) for i in items]
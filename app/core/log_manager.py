@@ -1,7 +1,7 @@
 import logging
 import sys
 import os
-from PyQt6.QtCore import QObject, pyqtSignal
+from app.core.signals import QObject, pyqtSignal
 
 from app.config import BASE_APP_DIR
 
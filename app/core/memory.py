@@ -5,7 +5,7 @@ Combines RawDataManager and KnowledgeManager for comprehensive data persistence.
 
 import sys
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 # Add workspace root to path for imports
 _workspace_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -39,13 +39,29 @@ class MemoryManager:
         """Add raw item with categories and product keys."""
         return self.raw_data.add_raw_item(item, categories, product_keys)
 
+    def add_raw_items(self, items: List[Dict], categories: Optional[List[str]] = None,
+                      product_keys: Optional[List[str]] = None) -> List[str]:
+        """Add raw items in one transaction; returns per-item statuses."""
+        return self.raw_data.add_raw_items(items, categories, product_keys)
+
     def get_raw_items(self, category: Optional[str] = None,
                       product_key: Optional[str] = None,
                       search_query: Optional[str] = None,
                       limit: int = 100,
-                      offset: int = 0) -> List[Dict]:
-        """Get raw items with filtering."""
-        return self.raw_data.get_raw_items(category, product_key, search_query, limit, offset)
+                      offset: int = 0,
+                      with_relations: bool = True,
+                      after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """Get raw items with filtering; after=page cursor continues from the previous page."""
+        return self.raw_data.get_raw_items(category, product_key, search_query, limit, offset, with_relations, after)
+
+    def page_cursor(self, items: List[Dict]) -> Optional[Tuple[str, int]]:
+        """Cursor of the next page after items (for get_raw_items(after=...))."""
+        return self.raw_data.page_cursor(items)
+
+    def search_raw_items(self, search_query: str, limit: int = 100,
+                         with_relations: bool = True) -> List[Dict]:
+        """Full-text search with relevance ranking and snippets."""
+        return self.raw_data.search_raw_items(search_query, limit=limit, with_relations=with_relations)
 
     def get_raw_items_count(self, category: Optional[str] = None,
                             product_key: Optional[str] = None) -> int:
@@ -64,9 +80,10 @@ class MemoryManager:
         """Clear all raw items."""
         return self.raw_data.clear_all_raw_items()
 
-    def get_items_for_product_key(self, product_key: str) -> List[Dict]:
-        """Get all items for a product key."""
-        return self.raw_data.get_items_for_product_key(product_key)
+    def get_items_for_product_key(self, product_key: str, with_relations: bool = True,
+                                  limit: Optional[int] = None) -> List[Dict]:
+        """Get items for a product key (all unless limit is set)."""
+        return self.raw_data.get_items_for_product_key(product_key, with_relations, limit)
 
     def get_all_categories(self) -> List[Dict]:
         """Get all categories."""
@@ -85,6 +102,20 @@ class MemoryManager:
         """Get or create product key."""
         return self.raw_data.get_or_create_product_key(key, display_name, category_id)
 
+    def get_price_history(self, ad_id: str, since: Optional[str] = None,
+                          until: Optional[str] = None) -> List[Dict]:
+        """Get price/views observations of an ad."""
+        return self.raw_data.get_price_history(ad_id, since, until)
+
+    def get_daily_prices(self, product_key: str, since: Optional[str] = None,
+                         until: Optional[str] = None) -> List[Dict]:
+        """Get daily min/median/max prices of a product key."""
+        return self.raw_data.get_daily_prices(product_key, since, until)
+
+    def get_price_trend(self, product_key: str) -> Optional[Dict]:
+        """Get measured price trend of a product key."""
+        return self.raw_data.get_price_trend(product_key)
+
     def get_raw_data_statistics(self) -> Dict:
         """Get raw data statistics."""
         return self.raw_data.get_statistics()
@@ -152,6 +183,10 @@ class MemoryManager:
         """Get RAG context for item."""
         return self.knowledge.get_rag_context_for_item(title)
 
+    def search_chunks(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Top-k knowledge chunks for a query, with scores."""
+        return self.knowledge.search_chunks(query, top_k)
+
     def get_rag_status(self) -> Dict:
         """Get RAG status."""
         return self.knowledge.get_rag_status()
@@ -162,21 +197,38 @@ class MemoryManager:
         """
         Возвращает True, если элемент был добавлен или обновлен.
         """
+        return self.add_items([item]) > 0
+
+    def add_items(self, items: List[Dict]) -> int:
+        """
+        Пакетный вариант add_item (одна транзакция). Возвращает число добавленных или обновленных.
+        """
+        if not items:
+            return 0
+        item_categories, item_product_keys = [], []
+        for item in items:
+            category, product_key = self._memory_keys(item)
+            item_categories.append([category])
+            item_product_keys.append([product_key])
+
+        statuses = self.raw_data.add_raw_items(
+            items,
+            item_categories=item_categories,
+            item_product_keys=item_product_keys
+        )
+        return sum(1 for status in statuses if status in ['created', 'updated'])
+
+    @staticmethod
+    def _memory_keys(item: Dict):
+        """Категория и ключ товара для памяти"""
         title = item.get('title', '')
-        
+
         # Умная генерация ключа
         product_key = FeatureExtractor.generate_product_key(title)
-        
+
         # В качестве категории берем первое слово из ключа или 'unknown'
         category = product_key.split('_')[0] if '_' in product_key else 'misc'
-
-        status = self.raw_data.add_raw_item(
-            item, 
-            categories=[category], 
-            product_keys=[product_key]
-        )
-        
-        return status in ['created', 'updated']
+        return category, product_key
 
     def get_stats(self) -> Dict:
         """Get combined stats."""
@@ -185,37 +237,58 @@ class MemoryManager:
         }
 
     def get_all_statistics(self, limit: int = 200) -> List[Dict]:
-        """Get all statistics (legacy method)."""
-        return []
+        """Рыночная статистика всех ключей товаров (из памяти, самые наполненные первыми)."""
+        return self.raw_data.get_all_market_stats(limit)
 
     def get_stats_for_product_key(self, product_key: str) -> Optional[Dict]:
-        """Get stats for product key (legacy method)."""
-        return None
+        """
+        Рыночная статистика ключа товара: count, mean, median, q25, q75, min, max,
+        weighted_median. Поддерживается при каждом добавлении, чтение без запросов к БД.
+        """
+        return self.raw_data.get_market_stats(product_key)
+
+    def get_category_stats(self, category: str) -> Optional[Dict]:
+        """Рыночная статистика категории."""
+        return self.raw_data.get_category_market_stats(category)
+
+    def find_market_stats(self, query: str) -> Optional[Dict]:
+        """
+        Статистика для свободного текста (заголовок, вопрос в чате): ключ товара из текста,
+        иначе самый длинный известный ключ, все слова которого есть в тексте.
+        Оба шага — в памяти, без полнотекстового поиска на каждый промпт.
+        """
+        if not query:
+            return None
+        stats = self.get_stats_for_product_key(FeatureExtractor.generate_product_key(query))
+        if stats:
+            return stats
+        return self.raw_data.match_market_stats(FeatureExtractor.normalize_for_hash(query))
 
     def find_similar_items(self, chunk_key: str, limit: int = 50) -> List[Dict]:
         """Find similar items (for cultivation prompts)."""
-        return self.raw_data.get_items_for_product_key(chunk_key)[:limit]
+        return self.raw_data.get_items_for_product_key(chunk_key, with_relations=False, limit=limit)
 
     # === Export/Import ===
 
-    def export_all(self, base_dir: str = BASE_APP_DIR):
-        """Export all data to JSON files."""
-        raw_path = os.path.join(base_dir, "export_raw_data.json")
-        knowledge_path = os.path.join(base_dir, "export_knowledge.json")
+    def export_all(self, base_dir: str = BASE_APP_DIR, on_progress=None):
+        """Export all data to JSON Lines files (streamed, bounded memory)."""
+        raw_path = os.path.join(base_dir, "export_raw_data.jsonl")
+        knowledge_path = os.path.join(base_dir, "export_knowledge.jsonl")
 
-        self.raw_data.export_to_json(raw_path)
-        self.knowledge.export_to_json(knowledge_path)
+        self.raw_data.export_to_json(raw_path, on_progress)
+        self.knowledge.export_to_json(knowledge_path, on_progress)
 
         return {'raw_data': raw_path, 'knowledge': knowledge_path}
 
     def import_all(self, raw_path: Optional[str] = None,
                    knowledge_path: Optional[str] = None,
-                   clear_first: bool = False):
-        """Import all data from JSON files."""
+                   clear_first: bool = False,
+                   on_progress=None):
+        """Import all data from export files (JSON Lines or old JSON), in batches."""
         if raw_path and os.path.exists(raw_path):
-            self.raw_data.import_from_json(raw_path, clear_first)
+            self.raw_data.import_from_json(raw_path, clear_first, on_progress)
         if knowledge_path and os.path.exists(knowledge_path):
-            self.knowledge.import_from_json(knowledge_path, clear_first)
+            self.knowledge.import_from_json(knowledge_path, clear_first, on_progress)
 
     # === Reset ===
 
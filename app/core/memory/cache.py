@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class GenerationCache:
+    """
+    Read-through cache for aggregate reads (statistics, category lists).
+    Every write bumps the generation; a value loaded under an older
+    generation is loaded again on the next read.
+
+    Other processes (CLI, scheduler) write the same database file, so the
+    generation is also kept in the database (table cache_generation): every
+    write transaction increments it (mark + committed), and sync() compares
+    it with the last value this process has seen. PRAGMA data_version skips
+    that read while no other connection has committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._values: Dict[Hashable, Tuple[int, Any]] = {}
+        self._db_generation: Optional[int] = None
+        self._seen = threading.local()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+            self._values.clear()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        generation = self._generation
+        cached = self._values.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        value = loader()
+        with self._lock:
+            # A write during loading bumped the generation: keep the value out of the cache
+            if self._generation == generation:
+                self._values[key] = (generation, value)
+        return value
+
+    # --- Generation shared through the database ---
+
+    def ensure_table(self, cursor: sqlite3.Cursor):
+        """Create the shared counter (schema setup) and remember its current value."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cache_generation (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                value INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO cache_generation (id, value) VALUES (1, 0)")
+        self._db_generation = cursor.execute("SELECT value FROM cache_generation").fetchone()[0]
+
+    def mark(self, cursor: sqlite3.Cursor) -> int:
+        """Increment the shared counter inside the current write transaction; returns the new value."""
+        cursor.execute("UPDATE cache_generation SET value = value + 1")
+        return cursor.execute("SELECT value FROM cache_generation").fetchone()[0]
+
+    def committed(self, db_generation: int) -> bool:
+        """
+        After the commit of a marked write: bump the generation. Returns True when the
+        counter also moved by writes this process has not seen (another process).
+        """
+        with self._lock:
+            external = db_generation - 1 != self._db_generation
+            self._db_generation = db_generation
+            self._generation += 1
+            self._values.clear()
+        return external
+
+    def sync(self, conn: sqlite3.Connection) -> bool:
+        """Before a cached read: True (and a bump) if another process wrote since the last check."""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = self._seen
+        if getattr(seen, "conn", None) is conn and seen.version == version:
+            return False
+        seen.conn, seen.version = conn, version
+        db_generation = conn.execute("SELECT value FROM cache_generation").fetchone()[0]
+        with self._lock:
+            if db_generation == self._db_generation:
+                return False
+            self._db_generation = db_generation
+            self._generation += 1
+            self._values.clear()
+        return True
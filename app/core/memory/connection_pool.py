@@ -0,0 +1,109 @@
+import itertools
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from app.config import MEMORY_DB_BUSY_TIMEOUT_MS, MEMORY_DB_CACHED_STATEMENTS, MEMORY_DB_SYNCHRONOUS
+
+
+class _ThreadConnection:
+    """Thread-local holder of a pooled connection; freed when its thread exits."""
+
+    __slots__ = ("conn", "generation", "depth", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection, generation: int):
+        self.conn = conn
+        self.generation = generation
+        self.depth = 0
+
+
+class SQLiteConnectionPool:
+    """
+    Persistent per-thread SQLite connections for the memory databases.
+
+    Each thread keeps one connection (WAL journal, tuned synchronous level,
+    busy timeout, prepared statement cache), so UI reads, AI writes and
+    cultivation run concurrently without connect overhead or "database is locked".
+    """
+
+    def __init__(self, db_path: str, foreign_keys: bool = False,
+                 busy_timeout_ms: int = MEMORY_DB_BUSY_TIMEOUT_MS,
+                 synchronous: str = MEMORY_DB_SYNCHRONOUS,
+                 cached_statements: int = MEMORY_DB_CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.foreign_keys = foreign_keys
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: Dict[int, sqlite3.Connection] = {}
+        self._keys = itertools.count()
+        self._generation = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if self.foreign_keys:
+            conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _holder(self) -> _ThreadConnection:
+        holder = getattr(self._local, "holder", None)
+        if holder is not None and holder.generation == self._generation:
+            return holder
+        conn = self._connect()
+        key = next(self._keys)
+        with self._lock:
+            self._conns[key] = conn
+            holder = _ThreadConnection(conn, self._generation)
+        # Thread-local data is dropped when the thread exits, including QThreads that
+        # threading still reports as alive, so the finalizer closes the connection
+        weakref.finalize(holder, self._release, key)
+        self._local.holder = holder
+        return holder
+
+    def _release(self, key: int):
+        with self._lock:
+            conn = self._conns.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the current thread (created on first use)."""
+        return self._holder().conn
+
+    @contextmanager
+    def session(self) -> Iterator[sqlite3.Connection]:
+        """
+        Thread connection for one manager call. Writes are committed explicitly
+        by the caller; whatever is left uncommitted when the outermost session
+        ends is rolled back, like closing a short-lived connection did.
+        """
+        holder = self._holder()
+        conn = holder.conn
+        holder.depth += 1
+        try:
+            yield conn
+        finally:
+            holder.depth -= 1
+            if holder.depth == 0 and conn.in_transaction:
+                conn.rollback()
+
+    def close_all(self):
+        """Close every pooled connection (e.g. before deleting the DB file)."""
+        with self._lock:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+            self._generation += 1
@@ -0,0 +1,87 @@
+import json
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+# Records of the old single-document exports: list key → record type
+_LEGACY_LISTS = {
+    "raw_data": (("categories", "category"), ("product_keys", "product_key"), ("items", "item")),
+    "knowledge": (("chunks", "chunk"),),
+}
+
+
+def batched(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_records(filepath: str, kind: str, schema_version: int, records: Iterable[Dict],
+                  total: Optional[int] = None, on_progress: Optional[ProgressCallback] = None,
+                  progress_every: int = 1000) -> int:
+    """
+    Stream a memory export as JSON Lines: a meta line, then one compact record
+    per line. Written to a temporary file and moved into place at the end.
+    Returns the number of records.
+    """
+    tmp = filepath + ".part"
+    count = 0
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            meta = {"type": "meta", "kind": kind, "schema_version": schema_version,
+                    "exported_at": datetime.now().isoformat()}
+            f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+                count += 1
+                if on_progress and count % progress_every == 0:
+                    on_progress(count, total)
+        os.replace(tmp, filepath)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if on_progress:
+        on_progress(count, total)
+    return count
+
+
+def export_kind(filepath: str) -> Optional[str]:
+    """Kind of a JSON Lines export ('raw_data' / 'knowledge'), None for other files."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        try:
+            meta = json.loads(f.readline())
+        except ValueError:
+            return None
+    return meta.get("kind") if isinstance(meta, dict) and meta.get("type") == "meta" else None
+
+
+def read_records(filepath: str, kind: str) -> Iterator[Dict]:
+    """
+    Records of a memory export, line by line. Old single-document JSON exports
+    (one object with lists) are still accepted; those are loaded whole.
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        first = f.readline()
+        try:
+            meta = json.loads(first)
+        except ValueError:
+            meta = None
+        if isinstance(meta, dict) and meta.get("type") == "meta":
+            if meta.get("kind") != kind:
+                raise ValueError(f"{filepath}: экспорт '{meta.get('kind')}', ожидался '{kind}'")
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        f.seek(0)
+        data = json.load(f)
+    for key, record_type in _LEGACY_LISTS[kind]:
+        for record in data.get(key, []):
+            yield dict(record, type=record_type)
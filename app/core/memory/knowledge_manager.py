@@ -2,7 +2,8 @@ import sqlite3
 import json
 import os
 import sys
-from typing import List, Dict, Optional
+import threading
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 
 # Add workspace root to path for config imports
@@ -10,8 +11,16 @@ _workspace_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspat
 if _workspace_root not in sys.path:
     sys.path.insert(0, _workspace_root)
 
-from app.config import BASE_APP_DIR
+from app.config import BASE_APP_DIR, MEMORY_IMPORT_BATCH, RAG_MIN_SCORE
 from app.core.log_manager import logger
+from app.core.memory.cache import GenerationCache
+from app.core.memory.connection_pool import SQLiteConnectionPool
+from app.core.memory.jsonl import ProgressCallback, batched, read_records, write_records
+from app.core.memory.rag_index import ChunkSearchIndex
+
+
+# Chunks describing a product or category market (DATABASE/AI_BEHAVIOR are not item-specific)
+RAG_CHUNK_TYPES = ('PRODUCT', 'CATEGORY')
 
 
 class KnowledgeManager:
@@ -25,18 +34,37 @@ class KnowledgeManager:
 
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self._pool = SQLiteConnectionPool(self.db_path)
+        # RAG index over READY chunks, rebuilt on the first lookup after any change
+        self._rag_index = ChunkSearchIndex()
+        self._rag_lock = threading.Lock()
+        self._rag_generation = -1
+        # Its generation also versions the RAG index
+        self._stats_cache = GenerationCache()
         self._ensure_db_exists()
 
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection with row factory."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def _connection(self):
+        """Pooled connection of the current thread (context manager)."""
+        return self._pool.session()
+
+    def _invalidate_rag(self):
+        """Chunks changed: the RAG index is rebuilt and statistics are recounted on the next read."""
+        self._stats_cache.bump()
+
+    def _commit(self, conn: sqlite3.Connection):
+        """Commit a chunk write together with the generation shared through the database."""
+        db_generation = self._stats_cache.mark(conn.cursor())
+        conn.commit()
+        self._stats_cache.committed(db_generation)
+
+    def _sync(self):
+        """Before a cached read: chunk writes of other processes (CLI, scheduler) drop the caches."""
+        with self._connection() as conn:
+            self._stats_cache.sync(conn)
 
     def _ensure_db_exists(self):
         """Create tables if they don't exist."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
 
             # Check if schema_version table exists
@@ -52,6 +80,7 @@ class KnowledgeManager:
                 cursor.execute("INSERT INTO schema_version (version) VALUES (?)", (self.SCHEMA_VERSION,))
                 # Create all data tables
                 self._create_all_tables(cursor)
+                self._stats_cache.ensure_table(cursor)
                 conn.commit()
                 return
 
@@ -67,10 +96,9 @@ class KnowledgeManager:
             elif current_version == self.SCHEMA_VERSION:
                 # Ensure tables exist even at current version
                 self._ensure_tables_exist(cursor)
+            self._stats_cache.ensure_table(cursor)
 
             conn.commit()
-        finally:
-            conn.close()
 
     def _ensure_tables_exist(self, cursor: sqlite3.Cursor):
         """Ensure all data tables exist."""
@@ -121,8 +149,7 @@ class KnowledgeManager:
         Add or update knowledge chunk.
         Returns the chunk id.
         """
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             content_json = json.dumps(content, ensure_ascii=False) if content else None
 
@@ -142,6 +169,7 @@ class KnowledgeManager:
                         last_updated = ?
                     WHERE id = ?
                 """, (title, content_json, status, priority, datetime.now().isoformat(), existing[0]))
+                self._commit(conn)
                 return existing[0]
             else:
                 # Insert new
@@ -150,10 +178,8 @@ class KnowledgeManager:
                         chunk_type, chunk_key, title, content, status, priority, last_updated
                     ) VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, (chunk_type, chunk_key, title, content_json, status, priority, datetime.now().isoformat()))
-                conn.commit()
+                self._commit(conn)
                 return cursor.lastrowid
-        finally:
-            conn.close()
 
     def get_knowledge(self, chunk_id: Optional[int] = None,
                       chunk_key: Optional[str] = None,
@@ -162,8 +188,7 @@ class KnowledgeManager:
                       limit: int = 100,
                       offset: int = 0) -> List[Dict]:
         """Get knowledge chunks with filters."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
 
             query = "SELECT * FROM ai_knowledge WHERE 1=1"
@@ -190,19 +215,14 @@ class KnowledgeManager:
 
             cursor.execute(query, params)
             return [self._chunk_from_row(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
 
     def get_chunk_by_id(self, chunk_id: int) -> Optional[Dict]:
         """Get single chunk by id."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM ai_knowledge WHERE id = ?", (chunk_id,))
             row = cursor.fetchone()
             return self._chunk_from_row(row) if row else None
-        finally:
-            conn.close()
 
     def _chunk_from_row(self, row: sqlite3.Row) -> Dict:
         """Convert row to chunk dict."""
@@ -217,19 +237,15 @@ class KnowledgeManager:
 
     def delete_knowledge(self, chunk_id: int) -> bool:
         """Delete chunk by id."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM ai_knowledge WHERE id = ?", (chunk_id,))
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     def delete_knowledge_by_key(self, chunk_key: str, chunk_type: Optional[str] = None) -> int:
         """Delete chunks by key. Returns count."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             if chunk_type:
                 cursor.execute(
@@ -238,30 +254,24 @@ class KnowledgeManager:
                 )
             else:
                 cursor.execute("DELETE FROM ai_knowledge WHERE chunk_key = ?", (chunk_key,))
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount
-        finally:
-            conn.close()
 
     def clear_all_knowledge(self) -> int:
         """Clear all knowledge. Returns count of deleted."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM ai_knowledge")
             count = cursor.fetchone()[0] or 0
             cursor.execute("DELETE FROM ai_knowledge")
-            conn.commit()
+            self._commit(conn)
             return count
-        finally:
-            conn.close()
 
     # === Updates ===
 
     def update_chunk_content(self, chunk_id: int, content: Dict, summary: Optional[str] = None):
         """Update chunk content and summary."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             content_json = json.dumps(content, ensure_ascii=False)
             if summary is None:
@@ -273,49 +283,38 @@ class KnowledgeManager:
                     new_data_items_count = 0, last_updated = ?
                 WHERE id = ?
             """, (content_json, summary, datetime.now().isoformat(), chunk_id))
-            conn.commit()
-        finally:
-            conn.close()
+            self._commit(conn)
 
     def update_chunk_status(self, chunk_id: int, status: str, progress: Optional[int] = None):
         """Update chunk status."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE ai_knowledge SET status = ?, last_cultivation_attempt = ?
                 WHERE id = ?
             """, (status, datetime.now().isoformat(), chunk_id))
-            conn.commit()
-        finally:
-            conn.close()
+            self._commit(conn)
 
     def update_chunk_with_retry(self, chunk_id: int, status: str, retry_count: int):
         """Update chunk status with retry count."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE ai_knowledge SET
                     status = ?, retry_count = ?, last_cultivation_attempt = ?
                 WHERE id = ?
             """, (status, retry_count, datetime.now().isoformat(), chunk_id))
-            conn.commit()
-        finally:
-            conn.close()
+            self._commit(conn)
 
     def increment_data_count(self, chunk_id: int, count: int = 1):
         """Increment new data items count."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE ai_knowledge SET new_data_items_count = new_data_items_count + ?
                 WHERE id = ?
             """, (count, chunk_id))
             conn.commit()
-        finally:
-            conn.close()
 
     # === Queries ===
 
@@ -340,25 +339,11 @@ class KnowledgeManager:
 
     def get_status_summary(self) -> Dict:
         """Get summary of chunks by status."""
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT status, COUNT(*) as count
-                FROM ai_knowledge
-                GROUP BY status
-            """)
-            result = {}
-            for row in cursor.fetchall():
-                result[row[0]] = row[1]
-            return result
-        finally:
-            conn.close()
+        return dict(self.get_statistics()['by_status'])
 
     def get_recent_knowledge(self, limit: int = 10) -> List[Dict]:
         """Get recently updated chunks."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT * FROM ai_knowledge
@@ -366,70 +351,73 @@ class KnowledgeManager:
                 LIMIT ?
             """, (limit,))
             return [self._chunk_from_row(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
 
     def get_statistics(self) -> Dict:
-        """Get overall statistics."""
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT COUNT(*) FROM ai_knowledge")
-            total = cursor.fetchone()[0] or 0
-
-            status_summary = self.get_status_summary()
-
-            cursor.execute("SELECT COUNT(*) FROM ai_knowledge WHERE chunk_type = 'PRODUCT'")
-            product_count = cursor.fetchone()[0] or 0
-
-            cursor.execute("SELECT COUNT(*) FROM ai_knowledge WHERE chunk_type = 'CATEGORY'")
-            category_count = cursor.fetchone()[0] or 0
-
+        """Get overall statistics (one grouped query, cached until chunks change)."""
+        self._sync()
+        def load():
+            with self._connection() as conn:
+                rows = conn.execute(
+                    "SELECT status, chunk_type, COUNT(*) FROM ai_knowledge GROUP BY status, chunk_type"
+                ).fetchall()
+            by_status, by_type = {}, {}
+            for status, chunk_type, count in rows:
+                by_status[status] = by_status.get(status, 0) + count
+                by_type[chunk_type] = by_type.get(chunk_type, 0) + count
             return {
-                'total_chunks': total,
-                'by_status': status_summary,
-                'product_chunks': product_count,
-                'category_chunks': category_count
+                'total_chunks': sum(by_status.values()),
+                'by_status': by_status,
+                'product_chunks': by_type.get('PRODUCT', 0),
+                'category_chunks': by_type.get('CATEGORY', 0)
             }
-        finally:
-            conn.close()
+        stats = self._stats_cache.get("statistics", load)
+        return dict(stats, by_status=dict(stats['by_status']))
 
     # === RAG Context ===
 
+    def search_chunks(self, query: str, top_k: int = 5,
+                      min_score: float = RAG_MIN_SCORE) -> List[Dict]:
+        """
+        Top-k READY chunks for a query (item title, chat message) from the
+        in-memory index. Each chunk dict gets a 'score' (higher is better).
+        """
+        index = self._get_rag_index()
+        return [dict(chunk, score=round(score, 4)) for chunk, score in index.search(query, top_k, min_score)]
+
+    def _get_rag_index(self) -> ChunkSearchIndex:
+        self._sync()
+        with self._rag_lock:
+            generation = self._stats_cache.generation
+            if self._rag_generation != generation:
+                with self._connection() as conn:
+                    rows = conn.execute(
+                        "SELECT * FROM ai_knowledge WHERE status = 'READY' AND chunk_type IN (?, ?)",
+                        RAG_CHUNK_TYPES
+                    ).fetchall()
+                self._rag_index.build(self._chunk_from_row(row) for row in rows)
+                self._rag_generation = generation
+            return self._rag_index
+
     def get_rag_context_for_item(self, title: str) -> Optional[Dict]:
         """Get RAG context for a given item title."""
-        # Find best matching chunk based on title
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM ai_knowledge
-                WHERE status = 'READY'
-                ORDER BY
-                    CASE WHEN title LIKE ? THEN 1 ELSE 0 END DESC,
-                    CASE WHEN title LIKE ? THEN 1 ELSE 0 END DESC,
-                    priority DESC
-                LIMIT 1
-            """, (f'%{title}%', f'%{title.lower()}%'))
-            row = cursor.fetchone()
-            if row:
-                chunk = self._chunk_from_row(row)
-                # Extract price stats from content
-                content = chunk.get('content') or {}
-                analysis = content.get('analysis') or {}
-                price_analysis = analysis.get('price_analysis') or {}
-                return {
-                    'knowledge': chunk.get('summary', ''),
-                    'chunk_id': chunk['id'],
-                    'median_price': price_analysis.get('median', 0) or price_analysis.get('avg', 0),
-                    'avg_price': price_analysis.get('avg', 0),
-                    'q25_price': price_analysis.get('q25', 0),
-                    'sample_count': analysis.get('sample_count', 0)
-                }
+        found = self.search_chunks(title, top_k=1)
+        if not found:
             return None
-        finally:
-            conn.close()
+        chunk = found[0]
+        # Extract price stats from content
+        content = chunk.get('content') or {}
+        analysis = content.get('analysis') or {}
+        price_analysis = analysis.get('price_analysis') or {}
+        return {
+            'knowledge': chunk.get('summary', ''),
+            'chunk_id': chunk['id'],
+            'chunk_key': chunk.get('chunk_key'),
+            'score': chunk['score'],
+            'median_price': price_analysis.get('median', 0) or price_analysis.get('avg', 0),
+            'avg_price': price_analysis.get('avg', 0),
+            'q25_price': price_analysis.get('q25', 0),
+            'sample_count': analysis.get('sample_count', 0)
+        }
 
     def get_rag_status(self) -> Dict:
         """Get RAG system status."""
@@ -445,52 +433,75 @@ class KnowledgeManager:
 
     # === Export/Import ===
 
-    def export_to_json(self, filepath: str):
-        """Export knowledge to JSON."""
-        chunks = self.get_knowledge(limit=999999)
-        data = {
-            'exported_at': datetime.now().isoformat(),
-            'schema_version': self.SCHEMA_VERSION,
-            'chunks': chunks
-        }
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.success(f"Exported {len(chunks)} knowledge chunks to {filepath}")
+    CHUNK_FIELDS = ('chunk_type', 'chunk_key', 'title', 'content', 'summary', 'status', 'priority',
+                    'new_data_items_count', 'last_cultivation_attempt', 'retry_count',
+                    'created_at', 'last_updated')
 
-    def import_from_json(self, filepath: str, clear_first: bool = False):
-        """Import knowledge from JSON."""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def _export_records(self) -> Iterator[Dict]:
+        with self._connection() as conn:
+            for row in conn.execute("SELECT * FROM ai_knowledge ORDER BY id"):
+                yield dict(self._chunk_from_row(row), type='chunk')
 
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
+    def export_to_json(self, filepath: str, on_progress: Optional[ProgressCallback] = None) -> int:
+        """Export knowledge as JSON Lines, streamed from the cursor. Returns the number of chunks."""
+        count = write_records(filepath, 'knowledge', self.SCHEMA_VERSION, self._export_records(),
+                              self.get_statistics()['total_chunks'], on_progress)
+        logger.success(f"Exported {count} knowledge chunks to {filepath}")
+        return count
 
+    def import_from_json(self, filepath: str, clear_first: bool = False,
+                         on_progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Import knowledge (JSON Lines or the old single JSON document): batched upserts
+        by (chunk_type, chunk_key), one transaction per MEMORY_IMPORT_BATCH chunks.
+        Returns the number of imported chunks.
+        """
+        now = datetime.now().isoformat()
+        done = 0
+        placeholders = ', '.join('?' * len(self.CHUNK_FIELDS))
+        updates = ', '.join(f"{f} = excluded.{f}" for f in self.CHUNK_FIELDS[2:] if f != 'created_at')
+
+        with self._connection() as conn:
+            cursor = conn.cursor()
             if clear_first:
                 cursor.execute("DELETE FROM ai_knowledge")
-
-            for chunk in data.get('chunks', []):
-                try:
-                    self.add_knowledge(
-                        chunk_type=chunk['chunk_type'],
-                        chunk_key=chunk['chunk_key'],
-                        title=chunk.get('title', ''),
-                        content=chunk.get('content'),
-                        status=chunk.get('status', 'PENDING'),
-                        priority=chunk.get('priority', 1)
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to import chunk {chunk.get('chunk_key')}: {e}")
-
-            conn.commit()
-            logger.success(f"Imported knowledge chunks from {filepath}")
-        finally:
-            conn.close()
+                self._commit(conn)
+            try:
+                for batch in batched(read_records(filepath, 'knowledge'), MEMORY_IMPORT_BATCH):
+                    rows = []
+                    for chunk in batch:
+                        if chunk.get('type') != 'chunk' or not chunk.get('chunk_type') or not chunk.get('chunk_key'):
+                            logger.warning(f"Skipped knowledge record {chunk.get('chunk_key')}")
+                            continue
+                        content = chunk.get('content')
+                        rows.append((
+                            chunk['chunk_type'], chunk['chunk_key'], chunk.get('title', ''),
+                            json.dumps(content, ensure_ascii=False) if content else None,
+                            chunk.get('summary'), chunk.get('status') or 'PENDING', chunk.get('priority') or 1,
+                            chunk.get('new_data_items_count') or 0, chunk.get('last_cultivation_attempt'),
+                            chunk.get('retry_count') or 0, chunk.get('created_at') or now,
+                            chunk.get('last_updated') or now
+                        ))
+                    cursor.executemany(f"""
+                        INSERT INTO ai_knowledge ({', '.join(self.CHUNK_FIELDS)}) VALUES ({placeholders})
+                        ON CONFLICT(chunk_type, chunk_key) DO UPDATE SET {updates}
+                    """, rows)
+                    self._commit(conn)
+                    done += len(rows)
+                    if on_progress:
+                        on_progress(done, None)
+            finally:
+                self._invalidate_rag()
+
+        logger.success(f"Imported {done} knowledge chunks from {filepath}")
+        return done
 
     # === Reset ===
 
     def reset_database(self):
         """Completely reset the database."""
+        self._pool.close_all()
+        self._invalidate_rag()
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
         self._ensure_db_exists()
@@ -0,0 +1,246 @@
+import heapq
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import MARKET_STATS_HALF_LIFE_DAYS
+
+
+def _parse_ts(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    try:
+        return datetime.fromisoformat(str(value).replace(" ", "T")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def _quantile(entries: List[Tuple[int, float]], q: float) -> float:
+    """Квантиль цен (price, weight), отсортированных по цене, с линейной интерполяцией (как numpy.quantile)"""
+    pos = (len(entries) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(entries) - 1)
+    return entries[lo][0] + (entries[hi][0] - entries[lo][0]) * (pos - lo)
+
+
+class MarketGroup:
+    """
+    Current prices of one product key or category: ad_id → (price, ts) plus a list of
+    (price, weight) sorted by price, so count/mean/min/max/quantiles and the weighted
+    median are read in one pass. Weights are exp(ts/half-life) relative to a reference
+    time: the weighted median depends only on their ratios, so a weight never changes
+    after insertion. A batch of changes is merged into the sorted list at once, and the
+    snapshot is cached until the next batch.
+    """
+
+    __slots__ = ("by_ad", "entries", "total", "_decay", "_ref", "_snapshot")
+
+    # Предел показателя экспоненты веса: цена новее опорной даты на столько периодов
+    # полураспада пересчитывает веса от новой опорной даты (иначе переполнение float)
+    MAX_EXPONENT = 500.0
+
+    def __init__(self, half_life_days: float = MARKET_STATS_HALF_LIFE_DAYS):
+        self.by_ad: Dict[str, Tuple[int, float]] = {}
+        self.entries: List[Tuple[int, float]] = []
+        self.total = 0
+        self._decay = math.log(2) / (half_life_days * 86400)
+        self._ref: Optional[float] = None
+        self._snapshot: Optional[Dict] = None
+
+    def _entry(self, price: int, ts: float) -> Tuple[int, float]:
+        return price, math.exp((ts - self._ref) * self._decay)
+
+    def apply(self, changes: Dict[str, Optional[Tuple[int, float]]]):
+        """ad_id → (price, ts) or None (removed) for one batch"""
+        if self._ref is None:
+            stamps = [value[1] for value in changes.values() if value is not None]
+            self._ref = max(stamps) if stamps else time.time()
+        removed: Counter = Counter()
+        added: List[Tuple[int, float]] = []
+        rebase = False
+        for ad_id, value in changes.items():
+            old = self.by_ad.pop(ad_id, None)
+            if old is not None:
+                removed[self._entry(*old)] += 1
+                self.total -= old[0]
+            if value is not None:
+                self.by_ad[ad_id] = value
+                self.total += value[0]
+                if (value[1] - self._ref) * self._decay > self.MAX_EXPONENT:
+                    rebase = True
+                else:
+                    added.append(self._entry(*value))
+        if rebase:
+            self._rebase()
+        else:
+            if removed:
+                kept = []
+                for entry in self.entries:
+                    if removed[entry]:
+                        removed[entry] -= 1
+                    else:
+                        kept.append(entry)
+                self.entries = kept
+            if added:
+                added.sort()
+                self.entries = list(heapq.merge(self.entries, added))
+        self._snapshot = None
+
+    def _rebase(self):
+        self._ref = max(ts for _, ts in self.by_ad.values())
+        self.entries = sorted(self._entry(price, ts) for price, ts in self.by_ad.values())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def snapshot(self) -> Dict:
+        if self._snapshot is None:
+            entries = self.entries
+            self._snapshot = {
+                'count': len(entries),
+                'mean': round(self.total / len(entries)),
+                'median': round(_quantile(entries, 0.5)),
+                'q25': round(_quantile(entries, 0.25)),
+                'q75': round(_quantile(entries, 0.75)),
+                'min': entries[0][0],
+                'max': entries[-1][0],
+                'weighted_median': self._weighted_median(),
+                'last_seen': datetime.fromtimestamp(max(ts for _, ts in self.by_ad.values())).isoformat(),
+            }
+        return self._snapshot
+
+    def _weighted_median(self) -> int:
+        """Медиана с весами exp(-возраст/период полураспада): свежие цены важнее старых"""
+        half = sum(w for _, w in self.entries) / 2
+        acc = 0.0
+        for price, w in self.entries:
+            acc += w
+            if acc >= half:
+                return price
+        return self.entries[-1][0]
+
+
+class MarketStatsCache:
+    """
+    In-memory market statistics per product key and per category. Loaded from the DB
+    on first use, then updated incrementally by every ingest batch; deletions drop the
+    cache so it is reloaded lazily. Product keys are also indexed by word, so free text
+    is matched to a key without a database search.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[str, int, Optional[str], List[str], List[str]]]],
+                 half_life_days: float = MARKET_STATS_HALF_LIFE_DAYS):
+        self._loader = loader
+        self.half_life_days = half_life_days
+        self._lock = threading.RLock()
+        self._product_keys: Optional[Dict[str, MarketGroup]] = None
+        self._categories: Dict[str, MarketGroup] = {}
+        # Слово → ключи товаров; None — пересобрать при следующем поиске
+        self._key_words: Optional[Dict[str, List[str]]] = None
+
+    def invalidate(self):
+        with self._lock:
+            self._product_keys = None
+            self._categories = {}
+            self._key_words = None
+
+    def _ensure_loaded(self):
+        if self._product_keys is not None:
+            return
+        self._product_keys = {}
+        self._categories = {}
+        self._key_words = None
+        self._apply(self._loader())
+
+    def _apply(self, rows):
+        # Изменения собираются по группам и сливаются в каждую одним проходом
+        changes: Dict[int, Dict[str, Optional[Tuple[int, float]]]] = defaultdict(dict)
+        touched: Dict[int, MarketGroup] = {}
+        for ad_id, price, ts, categories, product_keys in rows:
+            value = (int(price), _parse_ts(ts)) if isinstance(price, (int, float)) and price > 0 else None
+            for groups, names in ((self._product_keys, product_keys), (self._categories, categories)):
+                for name in names:
+                    group = groups.get(name)
+                    if group is None:
+                        if value is None:
+                            continue
+                        group = groups[name] = MarketGroup(self.half_life_days)
+                        if groups is self._product_keys:
+                            self._key_words = None
+                    touched[id(group)] = group
+                    changes[id(group)][ad_id] = value
+        for key, group in touched.items():
+            group.apply(changes[key])
+
+    def update(self, rows: Iterable[Tuple[str, int, Optional[str], List[str], List[str]]]):
+        """(ad_id, price, ts, categories, product_keys) of items written by a batch"""
+        with self._lock:
+            if self._product_keys is None:
+                return  # not loaded yet: the first read loads the current state
+            self._apply(rows)
+
+    def _stats(self, groups: Dict[str, MarketGroup], name: str) -> Optional[Dict]:
+        group = groups.get(name)
+        if not group:
+            return None
+        return dict(group.snapshot())
+
+    def for_product_key(self, product_key: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            stats = self._stats(self._product_keys, product_key)
+        if stats:
+            stats['product_key'] = product_key
+        return stats
+
+    def for_category(self, category: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            stats = self._stats(self._categories, category)
+        if stats:
+            stats['category'] = category
+        return stats
+
+    def match_product_key(self, words: Iterable[str]) -> Optional[Dict]:
+        """
+        Stats of the product key whose words all occur in words (e.g. a title split by
+        FeatureExtractor.normalize_for_hash): the longest key wins, then the fullest.
+        """
+        words = set(words)
+        with self._lock:
+            self._ensure_loaded()
+            if self._key_words is None:
+                index = defaultdict(list)
+                for name in self._product_keys:
+                    for word in set(name.split("_")):
+                        index[word].append(name)
+                self._key_words = dict(index)
+            best, best_rank = None, None
+            for name in {n for w in words for n in self._key_words.get(w, ())}:
+                group = self._product_keys[name]
+                parts = name.split("_")
+                if not group or not words.issuperset(parts):
+                    continue
+                rank = (len(parts), len(group))
+                if best_rank is None or rank > best_rank:
+                    best, best_rank = name, rank
+            stats = self._stats(self._product_keys, best) if best else None
+        if stats:
+            stats['product_key'] = best
+        return stats
+
+    def all_product_keys(self, limit: int = 200) -> List[Dict]:
+        """Product keys with the most priced items first"""
+        with self._lock:
+            self._ensure_loaded()
+            names = sorted(self._product_keys, key=lambda k: -len(self._product_keys[k]))
+            result = []
+            for name in names[:limit]:
+                stats = self._stats(self._product_keys, name)
+                if stats:
+                    stats['product_key'] = name
+                    result.append(stats)
+        return result
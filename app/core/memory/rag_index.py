@@ -0,0 +1,121 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from app.core.text_utils import FeatureExtractor
+
+_WORD_RE = re.compile(r"\w+")
+# Служебный префикс заголовков чанков (SmartChunkDetector): одинаков у всех, в признаки не идет
+_TITLE_PREFIX_RE = re.compile(r"^\s*анализ рынка:\s*", re.IGNORECASE)
+
+
+def _normalize(text: str) -> List[str]:
+    text = (text or "").lower().replace("ё", "е").replace("_", " ")
+    return _WORD_RE.findall(text)
+
+
+def _features(text: str) -> Counter:
+    """
+    Признаки текста: слова целиком и символьные триграммы слов. Триграммы берутся
+    с начала слова без конца: окончания ("-ая", "-ый") не дают ложных совпадений.
+    """
+    feats = Counter()
+    for word in _normalize(text):
+        feats["w:" + word] += 1
+        padded = f" {word}"
+        for i in range(len(padded) - 2):
+            feats[padded[i:i + 3]] += 1
+    return feats
+
+
+class ChunkSearchIndex:
+    """
+    In-memory TF-IDF index over knowledge chunk keys and titles (words + char trigrams)
+    with an inverted index, so a RAG lookup touches only chunks sharing features with
+    the query. Chunks whose key equals the product key of the query get a bonus.
+    Query features unseen in the chunks count with the maximum idf, so a long title
+    that merely contains a chunk's words scores lower. Accessory titles ("чехол для
+    iphone 12") only match chunks that mention the same accessory.
+    """
+
+    KEY_MATCH_BONUS = 0.5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks: Dict[int, Dict] = {}
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._idf: Dict[str, float] = {}
+        self._max_idf = 1.0
+        self._accessories: Dict[int, FrozenSet[str]] = {}
+        self._by_product_key: Dict[str, List[int]] = {}
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def build(self, chunks: Iterable[Dict]):
+        chunks = list(chunks)
+        texts = {
+            c["id"]: f"{c.get('chunk_key', '')} {_TITLE_PREFIX_RE.sub('', c.get('title') or '')}"
+            for c in chunks
+        }
+        docs = {chunk_id: _features(text) for chunk_id, text in texts.items()}
+        accessories = {chunk_id: FeatureExtractor.accessory_markers(text.replace("_", " "))
+                       for chunk_id, text in texts.items()}
+        df = Counter()
+        for feats in docs.values():
+            df.update(feats.keys())
+        n = len(docs)
+        idf = {f: math.log((n + 1) / (d + 1)) + 1.0 for f, d in df.items()}
+        # Как у признака с df = 0
+        max_idf = math.log(n + 1) + 1.0
+
+        postings = defaultdict(list)
+        for chunk_id, feats in docs.items():
+            weights = {f: tf * idf[f] for f, tf in feats.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for f, w in weights.items():
+                postings[f].append((chunk_id, w / norm))
+
+        by_key = defaultdict(list)
+        for c in chunks:
+            by_key[" ".join(_normalize(c.get("chunk_key", "")))].append(c["id"])
+
+        with self._lock:
+            self._chunks = {c["id"]: c for c in chunks}
+            self._postings = dict(postings)
+            self._idf = idf
+            self._max_idf = max_idf
+            self._accessories = accessories
+            self._by_product_key = dict(by_key)
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> List[Tuple[Dict, float]]:
+        """Top-k (chunk, score) by cosine similarity; score is in [0, 1 + KEY_MATCH_BONUS]"""
+        with self._lock:
+            postings, idf, chunks = self._postings, self._idf, self._chunks
+            by_key, max_idf, accessories = self._by_product_key, self._max_idf, self._accessories
+        if not chunks:
+            return []
+
+        # Норма по всем признакам запроса: незнакомые слова снижают сходство
+        weights = {f: tf * idf.get(f, max_idf) for f, tf in _features(query).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for f, w in weights.items():
+            if f not in postings:
+                continue
+            qw = w / norm
+            for chunk_id, dw in postings[f]:
+                scores[chunk_id] += qw * dw
+
+        product_key = " ".join(_normalize(FeatureExtractor.generate_product_key(query)))
+        for chunk_id in by_key.get(product_key, ()):
+            scores[chunk_id] += self.KEY_MATCH_BONUS
+
+        markers = FeatureExtractor.accessory_markers(query)
+        if markers:
+            scores = {cid: score for cid, score in scores.items() if markers <= accessories[cid]}
+
+        best = sorted(scores.items(), key=lambda kv: (-kv[1], -(chunks[kv[0]].get("priority") or 0)))
+        return [(chunks[cid], score) for cid, score in best[:top_k] if score >= min_score]
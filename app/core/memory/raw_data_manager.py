@@ -3,16 +3,36 @@ import json
 import os
 import sys
 import hashlib
-from typing import List, Dict, Optional
-from datetime import datetime
+import re
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+import statistics
+from datetime import date, datetime, timedelta
 
 # Add workspace root to path for config imports
 _workspace_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if _workspace_root not in sys.path:
     sys.path.insert(0, _workspace_root)
 
-from app.config import BASE_APP_DIR
+from app.config import BASE_APP_DIR, MEMORY_IMPORT_BATCH, MEMORY_PAGE_SIZE, PRICE_TREND_DAYS, PRICE_TREND_STABLE_PERCENT
 from app.core.log_manager import logger
+from app.core.memory.cache import GenerationCache
+from app.core.memory.connection_pool import SQLiteConnectionPool
+from app.core.memory.jsonl import ProgressCallback, batched, read_records, write_records
+from app.core.memory.market_stats import MarketStatsCache
+
+# Лимит параметров в одном запросе (SQLITE_MAX_VARIABLE_NUMBER старых сборок)
+SQLITE_MAX_PARAMS = 900
+
+
+def _chunks(values: List, size: int):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _fts_match_query(search_query: str) -> str:
+    """Строка поиска → запрос FTS5: все слова как префиксы (AND), спецсимволы отбрасываются"""
+    words = re.findall(r"\w+", search_query.lower())
+    return " ".join(f'"{w}"*' for w in words)
 
 
 class RawDataManager:
@@ -21,24 +41,50 @@ class RawDataManager:
     Supports categories, product keys, and many-to-many relationships.
     """
 
-    SCHEMA_VERSION = 2
+    SCHEMA_VERSION = 6
     DB_FILENAME = "memory_raw_data.db"
 
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self._pool = SQLiteConnectionPool(self.db_path, foreign_keys=True)
+        self._fts: Optional[bool] = None
+        self._market = MarketStatsCache(self._load_market_rows)
+        self._cache = GenerationCache()
         self._ensure_db_exists()
 
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection with row factory."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+    def _connection(self):
+        """Pooled connection of the current thread (context manager)."""
+        return self._pool.session()
+
+    def _invalidate(self, market: bool = True):
+        """Data changed: cached lists/statistics are reloaded, market stats too unless updated in place."""
+        self._cache.bump()
+        if market:
+            self._market.invalidate()
+
+    def _commit(self, conn: sqlite3.Connection, market: bool = True) -> bool:
+        """
+        Commit a write together with the generation shared through the database, then
+        drop cached reads; market stats too unless updated in place by the caller.
+        A write of another process seen meanwhile drops them anyway. Returns True if
+        the market stats were dropped.
+        """
+        db_generation = self._cache.mark(conn.cursor())
+        conn.commit()
+        external = self._cache.committed(db_generation)
+        if market or external:
+            self._market.invalidate()
+        return market or external
+
+    def _sync(self):
+        """Before a cached read: writes of other processes (CLI, scheduler) drop the caches."""
+        with self._connection() as conn:
+            if self._cache.sync(conn):
+                self._market.invalidate()
 
     def _ensure_db_exists(self):
         """Create tables if they don't exist."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
 
             # Check if schema_version table exists
@@ -54,6 +100,7 @@ class RawDataManager:
                 cursor.execute("INSERT INTO schema_version (version) VALUES (?)", (self.SCHEMA_VERSION,))
                 # Create all data tables
                 self._create_all_tables(cursor)
+                self._cache.ensure_table(cursor)
                 conn.commit()
                 return
 
@@ -69,16 +116,21 @@ class RawDataManager:
             elif current_version == self.SCHEMA_VERSION:
                 # Ensure tables exist even at current version
                 self._ensure_tables_exist(cursor)
+            self._cache.ensure_table(cursor)
 
             conn.commit()
-        finally:
-            conn.close()
 
     def _ensure_tables_exist(self, cursor: sqlite3.Cursor):
         """Ensure all data tables exist."""
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='categories'")
         if cursor.fetchone() is None:
             self._create_all_tables(cursor)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='raw_items_fts'")
+        if cursor.fetchone() is None:
+            self._create_search_index(cursor, rebuild=True)
+        self._create_price_history_tables(cursor)
+        self._create_paging_index(cursor)
+        self._create_counters(cursor)
 
     def _create_all_tables(self, cursor: sqlite3.Cursor):
         """Create all data tables."""
@@ -148,69 +200,241 @@ class RawDataManager:
         # Create indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_raw_items_ad_id ON raw_items(ad_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_raw_items_price ON raw_items(price)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_raw_items_analyzed ON raw_items(analyzed_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_keys_key ON product_keys(key)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_categories_name ON categories(name)")
+        self._create_paging_index(cursor)
+        self._create_counters(cursor)
+
+        self._create_search_index(cursor)
+        self._create_price_history_tables(cursor)
+
+    def _create_price_history_tables(self, cursor: sqlite3.Cursor):
+        """Append-only price/views observations and daily per-product-key aggregates."""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS price_observations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ad_id TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                price INTEGER,
+                views INTEGER,
+                source TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS price_daily (
+                product_key_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                min_price INTEGER,
+                median_price REAL,
+                max_price INTEGER,
+                sample_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (product_key_id, day),
+                FOREIGN KEY (product_key_id) REFERENCES product_keys(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_obs_ad_ts ON price_observations(ad_id, ts)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_obs_ts ON price_observations(ts)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_raw_items_products_pk ON raw_items_products(product_key_id, raw_item_id)"
+        )
+
+    def _create_paging_index(self, cursor: sqlite3.Cursor):
+        """Index in page order: keyset pagination seeks to (analyzed_at, id) instead of skipping OFFSET rows."""
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_raw_items_page ON raw_items(analyzed_at DESC, id DESC)")
+
+    def _create_counters(self, cursor: sqlite3.Cursor, rebuild: bool = False):
+        """
+        Item counters kept by triggers: categories.item_count, product_keys.item_count
+        and the single-row raw_stats (items, priced items, price sum), so lists and
+        statistics are read without COUNT/AVG over the item tables.
+        """
+        for table in ("categories", "product_keys"):
+            columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+            if "item_count" not in columns:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0")
+                rebuild = True
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raw_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                item_count INTEGER NOT NULL DEFAULT 0,
+                priced_count INTEGER NOT NULL DEFAULT 0,
+                price_sum INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO raw_stats (id) VALUES (1)")
+
+        for junction, table, column in (("raw_items_categories", "categories", "category_id"),
+                                        ("raw_items_products", "product_keys", "product_key_id")):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {junction}_count_ai AFTER INSERT ON {junction} BEGIN
+                    UPDATE {table} SET item_count = item_count + 1 WHERE id = new.{column};
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {junction}_count_ad AFTER DELETE ON {junction} BEGIN
+                    UPDATE {table} SET item_count = item_count - 1 WHERE id = old.{column};
+                END
+            """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS raw_items_stats_ai AFTER INSERT ON raw_items BEGIN
+                UPDATE raw_stats SET item_count = item_count + 1,
+                    priced_count = priced_count + (new.price > 0),
+                    price_sum = price_sum + (CASE WHEN new.price > 0 THEN new.price ELSE 0 END)
+                WHERE id = 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS raw_items_stats_ad AFTER DELETE ON raw_items BEGIN
+                UPDATE raw_stats SET item_count = item_count - 1,
+                    priced_count = priced_count - (old.price > 0),
+                    price_sum = price_sum - (CASE WHEN old.price > 0 THEN old.price ELSE 0 END)
+                WHERE id = 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS raw_items_stats_au AFTER UPDATE OF price ON raw_items BEGIN
+                UPDATE raw_stats SET
+                    priced_count = priced_count - (old.price > 0) + (new.price > 0),
+                    price_sum = price_sum - (CASE WHEN old.price > 0 THEN old.price ELSE 0 END)
+                                          + (CASE WHEN new.price > 0 THEN new.price ELSE 0 END)
+                WHERE id = 1;
+            END
+        """)
+
+        if rebuild:
+            cursor.execute("""
+                UPDATE categories SET item_count =
+                    (SELECT COUNT(*) FROM raw_items_categories WHERE category_id = categories.id)
+            """)
+            cursor.execute("""
+                UPDATE product_keys SET item_count =
+                    (SELECT COUNT(*) FROM raw_items_products WHERE product_key_id = product_keys.id)
+            """)
+            cursor.execute("""
+                UPDATE raw_stats SET
+                    item_count = (SELECT COUNT(*) FROM raw_items),
+                    priced_count = (SELECT COUNT(*) FROM raw_items WHERE price > 0),
+                    price_sum = (SELECT COALESCE(SUM(price), 0) FROM raw_items WHERE price > 0)
+                WHERE id = 1
+            """)
+
+    def _create_search_index(self, cursor: sqlite3.Cursor, rebuild: bool = False):
+        """
+        FTS5 index over title/description/city, kept in sync with raw_items by triggers.
+        unicode61 folds Cyrillic case. No prefix indexes: FTS5 builds them for every
+        column, which made each insert trigger several times more expensive, while
+        prefix queries work without them.
+        """
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS raw_items_fts USING fts5(
+                    title, description, city,
+                    content='raw_items', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            # SQLite без FTS5: поиск остается на LIKE
+            logger.dev(f"FTS5 unavailable, raw item search falls back to LIKE: {e}", level="WARNING")
+            return
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS raw_items_fts_ai AFTER INSERT ON raw_items BEGIN
+                INSERT INTO raw_items_fts(rowid, title, description, city)
+                VALUES (new.id, new.title, new.description, new.city);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS raw_items_fts_ad AFTER DELETE ON raw_items BEGIN
+                INSERT INTO raw_items_fts(raw_items_fts, rowid, title, description, city)
+                VALUES ('delete', old.id, old.title, old.description, old.city);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS raw_items_fts_au AFTER UPDATE OF title, description, city ON raw_items BEGIN
+                INSERT INTO raw_items_fts(raw_items_fts, rowid, title, description, city)
+                VALUES ('delete', old.id, old.title, old.description, old.city);
+                INSERT INTO raw_items_fts(rowid, title, description, city)
+                VALUES (new.id, new.title, new.description, new.city);
+            END
+        """)
+        if rebuild:
+            cursor.execute("INSERT INTO raw_items_fts(raw_items_fts) VALUES ('rebuild')")
 
     def _migrate_schema(self, cursor: sqlite3.Cursor, from_version: int, to_version: int):
         """Execute schema migrations."""
         if from_version < 2:
             # Create all tables for version 2
             self._create_all_tables(cursor)
+        if from_version < 3:
+            # Full-text index over existing items
+            self._create_search_index(cursor, rebuild=True)
+        if from_version < 4:
+            # Price history starts from the current state of every item
+            self._create_price_history_tables(cursor)
+            cursor.execute("""
+                INSERT INTO price_observations (ad_id, ts, price, views, source)
+                SELECT ad_id, COALESCE(analyzed_at, created_at), price, views, 'migration' FROM raw_items
+            """)
+            cursor.execute("""
+                SELECT DISTINCT rip.product_key_id, substr(po.ts, 1, 10) FROM price_observations po
+                JOIN raw_items ri ON ri.ad_id = po.ad_id
+                JOIN raw_items_products rip ON rip.raw_item_id = ri.id
+            """)
+            self._refresh_daily_prices(cursor, [tuple(row) for row in cursor.fetchall()])
+        if from_version < 5:
+            # Keyset pagination needs a non-NULL sort key for every item
+            cursor.execute("UPDATE raw_items SET analyzed_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+                           "WHERE analyzed_at IS NULL")
+            cursor.execute("DROP INDEX IF EXISTS idx_raw_items_analyzed")
+            self._create_paging_index(cursor)
+        if from_version < 6:
+            # Counters start from the current contents
+            self._create_counters(cursor, rebuild=True)
+
+    def _search_enabled(self) -> bool:
+        """Whether the FTS5 index exists in this database."""
+        if self._fts is None:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='raw_items_fts'"
+                ).fetchone()
+            self._fts = row is not None
+        return self._fts
 
     # === Categories ===
 
     def get_or_create_category(self, name: str, cursor: sqlite3.Cursor = None) -> int:
         """Get category id by name, creating if doesn't exist."""
-        own_cursor = cursor is None
-        conn = None
-        try:
-            if own_cursor:
-                conn = self._get_connection()
-                cursor = conn.cursor()
-            cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
-            row = cursor.fetchone()
-            if row:
-                return row[0]
-            cursor.execute("INSERT INTO categories (name) VALUES (?)", (name,))
-            if own_cursor:
-                conn.commit()
-            return cursor.lastrowid
-        finally:
-            if own_cursor and conn:
-                conn.close()
+        if cursor is None:
+            with self._connection() as conn:
+                category_id = self.get_or_create_category(name, conn.cursor())
+                self._commit(conn, market=False)
+                return category_id
+        cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+        cursor.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+        return cursor.lastrowid
 
     def get_all_categories(self) -> List[Dict]:
-        """Get all categories with counts."""
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT
-                    c.id,
-                    c.name,
-                    c.created_at,
-                    COUNT(DISTINCT rip.raw_item_id) as item_count
-                FROM categories c
-                LEFT JOIN raw_items_categories ric ON c.id = ric.category_id
-                LEFT JOIN raw_items_products rip ON ric.raw_item_id = rip.raw_item_id
-                GROUP BY c.id
-                ORDER BY c.name
-            """)
-            return [dict(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
+        """Get all categories with item counts (counters, cached until the next write)."""
+        self._sync()
+        def load():
+            with self._connection() as conn:
+                return [dict(row) for row in conn.execute(
+                    "SELECT id, name, created_at, item_count FROM categories ORDER BY name"
+                )]
+        return [dict(row) for row in self._cache.get("categories", load)]
 
     def delete_category(self, category_id: int) -> bool:
         """Delete category by id."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     # === Product Keys ===
 
@@ -218,93 +442,65 @@ class RawDataManager:
                                    category_id: Optional[int] = None,
                                    cursor: sqlite3.Cursor = None) -> int:
         """Get product key id, creating if doesn't exist."""
-        own_cursor = cursor is None
-        conn = None
-        try:
-            if own_cursor:
-                conn = self._get_connection()
-                cursor = conn.cursor()
-            cursor.execute("SELECT id, display_name, category_id FROM product_keys WHERE key = ?", (key,))
-            row = cursor.fetchone()
-            if row:
-                # Update display_name or category if provided
-                if display_name or category_id:
-                    update_fields = []
-                    params = []
-                    if display_name is not None:
-                        update_fields.append("display_name = ?")
-                        params.append(display_name)
-                    if category_id is not None:
-                        update_fields.append("category_id = ?")
-                        params.append(category_id)
-                    params.append(row[0])
-                    cursor.execute(f"UPDATE product_keys SET {', '.join(update_fields)} WHERE id = ?", params)
-                    if own_cursor:
-                        conn.commit()
-                return row[0]
-            cursor.execute(
-                "INSERT INTO product_keys (key, display_name, category_id) VALUES (?, ?, ?)",
-                (key, display_name, category_id)
-            )
-            if own_cursor:
-                conn.commit()
-            return cursor.lastrowid
-        finally:
-            if own_cursor and conn:
-                conn.close()
+        if cursor is None:
+            with self._connection() as conn:
+                product_key_id = self.get_or_create_product_key(key, display_name, category_id, conn.cursor())
+                self._commit(conn, market=False)
+                return product_key_id
+        cursor.execute("SELECT id, display_name, category_id FROM product_keys WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        if row:
+            # Update display_name or category if provided
+            if display_name or category_id:
+                update_fields = []
+                params = []
+                if display_name is not None:
+                    update_fields.append("display_name = ?")
+                    params.append(display_name)
+                if category_id is not None:
+                    update_fields.append("category_id = ?")
+                    params.append(category_id)
+                params.append(row[0])
+                cursor.execute(f"UPDATE product_keys SET {', '.join(update_fields)} WHERE id = ?", params)
+            return row[0]
+        cursor.execute(
+            "INSERT INTO product_keys (key, display_name, category_id) VALUES (?, ?, ?)",
+            (key, display_name, category_id)
+        )
+        return cursor.lastrowid
 
     def get_all_product_keys(self, category_id: Optional[int] = None) -> List[Dict]:
-        """Get all product keys with optional category filter."""
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
+        """Get all product keys with optional category filter (counters, cached until the next write)."""
+        self._sync()
+        def load():
+            query = """
+                SELECT
+                    pk.id,
+                    pk.key,
+                    pk.display_name,
+                    pk.category_id,
+                    c.name as category_name,
+                    pk.created_at,
+                    pk.item_count
+                FROM product_keys pk
+                LEFT JOIN categories c ON pk.category_id = c.id
+            """
+            params = []
             if category_id:
-                cursor.execute("""
-                    SELECT
-                        pk.id,
-                        pk.key,
-                        pk.display_name,
-                        pk.category_id,
-                        c.name as category_name,
-                        pk.created_at,
-                        COUNT(DISTINCT rip.raw_item_id) as item_count
-                    FROM product_keys pk
-                    LEFT JOIN categories c ON pk.category_id = c.id
-                    LEFT JOIN raw_items_products rip ON pk.id = rip.product_key_id
-                    WHERE pk.category_id = ?
-                    GROUP BY pk.id
-                    ORDER BY pk.key
-                """, (category_id,))
-            else:
-                cursor.execute("""
-                    SELECT
-                        pk.id,
-                        pk.key,
-                        pk.display_name,
-                        pk.category_id,
-                        c.name as category_name,
-                        pk.created_at,
-                        COUNT(DISTINCT rip.raw_item_id) as item_count
-                    FROM product_keys pk
-                    LEFT JOIN categories c ON pk.category_id = c.id
-                    LEFT JOIN raw_items_products rip ON pk.id = rip.product_key_id
-                    GROUP BY pk.id
-                    ORDER BY pk.key
-                """)
-            return [dict(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
+                query += " WHERE pk.category_id = ?"
+                params.append(category_id)
+            query += " ORDER BY pk.key"
+            with self._connection() as conn:
+                return [dict(row) for row in conn.execute(query, params)]
+        return [dict(row) for row in self._cache.get(("product_keys", category_id or None), load)]
 
     def delete_product_key(self, product_key_id: int) -> bool:
         """Delete product key by id."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM product_keys WHERE id = ?", (product_key_id,))
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     # === Raw Items ===
 
@@ -313,92 +509,310 @@ class RawDataManager:
         """
         Возвращает статус операции: 'created', 'updated', 'skipped'
         """
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
+        return self.add_raw_items([item], categories, product_keys)[0]
+
+    def add_raw_items(self, items: List[Dict], categories: Optional[List[str]] = None,
+                      product_keys: Optional[List[str]] = None,
+                      item_categories: Optional[List[List[str]]] = None,
+                      item_product_keys: Optional[List[List[str]]] = None,
+                      source: str = "parser") -> List[str]:
+        """
+        Пакетное добавление в одной транзакции: upsert по ad_id через executemany,
+        категории и ключи товаров разрешаются один раз на пакет.
 
-            # 1. Мягкая генерация ID (Hash fallback)
-            ad_id = str(item.get('id') or item.get('ad_id') or self._extract_ad_id(item.get('link', '')) or "")
-            
-            if not ad_id:
-                # Генерируем ID из заголовка и продавца, если нет явного ID
-                unique_str = f"{item.get('title')}_{item.get('seller_id')}_{item.get('city')}"
-                ad_id = hashlib.md5(unique_str.encode('utf-8')).hexdigest()
-
-            # 2. Проверка существования
-            cursor.execute("SELECT id, price, views FROM raw_items WHERE ad_id = ?", (ad_id,))
-            existing = cursor.fetchone()
-            
-            current_price = item.get('price', 0)
-            current_views = item.get('views', 0)
-            
-            raw_item_id = None
-            status = "skipped"
-
-            if existing:
-                # LOGIC: Обновляем только если изменилась цена или просмотры, или прошло время
-                raw_item_id = existing[0]
-                old_price = existing[1]
-                
-                # Обновляем, если есть новые данные
-                if (current_price > 0 and current_price != old_price) or (current_views > 0):
-                    raw_data_json = json.dumps(item, ensure_ascii=False)
-                    cursor.execute("""
-                        UPDATE raw_items SET
-                            price = ?, views = ?, raw_data = ?, analyzed_at = ?
-                        WHERE id = ?
-                    """, (
-                        current_price,
-                        current_views,
-                        raw_data_json,
-                        datetime.now().isoformat(),
-                        raw_item_id
+        categories/product_keys относятся ко всем товарам, item_categories/item_product_keys —
+        списки для каждого товара (параллельно items). Новые и измененные товары попадают
+        в историю цен price_observations с меткой source. Возвращает статус по каждому товару:
+        'created', 'updated', 'skipped' или 'error' (для всего пакета при ошибке БД).
+        """
+        if not items:
+            return []
+        now = datetime.now().isoformat()
+        ad_ids = [self._resolve_ad_id(item) for item in items]
+
+        with self._connection() as conn:
+            try:
+                cursor = conn.cursor()
+
+                # Текущее состояние уже известных объявлений: статус считается как в старом
+                # add_raw_item, плюс правка заголовка или описания тоже считается обновлением
+                known = {}
+                for part in _chunks(list(set(ad_ids)), SQLITE_MAX_PARAMS):
+                    cursor.execute(
+                        f"SELECT ad_id, price, title, description FROM raw_items "
+                        f"WHERE ad_id IN ({','.join('?' * len(part))})", part
+                    )
+                    known.update((row[0], tuple(row[1:])) for row in cursor.fetchall())
+
+                statuses = []
+                rows = []
+                for ad_id, item in zip(ad_ids, items):
+                    price = item.get('price', 0)
+                    views = item.get('views', 0)
+                    title, description = item.get('title'), item.get('description')
+                    if ad_id not in known:
+                        statuses.append("created")
+                    else:
+                        old_price, old_title, old_description = known[ad_id]
+                        changed = (((price or 0) > 0 and price != old_price) or (views or 0) > 0
+                                   or (title is not None and title != old_title)
+                                   or (description is not None and description != old_description))
+                        statuses.append("updated" if changed else "skipped")
+                    if statuses[-1] != "skipped":
+                        old = known.get(ad_id, (None, None, None))
+                        known[ad_id] = (price if (price or 0) > 0 else old[0],
+                                        old[1] if title is None else title,
+                                        old[2] if description is None else description)
+                    rows.append((
+                        ad_id, item.get('title'), price, item.get('description'), item.get('city'),
+                        item.get('condition'), item.get('seller_id'), views, item.get('date_text'),
+                        item.get('link'), json.dumps(item, ensure_ascii=False, default=dict), now
                     ))
-                    status = "updated"
-            else:
-                # INSERT
-                raw_data_json = json.dumps(item, ensure_ascii=False)
-                cursor.execute("""
+
+                cursor.executemany("""
                     INSERT INTO raw_items (
                         ad_id, title, price, description, city, condition,
                         seller_id, views, date_text, link, raw_data, analyzed_at
                     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    ad_id,
-                    item.get('title'),
-                    item.get('price'),
-                    item.get('description'),
-                    item.get('city'),
-                    item.get('condition'),
-                    item.get('seller_id'),
-                    item.get('views'),
-                    item.get('date_text'),
-                    item.get('link'),
-                    raw_data_json,
-                    datetime.now().isoformat()
-                ))
-                raw_item_id = cursor.lastrowid
-                status = "created"
-
-            # 3. Обновление связей (Categories / Product Keys)
-            if raw_item_id:
-                if categories:
-                    for cat_name in categories:
-                        cat_id = self.get_or_create_category(cat_name, cursor)
-                        cursor.execute("INSERT OR IGNORE INTO raw_items_categories (raw_item_id, category_id) VALUES (?, ?)", (raw_item_id, cat_id))
-
-                if product_keys:
-                    for pk in product_keys:
-                        pk_id = self.get_or_create_product_key(pk, cursor=cursor)
-                        cursor.execute("INSERT OR IGNORE INTO raw_items_products (raw_item_id, product_key_id) VALUES (?, ?)", (raw_item_id, pk_id))
+                    ON CONFLICT(ad_id) DO UPDATE SET
+                        title = COALESCE(excluded.title, raw_items.title),
+                        description = COALESCE(excluded.description, raw_items.description),
+                        city = COALESCE(excluded.city, raw_items.city),
+                        condition = COALESCE(excluded.condition, raw_items.condition),
+                        seller_id = COALESCE(excluded.seller_id, raw_items.seller_id),
+                        date_text = COALESCE(excluded.date_text, raw_items.date_text),
+                        link = COALESCE(excluded.link, raw_items.link),
+                        price = CASE WHEN excluded.price > 0 THEN excluded.price ELSE raw_items.price END,
+                        views = CASE WHEN excluded.views > 0 THEN excluded.views ELSE raw_items.views END,
+                        raw_data = excluded.raw_data, analyzed_at = excluded.analyzed_at
+                    WHERE (excluded.price > 0 AND excluded.price IS NOT raw_items.price)
+                       OR excluded.views > 0
+                       OR (excluded.title IS NOT NULL AND excluded.title IS NOT raw_items.title)
+                       OR (excluded.description IS NOT NULL AND excluded.description IS NOT raw_items.description)
+                """, rows)
+
+                self._link_items(cursor, ad_ids, categories, product_keys, item_categories, item_product_keys)
+                self._record_observations(cursor, [
+                    (ad_id, now, row[2], row[7], source)
+                    for ad_id, row, status in zip(ad_ids, rows, statuses) if status != "skipped"
+                ])
+                market_rows = self._market_rows(cursor, ad_ids)
+                if not self._commit(conn, market=False):
+                    self._market.update(market_rows)
+                return statuses
+            except Exception as e:
+                logger.error(f"DB Error in add_raw_items: {e}")
+                return ["error"] * len(items)
+
+    def _link_items(self, cursor: sqlite3.Cursor, ad_ids: List[str],
+                    categories: Optional[List[str]], product_keys: Optional[List[str]],
+                    item_categories: Optional[List[List[str]]],
+                    item_product_keys: Optional[List[List[str]]]):
+        """Связи товаров пакета с категориями и ключами товаров."""
+        per_item_cats = [list(categories or []) + list(item_categories[i] if item_categories else [])
+                         for i in range(len(ad_ids))]
+        per_item_pks = [list(product_keys or []) + list(item_product_keys[i] if item_product_keys else [])
+                        for i in range(len(ad_ids))]
+        if not any(per_item_cats) and not any(per_item_pks):
+            return
+
+        cat_ids = {name: self.get_or_create_category(name, cursor)
+                   for name in dict.fromkeys(n for names in per_item_cats for n in names if n)}
+        pk_ids = {key: self.get_or_create_product_key(key, cursor=cursor)
+                  for key in dict.fromkeys(k for keys in per_item_pks for k in keys if k)}
+
+        item_ids = {}
+        for part in _chunks(list(set(ad_ids)), SQLITE_MAX_PARAMS):
+            cursor.execute(f"SELECT ad_id, id FROM raw_items WHERE ad_id IN ({','.join('?' * len(part))})", part)
+            item_ids.update((row[0], row[1]) for row in cursor.fetchall())
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO raw_items_categories (raw_item_id, category_id) VALUES (?, ?)",
+            [(item_ids[ad_id], cat_ids[n]) for ad_id, names in zip(ad_ids, per_item_cats) for n in names if n]
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO raw_items_products (raw_item_id, product_key_id) VALUES (?, ?)",
+            [(item_ids[ad_id], pk_ids[k]) for ad_id, keys in zip(ad_ids, per_item_pks) for k in keys if k]
+        )
+
+    # === Market Statistics ===
+
+    def _market_rows(self, cursor: sqlite3.Cursor, ad_ids: Optional[List[str]] = None) -> List[Tuple]:
+        """(ad_id, price, analyzed_at, categories, product_keys) of the given ads, or of all ads."""
+        parts = _chunks(list(set(ad_ids)), SQLITE_MAX_PARAMS) if ad_ids is not None else [None]
+        result = []
+        for part in parts:
+            where = f"WHERE ri.ad_id IN ({','.join('?' * len(part))})" if part else ""
+            params = part or []
+            cursor.execute(f"SELECT ri.id, ri.ad_id, ri.price, ri.analyzed_at FROM raw_items ri {where}", params)
+            items = {row[0]: (row[1], row[2], row[3], [], []) for row in cursor.fetchall()}
+            cursor.execute(f"""
+                SELECT ric.raw_item_id, c.name FROM raw_items ri
+                JOIN raw_items_categories ric ON ric.raw_item_id = ri.id
+                JOIN categories c ON c.id = ric.category_id {where}
+            """, params)
+            for item_id, name in cursor.fetchall():
+                items[item_id][3].append(name)
+            cursor.execute(f"""
+                SELECT rip.raw_item_id, pk.key FROM raw_items ri
+                JOIN raw_items_products rip ON rip.raw_item_id = ri.id
+                JOIN product_keys pk ON pk.id = rip.product_key_id {where}
+            """, params)
+            for item_id, key in cursor.fetchall():
+                items[item_id][4].append(key)
+            result.extend(items.values())
+        return result
+
+    def _load_market_rows(self) -> List[Tuple]:
+        with self._connection() as conn:
+            return self._market_rows(conn.cursor())
+
+    def get_market_stats(self, product_key: str) -> Optional[Dict]:
+        """
+        Рыночная статистика ключа товара из памяти: count, mean, median, q25, q75,
+        min, max и weighted_median (свежие цены весят больше). None — нет цен.
+        """
+        self._sync()
+        return self._market.for_product_key(product_key)
+
+    def get_category_market_stats(self, category: str) -> Optional[Dict]:
+        """Рыночная статистика категории (те же поля, что у get_market_stats)."""
+        self._sync()
+        return self._market.for_category(category)
+
+    def match_market_stats(self, words: Iterable[str]) -> Optional[Dict]:
+        """Статистика ключа товара, все слова которого есть среди words (без поиска по БД)."""
+        self._sync()
+        return self._market.match_product_key(words)
+
+    def get_all_market_stats(self, limit: int = 200) -> List[Dict]:
+        """Статистика ключей товаров, самые наполненные первыми."""
+        self._sync()
+        return self._market.all_product_keys(limit)
+
+    # === Price History ===
+
+    def _record_observations(self, cursor: sqlite3.Cursor, observations: List[Tuple]):
+        """Append (ad_id, ts, price, views, source) rows and refresh the touched daily aggregates."""
+        if not observations:
+            return
+        cursor.executemany(
+            "INSERT INTO price_observations (ad_id, ts, price, views, source) VALUES (?, ?, ?, ?, ?)",
+            observations
+        )
+        ad_ids = list({o[0] for o in observations})
+        days = {o[1][:10] for o in observations}
+        pk_ids = set()
+        for part in _chunks(ad_ids, SQLITE_MAX_PARAMS):
+            cursor.execute(f"""
+                SELECT DISTINCT rip.product_key_id FROM raw_items ri
+                JOIN raw_items_products rip ON rip.raw_item_id = ri.id
+                WHERE ri.ad_id IN ({','.join('?' * len(part))})
+            """, part)
+            pk_ids.update(row[0] for row in cursor.fetchall())
+        self._refresh_daily_prices(cursor, [(pk_id, day) for pk_id in pk_ids for day in days])
+
+    def _refresh_daily_prices(self, cursor: sqlite3.Cursor, pairs: List[Tuple[int, str]]):
+        """
+        Recompute price_daily for (product_key_id, day) pairs: the last observed
+        price of every ad of the product key that day → min/median/max.
+        """
+        for pk_id, day in pairs:
+            cursor.execute("""
+                SELECT po.price, MAX(po.ts) FROM price_observations po
+                JOIN raw_items ri ON ri.ad_id = po.ad_id
+                JOIN raw_items_products rip ON rip.raw_item_id = ri.id
+                WHERE rip.product_key_id = ? AND po.ts >= ? AND po.ts < date(?, '+1 day')
+                GROUP BY po.ad_id
+            """, (pk_id, day, day))
+            prices = [row[0] for row in cursor.fetchall() if row[0] and row[0] > 0]
+            if not prices:
+                cursor.execute("DELETE FROM price_daily WHERE product_key_id = ? AND day = ?", (pk_id, day))
+                continue
+            cursor.execute("""
+                INSERT OR REPLACE INTO price_daily
+                    (product_key_id, day, min_price, median_price, max_price, sample_count)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (pk_id, day, min(prices), statistics.median(prices), max(prices), len(prices)))
+
+    def get_price_history(self, ad_id: str, since: Optional[str] = None,
+                          until: Optional[str] = None) -> List[Dict]:
+        """Observations of one ad in time order (ISO timestamps, bounds inclusive)."""
+        query = "SELECT ts, price, views, source FROM price_observations WHERE ad_id = ?"
+        params = [str(ad_id)]
+        if since:
+            query += " AND ts >= ?"
+            params.append(since)
+        if until:
+            query += " AND ts <= ?"
+            params.append(until)
+        query += " ORDER BY ts"
+        with self._connection() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def get_daily_prices(self, product_key: str, since: Optional[str] = None,
+                         until: Optional[str] = None) -> List[Dict]:
+        """Daily min/median/max price of a product key (days as YYYY-MM-DD, bounds inclusive)."""
+        query = """
+            SELECT pd.day, pd.min_price, pd.median_price, pd.max_price, pd.sample_count
+            FROM price_daily pd JOIN product_keys pk ON pk.id = pd.product_key_id
+            WHERE pk.key = ?
+        """
+        params = [product_key]
+        if since:
+            query += " AND pd.day >= ?"
+            params.append(since[:10])
+        if until:
+            query += " AND pd.day <= ?"
+            params.append(until[:10])
+        query += " ORDER BY pd.day"
+        with self._connection() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def get_price_trend(self, product_key: str, days: int = PRICE_TREND_DAYS) -> Optional[Dict]:
+        """
+        Price trend of a product key over the last `days` days: least-squares line
+        through daily medians. None if fewer than two days have data.
+        trend is 'up' / 'down' / 'stable' (change within PRICE_TREND_STABLE_PERCENT).
+        """
+        since = (datetime.now() - timedelta(days=days)).date().isoformat()
+        daily = self.get_daily_prices(product_key, since=since)
+        if len(daily) < 2:
+            return None
 
-            conn.commit()
-            return status # Возвращаем статус вместо ID, чтобы понимать результат
-        except Exception as e:
-            logger.error(f"DB Error in add_raw_item: {e}")
-            return "error"
-        finally:
-            conn.close()
+        first_day = date.fromisoformat(daily[0]['day'])
+        xs = [(date.fromisoformat(d['day']) - first_day).days for d in daily]
+        ys = [d['median_price'] for d in daily]
+        n = len(xs)
+        mean_x, mean_y = sum(xs) / n, sum(ys) / n
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+        start = mean_y + slope * (xs[0] - mean_x)
+        end = mean_y + slope * (xs[-1] - mean_x)
+        percent = round((end - start) / start * 100, 1) if start > 0 else 0.0
+
+        if percent >= PRICE_TREND_STABLE_PERCENT:
+            trend = 'up'
+        elif percent <= -PRICE_TREND_STABLE_PERCENT:
+            trend = 'down'
+        else:
+            trend = 'stable'
+        return {
+            'trend': trend,
+            'trend_percent': percent,
+            'days': n,
+            'first_median': ys[0],
+            'last_median': ys[-1],
+        }
+
+    def _resolve_ad_id(self, item: Dict) -> str:
+        """ad_id товара: id, ad_id, номер из ссылки или хеш заголовка/продавца/города."""
+        ad_id = str(item.get('id') or item.get('ad_id') or self._extract_ad_id(item.get('link', '')) or "")
+        if not ad_id:
+            # Генерируем ID из заголовка и продавца, если нет явного ID
+            unique_str = f"{item.get('title')}_{item.get('seller_id')}_{item.get('city')}"
+            ad_id = hashlib.md5(unique_str.encode('utf-8')).hexdigest()
+        return ad_id
 
     def _extract_ad_id(self, link: str) -> Optional[str]:
         """Extract ad_id from Avito URL."""
@@ -408,245 +822,296 @@ class RawDataManager:
         match = re.search(r'/(\d+)(?:\?|$)', link)
         return match.group(1) if match else None
 
-    def _update_raw_item(self, cursor: sqlite3.Cursor, item_id: int, item: Dict):
-        """Update existing raw item."""
-        raw_data_json = json.dumps(item, ensure_ascii=False)
-        cursor.execute("""
-            UPDATE raw_items SET
-                title = ?, price = ?, description = ?, city = ?, condition = ?,
-                seller_id = ?, views = ?, date_text = ?, link = ?, raw_data = ?,
-                analyzed_at = ?
-            WHERE id = ?
-        """, (
-            item.get('title'),
-            item.get('price'),
-            item.get('description'),
-            item.get('city'),
-            item.get('condition'),
-            item.get('seller_id'),
-            item.get('views'),
-            item.get('date_text'),
-            item.get('link'),
-            raw_data_json,
-            datetime.now().isoformat(),
-            item_id
-        ))
-
-    def get_items(self, limit: int = 100000) -> List[Dict]:
+    def get_items(self, limit: int = 100000, with_relations: bool = True) -> List[Dict]:
         """Get all raw items with optional limit."""
-        return self.get_raw_items(limit=limit)
+        return self.get_raw_items(limit=limit, with_relations=with_relations)
+
+    @staticmethod
+    def _relation_filters(category: Optional[str], product_key: Optional[str]) -> Tuple[str, List]:
+        """
+        EXISTS conditions for active category/product key filters: a primary key lookup
+        per row instead of joining the relation tables and deduplicating with DISTINCT.
+        """
+        clauses, params = [], []
+        if category:
+            clauses.append("""EXISTS (
+                SELECT 1 FROM raw_items_categories ric
+                WHERE ric.raw_item_id = ri.id
+                  AND ric.category_id = (SELECT id FROM categories WHERE name = ?))""")
+            params.append(category)
+        if product_key:
+            clauses.append("""EXISTS (
+                SELECT 1 FROM raw_items_products rip
+                WHERE rip.raw_item_id = ri.id
+                  AND rip.product_key_id = (SELECT id FROM product_keys WHERE key = ?))""")
+            params.append(product_key)
+        return "".join(f" AND {c}" for c in clauses), params
 
     def get_raw_items(self, category: Optional[str] = None,
                       product_key: Optional[str] = None,
                       search_query: Optional[str] = None,
                       limit: int = 100,
-                      offset: int = 0) -> List[Dict]:
-        """Get raw items with filtering and pagination."""
-        conn = self._get_connection()
-        try:
+                      offset: int = 0,
+                      with_relations: bool = True,
+                      after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """
+        Get raw items with filtering and pagination, newest first.
+        with_relations=False skips categories/product_keys of each item.
+        A search query goes through the FTS5 index and is ordered by relevance.
+
+        after=(analyzed_at, id) of the last item of the previous page continues from it
+        through the page index (keyset pagination): every page costs the same, unlike
+        a deep offset. See page_cursor() and iter_raw_items(). Search results carry
+        their own (rank, id) cursor.
+        """
+        if search_query and self._search_enabled() and _fts_match_query(search_query):
+            return self.search_raw_items(search_query, category=category, product_key=product_key,
+                                         limit=limit, offset=offset, with_relations=with_relations,
+                                         after=after)
+
+        with self._connection() as conn:
             cursor = conn.cursor()
 
             query = """
-                SELECT DISTINCT
+                SELECT
                     ri.id, ri.ad_id, ri.title, ri.price, ri.description, ri.city,
                     ri.condition, ri.seller_id, ri.views, ri.date_text, ri.link,
                     ri.analyzed_at, ri.created_at
                 FROM raw_items ri
-                LEFT JOIN raw_items_categories ric ON ri.id = ric.raw_item_id
-                LEFT JOIN categories c ON ric.category_id = c.id
-                LEFT JOIN raw_items_products rip ON ri.id = rip.raw_item_id
-                LEFT JOIN product_keys pk ON rip.product_key_id = pk.id
                 WHERE 1=1
             """
-            params = []
-
-            if category:
-                query += " AND c.name = ?"
-                params.append(category)
-
-            if product_key:
-                query += " AND pk.key = ?"
-                params.append(product_key)
+            filters, params = self._relation_filters(category, product_key)
+            query += filters
 
             if search_query:
                 query += " AND (ri.title LIKE ? OR ri.description LIKE ? OR ri.city LIKE ?)"
                 search_term = f"%{search_query}%"
                 params.extend([search_term, search_term, search_term])
 
-            query += " ORDER BY ri.analyzed_at DESC LIMIT ? OFFSET ?"
+            if after:
+                query += " AND (ri.analyzed_at, ri.id) < (?, ?)"
+                params.extend(after)
+                offset = 0
+
+            query += " ORDER BY ri.analyzed_at DESC, ri.id DESC LIMIT ? OFFSET ?"
             params.extend([limit, offset])
 
             cursor.execute(query, params)
-            return [self._item_from_row(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
-
-    def _item_from_row(self, row: sqlite3.Row) -> Dict:
-        """Convert row to item dict."""
-        item = dict(row)
-        # Parse categories
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT c.name FROM categories c
-                JOIN raw_items_categories ric ON c.id = ric.category_id
-                WHERE ric.raw_item_id = ?
-            """, (item['id'],))
-            item['categories'] = [r[0] for r in cursor.fetchall()]
-            # Parse product keys
-            cursor.execute("""
-                SELECT pk.key FROM product_keys pk
-                JOIN raw_items_products rip ON pk.id = rip.product_key_id
-                WHERE rip.raw_item_id = ?
-            """, (item['id'],))
-            item['product_keys'] = [r[0] for r in cursor.fetchall()]
-        finally:
-            conn.close()
-        return item
+            return self._items_from_rows(cursor, cursor.fetchall(), with_relations)
 
-    def get_raw_items_count(self, category: Optional[str] = None,
-                            product_key: Optional[str] = None) -> int:
-        """Get count of raw items with filters."""
-        conn = self._get_connection()
-        try:
+    @staticmethod
+    def page_cursor(items: List[Dict]) -> Optional[Tuple]:
+        """Cursor for the page after items (the 'after' argument of get_raw_items)."""
+        if not items:
+            return None
+        last = items[-1]
+        return (last['rank'], last['id']) if 'rank' in last else (last['analyzed_at'], last['id'])
+
+    def iter_raw_items(self, category: Optional[str] = None,
+                       product_key: Optional[str] = None,
+                       page_size: int = MEMORY_PAGE_SIZE,
+                       with_relations: bool = True) -> Iterator[List[Dict]]:
+        """All matching items page by page (keyset pagination), newest first."""
+        after = None
+        while True:
+            page = self.get_raw_items(category, product_key, limit=page_size,
+                                      with_relations=with_relations, after=after)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = self.page_cursor(page)
+
+    def search_raw_items(self, search_query: str,
+                         category: Optional[str] = None,
+                         product_key: Optional[str] = None,
+                         limit: int = 100,
+                         offset: int = 0,
+                         with_relations: bool = True,
+                         snippet_marks: Tuple[str, str] = ('[', ']'),
+                         after: Optional[Tuple[float, int]] = None) -> List[Dict]:
+        """
+        Full-text search over title/description/city (FTS5 MATCH, bm25 ranking).
+        Every word is matched as a prefix, so word forms are found ("видеокарт" → "видеокарты").
+        Items get 'rank' (lower is better) and 'snippet' with matches wrapped in snippet_marks.
+        after=(rank, id) of the last result (page_cursor()) continues from it in rank order.
+        """
+        match = _fts_match_query(search_query)
+        if not match:
+            return []
+        with self._connection() as conn:
             cursor = conn.cursor()
-
+            # Вес совпадения: заголовок важнее города, город важнее описания
             query = """
-                SELECT COUNT(DISTINCT ri.id)
-                FROM raw_items ri
-                LEFT JOIN raw_items_categories ric ON ri.id = ric.raw_item_id
-                LEFT JOIN categories c ON ric.category_id = c.id
-                LEFT JOIN raw_items_products rip ON ri.id = rip.raw_item_id
-                LEFT JOIN product_keys pk ON rip.product_key_id = pk.id
-                WHERE 1=1
+                SELECT
+                    ri.id, ri.ad_id, ri.title, ri.price, ri.description, ri.city,
+                    ri.condition, ri.seller_id, ri.views, ri.date_text, ri.link,
+                    ri.analyzed_at, ri.created_at,
+                    bm25(raw_items_fts, 10.0, 1.0, 2.0) AS rank,
+                    snippet(raw_items_fts, -1, ?, ?, '…', 12) AS snippet
+                FROM raw_items_fts
+                JOIN raw_items ri ON ri.id = raw_items_fts.rowid
+                WHERE raw_items_fts MATCH ?
             """
-            params = []
+            filters, filter_params = self._relation_filters(category, product_key)
+            query += filters
+            params = [snippet_marks[0], snippet_marks[1], match] + filter_params
+            if after:
+                # rank считается в выборке, поэтому курсор применяется снаружи
+                query = f"SELECT * FROM ({query}) WHERE (rank, id) > (?, ?)"
+                params.extend(after)
+                offset = 0
+            query += " ORDER BY rank, id LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
 
-            if category:
-                query += " AND c.name = ?"
-                params.append(category)
+            cursor.execute(query, params)
+            return self._items_from_rows(cursor, cursor.fetchall(), with_relations)
+
+    def _items_from_rows(self, cursor: sqlite3.Cursor, rows: List[sqlite3.Row],
+                         with_relations: bool = True) -> List[Dict]:
+        """Convert rows to item dicts; relations are fetched with one query per relation."""
+        items = [dict(row) for row in rows]
+        if not with_relations or not items:
+            return items
+
+        by_id = {}
+        for item in items:
+            item['categories'] = []
+            item['product_keys'] = []
+            by_id[item['id']] = item
+        ids = list(by_id)
+        for part in _chunks(ids, SQLITE_MAX_PARAMS):
+            marks = ','.join('?' * len(part))
+            cursor.execute(f"""
+                SELECT ric.raw_item_id, c.name FROM raw_items_categories ric
+                JOIN categories c ON c.id = ric.category_id
+                WHERE ric.raw_item_id IN ({marks})
+            """, part)
+            for item_id, name in cursor.fetchall():
+                by_id[item_id]['categories'].append(name)
+            cursor.execute(f"""
+                SELECT rip.raw_item_id, pk.key FROM raw_items_products rip
+                JOIN product_keys pk ON pk.id = rip.product_key_id
+                WHERE rip.raw_item_id IN ({marks})
+            """, part)
+            for item_id, key in cursor.fetchall():
+                by_id[item_id]['product_keys'].append(key)
+        return items
 
-            if product_key:
-                query += " AND pk.key = ?"
-                params.append(product_key)
+    def get_raw_items_count(self, category: Optional[str] = None,
+                            product_key: Optional[str] = None) -> int:
+        """Get count of raw items with filters."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
 
-            cursor.execute(query, params)
+            filters, params = self._relation_filters(category, product_key)
+            cursor.execute(f"SELECT COUNT(*) FROM raw_items ri WHERE 1=1{filters}", params)
             return cursor.fetchone()[0] or 0
-        finally:
-            conn.close()
 
-    def get_raw_item_by_id(self, item_id: int) -> Optional[Dict]:
+    def get_raw_item_by_id(self, item_id: int, with_relations: bool = True) -> Optional[Dict]:
         """Get single raw item by id."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM raw_items WHERE id = ?", (item_id,))
             row = cursor.fetchone()
-            return self._item_from_row(row) if row else None
-        finally:
-            conn.close()
+            return self._items_from_rows(cursor, [row], with_relations)[0] if row else None
 
     def delete_raw_items(self, item_ids: List[int]) -> int:
         """Delete items by ids. Returns count of deleted items."""
         if not item_ids:
             return 0
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             placeholders = ','.join('?' * len(item_ids))
             cursor.execute(f"DELETE FROM raw_items WHERE id IN ({placeholders})", item_ids)
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount
-        finally:
-            conn.close()
 
     def clear_all_raw_items(self) -> int:
         """Clear all raw items. Returns count of deleted items."""
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM raw_items")
             count = cursor.fetchone()[0] or 0
             cursor.execute("DELETE FROM raw_items")
-            conn.commit()
+            cursor.execute("DELETE FROM price_observations")
+            cursor.execute("DELETE FROM price_daily")
+            self._commit(conn)
             return count
-        finally:
-            conn.close()
 
     # === Product Key Relations ===
 
-    def get_items_for_product_key(self, product_key: str) -> List[Dict]:
-        """Get all items for a specific product key."""
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT
-                    ri.id, ri.ad_id, ri.title, ri.price, ri.description, ri.city,
-                    ri.condition, ri.seller_id, ri.views, ri.date_text, ri.link,
-                    ri.analyzed_at, ri.created_at
-                FROM raw_items ri
-                JOIN raw_items_products rip ON ri.id = rip.raw_item_id
-                JOIN product_keys pk ON rip.product_key_id = pk.id
-                WHERE pk.key = ?
-                ORDER BY ri.analyzed_at DESC
-            """, (product_key,))
-            return [self._item_from_row(row) for row in cursor.fetchall()]
-        finally:
-            conn.close()
+    def get_items_for_product_key(self, product_key: str, with_relations: bool = True,
+                                  limit: Optional[int] = None) -> List[Dict]:
+        """Get items for a specific product key, newest first (all of them unless limit is set)."""
+        if limit is not None:
+            return self.get_raw_items(product_key=product_key, limit=limit, with_relations=with_relations)
+        items = []
+        for page in self.iter_raw_items(product_key=product_key, with_relations=with_relations):
+            items.extend(page)
+        return items
 
     # === Statistics ===
 
     def get_statistics(self) -> Dict:
-        """Get overall statistics."""
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT COUNT(*) FROM raw_items")
-            total_items = cursor.fetchone()[0] or 0
-
-            cursor.execute("SELECT COUNT(*) FROM categories")
-            total_categories = cursor.fetchone()[0] or 0
+        """Get overall statistics (counters, cached until the next write)."""
+        self._sync()
+        def load():
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT item_count, priced_count, price_sum FROM raw_stats WHERE id = 1")
+                total_items, priced_count, price_sum = cursor.fetchone() or (0, 0, 0)
 
-            cursor.execute("SELECT COUNT(*) FROM product_keys")
-            total_product_keys = cursor.fetchone()[0] or 0
+                cursor.execute("SELECT COUNT(*) FROM categories")
+                total_categories = cursor.fetchone()[0] or 0
 
-            cursor.execute("SELECT AVG(price) FROM raw_items WHERE price > 0")
-            avg_price = cursor.fetchone()[0] or 0
+                cursor.execute("SELECT COUNT(*) FROM product_keys")
+                total_product_keys = cursor.fetchone()[0] or 0
 
-            return {
-                'total_items': total_items,
-                'total_categories': total_categories,
-                'total_product_keys': total_product_keys,
-                'avg_price': round(avg_price, 2) if avg_price else 0
-            }
-        finally:
-            conn.close()
+                avg_price = price_sum / priced_count if priced_count else 0
+                return {
+                    'total_items': total_items,
+                    'total_categories': total_categories,
+                    'total_product_keys': total_product_keys,
+                    'avg_price': round(avg_price, 2) if avg_price else 0
+                }
+        return dict(self._cache.get("statistics", load))
 
     # === Export/Import ===
 
-    def export_to_json(self, filepath: str):
-        """Export entire database to JSON."""
-        data = {
-            'exported_at': datetime.now().isoformat(),
-            'schema_version': self.SCHEMA_VERSION,
-            'categories': self.get_all_categories(),
-            'product_keys': self.get_all_product_keys(),
-            'items': self.get_raw_items(limit=999999)
-        }
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.success(f"Exported {data['items']} items to {filepath}")
+    def _export_records(self) -> Iterator[Dict]:
+        for cat in self.get_all_categories():
+            yield {'type': 'category', 'name': cat['name'], 'created_at': cat.get('created_at')}
+        for pk in self.get_all_product_keys():
+            yield {'type': 'product_key', 'key': pk['key'], 'display_name': pk.get('display_name'),
+                   'category_name': pk.get('category_name'), 'created_at': pk.get('created_at')}
+        for page in self.iter_raw_items():
+            for item in page:
+                yield dict(item, type='item')
+
+    def export_to_json(self, filepath: str, on_progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Export the database as JSON Lines (categories, product keys, then items with
+        their relation names), streamed page by page. Returns the number of records.
+        """
+        count = write_records(filepath, 'raw_data', self.SCHEMA_VERSION, self._export_records(),
+                              self.get_statistics()['total_items'], on_progress)
+        logger.success(f"Exported {count} records to {filepath}")
+        return count
 
-    def import_from_json(self, filepath: str, clear_first: bool = False):
-        """Import database from JSON."""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def import_from_json(self, filepath: str, clear_first: bool = False,
+                         on_progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Import an export (JSON Lines or the old single JSON document) in batches of
+        MEMORY_IMPORT_BATCH records, one transaction per batch. Items already present
+        (same ad_id) are kept; relations are merged. Returns the number of new items.
+        """
+        imported_at = datetime.now().isoformat()
+        done = imported = 0
+        price_days = set()
 
-        conn = self._get_connection()
-        try:
+        with self._connection() as conn:
             cursor = conn.cursor()
 
             if clear_first:
@@ -655,48 +1120,101 @@ class RawDataManager:
                 cursor.execute("DELETE FROM raw_items")
                 cursor.execute("DELETE FROM product_keys")
                 cursor.execute("DELETE FROM categories")
-
-            # Import categories
-            for cat in data.get('categories', []):
-                cursor.execute(
-                    "INSERT OR IGNORE INTO categories (id, name, created_at) VALUES (?, ?, ?)",
-                    (cat['id'], cat['name'], cat.get('created_at'))
-                )
-
-            # Import product keys
-            for pk in data.get('product_keys', []):
-                cursor.execute(
-                    "INSERT OR IGNORE INTO product_keys (id, key, display_name, category_id, created_at) VALUES (?, ?, ?, ?, ?)",
-                    (pk['id'], pk['key'], pk.get('display_name'), pk.get('category_id'), pk.get('created_at'))
-                )
-
-            # Import items
-            for item in data.get('items', []):
-                ad_id = item.get('ad_id')
-                if not ad_id:
-                    continue
-                raw_data = json.dumps(item, ensure_ascii=False)
-                cursor.execute("""
-                    INSERT OR IGNORE INTO raw_items (
-                        id, ad_id, title, price, description, city, condition,
-                        seller_id, views, date_text, link, raw_data, analyzed_at, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    item.get('id'), ad_id, item.get('title'), item.get('price'),
-                    item.get('description'), item.get('city'), item.get('condition'),
-                    item.get('seller_id'), item.get('views'), item.get('date_text'),
-                    item.get('link'), raw_data, item.get('analyzed_at'), item.get('created_at')
-                ))
-
-            conn.commit()
-            logger.success(f"Imported {len(data.get('items', []))} items from {filepath}")
-        finally:
-            conn.close()
+                cursor.execute("DELETE FROM price_observations")
+                cursor.execute("DELETE FROM price_daily")
+                self._commit(conn)
+
+            try:
+                for batch in batched(read_records(filepath, 'raw_data'), MEMORY_IMPORT_BATCH):
+                    imported += self._import_batch(cursor, batch, imported_at, clear_first, price_days)
+                    self._commit(conn)
+                    done += len(batch)
+                    if on_progress:
+                        on_progress(done, None)
+                self._refresh_daily_prices(cursor, sorted(price_days))
+                self._commit(conn)
+            finally:
+                self._invalidate()
+
+        logger.success(f"Imported {imported} items from {filepath}")
+        return imported
+
+    def _import_batch(self, cursor: sqlite3.Cursor, records: List[Dict], imported_at: str,
+                      keep_ids: bool, price_days: set) -> int:
+        """Insert one batch of export records; returns the number of new items."""
+        by_type = {}
+        for record in records:
+            by_type.setdefault(record.get('type'), []).append(record)
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO categories (name, created_at) VALUES (?, COALESCE(?, CURRENT_TIMESTAMP))",
+            [(c['name'], c.get('created_at')) for c in by_type.get('category', []) if c.get('name')]
+        )
+
+        product_keys = [pk for pk in by_type.get('product_key', []) if pk.get('key')]
+        cat_ids = {name: self.get_or_create_category(name, cursor)
+                   for name in {pk.get('category_name') for pk in product_keys} if name}
+        cursor.executemany(
+            "INSERT OR IGNORE INTO product_keys (key, display_name, category_id, created_at) "
+            "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+            [(pk['key'], pk.get('display_name'), cat_ids.get(pk.get('category_name')), pk.get('created_at'))
+             for pk in product_keys]
+        )
+
+        items = [item for item in by_type.get('item', []) if item.get('ad_id')]
+        if not items:
+            return 0
+        ad_ids = [str(item['ad_id']) for item in items]
+        known = set()
+        for part in _chunks(list(set(ad_ids)), SQLITE_MAX_PARAMS):
+            cursor.execute(f"SELECT ad_id FROM raw_items WHERE ad_id IN ({','.join('?' * len(part))})", part)
+            known.update(row[0] for row in cursor.fetchall())
+
+        rows = []
+        for ad_id, item in zip(ad_ids, items):
+            data = {k: v for k, v in item.items() if k not in ('type', 'rank', 'snippet')}
+            rows.append((
+                item.get('id') if keep_ids else None, ad_id, item.get('title'), item.get('price'),
+                item.get('description'), item.get('city'), item.get('condition'),
+                item.get('seller_id'), item.get('views'), item.get('date_text'), item.get('link'),
+                json.dumps(data, ensure_ascii=False, default=dict),
+                item.get('analyzed_at') or imported_at, item.get('created_at') or imported_at
+            ))
+        cursor.executemany("""
+            INSERT OR IGNORE INTO raw_items (
+                id, ad_id, title, price, description, city, condition,
+                seller_id, views, date_text, link, raw_data, analyzed_at, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+        self._link_items(cursor, ad_ids, None, None,
+                         [item.get('categories') or [] for item in items],
+                         [item.get('product_keys') or [] for item in items])
+
+        # New items start their price history at the export time
+        new = [(ad_id, row[12], row[3], row[8], 'import')
+               for ad_id, row in zip(ad_ids, rows) if ad_id not in known]
+        if new:
+            cursor.executemany(
+                "INSERT INTO price_observations (ad_id, ts, price, views, source) VALUES (?, ?, ?, ?, ?)", new
+            )
+            days = {o[0]: o[1][:10] for o in new}
+            for part in _chunks(list(days), SQLITE_MAX_PARAMS):
+                cursor.execute(f"""
+                    SELECT ri.ad_id, rip.product_key_id FROM raw_items ri
+                    JOIN raw_items_products rip ON rip.raw_item_id = ri.id
+                    WHERE ri.ad_id IN ({','.join('?' * len(part))})
+                """, part)
+                price_days.update((pk_id, days[ad_id]) for ad_id, pk_id in cursor.fetchall())
+        return len(set(ad_ids) - known)
 
     # === Reset ===
 
     def reset_database(self):
         """Completely reset the database."""
+        self._pool.close_all()
+        self._fts = None
+        self._invalidate()
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
         self._ensure_db_exists()
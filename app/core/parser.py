@@ -11,9 +11,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException, StaleElementReferenceException
 
-from PyQt6.QtCore import QObject, pyqtSignal
+from app.core.signals import QObject, pyqtSignal
 
 from app.core.driver import DriverManager
+from app.core.egress import EgressPool
 from app.config import USER_AGENTS, BASE_URL_MOSCOW, ALL_PAGES_LIMIT
 from app.core.blacklist_manager import get_blacklist_manager
 from app.core.selectors import AvitoSelectors
@@ -21,6 +22,10 @@ from app.core.selectors import AvitoSelectors
 from app.core.log_manager import logger
 
 
+def _has_egress_pool(driver_manager) -> bool:
+    return isinstance(getattr(driver_manager, "egress_pool", None), EgressPool)
+
+
 class BanRecoveryStrategy:
     def __init__(self, driver_manager):
         self.driver_manager = driver_manager
@@ -33,6 +38,12 @@ class BanRecoveryStrategy:
         current_time = time.time()
         
         logger.warning(f"SOFT BAN #{self.ban_count} DETECTED")
+
+        # С пулом прокси бан одного выхода не останавливает очередь: уходим на другой выход
+        if _has_egress_pool(self.driver_manager):
+            if self.driver_manager.rotate_exit_after_ban():
+                self.last_ban_time = current_time
+                return True
         
         wait_time = min(30 * (2 ** (self.ban_count - 1)), self.max_wait_time)
         
@@ -116,6 +127,9 @@ class PageLoader:
         
             if driver_manager and hasattr(driver_manager, 'rate_limit_delay'):
                 driver_manager.rate_limit_delay(stop_check=stop_check)
+                # Выход мог смениться (перезапуск браузера с другим прокси)
+                if _has_egress_pool(driver_manager):
+                    driver = driver_manager.driver
         
             if on_request:
                 on_request()
@@ -140,6 +154,8 @@ class PageLoader:
                 load_timeout = int(10 * speed_mult)
                 if PageLoader.wait_for_load(driver, timeout=load_timeout):
                     logger.dev(f"Page loaded in {time.time() - t_start:.2f}s")
+                    if _has_egress_pool(driver_manager):
+                        driver_manager.report_exit_success()
                     return True
             
             except WebDriverException as e:
@@ -152,6 +168,8 @@ class PageLoader:
         
                 logger.dev(f"Load Error: {e}", level="ERROR")
                 logger.error(f"WebDriver Error: {e}")
+                if _has_egress_pool(driver_manager):
+                    driver_manager.report_exit_error()
         
                 if stop_check and stop_check():
                     return False
@@ -184,8 +202,15 @@ class PageLoader:
 
 
 class SearchNavigator:
-    def __init__(self, driver):
+    def __init__(self, driver, request_budget=None, stop_check: Optional[Callable[[], bool]] = None):
         self.driver = driver
+        # Переходы по страницам при поиске категорий тоже тратят общий бюджет запросов
+        self.request_budget = request_budget
+        self.stop_check = stop_check
+
+    def _acquire_request(self):
+        if self.request_budget is not None:
+            self.request_budget.acquire(self.stop_check)
     
     def _human_type(self, element, text):
         from app.config import (
@@ -247,6 +272,7 @@ class SearchNavigator:
         
         if need_navigation:
             logger.dev("Сброс навигации на главную (Москва)...")
+            self._acquire_request()
             if not PageLoader.safe_get(self.driver, "https://www.avito.ru/moskva"):
                 logger.warning("Не удалось загрузить главную страницу...")
                 return None
@@ -523,6 +549,7 @@ class SearchNavigator:
                             cached = next((c for c in candidates if c['text'] == target_text), None)
                             if cached and cached.get('href') and self._is_valid_url(cached['href']):
                                 try:
+                                    self._acquire_request()
                                     self.driver.get(cached['href'])
                                     PageLoader.wait_for_load(self.driver, timeout=10)
                                     time.sleep(1.5)
@@ -538,6 +565,7 @@ class SearchNavigator:
 
                         if not target or idx > 0 or attempt > 0:
                             if self.driver.current_url.split('?')[0] != "https://www.avito.ru/moskva":
+                                self._acquire_request()
                                 PageLoader.safe_get(self.driver, "https://www.avito.ru/moskva")
                                 time.sleep(1.5)
 
@@ -557,6 +585,7 @@ class SearchNavigator:
                             if attempt == 2: logger.warning(f"Элемент меню не найден: {target_text}")
                             continue
 
+                        self._acquire_request()
                         self.driver.execute_script("arguments[0].click();", target['element'])
                         time.sleep(1.5)
                         
@@ -740,7 +769,9 @@ class AvitoParser(QObject):
         if isinstance(keywords, (list, tuple)): query_str = " ".join(keywords)
         else: query_str = str(keywords)
         
-        navigator = SearchNavigator(self.driver_manager.driver)
+        navigator = SearchNavigator(self.driver_manager.driver,
+                                    request_budget=self.driver_manager.request_budget,
+                                    stop_check=self.is_stop_requested)
         
         if forced_categories:
             logger.info("Открытие выбранных категорий...")
@@ -861,6 +892,8 @@ class AvitoParser(QObject):
         
             if self.is_stop_requested(): return []
         
+            # Бюджет действует с первого запроса: поиск категорий тоже ходит на Авито
+            self.driver_manager.request_budget = kwargs.pop('request_budget', None)
             final_tasks = self._build_tasks(
                 keywords, 
                 kwargs.get('min_price'), 
@@ -888,6 +921,12 @@ class AvitoParser(QObject):
         finally:
             self._is_running = False
             if self.driver_manager: self.driver_manager.set_speed_multiplier(1.0)
+            if _has_egress_pool(self.driver_manager):
+                for ex in self.driver_manager.egress_pool.snapshot():
+                    logger.dev(
+                        f"Выход {ex['name']}: запросов {ex['requests']}, успешно {ex['successes']}, "
+                        f"ошибок {ex['errors']}, банов за час {ex['recent_bans']}, здоровье {ex['health']}"
+                    )
     
     def process_region(
         self, 
@@ -905,6 +944,13 @@ class AvitoParser(QObject):
         filter_defects=False, 
         skip_duplicates=False, 
         allow_rewrite_duplicates=False, 
+        seen_index=None, 
+        skip_seen_history=False, 
+        queue_name=None, 
+        on_page_items=None, 
+        incremental_stop_after=None, 
+        watermark_ids=None, 
+        listed_ids=None, 
         total_expected_items=None, 
         current_task_index=0, 
         total_tasks=1, 
@@ -916,6 +962,8 @@ class AvitoParser(QObject):
         ignore_keywords = ignore_keywords or []
         blacklist_manager = get_blacklist_manager()
         consecutive_deep_errors = 0
+        # Инкрементальный режим (сортировка по дате): серия уже известных подряд = дошли до прошлого запуска
+        known_streak = 0
         
         while True:
             if self.is_stop_requested(): break
@@ -963,16 +1011,39 @@ class AvitoParser(QObject):
                 break
         
             items_added_on_page = 0
+            page_seen_ids = []
+            page_new_items = []
+            limit_reached = False
+            watermark_reached = False
              
             for item in page_items:
                 if self.is_stop_requested(): break
                 if max_total_items and len(results_list) >= max_total_items:
-                    return
+                    limit_reached = True
+                    break
         
                 ad_id = str(item.get("id") or "").strip()
+                # Все просмотренные в выдаче ID, включая отфильтрованные: из них строится водяной знак,
+                # иначе отсеянные объявления сбивают серию known_streak в следующем запуске
+                if listed_ids is not None and ad_id:
+                    listed_ids.append(ad_id)
+                if incremental_stop_after and watermark_ids:
+                    if ad_id and ad_id in watermark_ids:
+                        known_streak += 1
+                        if known_streak >= incremental_stop_after:
+                            watermark_reached = True
+                            break
+                    else:
+                        known_streak = 0
                 if ad_id in seen_ids:
                     continue
-                if ad_id and existing_ids_base and ad_id in existing_ids_base:
+                # История прошлых сессий (seen_index) учитывается только по явной опции skip_seen_history
+                is_known = bool(ad_id) and (
+                    (existing_ids_base and ad_id in existing_ids_base)
+                    or (skip_seen_history and seen_index is not None and ad_id in seen_index)
+                )
+                if is_known:
+                    page_seen_ids.append(ad_id)
                     if skip_duplicates and not allow_rewrite_duplicates:
                         continue
                  
@@ -1006,6 +1077,8 @@ class AvitoParser(QObject):
                 if item['id'] not in seen_ids:
                     seen_ids.add(item['id'])
                     results_list.append(item)
+                    page_seen_ids.append(item['id'])
+                    page_new_items.append(item)
                     items_added_on_page += 1
         
                     if total_expected_items and total_expected_items > 0:
@@ -1016,6 +1089,22 @@ class AvitoParser(QObject):
                 if max_items_per_page and items_added_on_page >= max_items_per_page: 
                     break
                      
+            if seen_index is not None and page_seen_ids:
+                try:
+                    seen_index.mark_seen(page_seen_ids, queue_name=queue_name)
+                except Exception as e:
+                    logger.dev(f"SeenIdIndex write error: {e}", level="ERROR")
+
+            if on_page_items and page_new_items:
+                on_page_items(page_new_items)
+
+            if limit_reached:
+                return
+
+            if watermark_reached:
+                logger.info(f"Дошли до прошлого запуска (страница {page}), дальше только старые объявления...")
+                break
+
             logger.success(f"Страница {page}: +{items_added_on_page} товаров...", token="parser_page")
             if is_deep_mode and items_added_on_page > 0:
                 logger.success("Обработка товаров завершена...", token="parser_deep")
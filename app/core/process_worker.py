@@ -0,0 +1,221 @@
+import queue
+import threading
+import multiprocessing as mp
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from app.config import STREAM_ACK_TIMEOUT
+from app.core.log_manager import logger
+
+# --- Протокол сообщений дочерний процесс -> GUI: кортежи (тип, данные) ---
+MSG_PROGRESS = "progress"        # int
+MSG_REQUESTS = "requests"        # (parser_count, ai_count)
+MSG_ITEMS = "items"              # List[Dict] — пачка товаров со страницы
+MSG_LOG = "log"                  # (token, text, level, replace)
+MSG_LOG_DELETE = "log_delete"    # token
+MSG_ERROR = "error"              # str
+MSG_FINISHED = "finished"        # List[Dict] — итоговый список
+
+# Сколько ждать штатного завершения процесса после запроса остановки
+PROCESS_STOP_GRACE = 15.0
+
+
+def _parser_process_main(params: Dict[str, Any], out_q, stop_event, batch_slots, request_budget=None):
+    """Точка входа дочернего процесса: тот же AvitoParser, события уходят в out_q"""
+    from app.core.parser import AvitoParser
+    from app.core.log_manager import logger as child_logger
+
+    child_logger.ui_log_signal.connect(
+        lambda token, text, level, replace: out_q.put((MSG_LOG, (token, text, level, replace)))
+    )
+    child_logger.ui_delete_signal.connect(lambda token: out_q.put((MSG_LOG_DELETE, token)))
+
+    seen_index = None
+    if params.pop("use_seen_index", False):
+        try:
+            from app.core.seen_index import get_seen_index
+            seen_index = get_seen_index()
+        except Exception as e:
+            child_logger.dev(f"SeenIdIndex недоступен в процессе парсера: {e}", level="ERROR")
+
+    def on_page_items(items):
+        if batch_slots is not None:
+            waited = 0.0
+            while not batch_slots.acquire(timeout=0.5):
+                if stop_event.is_set():
+                    return
+                waited += 0.5
+                if waited >= STREAM_ACK_TIMEOUT:
+                    break
+        out_q.put((MSG_ITEMS, list(items)))
+
+    results = []
+    try:
+        keywords = params.pop("keywords")
+        ignore_keywords = params.pop("ignore_keywords")
+        debug_mode = params.pop("debug_mode", False)
+
+        with AvitoParser(debug_mode=debug_mode) as parser:
+            parser.progress_value.connect(lambda v: out_q.put((MSG_PROGRESS, v)))
+            parser.update_requests_count.connect(lambda a, b: out_q.put((MSG_REQUESTS, (a, b))))
+
+            def watch_stop():
+                stop_event.wait()
+                parser.request_stop()
+
+            threading.Thread(target=watch_stop, daemon=True).start()
+
+            results = parser.search_items(
+                keywords,
+                ignore_keywords,
+                existing_ids_base=set(params.pop("existing_ids", [])),
+                seen_index=seen_index,
+                on_page_items=on_page_items,
+                request_budget=request_budget,
+                **params,
+            )
+    except Exception as e:
+        child_logger.error(f"Ошибка запуска парсера: {e}")
+        out_q.put((MSG_ERROR, str(e)))
+    finally:
+        out_q.put((MSG_FINISHED, results or []))
+        if seen_index is not None:
+            seen_index.close()
+
+
+class ProcessParserWorker(QObject):
+    """
+    ParserWorker с парсингом в отдельном процессе.
+    Сигналы и методы совпадают с ParserWorker, поэтому ParserController подключает его так же.
+    """
+
+    finished = pyqtSignal(list)
+    batch_ready = pyqtSignal(list)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    requests_count = pyqtSignal(int, int)
+
+    def __init__(self, keywords, ignore_keywords, max_pages, max_total_items,
+            min_price, max_price, sort_type,
+            search_all_regions, debug_mode=False,
+            search_mode="full", forced_categories=None,
+            filter_defects=False,
+            skip_duplicates=False,
+            allow_rewrite_duplicates=False,
+            existing_ids=None,
+            seen_index=None,
+            skip_seen_history=False,
+            queue_name=None,
+            max_pending_batches=None,
+            request_budget=None):
+        super().__init__()
+        self.params = {
+            "keywords": keywords,
+            "ignore_keywords": ignore_keywords,
+            "max_pages": max_pages,
+            "max_items_per_page": max_total_items if search_mode == "primary" else None,
+            "max_total_items": max_total_items,
+            "min_price": min_price,
+            "max_price": max_price,
+            "sort_type": sort_type,
+            "search_all_regions": search_all_regions,
+            "debug_mode": debug_mode,
+            "search_mode": search_mode,
+            "forced_categories": forced_categories,
+            "filter_defects": filter_defects,
+            "skip_duplicates": skip_duplicates,
+            "allow_rewrite_duplicates": allow_rewrite_duplicates,
+            "existing_ids": list(existing_ids or []),
+            # Индекс — SQLite-файл: процесс открывает его сам, объект между процессами не передается
+            "use_seen_index": seen_index is not None,
+            "skip_seen_history": skip_seen_history,
+            "queue_name": queue_name,
+        }
+
+        # Бюджет должен быть создан на spawn-контексте (общая память), он уходит в процесс аргументом
+        self._request_budget = request_budget
+        self._ctx = mp.get_context("spawn")
+        self._stop_event = self._ctx.Event()
+        self._batch_slots = self._ctx.BoundedSemaphore(max_pending_batches) if max_pending_batches else None
+        self._process: Optional[mp.Process] = None
+        self._stop_requested = False
+
+    def request_stop(self):
+        self._stop_requested = True
+        self._stop_event.set()
+
+    def ack_batch(self):
+        if self._batch_slots is not None:
+            try:
+                self._batch_slots.release()
+            except ValueError:
+                pass
+
+    def kill_process(self):
+        """Жесткая остановка (зависший Chrome и т.п.)"""
+        if self._process and self._process.is_alive():
+            self._process.kill()
+
+    @pyqtSlot()
+    def run(self):
+        out_q = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_parser_process_main,
+            args=(dict(self.params), out_q, self._stop_event, self._batch_slots, self._request_budget),
+            daemon=True,
+        )
+
+        collected: List[Dict] = []
+        results: Optional[List[Dict]] = None
+        stop_wait = 0.0
+        dead_polls = 0
+
+        try:
+            self._process.start()
+            while results is None:
+                try:
+                    kind, payload = out_q.get(timeout=0.5)
+                except queue.Empty:
+                    if not self._process.is_alive():
+                        # Даем очереди дочитаться: процесс мог выйти сразу после последнего сообщения
+                        dead_polls += 1
+                        if dead_polls < 2:
+                            continue
+                        if not self._stop_requested:
+                            msg = f"Процесс парсера завершился аварийно (код {self._process.exitcode})"
+                            logger.error(msg)
+                            self.error.emit(msg)
+                        results = collected
+                        break
+                    if self._stop_requested:
+                        stop_wait += 0.5
+                        if stop_wait >= PROCESS_STOP_GRACE:
+                            self.kill_process()
+                    continue
+
+                if kind == MSG_PROGRESS:
+                    self.progress.emit(payload)
+                elif kind == MSG_REQUESTS:
+                    self.requests_count.emit(*payload)
+                elif kind == MSG_ITEMS:
+                    collected.extend(payload)
+                    self.batch_ready.emit(payload)
+                elif kind == MSG_LOG:
+                    logger.ui_log_signal.emit(*payload)
+                elif kind == MSG_LOG_DELETE:
+                    logger.delete_log(payload)
+                elif kind == MSG_ERROR:
+                    self.error.emit(payload)
+                elif kind == MSG_FINISHED:
+                    results = payload
+        except Exception as e:
+            logger.error(f"Ошибка процесса парсера: {e}")
+            self.error.emit(str(e))
+            results = collected
+        finally:
+            if self._process is not None:
+                self._process.join(timeout=5)
+                if self._process.is_alive():
+                    self._process.kill()
+            self.finished.emit(results if results else [])
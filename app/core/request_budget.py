@@ -0,0 +1,146 @@
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from app.config import REQUEST_BUDGET_PER_MIN, REQUEST_BUDGET_BURST
+
+
+class _Cell:
+    """Замена multiprocessing.Value для режима без процессов"""
+    __slots__ = ("value",)
+
+    def __init__(self, value: float):
+        self.value = value
+
+
+class TokenBucket:
+    """
+    Token bucket: rate_per_min токенов в минуту, не больше burst про запас.
+    С ctx (multiprocessing context) состояние лежит в общей памяти, и один бакет
+    можно передать в дочерние процессы парсера.
+    """
+
+    def __init__(self, rate_per_min: float, burst: float = 1.0, ctx=None):
+        if ctx is not None:
+            self._lock = ctx.Lock()
+            self._rate = ctx.Value("d", float(rate_per_min), lock=False)
+            self._tokens = ctx.Value("d", float(burst), lock=False)
+            self._stamp = ctx.Value("d", time.time(), lock=False)
+        else:
+            self._lock = threading.Lock()
+            self._rate = _Cell(float(rate_per_min))
+            self._tokens = _Cell(float(burst))
+            self._stamp = _Cell(time.time())
+        self.burst = max(1.0, float(burst))
+
+    @property
+    def rate_per_min(self) -> float:
+        return self._rate.value
+
+    def set_rate(self, rate_per_min: float):
+        with self._lock:
+            self._refill(time.time())
+            self._rate.value = max(0.0, float(rate_per_min))
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._stamp.value)
+        self._stamp.value = now
+        self._tokens.value = min(self.burst, self._tokens.value + elapsed * self._rate.value / 60.0)
+
+    def get_state(self) -> Tuple[float, float]:
+        """(токены, время последнего пополнения) — для хранения бакета вне процесса"""
+        with self._lock:
+            return self._tokens.value, self._stamp.value
+
+    def set_state(self, tokens: float, stamp: float):
+        with self._lock:
+            self._tokens.value = min(self.burst, float(tokens))
+            self._stamp.value = float(stamp)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Забирает токены и возвращает 0, либо сколько секунд ждать до следующей попытки"""
+        with self._lock:
+            self._refill(time.time())
+            if self._tokens.value >= tokens:
+                self._tokens.value -= tokens
+                return 0.0
+            rate = self._rate.value
+            if rate <= 0:
+                return 1.0
+            return (tokens - self._tokens.value) * 60.0 / rate
+
+    def acquire(self, stop_check: Optional[Callable[[], bool]] = None, tokens: float = 1.0,
+                timeout: Optional[float] = None) -> bool:
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if stop_check and stop_check():
+                return False
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(min(wait, 0.5))
+
+
+class BudgetLease:
+    """Доля очереди в общем бюджете: сначала своя доля (честность), затем общий лимит"""
+
+    def __init__(self, queue_key, share: TokenBucket, total: TokenBucket):
+        self.queue_key = queue_key
+        self.share = share
+        self.total = total
+
+    def acquire(self, stop_check: Optional[Callable[[], bool]] = None) -> bool:
+        if not self.share.acquire(stop_check):
+            return False
+        return self.total.acquire(stop_check)
+
+
+class RequestBudget:
+    """
+    Общий бюджет запросов к Авито для параллельных очередей.
+    Каждая активная очередь получает равную долю rate_per_min, сумма долей не
+    превышает общий лимит, поэтому одна "жадная" очередь не вытесняет остальные.
+    """
+
+    def __init__(self, rate_per_min: float = REQUEST_BUDGET_PER_MIN,
+                 burst: float = REQUEST_BUDGET_BURST, ctx=None):
+        self.rate_per_min = float(rate_per_min)
+        self.burst = burst
+        self._ctx = ctx
+        self._total = TokenBucket(rate_per_min, burst, ctx)
+        self._leases: Dict[object, BudgetLease] = {}
+        self._lock = threading.Lock()
+
+    def lease(self, queue_key) -> BudgetLease:
+        with self._lock:
+            lease = self._leases.get(queue_key)
+            if lease is None:
+                share = TokenBucket(self.rate_per_min, max(1.0, self.burst / 2), self._ctx)
+                lease = BudgetLease(queue_key, share, self._total)
+                self._leases[queue_key] = lease
+            self._rebalance()
+            return lease
+
+    def release(self, queue_key):
+        with self._lock:
+            self._leases.pop(queue_key, None)
+            self._rebalance()
+
+    def _rebalance(self):
+        if not self._leases:
+            return
+        share_rate = self.rate_per_min / len(self._leases)
+        for lease in self._leases.values():
+            lease.share.set_rate(share_rate)
+
+    def set_rate(self, rate_per_min: float):
+        with self._lock:
+            self.rate_per_min = float(rate_per_min)
+            self._total.set_rate(rate_per_min)
+            self._rebalance()
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._leases)
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import BASE_APP_DIR, RESULTS_DIR
+from app.core.log_manager import logger
+
+_STARRED_RE = re.compile(r'"starred": true\b')
+_PARSED_AT_RE = re.compile(r'"parsed_at": "([^"]+)"')
+_QUEUE_NAME_RE = re.compile(r"^avito_(.*?)(?:_\d{8}_\d{6})?\.json$")
+
+
+def queue_name_from_path(path: str) -> str:
+    m = _QUEUE_NAME_RE.match(os.path.basename(path))
+    return m.group(1) if m else os.path.basename(path)
+
+
+def row_marks(raw: str) -> Tuple[Optional[str], bool]:
+    """parsed_at и признак избранного у сериализованного товара — без разбора JSON"""
+    m = _PARSED_AT_RE.search(raw)
+    return (m.group(1) if m else None), bool(_STARRED_RE.search(raw))
+
+
+def summarize_rows(rows: Iterable[str]) -> Tuple[Dict, List[Dict]]:
+    """
+    Сводка по сериализованным товарам (как в зеркале ResultsStore): без полного
+    разбора JSON, разбираются только избранные товары.
+    """
+    starred = []
+    dates = []
+    count = 0
+    for raw in rows:
+        count += 1
+        date, is_starred = row_marks(raw)
+        if date:
+            dates.append(date)
+        if is_starred:
+            item = json.loads(raw)
+            if item.get("starred"):
+                starred.append(item)
+    summary = {
+        "item_count": count,
+        "starred_count": len(starred),
+        "first_date": min(dates) if dates else None,
+        "last_date": max(dates) if dates else None,
+    }
+    return summary, starred
+
+
+class ResultsCatalog:
+    """
+    Каталог файлов результатов (путь, очередь, число товаров и избранных, даты, размер, mtime)
+    и копии избранных товаров. Обновляется писателем ResultsStore и sync() по изменениям папки,
+    поэтому браузер таблиц и трекер не распаковывают файлы.
+    """
+
+    DB_FILENAME = "results_catalog.db"
+
+    def __init__(self, db_path: Optional[str] = None, results_dir: str = RESULTS_DIR):
+        self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self.results_dir = os.path.abspath(results_dir)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ensure_db_exists()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        return self._conn
+
+    def _ensure_db_exists(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._lock, self._get_connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS result_files (
+                    path TEXT PRIMARY KEY,
+                    queue_name TEXT,
+                    item_count INTEGER NOT NULL DEFAULT 0,
+                    starred_count INTEGER NOT NULL DEFAULT 0,
+                    first_date TEXT,
+                    last_date TEXT,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL DEFAULT 0,
+                    indexed_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_result_files_mtime ON result_files(mtime);
+
+                CREATE TABLE IF NOT EXISTS starred_items (
+                    path TEXT NOT NULL,
+                    ad_id TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    PRIMARY KEY (path, ad_id)
+                );
+            """)
+
+    def covers(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == self.results_dir
+
+    # --- Запись ---
+
+    def record(self, path: str, summary: Dict, starred: List[Dict]):
+        """Сводка по файлу после записи на диск"""
+        if not self.covers(path):
+            return
+        from app.core.results_store import results_file_stat
+
+        path = os.path.abspath(path)
+        mtime, size = results_file_stat(path)
+        with self._lock, self._get_connection() as conn:
+            conn.execute("""
+                INSERT INTO result_files
+                    (path, queue_name, item_count, starred_count, first_date, last_date, size, mtime, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    queue_name = excluded.queue_name, item_count = excluded.item_count,
+                    starred_count = excluded.starred_count, first_date = excluded.first_date,
+                    last_date = excluded.last_date, size = excluded.size, mtime = excluded.mtime,
+                    indexed_at = excluded.indexed_at
+            """, (path, queue_name_from_path(path), summary["item_count"], summary["starred_count"],
+                  summary["first_date"], summary["last_date"], size, mtime, time.time()))
+            conn.execute("DELETE FROM starred_items WHERE path = ?", (path,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO starred_items (path, ad_id, item) VALUES (?, ?, ?)",
+                [(path, str(i.get("id", "")), json.dumps(i, ensure_ascii=False)) for i in starred]
+            )
+
+    def remove(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock, self._get_connection() as conn:
+            conn.execute("DELETE FROM result_files WHERE path = ?", (path,))
+            conn.execute("DELETE FROM starred_items WHERE path = ?", (path,))
+
+    def rename(self, old_path: str, new_path: str):
+        old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+        with self._lock, self._get_connection() as conn:
+            conn.execute("DELETE FROM result_files WHERE path = ?", (new_path,))
+            conn.execute("DELETE FROM starred_items WHERE path = ?", (new_path,))
+            conn.execute("UPDATE result_files SET path = ?, queue_name = ? WHERE path = ?",
+                         (new_path, queue_name_from_path(new_path), old_path))
+            conn.execute("UPDATE starred_items SET path = ? WHERE path = ?", (new_path, old_path))
+
+    def sync(self) -> int:
+        """
+        Сверка с папкой: новые/измененные извне файлы переиндексируются, удаленные убираются.
+        Возвращает число переиндексированных файлов.
+        """
+        from app.core.results_store import load_results, results_file_stat
+
+        on_disk = {}
+        if os.path.isdir(self.results_dir):
+            for name in os.listdir(self.results_dir):
+                if name.startswith("avito_") and name.endswith(".json"):
+                    path = os.path.join(self.results_dir, name)
+                    on_disk[path] = results_file_stat(path)
+
+        with self._lock:
+            known = {
+                r["path"]: (r["mtime"], r["size"])
+                for r in self._get_connection().execute("SELECT path, mtime, size FROM result_files")
+            }
+        for path in set(known) - set(on_disk):
+            self.remove(path)
+
+        reindexed = 0
+        for path, stat in on_disk.items():
+            if known.get(path) == stat:
+                continue
+            try:
+                items = load_results(path)
+            except Exception as e:
+                logger.dev(f"Catalog: cannot read {os.path.basename(path)}: {e}", level="WARNING")
+                continue
+            rows = [json.dumps(i, ensure_ascii=False) for i in items]
+            self.record(path, *summarize_rows(rows))
+            reindexed += 1
+        return reindexed
+
+    # --- Чтение ---
+
+    def list_files(self) -> List[Dict]:
+        """Файлы по убыванию mtime"""
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT * FROM result_files ORDER BY mtime DESC"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_file(self, path: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._get_connection().execute(
+                "SELECT * FROM result_files WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_starred_items(self) -> List[Dict]:
+        """Избранное по всем файлам; у каждого товара _source_file"""
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT path, item FROM starred_items ORDER BY path, ad_id"
+            ).fetchall()
+        items = []
+        for r in rows:
+            item = json.loads(r["item"])
+            item["_source_file"] = r["path"]
+            items.append(item)
+        return items
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_catalog: Optional[ResultsCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_results_catalog() -> ResultsCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ResultsCatalog()
+        return _catalog
+
+
+def is_catalogued(path: str) -> bool:
+    """Файл лежит в RESULTS_DIR (без открытия БД каталога)"""
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(RESULTS_DIR)
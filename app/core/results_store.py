@@ -0,0 +1,622 @@
+import os
+import gzip
+import json
+import time
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import (
+    RESULTS_DIR, RESULTS_LOG_COMPACT_RATIO, RESULTS_LOG_COMPACT_MIN_BYTES, RESULTS_WRITE_DEBOUNCE_SEC,
+    RESULTS_LOAD_CHUNK, RESULTS_LOAD_READ_SIZE,
+)
+from app.core.log_manager import logger
+from app.core.results_catalog import is_catalogued, row_marks
+
+
+def _item_key(item: Dict) -> Optional[str]:
+    iid = item.get("id")
+    return str(iid) if iid not in (None, "") else None
+
+
+def _dumps(obj) -> str:
+    # default=dict: компактные товары (CompactItem) сериализуются как обычные словари
+    return json.dumps(obj, ensure_ascii=False, default=dict)
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+_SKIP_CHARS = " \t\r\n,"
+
+
+def sniff_format(path: str) -> str:
+    """'gzip' по сигнатуре 1f 8b, иначе 'json' — без попытки разобрать файл дважды"""
+    with open(path, "rb") as f:
+        return "gzip" if f.read(2) == GZIP_MAGIC else "json"
+
+
+def open_results_text(path: str):
+    if sniff_format(path) == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_json_array(fp, read_size: int = RESULTS_LOAD_READ_SIZE) -> Iterator[Dict]:
+    """
+    Инкрементальный разбор JSON-массива из текстового потока: в памяти только
+    текущий кусок текста, элементы отдаются по одному.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in _SKIP_CHARS:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = fp.read(read_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+        if pos >= len(buf):
+            return
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Файл результатов не является JSON-массивом")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+        if end is None or (end >= len(buf) and not eof):
+            # Элемент не поместился в буфер: дочитываем
+            if eof:
+                raise ValueError("Оборванный JSON в файле результатов")
+            chunk = fp.read(read_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        pos = end
+        yield item
+
+
+def _log_paths(path: str) -> List[str]:
+    active = path + ".log"
+    return [active] if os.path.exists(active) else []
+
+
+def _iter_log_ops(path: str) -> Iterator[Dict]:
+    for log_path in _log_paths(path):
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Оборванная последняя строка после падения
+                    logger.dev(f"Results log: skip broken line in {os.path.basename(log_path)}", level="WARNING")
+
+
+def _read_log_overrides(path: str):
+    """
+    Журнал сворачивается в поправки к снапшоту:
+    overrides — товары, записанные в журнале целиком (None — удален), в порядке появления;
+    patches — поля для товаров снапшота; moved — удаленные и заново добавленные (уходят в конец).
+    """
+    overrides: Dict[str, Optional[Dict]] = {}
+    patches: Dict[str, Dict] = {}
+    moved = set()
+    anonymous = 0
+    for op in _iter_log_ops(path):
+        kind = op.get("op")
+        if kind == "put":
+            item = op.get("item") or {}
+            key = _item_key(item)
+            if key is None:
+                anonymous += 1
+                key = f"#log{anonymous}"
+            if overrides.get(key, 0) is None:
+                moved.add(key)
+                del overrides[key]
+            overrides[key] = item
+            patches.pop(key, None)
+        elif kind == "patch":
+            key = str(op.get("id"))
+            if key in overrides:
+                if overrides[key] is not None:
+                    overrides[key].update(op.get("set") or {})
+            else:
+                patches.setdefault(key, {}).update(op.get("set") or {})
+        elif kind == "del":
+            key = str(op.get("id"))
+            overrides.pop(key, None)
+            overrides[key] = None
+            patches.pop(key, None)
+    return overrides, patches, moved
+
+
+def _iter_file_chunks(path: str, chunk_size: int) -> Iterator[List[Dict]]:
+    """Снапшот + журнал с диска, порциями по chunk_size товаров"""
+    if not os.path.exists(path):
+        return
+    overrides, patches, moved = _read_log_overrides(path)
+    chunk: List[Dict] = []
+    with open_results_text(path) as fp:
+        for item in iter_json_array(fp):
+            if not isinstance(item, dict):
+                continue
+            key = _item_key(item)
+            if key is not None:
+                if key in moved:
+                    continue
+                if key in overrides:
+                    item = overrides.pop(key)
+                    if item is None:
+                        continue
+                elif key in patches:
+                    item.update(patches[key])
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    for item in overrides.values():
+        if item is None:
+            continue
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ResultsWriter:
+    """
+    Фоновый поток записи файлов результатов. Запросы на запись одного файла,
+    пришедшие в пределах debounce-окна, сливаются в одну запись.
+    """
+
+    def __init__(self, debounce_sec: float = RESULTS_WRITE_DEBOUNCE_SEC):
+        self.debounce_sec = debounce_sec
+        self._cond = threading.Condition()
+        self._dirty: Dict["ResultsStore", float] = {}
+        self._busy: set = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, store: "ResultsStore", immediate: bool = False):
+        with self._cond:
+            due = 0.0 if immediate else time.time() + self.debounce_sec
+            self._dirty[store] = min(self._dirty.get(store, due), due)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="results-writer")
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, store: Optional["ResultsStore"] = None, timeout: Optional[float] = None) -> bool:
+        """Записать немедленно (один файл или все) и дождаться окончания записи"""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            targets = [store] if store is not None else list(self._dirty) + list(self._busy)
+            for s in targets:
+                if s in self._dirty:
+                    self._dirty[s] = 0.0
+            self._cond.notify_all()
+            while any(s in self._dirty or s in self._busy for s in targets):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    due = [s for s, t in self._dirty.items() if t <= now]
+                    if due:
+                        break
+                    wait = min(self._dirty.values()) - now if self._dirty else None
+                    self._cond.wait(wait)
+                for s in due:
+                    del self._dirty[s]
+                self._busy.update(due)
+            for s in due:
+                try:
+                    s._write_pending()
+                except Exception as e:
+                    logger.dev(f"Results write error ({os.path.basename(s.path)}): {e}", level="ERROR")
+            with self._cond:
+                self._busy.difference_update(due)
+                self._cond.notify_all()
+
+
+_writer: Optional[ResultsWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_results_writer() -> ResultsWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResultsWriter()
+        return _writer
+
+
+class ResultsStore:
+    """
+    Файл результатов = снапшот (gzip JSON-список, прежний формат) + журнал <файл>.log.
+    Изменения применяются к зеркалу в памяти сразу, а на диск уходят через ResultsWriter:
+    дописываются в журнал или, когда журнал разросся, сворачиваются в новый снапшот.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = RESULTS_LOG_COMPACT_RATIO,
+                 compact_min_bytes: int = RESULTS_LOG_COMPACT_MIN_BYTES,
+                 writer: Optional[ResultsWriter] = None):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.writer = writer or get_results_writer()
+        self.writes = 0
+        self._lock = threading.RLock()
+        # Зеркало состояния: ключ -> сериализованный товар (строки неизменяемы, их можно отдать писателю)
+        self._rows: Optional[Dict[str, str]] = None
+        self._counter = [0]
+        self._pending: List[str] = []
+        self._needs_snapshot = False
+        self._log = None
+        self._log_bytes = 0
+        self._snapshot_bytes = 0
+        # Растет при полной замене зеркала: запись, начатая до нее, не трогает учет размеров
+        self._generation = 0
+        # Сводка для каталога ведется по изменениям, а не пересчетом всех строк при записи
+        self._catalogued = is_catalogued(path)
+        self._starred: Dict[str, str] = {}
+        self._dates: Dict[str, str] = {}
+        self._date_bounds: Optional[Tuple[Optional[str], Optional[str]]] = (None, None)
+
+    # --- Состояние ---
+
+    def _ensure_loaded(self):
+        if self._rows is not None:
+            return
+        self._rows = {}
+        self._counter = [0]
+        self._reset_marks()
+        for chunk in _iter_file_chunks(self.path, RESULTS_LOAD_CHUNK):
+            for item in chunk:
+                key = _item_key(item)
+                if key is None:
+                    self._counter[0] += 1
+                    key = f"#{self._counter[0]}"
+                self._set_row(key, _dumps(item))
+        self._snapshot_bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self._log_bytes = sum(os.path.getsize(p) for p in _log_paths(self.path))
+        self._touch()
+
+    def _touch(self):
+        # Пустой снапшот сразу, чтобы файл был виден в списке таблиц до первой записи
+        if not os.path.exists(self.path):
+            self._snapshot_bytes = self._write_snapshot([])
+            self._record_catalog(self._catalog_summary())
+
+    def _set_row(self, key: str, raw: Optional[str]) -> bool:
+        """Запись строки зеркала (raw=None — удаление) с учетом в сводке каталога"""
+        existed = (self._rows.pop(key, None) if raw is None else self._rows.get(key)) is not None
+        if raw is not None:
+            self._rows[key] = raw
+        if self._catalogued:
+            old_date = self._dates.pop(key, None)
+            self._starred.pop(key, None)
+            if old_date is not None and self._date_bounds is not None and old_date in self._date_bounds:
+                # Ушла крайняя дата — границы пересчитаются при следующей записи
+                self._date_bounds = None
+            if raw is not None:
+                date, starred = row_marks(raw)
+                if date:
+                    self._dates[key] = date
+                    if self._date_bounds is not None:
+                        lo, hi = self._date_bounds
+                        self._date_bounds = (date if lo is None else min(lo, date),
+                                             date if hi is None else max(hi, date))
+                if starred:
+                    self._starred[key] = raw
+        return existed
+
+    def _reset_marks(self):
+        self._starred = {}
+        self._dates = {}
+        self._date_bounds = (None, None)
+
+    def items(self) -> List[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            return [json.loads(v) for v in self._rows.values()]
+
+    def iter_chunks(self, chunk_size: int = RESULTS_LOAD_CHUNK) -> Iterator[List[Dict]]:
+        with self._lock:
+            self._ensure_loaded()
+            rows = list(self._rows.values())
+        for i in range(0, len(rows), chunk_size):
+            yield [json.loads(v) for v in rows[i:i + chunk_size]]
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._rows)
+
+    def __contains__(self, item_id) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return str(item_id) in self._rows
+
+    # --- Изменения ---
+
+    def put_many(self, items: Iterable[Dict]) -> int:
+        """Новые или целиком замененные товары"""
+        with self._lock:
+            self._ensure_loaded()
+            ops = []
+            for item in items:
+                key = _item_key(item)
+                if key is None:
+                    self._counter[0] += 1
+                    key = f"#{self._counter[0]}"
+                raw = _dumps(item)
+                self._set_row(key, raw)
+                ops.append('{"op": "put", "item": ' + raw + '}')
+            self._enqueue(ops)
+            return len(ops)
+
+    def patch(self, item_id, fields: Dict) -> bool:
+        """Обновление отдельных полей (ai_comment, starred, price...)"""
+        key = str(item_id)
+        with self._lock:
+            self._ensure_loaded()
+            raw = self._rows.get(key)
+            if raw is None:
+                return False
+            row = json.loads(raw)
+            row.update(fields)
+            self._set_row(key, _dumps(row))
+            self._enqueue([_dumps({"op": "patch", "id": key, "set": fields})])
+            return True
+
+    def delete(self, item_ids: Iterable) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            ops = []
+            for iid in item_ids:
+                if self._set_row(str(iid), None):
+                    ops.append(_dumps({"op": "del", "id": str(iid)}))
+            self._enqueue(ops)
+            return len(ops)
+
+    def rewrite(self, items: List[Dict]):
+        """Полная перезапись (слияние таблиц и т.п.): новый снапшот, журнал обнуляется"""
+        with self._lock:
+            self._rows = {}
+            self._counter = [0]
+            self._generation += 1
+            self._reset_marks()
+            for item in items:
+                key = _item_key(item)
+                if key is None:
+                    self._counter[0] += 1
+                    key = f"#{self._counter[0]}"
+                self._set_row(key, _dumps(item))
+            self._touch()
+            self._pending = []
+            self._needs_snapshot = True
+        self.writer.schedule(self)
+
+    def compact(self, wait: bool = True):
+        """Свернуть журнал в снапшот"""
+        with self._lock:
+            self._ensure_loaded()
+            self._needs_snapshot = True
+        self.writer.schedule(self, immediate=True)
+        if wait:
+            self.flush()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.writer.flush(self, timeout)
+
+    def _enqueue(self, ops: List[str]):
+        if not ops:
+            return
+        self._pending.extend(ops)
+        self.writer.schedule(self)
+
+    # --- Запись (поток ResultsWriter) ---
+
+    def _write_pending(self):
+        with self._lock:
+            ops, self._pending = self._pending, []
+            data = "".join(op + "\n" for op in ops)
+            size = len(data.encode("utf-8"))
+            threshold = max(self.compact_min_bytes, self._snapshot_bytes * self.compact_ratio)
+            snapshot = self._needs_snapshot or self._log_bytes + size >= threshold
+            self._needs_snapshot = False
+            if not snapshot and not data:
+                return
+            # Под блокировкой — только список строк (сами строки неизменяемы), запись файла вне ее
+            rows = list(self._rows.values()) if snapshot else None
+            generation = self._generation
+            summary = self._catalog_summary()
+        if snapshot:
+            # Снапшот содержит все изменения из журнала и из ops. Изменения, пришедшие
+            # во время записи, ждут в _pending и попадут уже в новый журнал
+            self._close_log()
+            snapshot_bytes = self._write_snapshot(rows)
+            for p in _log_paths(self.path):
+                os.remove(p)
+            with self._lock:
+                if self._generation == generation:
+                    self._snapshot_bytes = snapshot_bytes
+                    self._log_bytes = 0
+        else:
+            if self._log is None:
+                self._log = open(self.path + ".log", "a", encoding="utf-8")
+            self._log.write(data)
+            self._log.flush()
+            with self._lock:
+                self._log_bytes += size
+        self.writes += 1
+        self._record_catalog(summary)
+
+    def _catalog_summary(self) -> Optional[Tuple[Dict, List[Dict]]]:
+        """Сводка для каталога (под self._lock); None — файл вне RESULTS_DIR"""
+        if not self._catalogued:
+            return None
+        if self._date_bounds is None:
+            dates = self._dates.values()
+            self._date_bounds = (min(dates), max(dates)) if dates else (None, None)
+        starred = [item for item in map(json.loads, self._starred.values()) if item.get("starred")]
+        summary = {
+            "item_count": len(self._rows),
+            "starred_count": len(starred),
+            "first_date": self._date_bounds[0],
+            "last_date": self._date_bounds[1],
+        }
+        return summary, starred
+
+    def _record_catalog(self, summary: Optional[Tuple[Dict, List[Dict]]]):
+        from app.core.results_catalog import get_results_catalog
+
+        if summary is None:
+            return
+        try:
+            get_results_catalog().record(self.path, *summary)
+        except Exception as e:
+            logger.dev(f"Results catalog update error: {e}", level="ERROR")
+
+    def _write_snapshot(self, rows: Iterable[str]) -> int:
+        """Пишет снапшот через временный файл и возвращает его размер"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            # Построчно: без склейки всего файла в одну строку
+            sep = "[\n"
+            for row in rows:
+                f.write(sep)
+                f.write(row)
+                sep = ",\n"
+            f.write("[\n]" if sep == "[\n" else "\n]")
+        os.replace(tmp, self.path)
+        return os.path.getsize(self.path)
+
+    def _close_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def close(self):
+        self.flush()
+        self._close_log()
+
+
+_stores: Dict[str, ResultsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_results_store(path: str) -> ResultsStore:
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ResultsStore(path)
+            _stores[key] = store
+        return store
+
+
+def _drop_store(path: str):
+    with _stores_lock:
+        store = _stores.pop(os.path.abspath(path), None)
+    if store is not None:
+        store.close()
+
+
+def iter_results(path: str, chunk_size: int = RESULTS_LOAD_CHUNK) -> Iterator[List[Dict]]:
+    """
+    Товары файла результатов порциями (снапшот + журнал). Первая порция готова
+    сразу после разбора первых chunk_size товаров; открытый в этом процессе файл — из памяти.
+    """
+    if not path:
+        return iter(())
+    with _stores_lock:
+        store = _stores.get(os.path.abspath(path))
+    if store is not None:
+        return store.iter_chunks(chunk_size)
+    return _iter_file_chunks(path, chunk_size)
+
+
+def load_results(path: str) -> List[Dict]:
+    """Чтение файла результатов целиком"""
+    items: List[Dict] = []
+    for chunk in iter_results(path):
+        items.extend(chunk)
+    return items
+
+
+def sanitize_filename(name: str) -> str:
+    return "".join(c if c.isalnum() or c in (' ', '-', '_', '.') else '_' for c in name).strip()
+
+
+def new_results_path(queue_name: str = "", results_dir: str = RESULTS_DIR) -> str:
+    """Путь нового файла результатов: avito_<очередь>_<время>.json"""
+    name = sanitize_filename(queue_name) if queue_name else "search"
+    return os.path.join(results_dir, f"avito_{name}_{time.strftime('%d%m%Y_%H%M%S')}.json")
+
+
+def save_results_file(path: str, items: List[Dict]):
+    get_results_store(path).rewrite(items)
+
+
+def close_results_file(path: str):
+    """Дописать файл на диск и выгрузить его из памяти (headless-запуски)"""
+    _drop_store(path)
+
+
+def results_file_stat(path: str) -> Tuple[float, int]:
+    """(mtime, размер) с учетом журнала"""
+    paths = [path] + _log_paths(path)
+    existing = [p for p in paths if os.path.exists(p)]
+    if not existing:
+        return 0.0, 0
+    return max(os.path.getmtime(p) for p in existing), sum(os.path.getsize(p) for p in existing)
+
+
+def delete_results_file(path: str):
+    from app.core.results_catalog import get_results_catalog
+
+    _drop_store(path)
+    for p in [path] + _log_paths(path):
+        if os.path.exists(p):
+            os.remove(p)
+    if is_catalogued(path):
+        get_results_catalog().remove(path)
+
+
+def rename_results_file(old_path: str, new_path: str):
+    from app.core.results_catalog import get_results_catalog
+
+    _drop_store(old_path)
+    logs = _log_paths(old_path)
+    os.rename(old_path, new_path)
+    for p in logs:
+        os.rename(p, new_path + p[len(old_path):])
+    if is_catalogued(old_path):
+        get_results_catalog().rename(old_path, new_path)
+
+
+def close_results_stores():
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
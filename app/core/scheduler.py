@@ -0,0 +1,471 @@
+import os
+import re
+import json
+import random
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.config import (
+    BASE_APP_DIR, SCHEDULER_TICK_SEC, SCHEDULER_MAX_CONCURRENT, SCHEDULER_JITTER_SEC,
+    SCHEDULER_MISSED_POLICY, SCHEDULER_WATERMARK_SIZE, INCREMENTAL_STOP_AFTER_KNOWN,
+)
+from app.core.log_manager import logger
+
+
+def _parse_cron_field(value: str, lo: int, hi: int) -> Set[int]:
+    result: Set[int] = set()
+    for part in value.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step <= 0:
+                raise ValueError(f"Неверный шаг: {value}")
+        if part in ("*", ""):
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(part)
+            end = hi if step > 1 else start
+        if start < lo or end > hi or start > end:
+            raise ValueError(f"Значение вне диапазона {lo}-{hi}: {value}")
+        result.update(range(start, end + 1, step))
+    return result
+
+
+class CronSchedule:
+    """
+    Расписание в стиле cron: "*/20 * * * *", "0 9-18 * * 1-5", "@hourly", "@daily"
+    или интервал "every 20m" / "@every 2h".
+    """
+
+    ALIASES = {
+        "@hourly": "0 * * * *",
+        "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0",
+    }
+    UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def __init__(self, expr: str):
+        self.expr = (expr or "").strip()
+        self.interval: Optional[timedelta] = None
+
+        m = re.fullmatch(r"@?every\s+(\d+)\s*([smhd])", self.expr, re.IGNORECASE)
+        if m:
+            seconds = int(m.group(1)) * self.UNITS[m.group(2).lower()]
+            if seconds <= 0:
+                raise ValueError(f"Пустой интервал: {expr}")
+            self.interval = timedelta(seconds=seconds)
+            return
+
+        fields = self.ALIASES.get(self.expr.lower(), self.expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"Ожидается 5 полей cron: {expr}")
+
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_cron_field(fields[4], 0, 7)}
+        self._dom_any = fields[2] == "*"
+        self._dow_any = fields[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = ((dt.weekday() + 1) % 7) in self.weekdays  # в cron 0 = воскресенье
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, dt: datetime) -> datetime:
+        if self.interval is not None:
+            return dt + self.interval
+
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t
+        raise ValueError(f"Расписание никогда не срабатывает: {self.expr}")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expr!r})"
+
+
+class SchedulerStore:
+    """SQLite: водяные знаки очередей, время следующего запуска и статистика прогонов"""
+
+    DB_FILENAME = "scheduler.db"
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ensure_db_exists()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        return self._conn
+
+    def _ensure_db_exists(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._lock, self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queue_watermarks (
+                    queue_key TEXT PRIMARY KEY,
+                    ids TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schedule_state (
+                    queue_key TEXT PRIMARY KEY,
+                    last_run_at TEXT,
+                    next_run_at TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queue_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue_key TEXT NOT NULL,
+                    scheduled_at TEXT,
+                    started_at TEXT NOT NULL,
+                    finished_at TEXT,
+                    duration REAL,
+                    requests INTEGER DEFAULT 0,
+                    new_items INTEGER DEFAULT 0,
+                    total_items INTEGER DEFAULT 0,
+                    incremental INTEGER DEFAULT 0,
+                    status TEXT,
+                    error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_queue ON queue_runs(queue_key, started_at)")
+
+    def get_watermark(self, queue_key: str) -> List[str]:
+        with self._lock:
+            row = self._get_connection().execute(
+                "SELECT ids FROM queue_watermarks WHERE queue_key = ?", (queue_key,)
+            ).fetchone()
+        return json.loads(row["ids"]) if row else []
+
+    def update_watermark(self, queue_key: str, newest_ids: List[str], size: int = SCHEDULER_WATERMARK_SIZE) -> List[str]:
+        """Новые ID встают в начало, старые сдвигаются; храним только size самых свежих"""
+        merged: List[str] = []
+        seen = set()
+        for ad_id in list(newest_ids) + self.get_watermark(queue_key):
+            key = str(ad_id)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(key)
+        merged = merged[:size]
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._get_connection() as conn:
+            conn.execute("""
+                INSERT INTO queue_watermarks (queue_key, ids, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(queue_key) DO UPDATE SET ids = excluded.ids, updated_at = excluded.updated_at
+            """, (queue_key, json.dumps(merged), now))
+        return merged
+
+    def get_state(self, queue_key: str) -> Optional[Dict[str, Optional[datetime]]]:
+        with self._lock:
+            row = self._get_connection().execute(
+                "SELECT last_run_at, next_run_at FROM schedule_state WHERE queue_key = ?", (queue_key,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "last_run_at": datetime.fromisoformat(row["last_run_at"]) if row["last_run_at"] else None,
+            "next_run_at": datetime.fromisoformat(row["next_run_at"]) if row["next_run_at"] else None,
+        }
+
+    def set_state(self, queue_key: str, last_run_at: Optional[datetime] = None, next_run_at: Optional[datetime] = None):
+        with self._lock, self._get_connection() as conn:
+            conn.execute("""
+                INSERT INTO schedule_state (queue_key, last_run_at, next_run_at) VALUES (?, ?, ?)
+                ON CONFLICT(queue_key) DO UPDATE SET
+                    last_run_at = COALESCE(excluded.last_run_at, schedule_state.last_run_at),
+                    next_run_at = COALESCE(excluded.next_run_at, schedule_state.next_run_at)
+            """, (
+                queue_key,
+                last_run_at.isoformat(timespec="seconds") if last_run_at else None,
+                next_run_at.isoformat(timespec="seconds") if next_run_at else None,
+            ))
+
+    def record_run(self, queue_key: str, **stats) -> int:
+        columns = ["scheduled_at", "started_at", "finished_at", "duration", "requests",
+                   "new_items", "total_items", "incremental", "status", "error"]
+        values = []
+        for col in columns:
+            value = stats.get(col)
+            if isinstance(value, datetime):
+                value = value.isoformat(timespec="seconds")
+            elif isinstance(value, bool):
+                value = int(value)
+            values.append(value)
+        with self._lock, self._get_connection() as conn:
+            cur = conn.execute(
+                f"INSERT INTO queue_runs (queue_key, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+                [queue_key] + values
+            )
+            return cur.lastrowid
+
+    def get_runs(self, queue_key: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM queue_runs"
+        params: list = []
+        if queue_key:
+            sql += " WHERE queue_key = ?"
+            params.append(queue_key)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(r) for r in self._get_connection().execute(sql, params).fetchall()]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+@dataclass
+class ScheduleEntry:
+    queue_key: str
+    config: Dict[str, Any]
+    schedule: CronSchedule
+    next_run_at: Optional[datetime] = None
+
+
+class QueueScheduler:
+    """
+    Периодический запуск сохраненных очередей (ключ "schedule" в состоянии очереди).
+    Работает только в headless-режиме (python -m app.cli schedule): GUI планировщик
+    не запускает, "schedule" и "incremental" задаются в queues_state.json.
+
+    run_queue(config, extra_kwargs) выполняет одну очередь и возвращает словарь
+    {"requests", "ids", "listed_ids", "error"}: ids — принятые товары, listed_ids — все
+    просмотренные в выдаче объявления (из них строится водяной знак); extra_kwargs уходят
+    в AvitoParser.search_items (инкрементальный режим: сортировка по дате + остановка на водяном знаке).
+
+    Водяной знак работает только при выдаче по дате: очередь с сортировкой "default"
+    в инкрементальном прогоне идет по дате, а с явной сортировкой (цена, скидка) — всегда полностью.
+    """
+
+    # Сортировки, при которых инкрементальный прогон может идти по дате
+    INCREMENTAL_SORTS = ("date", "default")
+
+    def __init__(self, run_queue: Callable[[Dict, Dict], Dict],
+                 store: Optional[SchedulerStore] = None,
+                 max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+                 jitter_sec: float = SCHEDULER_JITTER_SEC,
+                 missed_policy: str = SCHEDULER_MISSED_POLICY,
+                 tick_sec: float = SCHEDULER_TICK_SEC):
+        self.run_queue = run_queue
+        self.store = store or SchedulerStore()
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.jitter_sec = max(0.0, float(jitter_sec))
+        self.missed_policy = missed_policy
+        self.tick_sec = tick_sec
+
+        self.entries: Dict[str, ScheduleEntry] = {}
+        # Идущие прогоны по ключу очереди: переживают повторную регистрацию очередей (set_queues)
+        self._running: Dict[str, threading.Thread] = {}
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._loop_thread: Optional[threading.Thread] = None
+
+    # --- Очереди ---
+
+    def set_queues(self, configs: List[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """Регистрирует очереди с непустым "schedule". Возвращает число запланированных"""
+        now = now or datetime.now()
+        entries: Dict[str, ScheduleEntry] = {}
+        for cfg in configs:
+            expr = (cfg.get("schedule") or "").strip()
+            if not expr:
+                continue
+            key = cfg.get("queue_name") or cfg.get("name") or f"queue_{cfg.get('original_index', 0) + 1}"
+            try:
+                schedule = CronSchedule(expr)
+            except ValueError as e:
+                logger.warning(f"Очередь '{key}': неверное расписание ({e})...")
+                continue
+            entry = ScheduleEntry(queue_key=key, config=cfg, schedule=schedule)
+            if cfg.get("incremental", True) and cfg.get("sort_type", "default") not in self.INCREMENTAL_SORTS:
+                logger.info(f"Очередь '{key}': сортировка не по дате, инкрементальный режим выключен...")
+            entry.next_run_at = self._initial_next_run(entry, now)
+            entries[key] = entry
+            logger.info(f"Очередь '{key}': {expr}, следующий запуск {entry.next_run_at:%d.%m %H:%M:%S}")
+
+        with self._lock:
+            self.entries = entries
+        return len(entries)
+
+    def _next_run(self, entry: ScheduleEntry, after: datetime) -> datetime:
+        jitter = random.uniform(0, self.jitter_sec) if self.jitter_sec else 0.0
+        return entry.schedule.next_after(after) + timedelta(seconds=jitter)
+
+    def _initial_next_run(self, entry: ScheduleEntry, now: datetime) -> datetime:
+        state = self.store.get_state(entry.queue_key)
+        if not state:
+            return self._next_run(entry, now)
+
+        planned = state["next_run_at"]
+        if planned is None and state["last_run_at"]:
+            planned = entry.schedule.next_after(state["last_run_at"])
+        if planned is None:
+            return self._next_run(entry, now)
+        if planned > now:
+            return planned
+
+        # Пропущенные запуски (приложение было выключено) схлопываются в один
+        if self.missed_policy == "run_once":
+            logger.info(f"Очередь '{entry.queue_key}': пропущен запуск {planned:%d.%m %H:%M}, догоняем...")
+            return now
+        logger.info(f"Очередь '{entry.queue_key}': пропущен запуск {planned:%d.%m %H:%M}, ждем следующий...")
+        return self._next_run(entry, now)
+
+    # --- Цикл ---
+
+    def tick(self, now: Optional[datetime] = None) -> List[str]:
+        """Запускает очереди, у которых подошло время. Возвращает ключи запущенных"""
+        now = now or datetime.now()
+        started = []
+        with self._lock:
+            due = sorted(
+                (e for e in self.entries.values()
+                 if e.queue_key not in self._running and e.next_run_at and e.next_run_at <= now),
+                key=lambda e: e.next_run_at
+            )
+            for entry in due:
+                # Нет свободного слота — очередь ждет следующего тика, запуск не теряется и не дублируется
+                if not self._slots.acquire(blocking=False):
+                    break
+                scheduled_at = entry.next_run_at
+                thread = threading.Thread(
+                    target=self._run_entry, args=(entry, scheduled_at), daemon=True,
+                    name=f"sched-{entry.queue_key}"
+                )
+                self._running[entry.queue_key] = thread
+                thread.start()
+                started.append(entry.queue_key)
+        return started
+
+    def _incremental_kwargs(self, entry: ScheduleEntry) -> Dict[str, Any]:
+        if not entry.config.get("incremental", True):
+            return {}
+        if entry.config.get("sort_type", "default") not in self.INCREMENTAL_SORTS:
+            return {}
+        watermark = self.store.get_watermark(entry.queue_key)
+        if not watermark:
+            return {}
+        return {
+            "sort_type": "date",
+            "incremental_stop_after": INCREMENTAL_STOP_AFTER_KNOWN,
+            "watermark_ids": set(watermark),
+        }
+
+    def _run_entry(self, entry: ScheduleEntry, scheduled_at: datetime):
+        started_at = datetime.now()
+        extra = self._incremental_kwargs(entry)
+        known = extra.get("watermark_ids", set())
+        result: Dict[str, Any] = {}
+        error = None
+        try:
+            logger.info(f"Планировщик: запуск '{entry.queue_key}'" + (" (инкрементально)" if extra else ""))
+            result = self.run_queue(entry.config, extra) or {}
+            error = result.get("error")
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Планировщик: '{entry.queue_key}' — {e}")
+        finally:
+            finished_at = datetime.now()
+            ids = [str(i) for i in result.get("ids", []) if i]
+            new_items = sum(1 for i in ids if i not in known)
+            listed = [str(i) for i in result.get("listed_ids") or ids if i]
+            try:
+                if listed and not error:
+                    self.store.update_watermark(entry.queue_key, listed)
+                self.store.record_run(
+                    entry.queue_key,
+                    scheduled_at=scheduled_at, started_at=started_at, finished_at=finished_at,
+                    duration=round((finished_at - started_at).total_seconds(), 1),
+                    requests=result.get("requests", 0), new_items=new_items, total_items=len(ids),
+                    incremental=bool(extra), status="error" if error else "ok", error=error,
+                )
+                next_run = self._next_run(entry, finished_at)
+                self.store.set_state(entry.queue_key, last_run_at=started_at, next_run_at=next_run)
+            except Exception as e:
+                next_run = self._next_run(entry, finished_at)
+                logger.dev(f"SchedulerStore error: {e}", level="ERROR")
+
+            with self._lock:
+                # Очередь могли перерегистрировать во время прогона: обновляется текущая запись
+                current = self.entries.get(entry.queue_key, entry)
+                current.next_run_at = next_run
+                self._running.pop(entry.queue_key, None)
+            self._slots.release()
+            logger.info(
+                f"Планировщик: '{entry.queue_key}' готово — новых {new_items}, "
+                f"запросов {result.get('requests', 0)}, следующий запуск {next_run:%d.%m %H:%M:%S}"
+            )
+
+    def start(self):
+        if self._loop_thread and self._loop_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._loop_thread = threading.Thread(target=self._loop, daemon=True, name="queue-scheduler")
+        self._loop_thread.start()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.dev(f"Scheduler tick error: {e}", level="ERROR")
+            self._stop_event.wait(self.tick_sec)
+
+    def stop(self, wait: bool = True, timeout: Optional[float] = None):
+        self._stop_event.set()
+        if self._loop_thread:
+            self._loop_thread.join(timeout=5)
+        if wait:
+            self.join(timeout)
+
+    def join(self, timeout: Optional[float] = None):
+        """Дождаться окончания идущих прогонов"""
+        with self._lock:
+            threads = list(self._running.values())
+        for t in threads:
+            t.join(timeout=timeout)
+
+    def is_queue_running(self, queue_key: str) -> bool:
+        with self._lock:
+            return queue_key in self._running
+
+    def is_running(self) -> bool:
+        return bool(self._loop_thread and self._loop_thread.is_alive())
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Блокирует до stop(); True, если планировщик остановлен"""
+        return self._stop_event.wait(timeout)
@@ -0,0 +1,191 @@
+import os
+import math
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Dict
+
+from app.config import BASE_APP_DIR
+from app.core.log_manager import logger
+
+
+class BloomFilter:
+    """Компактный фильтр Блума: быстрый отрицательный ответ без обращения к БД"""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = max(1000, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        for pos in self._positions(key):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.count > self.capacity
+
+
+class SeenIdIndex:
+    """
+    Постоянный индекс просмотренных объявлений (ad_id -> first_seen/last_seen).
+    SQLite хранит историю между сессиями, фильтр Блума в памяти отвечает
+    на большинство проверок "не видели" без запроса к БД.
+    """
+
+    DB_FILENAME = "seen_ids.db"
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(BASE_APP_DIR, self.DB_FILENAME)
+        self._lock = threading.RLock()
+        self._bloom = BloomFilter()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ensure_db_exists()
+        self._load_bloom()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Одно соединение на индекс: доступ из парсера и GUI сериализуется через _lock"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        return self._conn
+
+    def _ensure_db_exists(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._lock, self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_ids (
+                    ad_id TEXT PRIMARY KEY,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    seen_count INTEGER NOT NULL DEFAULT 1,
+                    queue_name TEXT
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_first ON seen_ids(first_seen)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_last ON seen_ids(last_seen)")
+
+    def _load_bloom(self):
+        with self._lock:
+            conn = self._get_connection()
+            total = conn.execute("SELECT COUNT(*) FROM seen_ids").fetchone()[0]
+            bloom = BloomFilter(capacity=max(100_000, total * 2))
+            for row in conn.execute("SELECT ad_id FROM seen_ids"):
+                bloom.add(row[0])
+            self._bloom = bloom
+        if total:
+            logger.dev(f"SeenIdIndex: загружено {total} ID", level="INFO")
+
+    def __contains__(self, ad_id) -> bool:
+        key = str(ad_id or "").strip()
+        if not key:
+            return False
+        with self._lock:
+            if key not in self._bloom:
+                return False
+            row = self._get_connection().execute(
+                "SELECT 1 FROM seen_ids WHERE ad_id = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._get_connection().execute("SELECT COUNT(*) FROM seen_ids").fetchone()[0]
+
+    def __bool__(self) -> bool:
+        return True
+
+    def mark_seen(self, ad_ids: Iterable, queue_name: Optional[str] = None) -> int:
+        """Добавляет ID в индекс (или обновляет last_seen). Возвращает число обработанных ID"""
+        now = datetime.now().isoformat(timespec="seconds")
+        keys = {str(a).strip() for a in ad_ids if a is not None and str(a).strip()}
+        if not keys:
+            return 0
+
+        rows = [(k, now, now, queue_name) for k in keys]
+        with self._lock:
+            with self._get_connection() as conn:
+                conn.executemany("""
+                    INSERT INTO seen_ids (ad_id, first_seen, last_seen, seen_count, queue_name)
+                    VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT(ad_id) DO UPDATE SET
+                        last_seen = excluded.last_seen,
+                        seen_count = seen_ids.seen_count + 1
+                """, rows)
+            for k in keys:
+                self._bloom.add(k)
+            saturated = self._bloom.is_saturated
+
+        if saturated:
+            self._load_bloom()
+        return len(keys)
+
+    def get_record(self, ad_id) -> Optional[Dict]:
+        with self._lock:
+            row = self._get_connection().execute(
+                "SELECT * FROM seen_ids WHERE ad_id = ?", (str(ad_id),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def ids_first_seen_since(self, since: datetime) -> List[str]:
+        """ID, впервые встреченные начиная с указанного момента"""
+        with self._lock:
+            rows = self._get_connection().execute(
+                "SELECT ad_id FROM seen_ids WHERE first_seen >= ? ORDER BY first_seen",
+                (since.isoformat(timespec="seconds"),)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def new_since_days(self, days: int = 7) -> List[str]:
+        return self.ids_first_seen_since(datetime.now() - timedelta(days=days))
+
+    def filter_new(self, items: List[Dict], since: Optional[datetime] = None) -> List[Dict]:
+        """Оставляет товары, которых не было в индексе до момента since (или вообще)"""
+        if since is None:
+            return [i for i in items if str(i.get("id", "")) not in self]
+        fresh = set(self.ids_first_seen_since(since))
+        return [i for i in items if str(i.get("id", "")) in fresh or str(i.get("id", "")) not in self]
+
+    def clear(self):
+        with self._lock:
+            with self._get_connection() as conn:
+                conn.execute("DELETE FROM seen_ids")
+            self._bloom = BloomFilter()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Глобальный экземпляр
+_seen_index = None
+
+
+def get_seen_index() -> SeenIdIndex:
+    """Получить глобальный индекс просмотренных объявлений"""
+    global _seen_index
+    if _seen_index is None:
+        _seen_index = SeenIdIndex()
+    return _seen_index
@@ -0,0 +1,74 @@
+"""
+Совместимость ядра с headless-режимом.
+
+В GUI это просто QObject/pyqtSignal из PyQt6. При AVITO_HEADLESS=1 (app.cli)
+или без установленного PyQt6 подставляется простая реализация сигналов на
+синхронных колбэках, и ядро (парсер, логгер, llama-сервер) работает без Qt.
+"""
+
+import os
+import threading
+
+HEADLESS = os.environ.get("AVITO_HEADLESS", "") not in ("", "0")
+
+if not HEADLESS:
+    try:
+        from PyQt6.QtCore import QObject, pyqtSignal
+    except ImportError:
+        HEADLESS = True
+
+if HEADLESS:
+
+    class _BoundSignal:
+        __slots__ = ("_slots", "_lock")
+
+        def __init__(self):
+            self._slots = []
+            self._lock = threading.Lock()
+
+        def connect(self, slot, *args):
+            with self._lock:
+                self._slots.append(slot)
+
+        def disconnect(self, slot=None):
+            with self._lock:
+                if slot is None:
+                    self._slots.clear()
+                elif slot in self._slots:
+                    self._slots.remove(slot)
+
+        def emit(self, *args):
+            with self._lock:
+                slots = list(self._slots)
+            for slot in slots:
+                slot(*args)
+
+    class pyqtSignal:  # noqa: N801 — повторяет имя из PyQt6
+        """Дескриптор: у каждого экземпляра свой список подписчиков"""
+
+        def __init__(self, *types, **kwargs):
+            self._name = None
+
+        def __set_name__(self, owner, name):
+            self._name = "_signal_" + name
+
+        def __get__(self, instance, owner):
+            if instance is None:
+                return self
+            bound = instance.__dict__.get(self._name)
+            if bound is None:
+                bound = instance.__dict__.setdefault(self._name, _BoundSignal())
+            return bound
+
+    class QObject:
+        def __init__(self, parent=None, *args, **kwargs):
+            self._parent = parent
+
+        def parent(self):
+            return self._parent
+
+        def deleteLater(self):
+            pass
+
+
+__all__ = ["HEADLESS", "QObject", "pyqtSignal"]
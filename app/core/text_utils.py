@@ -1,5 +1,5 @@
 import re
-from typing import Dict, List
+from typing import Dict, FrozenSet, List
 
 try:
     from sklearn.feature_extraction.text import TfidfVectorizer
@@ -34,6 +34,13 @@ class FeatureExtractor:
         'видеокарта', 'процессор', 'ноутбук', 'телефон', 'смартфон'
     }
 
+    # Основы слов-аксессуаров: "чехол для iphone 12" — не рынок самого iphone 12
+    ACCESSORY_STEMS = (
+        'чехол', 'чехл', 'кабел', 'шнур', 'стекл', 'пленк', 'зарядк', 'зарядн',
+        'адаптер', 'переходник', 'держател', 'подставк', 'кронштейн', 'наклейк', 'бампер',
+        'ремеш', 'шлейф', 'запчаст', 'cable', 'cover'
+    )
+
     @staticmethod
     def generate_product_key(title: str) -> str:
         """
@@ -93,6 +100,13 @@ class FeatureExtractor:
                 
         return features
 
+    @staticmethod
+    def accessory_markers(text: str) -> FrozenSet[str]:
+        """Основы слов-аксессуаров, встречающиеся в тексте"""
+        words = FeatureExtractor.normalize_for_hash(text)
+        return frozenset(stem for stem in FeatureExtractor.ACCESSORY_STEMS
+                         if any(w.startswith(stem) for w in words))
+
     @staticmethod
     def normalize_for_hash(text: str) -> List[str]:
         if not text:
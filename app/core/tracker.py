@@ -1,13 +1,12 @@
 import time
 import os
-import json
-import gzip
 import random
 from PyQt6.QtCore import QThread, pyqtSignal
 
 from app.core.parser import AvitoParser
 from app.core.log_manager import logger
 from app.config import RESULTS_DIR
+from app.core.results_catalog import get_results_catalog
 
 class AdTracker(QThread):
     item_updated = pyqtSignal(dict)  # Сигнал: (item_dict_with_source_path)
@@ -45,43 +44,20 @@ class AdTracker(QThread):
         # logger.info(f"Трекер: обновлен список из текущей таблицы (+{count} шт). Всего: {len(self._starred_items)}")
 
     def scan_global_favorites(self):
-        """Сканирует ВСЕ файлы в папке results и ищет избранное"""
+        """Избранное по ВСЕМ файлам из каталога результатов (без распаковки файлов)"""
         if not os.path.exists(RESULTS_DIR): return
 
         logger.info("Трекер: Глобальное сканирование избранного...")
-        total_found = 0
-        self._starred_items = [] # Полный сброс перед глобальным сканом
 
         try:
-            files = [f for f in os.listdir(RESULTS_DIR) if f.endswith('.json')]
-            for filename in files:
-                path = os.path.join(RESULTS_DIR, filename)
-                try:
-                    data = []
-                    # Пытаемся открыть как JSON
-                    try:
-                        with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
-                    except:
-                        # Пытаемся как GZIP
-                        with gzip.open(path, 'rt', encoding='utf-8') as f: data = json.load(f)
-                    
-                    if not isinstance(data, list): continue
-
-                    file_stars = 0
-                    for item in data:
-                        if item.get('starred', False):
-                            item['_source_file'] = path
-                            self._starred_items.append(item)
-                            file_stars += 1
-                    
-                    if file_stars > 0:
-                        total_found += file_stars
-                        
-                except Exception as e:
-                    pass # Битый файл пропускаем
+            catalog = get_results_catalog()
+            catalog.sync()
+            self._starred_items = catalog.get_starred_items() # Полный сброс перед глобальным сканом
+            total_found = len(self._starred_items)
+            files_count = len({x['_source_file'] for x in self._starred_items})
             
             if total_found > 0:
-                logger.success(f"Трекер: Загружено {total_found} товаров на слежение из {len(files)} файлов.")
+                logger.success(f"Трекер: Загружено {total_found} товаров на слежение из {files_count} файлов.")
             else:
                 logger.info("Трекер: Избранных товаров в архивах не найдено.")
 
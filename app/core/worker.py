@@ -1,10 +1,13 @@
+import threading
 from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 from app.core.parser import AvitoParser
 from app.core.log_manager import logger
+from app.config import STREAM_ACK_TIMEOUT
 
 
 class ParserWorker(QObject):
     finished = pyqtSignal(list)
+    batch_ready = pyqtSignal(list)
     error = pyqtSignal(str)
     progress = pyqtSignal(int)
     requests_count = pyqtSignal(int, int)
@@ -16,7 +19,12 @@ class ParserWorker(QObject):
             filter_defects=False,
             skip_duplicates=False,
             allow_rewrite_duplicates=False,
-            existing_ids=None):
+            existing_ids=None,
+            seen_index=None,
+            skip_seen_history=False,
+            queue_name=None,
+            max_pending_batches=None,
+            request_budget=None):
         super().__init__()
         self.keywords = keywords
         self.ignore_keywords = ignore_keywords
@@ -33,12 +41,21 @@ class ParserWorker(QObject):
         self.skip_duplicates = skip_duplicates
         self.allow_rewrite_duplicates = allow_rewrite_duplicates
         self.existing_ids = existing_ids or set()
+        self.seen_index = seen_index
+        self.skip_seen_history = skip_seen_history
+        self.queue_name = queue_name
+        self.request_budget = request_budget
 
         if self.search_mode == "primary":
             self.max_items_per_page = self.max_total_items
         else:
             self.max_items_per_page = None
 
+        # Back-pressure: не больше max_pending_batches неподтвержденных пачек (ack_batch)
+        self._batch_slots = (
+            threading.BoundedSemaphore(max_pending_batches) if max_pending_batches else None
+        )
+
         self.parser = None
         self._stop_requested = False
         
@@ -46,6 +63,26 @@ class ParserWorker(QObject):
         self._stop_requested = True
         if self.parser:
             self.parser.request_stop()
+
+    def ack_batch(self):
+        """Потребитель обработал пачку из batch_ready"""
+        if self._batch_slots:
+            try:
+                self._batch_slots.release()
+            except ValueError:
+                pass
+
+    def _on_page_items(self, items):
+        if self._batch_slots:
+            waited = 0.0
+            while not self._batch_slots.acquire(timeout=0.5):
+                if self._stop_requested:
+                    return
+                waited += 0.5
+                if waited >= STREAM_ACK_TIMEOUT:
+                    logger.dev("ParserWorker: потребитель не подтверждает пачки, продолжаем без ожидания", level="WARNING")
+                    break
+        self.batch_ready.emit(list(items))
             
     @pyqtSlot()
     def run(self):
@@ -71,6 +108,11 @@ class ParserWorker(QObject):
                     skip_duplicates=self.skip_duplicates,
                     allow_rewrite_duplicates=self.allow_rewrite_duplicates,
                     existing_ids_base=self.existing_ids,
+                    seen_index=self.seen_index,
+                    skip_seen_history=self.skip_seen_history,
+                    queue_name=self.queue_name,
+                    on_page_items=self._on_page_items,
+                    request_budget=self.request_budget,
                 )
         except Exception as e:
             logger.error(f"Ошибка запуска парсера: {e}")
@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
 from PyQt6.QtCore import Qt, QPoint, QRect
 from PyQt6.QtGui import QIcon, QPixmap, QPainter, QColor, QFont
@@ -20,7 +21,7 @@ class ActionsDelegate(QStyledItemDelegate):
         
         # Получаем данные
         item = index.data(Qt.ItemDataRole.UserRole)
-        is_favorite = item.get('is_favorite', False) if isinstance(item, dict) else False
+        is_favorite = item.get('is_favorite', False) if isinstance(item, Mapping) else False
         
         rect = option.rect
         row = index.row()
@@ -13,12 +13,31 @@ from PyQt6.QtWidgets import (
     QToolButton, QMenu, QMessageBox, QTabWidget, QGridLayout,
     QHeaderView, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QThread
 from PyQt6.QtGui import QAction, QIcon
 
 from app.ui.styles import Components, Palette, Spacing, Typography
 from app.core.log_manager import logger
-from app.config import BASE_APP_DIR
+from app.config import BASE_APP_DIR, MEMORY_PAGE_SIZE
+from app.core.memory.jsonl import export_kind
+
+
+class MemoryTransferWorker(QThread):
+    """Экспорт/импорт памяти вне GUI-потока: job(on_progress) выполняется в run()"""
+    progress = pyqtSignal(int, int)
+    finished_ok = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+
+    def run(self):
+        try:
+            result = self.job(lambda done, total: self.progress.emit(done, total or 0))
+            self.finished_ok.emit(result)
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class DatabaseTab(QWidget):
@@ -32,6 +51,10 @@ class DatabaseTab(QWidget):
     def __init__(self, memory_manager, parent=None):
         super().__init__(parent)
         self.memory = memory_manager
+        # Постраничная загрузка сырых данных: фильтр текущего списка и курсор следующей страницы
+        self._raw_filter = {}
+        self._raw_after = None
+        self._transfer_worker = None
         self._init_ui()
         self._load_data()
     
@@ -70,18 +93,18 @@ class DatabaseTab(QWidget):
         toolbar.addAction(refresh_action)
         
         toolbar.addSeparator()
-        export_action = QAction("📤 Экспорт JSON", self)
-        export_action.triggered.connect(self._export_data)
-        toolbar.addAction(export_action)
+        self.export_action = QAction("📤 Экспорт JSON", self)
+        self.export_action.triggered.connect(self._export_data)
+        toolbar.addAction(self.export_action)
         
-        import_action = QAction("📥 Импорт JSON", self)
-        import_action.triggered.connect(self._import_data)
-        toolbar.addAction(import_action)
+        self.import_action = QAction("📥 Импорт JSON", self)
+        self.import_action.triggered.connect(self._import_data)
+        toolbar.addAction(self.import_action)
         
         toolbar.addSeparator()
-        clear_action = QAction("🗑️ Очистить БД", self)
-        clear_action.triggered.connect(self._clear_database)
-        toolbar.addAction(clear_action)
+        self.clear_action = QAction("🗑️ Очистить БД", self)
+        self.clear_action.triggered.connect(self._clear_database)
+        toolbar.addAction(self.clear_action)
         layout.addWidget(toolbar)
         
         # === Splitter ===
@@ -162,6 +185,7 @@ class DatabaseTab(QWidget):
         self.raw_items_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.raw_items_table.setStyleSheet(self._get_table_style())
         self.raw_items_table.itemClicked.connect(self._on_raw_item_clicked)
+        self.raw_items_table.verticalScrollBar().valueChanged.connect(self._on_raw_items_scrolled)
         self.table_tabs.addTab(self.raw_items_table, "📦 Сырые данные")
         
         self.knowledge_table = QTableWidget()
@@ -283,8 +307,7 @@ class DatabaseTab(QWidget):
         products_node.setExpanded(True)
         
         # Load raw items
-        raw_items = self.memory.get_raw_items(limit=1000)
-        self._populate_raw_items_table(raw_items)
+        self._load_raw_items()
         
         # Load knowledge
         knowledge = self.memory.get_knowledge(limit=1000)
@@ -296,9 +319,25 @@ class DatabaseTab(QWidget):
         # Update stats
         self._update_stats()
     
-    def _populate_raw_items_table(self, items: list):
-        """Populate the raw items table."""
-        self.raw_items_table.setRowCount(0)
+    def _load_raw_items(self, **filters):
+        """Первая страница сырых данных (category/product_key); следующие подгружаются при прокрутке."""
+        self._raw_filter = filters
+        self._raw_after = None
+        self._load_raw_page(append=False)
+
+    def _load_raw_page(self, append: bool = True):
+        items = self.memory.get_raw_items(limit=MEMORY_PAGE_SIZE, after=self._raw_after, **self._raw_filter)
+        self._raw_after = self.memory.page_cursor(items) if len(items) == MEMORY_PAGE_SIZE else None
+        self._populate_raw_items_table(items, append=append)
+
+    def _on_raw_items_scrolled(self, value: int):
+        if self._raw_after and value >= self.raw_items_table.verticalScrollBar().maximum():
+            self._load_raw_page()
+
+    def _populate_raw_items_table(self, items: list, append: bool = False):
+        """Populate the raw items table (append=True adds rows of the next page)."""
+        if not append:
+            self.raw_items_table.setRowCount(0)
         
         for item in items:
             row = self.raw_items_table.rowCount()
@@ -403,20 +442,17 @@ class DatabaseTab(QWidget):
         item_type = data.get('type')
         
         if item_type == 'all_items':
-            items = self.memory.get_raw_items(limit=1000)
-            self._populate_raw_items_table(items)
+            self._load_raw_items()
             self.table_tabs.setCurrentIndex(0)
         elif item_type == 'all_knowledge':
             chunks = self.memory.get_knowledge(limit=1000)
             self._populate_knowledge_table(chunks)
             self.table_tabs.setCurrentIndex(1)
         elif item_type == 'category':
-            items = self.memory.get_raw_items(category=data.get('name'), limit=1000)
-            self._populate_raw_items_table(items)
+            self._load_raw_items(category=data.get('name'))
             self.table_tabs.setCurrentIndex(0)
         elif item_type == 'product_key':
-            items = self.memory.get_items_for_product_key(data.get('key'))
-            self._populate_raw_items_table(items)
+            self._load_raw_items(product_key=data.get('key'))
             self.table_tabs.setCurrentIndex(0)
     
     def _on_raw_item_clicked(self, item):
@@ -631,6 +667,7 @@ class DatabaseTab(QWidget):
         if not txt: 
             self._load_data()
             return
+        self._raw_after = None
         self._populate_raw_items_table(self.memory.get_raw_items(search_query=txt, limit=100))
         # Filter knowledge locally
         all_k = self.memory.get_knowledge(limit=1000)
@@ -707,30 +744,71 @@ class DatabaseTab(QWidget):
         """Refresh all data."""
         self._load_data()
     
+    def _start_transfer(self, action: str, job, on_finished):
+        """Экспорт/импорт в фоновом потоке; кнопки БД отключены до его завершения"""
+        worker = MemoryTransferWorker(job, parent=self)
+
+        def on_progress(done, total):
+            suffix = f" из {total}" if total else ""
+            self.stats_label.setText(f"{action}: {done}{suffix} записей...")
+
+        def finish():
+            self._transfer_worker = None
+            self._set_transfer_enabled(True)
+
+        def on_ok(result):
+            finish()
+            on_finished(result)
+
+        def on_failed(error):
+            finish()
+            self._update_stats()
+            logger.error(f"{action} failed: {error}")
+            QMessageBox.critical(self, "Ошибка", f"{action} не удался: {error}")
+
+        worker.progress.connect(on_progress)
+        worker.finished_ok.connect(on_ok)
+        worker.failed.connect(on_failed)
+        self._transfer_worker = worker
+        self._set_transfer_enabled(False)
+        worker.start()
+
+    def _set_transfer_enabled(self, enabled: bool):
+        for action in (self.export_action, self.import_action, self.clear_action):
+            action.setEnabled(enabled)
+
+    def _transfer_running(self) -> bool:
+        return self._transfer_worker is not None and self._transfer_worker.isRunning()
+
     def _export_data(self):
-        """Export database to JSON."""
+        """Export database to JSON Lines files in the chosen folder."""
         from PyQt6.QtWidgets import QFileDialog
         
-        filepath, _ = QFileDialog.getSaveFileName(
-            self, "Экспорт базы данных", "", "JSON файлы (*.json)"
-        )
+        if self._transfer_running():
+            return
         
-        if not filepath:
+        # Два файла (сырые данные и знания): пользователь выбирает папку, а не имя файла
+        base_dir = QFileDialog.getExistingDirectory(self, "Папка для экспорта базы данных", BASE_APP_DIR)
+        
+        if not base_dir:
             return
         
-        try:
-            self.memory.export_all(BASE_APP_DIR)
-            QMessageBox.information(self, "Успех", "База данных экспортирована")
-        except Exception as e:
-            logger.error(f"Export failed: {e}")
-            QMessageBox.critical(self, "Ошибка", f"Экспорт не удался: {e}")
+        def on_finished(paths):
+            self._update_stats()
+            QMessageBox.information(self, "Успех", "База данных экспортирована:\n" + "\n".join(paths.values()))
+        
+        self._start_transfer(
+            "Экспорт", lambda on_progress: self.memory.export_all(base_dir, on_progress=on_progress), on_finished)
     
     def _import_data(self):
         """Import database from JSON."""
         from PyQt6.QtWidgets import QFileDialog
         
+        if self._transfer_running():
+            return
+        
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Импорт базы данных", "", "JSON файлы (*.json)"
+            self, "Импорт базы данных", "", "Экспорт памяти (*.jsonl *.json)"
         )
         
         if not filepath:
@@ -746,13 +824,17 @@ class DatabaseTab(QWidget):
         if confirm != QMessageBox.StandardButton.Yes:
             return
         
-        try:
-            self.memory.import_all(raw_path=filepath, clear_first=False)
+        def job(on_progress):
+            if export_kind(filepath) == 'knowledge':
+                self.memory.import_all(knowledge_path=filepath, clear_first=False, on_progress=on_progress)
+            else:
+                self.memory.import_all(raw_path=filepath, clear_first=False, on_progress=on_progress)
+        
+        def on_finished(_result):
             self._refresh_data()
             QMessageBox.information(self, "Успех", "Данные импортированы")
-        except Exception as e:
-            logger.error(f"Import failed: {e}")
-            QMessageBox.critical(self, "Ошибка", f"Импорт не удался: {e}")
+        
+        self._start_transfer("Импорт", job, on_finished)
     
     def _clear_database(self):
         """Clear the entire database."""
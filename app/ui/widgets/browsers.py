@@ -2,11 +2,13 @@ import os
 from typing import Optional
 from datetime import datetime
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QPushButton, QListWidgetItem, QMessageBox, QMenu, QLineEdit, QSizePolicy, QFrame
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QFileSystemWatcher, QTimer, QThread
 from PyQt6.QtGui import QValidator
 from app.ui.styles import Components, Palette, Typography, Spacing, InputComponents
-from app.config import RESULTS_DIR
+from app.config import RESULTS_DIR, RESULTS_LOAD_CHUNK
 from app.core.log_manager import logger
+from app.core.results_store import iter_results, delete_results_file, rename_results_file
+from app.core.results_catalog import get_results_catalog
 
 class FilenameValidator(QValidator):
     def validate(self, text, pos):
@@ -15,24 +17,102 @@ class FilenameValidator(QValidator):
             return (QValidator.State.Invalid, text, pos)
         return (QValidator.State.Acceptable, text, pos)
 
+class ResultsFileLoader(QThread):
+    """
+    Чтение файла результатов в фоне: товары уходят в таблицу порциями по мере разбора,
+    в конце — только число товаров (целиком список не копится)
+    """
+    chunk_ready = pyqtSignal(str, list)
+    loaded = pyqtSignal(str, int)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, path: str, chunk_size: int = RESULTS_LOAD_CHUNK, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.chunk_size = chunk_size
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        count = 0
+        try:
+            for chunk in iter_results(self.path, self.chunk_size):
+                if self._cancelled:
+                    return
+                count += len(chunk)
+                self.chunk_ready.emit(self.path, chunk)
+            if not self._cancelled:
+                self.loaded.emit(self.path, count)
+        except Exception as e:
+            self.failed.emit(self.path, str(e))
+
+class CatalogSyncWorker(QThread):
+    """Сверка каталога результатов с папкой в фоне: переиндексация читает файлы целиком"""
+    synced = pyqtSignal(int)
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+
+    def run(self):
+        try:
+            self.synced.emit(self.catalog.sync())
+        except Exception as e:
+            logger.dev(f"Results catalog sync error: {e}", level="ERROR")
+
 class BaseJsonFileBrowser(QWidget):
-    file_loaded = pyqtSignal(str, list)
+    file_load_started = pyqtSignal(str)
+    file_chunk_loaded = pyqtSignal(str, list)
+    file_loaded = pyqtSignal(str, int)
     file_deleted = pyqtSignal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.file_list = None
+        self._loader = None
+        self.catalog = get_results_catalog()
+        self._sync_worker = None
+        self._sync_again = False
+
+        # Изменения папки извне (CLI, ручное копирование): сверка каталога с задержкой
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        self._watcher = QFileSystemWatcher([RESULTS_DIR], self)
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setInterval(500)
+        self._sync_timer.timeout.connect(self._on_results_dir_changed)
+        self._watcher.directoryChanged.connect(lambda _: self._sync_timer.start())
+        self._on_results_dir_changed()
+
+    def _on_results_dir_changed(self):
+        if self._sync_worker is not None:
+            # Сверка уже идет: повторим после нее, чтобы не пропустить изменения
+            self._sync_again = True
+            return
+        worker = CatalogSyncWorker(self.catalog, parent=self)
+        worker.synced.connect(self._on_catalog_synced)
+        worker.finished.connect(self._on_sync_finished)
+        self._sync_worker = worker
+        worker.start()
+
+    def _on_catalog_synced(self, reindexed: int):
+        if reindexed:
+            self.refresh_files()
+
+    def _on_sync_finished(self):
+        self._sync_worker.deleteLater()
+        self._sync_worker = None
+        if self._sync_again:
+            self._sync_again = False
+            self._on_results_dir_changed()
 
     def iter_files(self):
         files_info = []
         try:
-            files = [f for f in os.listdir(RESULTS_DIR) if f.endswith('.json') and f.startswith('avito_')]
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(RESULTS_DIR, x)), reverse=True)
-            for f in files:
-                full_path = os.path.join(RESULTS_DIR, f)
-                mtime = os.path.getmtime(full_path)
-                size_kb = os.path.getsize(full_path) / 1024
-                files_info.append((full_path, mtime, size_kb))
+            for row in self.catalog.list_files():
+                files_info.append((row["path"], row["mtime"], row["size"] / 1024))
         except: pass
         return files_info
 
@@ -52,14 +132,17 @@ class BaseJsonFileBrowser(QWidget):
         fname = item.data(Qt.ItemDataRole.UserRole)
         if not fname: return
 
-        import json, gzip
-        try:
-            try:
-                with open(fname, 'r', encoding='utf-8') as f: data = json.load(f)
-            except:
-                with gzip.open(fname, 'rt', encoding='utf-8') as f: data = json.load(f)
-            self.file_loaded.emit(fname, data)
-        except Exception: pass
+        if self._loader is not None and self._loader.isRunning():
+            self._loader.cancel()
+
+        loader = ResultsFileLoader(fname, parent=self)
+        loader.chunk_ready.connect(self.file_chunk_loaded)
+        loader.loaded.connect(self.file_loaded)
+        loader.failed.connect(lambda path, err: logger.error(f"Не удалось открыть {os.path.basename(path)}: {err}"))
+        loader.finished.connect(loader.deleteLater)
+        self._loader = loader
+        self.file_load_started.emit(fname)
+        loader.start()
 
     def delete_selected_file(self):
         item = self.file_list.currentItem()
@@ -68,7 +151,7 @@ class BaseJsonFileBrowser(QWidget):
         if not fname or not self.confirm_delete(fname): return
 
         try:
-            os.remove(fname)
+            delete_results_file(fname)
             self.refresh_files()
             self.file_deleted.emit(fname)
         except: pass
@@ -214,7 +297,7 @@ class MiniFileBrowser(BaseJsonFileBrowser):
             return
 
         try:
-            os.rename(old_path, new_path)
+            rename_results_file(old_path, new_path)
             logger.info(f"Переименовано: {os.path.basename(old_path)} -> {os.path.basename(new_path)}...")
         except Exception as e:
             logger.error(f"Ошибка переименования: {e}...")
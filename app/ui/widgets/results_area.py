@@ -14,7 +14,9 @@ class NoScrollComboBox(QComboBox):
         event.ignore()
 
 class ResultsAreaWidget(QGroupBox):
-    file_loaded = pyqtSignal(str, list)
+    file_load_started = pyqtSignal(str)
+    file_chunk_loaded = pyqtSignal(str, list)
+    file_loaded = pyqtSignal(str, int)
     file_deleted = pyqtSignal(str)
     table_item_deleted = pyqtSignal(str)
     table_closed = pyqtSignal()
@@ -184,6 +186,8 @@ class ResultsAreaWidget(QGroupBox):
         group_v.addWidget(content_widget, 1)
 
         # Connections
+        self.mini_browser.file_load_started.connect(self.file_load_started)
+        self.mini_browser.file_chunk_loaded.connect(self.file_chunk_loaded)
         self.mini_browser.file_loaded.connect(self.file_loaded)
         self.mini_browser.file_deleted.connect(self.file_deleted)
         self.results_table.item_deleted.connect(self.table_item_deleted)
@@ -231,6 +235,16 @@ class ResultsAreaWidget(QGroupBox):
         self.header_widget.setVisible(True)
         self.results_table.add_items(items)
 
+    def begin_stream(self):
+        """Таблица для постепенной загрузки файла: строки добавляются append_items"""
+        self.clear_table()
+        self.right_stack.setCurrentWidget(self.results_table)
+        self.header_widget.setVisible(True)
+
+    def append_items(self, items: list[dict]):
+        if items:
+            self.results_table.add_items(items)
+
     def _apply_search(self, text: str):
         query = text.strip()
         mode = self.search_mode.currentText()
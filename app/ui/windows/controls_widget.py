@@ -198,6 +198,7 @@ class SearchParametersPanel(QWidget):
         grid.addWidget(info_container, 0, 1)
         grid.addWidget(self._create_region_toggle(), 1, 0)
         grid.addWidget(self._create_defects_toggle(), 1, 1)
+        grid.addWidget(self._create_seen_history_toggle(), 2, 0, 1, 2)
         grid.setColumnStretch(0, 0)
         grid.setColumnStretch(1, 1)
         limits_layout.addLayout(grid)
@@ -470,6 +471,30 @@ class SearchParametersPanel(QWidget):
         layout.addLayout(row_layout)
         return container
 
+    def _create_seen_history_toggle(self) -> QWidget:
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(int(Spacing.XS * 1.5))
+        title = QLabel("Пропускать виденные ранее")
+        title.setStyleSheet(Typography.style(family=Typography.UI, size=Typography.SIZE_NORMAL, color=Palette.TEXT_SECONDARY))
+        title.setToolTip("Не собирать объявления, найденные в прошлых сессиях парсинга")
+        layout.addWidget(title)
+        row_layout = QHBoxLayout()
+        row_layout.setSpacing(Spacing.SM)
+        self.skip_seen_history_sw = AnimatedToggle()
+        self.skip_seen_history_sw.setFixedSize(55, 30)
+        self.skip_seen_history_lbl = QLabel("Выкл")
+        self._update_toggle_label(self.skip_seen_history_lbl, False)
+        
+        self.skip_seen_history_sw.stateChanged.connect(
+            lambda s: self._update_toggle_label(self.skip_seen_history_lbl, s)
+        )
+        row_layout.addWidget(self.skip_seen_history_sw)
+        row_layout.addWidget(self.skip_seen_history_lbl)
+        layout.addLayout(row_layout)
+        return container
+
     def _create_separator(self) -> QFrame:
         line = QFrame()
         line.setFrameShape(QFrame.Shape.HLine)
@@ -628,6 +653,7 @@ class SearchParametersPanel(QWidget):
             "max_items": self.max_items_input.value(),
             "all_regions": self.search_all_regions_checkbox.isChecked(),
             "filter_defects": self.filter_defects_sw.isChecked(),
+            "skip_seen_history": self.skip_seen_history_sw.isChecked(),
             "rewrite_duplicates": getattr(self, "rewrite_duplicates_sw", None) and self.rewrite_duplicates_sw.isChecked(),
             "split_results": getattr(self, "split_results_sw", None) and self.split_results_sw.isChecked(),
             "merge_with_table": merge_with_table,
@@ -646,6 +672,7 @@ class SearchParametersPanel(QWidget):
             self.max_items_input.setValue(params.get("max_items", 0))
             self.search_all_regions_checkbox.setChecked(params.get("all_regions", False))
             self.filter_defects_sw.setChecked(params.get("filter_defects", False))
+            self.skip_seen_history_sw.setChecked(params.get("skip_seen_history", False))
             if hasattr(self, "rewrite_duplicates_sw"):
                 self.rewrite_duplicates_sw.setChecked(bool(params.get("rewrite_duplicates", False)))
             if hasattr(self, "sort_combo"):
@@ -804,6 +831,7 @@ class ControlsWidget(QWidget):
         self.max_items_input = self.params_panel.max_items_input
         self.search_all_regions_checkbox = self.params_panel.search_all_regions_checkbox
         self.filter_defects_sw = self.params_panel.filter_defects_sw
+        self.skip_seen_history_sw = self.params_panel.skip_seen_history_sw
         self.include_ai_sw = self.params_panel.include_ai_sw
         self.store_memory_sw = self.params_panel.store_memory_sw
         self.sort_combo = self.params_panel.sort_combo
@@ -853,6 +881,7 @@ class ControlsWidget(QWidget):
         pp.max_items_input.setEnabled(not locked)
         pp.search_all_regions_checkbox.setEnabled(not locked)
         pp.filter_defects_sw.setEnabled(not locked)
+        pp.skip_seen_history_sw.setEnabled(not locked)
         pp.include_ai_sw.setEnabled(not locked)
         pp.store_memory_sw.setEnabled(not locked)
         pp.sort_combo.setEnabled(not locked)
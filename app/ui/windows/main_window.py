@@ -7,14 +7,20 @@ from PyQt6.QtWidgets import (
     QSplitter, QScrollArea, QFrame, QApplication, QMessageBox,
     QLabel, QDialog
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt6.QtGui import QCursor
 
 from app.core.controller import ParserController
 from app.core.memory import MemoryManager
 from app.core.telegram_notifier import TelegramNotifier
 from app.core.tracker import AdTracker
-from app.config import BASE_APP_DIR, RESULTS_DIR
+from app.config import BASE_APP_DIR, QUEUE_PARALLELISM, REQUEST_BUDGET_PER_MIN
+from app.core.item_store import CompactItem, compact_items
+from app.core.results_store import (
+    get_results_store, load_results, save_results_file, close_results_stores, new_results_path,
+)
+from app.core.results_catalog import get_results_catalog, is_catalogued
+from app.core.exporter import ExportCancelled, export_table
 from app.ui.widgets.ai_memory_panel import AIMemoryPanel
 from app.core.ai.chunk_cultivation import ChunkCultivationManager
 from app.ui.pages.analytics import AnalyticsWidget
@@ -28,6 +34,39 @@ from app.ui.styles import Components, Palette, Spacing, Typography
 from app.ui.widgets.category_selection_dialog import CategorySelectionDialog
 from app.core.log_manager import logger
 
+class TableExportWorker(QThread):
+    """Экспорт таблицы или файла результатов в CSV/XLSX вне GUI-потока"""
+    progress = pyqtSignal(int, int)
+    finished_ok = pyqtSignal(str, int)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, filepath: str, items: List[Dict] = None, path: str = None,
+                 total: int = None, parent=None):
+        super().__init__(parent)
+        self.filepath = filepath
+        self.items = items
+        self.path = path
+        self.total = total
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            count = export_table(
+                self.filepath, items=self.items, path=self.path, total=self.total,
+                on_progress=lambda done, total: self.progress.emit(done, total or 0),
+                is_cancelled=lambda: self._cancelled,
+            )
+            self.finished_ok.emit(self.filepath, count)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class ScanPromptDialog(QDialog):
     def __init__(self, queue_name: str, parent=None):
         super().__init__(parent)
@@ -98,6 +137,10 @@ class MainWindow(QWidget):
         self.queue_manager = QueueStateManager()
         self.current_results = []
         self.current_json_file = None
+        # Файл результатов каждой очереди запуска: при параллельных очередях открытая таблица — лишь одна из них
+        self._queue_files: Dict[int, str] = {}
+        self._streaming_file = None
+        self._export_worker = None
         self.is_sequence_running = False
         self._is_programmatic_update = False
         self.cnt_parser = 0
@@ -105,6 +148,7 @@ class MainWindow(QWidget):
         self.parser_progress_timer = None
         self.current_search_mode = "full"
         self.app_settings = self._load_settings()
+        self._apply_parser_settings()
         tg_token = self.app_settings.get("telegram_token", "")
         tg_chat_id = self.app_settings.get("telegram_chat_id", "")
         self.notifier = TelegramNotifier(tg_token, tg_chat_id)
@@ -335,6 +379,7 @@ class MainWindow(QWidget):
         self.controller.parser_started.connect(self._on_parser_started_logic)
         self.controller.progress_updated.connect(self._on_parser_progress)
         self.controller.queue_finished.connect(self._on_queue_finished)
+        self.controller.results_batch_ready.connect(self._on_results_batch)
         self.controller.parser_finished.connect(self._on_parsing_finished)
         self.controller.sequence_finished.connect(self._on_sequence_finished_ui)
         self.controller.error_occurred.connect(lambda msg: self.progress_panel.parser_log.error(msg))
@@ -357,6 +402,8 @@ class MainWindow(QWidget):
             self.controls_widget.queue_manager_widget.queue_changed.connect(self._on_queue_changed)
             self.controls_widget.queue_manager_widget.queue_removed.connect(self._on_queue_removed)
             self.controls_widget.queue_manager_widget.queue_toggled.connect(self._on_queue_toggled)
+        self.results_area.file_load_started.connect(self._on_file_load_started)
+        self.results_area.file_chunk_loaded.connect(self._on_file_chunk_loaded)
         self.results_area.file_loaded.connect(self._on_file_loaded)
         self.results_area.file_deleted.connect(self._on_file_deleted)
         self.results_area.table_item_deleted.connect(self._on_table_item_deleted)
@@ -622,6 +669,7 @@ class MainWindow(QWidget):
 
         self.is_sequence_running = True
         self.controls_widget.set_ui_locked(True)
+        self._queue_files = {}
         
         self.current_search_mode = active_configs[0].get("search_mode", "full")
         self.progress_panel.set_parser_mode(self.current_search_mode)
@@ -635,7 +683,7 @@ class MainWindow(QWidget):
             merge_file = first_config.get("merge_with_table")
             if merge_file and os.path.exists(merge_file):
                 self.current_json_file = merge_file
-                self.current_results = self._load_results_file_silent(merge_file)
+                self.current_results = compact_items(self._load_results_file_silent(merge_file))
                 logger.info(f"Режим добавления: {os.path.basename(merge_file)}...")
             else:
                 first_queue_name = first_config.get('queue_name', '')
@@ -728,18 +776,14 @@ class MainWindow(QWidget):
             else:
                 if iid not in processed_ids:
                     item.setdefault("starred", False)
-                    new_entries.append(item)
+                    new_entries.append(CompactItem.from_dict(item))
                     added += 1
             processed_ids.add(iid)
             
         final_list = list(base_map.values()) + new_entries
         return final_list, added, updated, skipped
 
-    def _sanitize_filename(self, name: str) -> str:
-        return "".join(c if c.isalnum() or c in (' ', '-', '_', '.') else '_' for c in name).strip()
-
-    def _on_parsing_finished(self, results: List[Dict]):
-        idx = self.controller.queue_state.current_queue_index
+    def _on_parsing_finished(self, results: List[Dict], idx: int):
         if idx < len(self.controller.queue_state.queues_config):
             config = self.controller.queue_state.queues_config[idx]
         else:
@@ -762,16 +806,89 @@ class MainWindow(QWidget):
             self.progress_panel.set_finished_state()
             logger.success("Парсинг завершен...")
 
-    def _create_new_results_file(self, queue_name: str = ""):
-        timestamp = time.strftime('%d%m%Y_%H%M%S')
-        
-        if queue_name:
-            safe_name = self._sanitize_filename(queue_name)
-            filename = f"avito_{safe_name}_{timestamp}.json"
+    def _on_results_batch(self, batch: List[Dict], idx: int):
+        """Постраничная выдача: показываем и сохраняем товары, не дожидаясь конца очереди"""
+        if not batch:
+            return
+        if idx < len(self.controller.queue_state.queues_config):
+            config = self.controller.queue_state.queues_config[idx]
         else:
-            filename = f"avito_search_{timestamp}.json"
-            
-        self.current_json_file = os.path.join(RESULTS_DIR, filename)
+            config = self.controls_widget.get_parameters()
+
+        # Нейро-фильтр и раздельные таблицы обрабатываются целиком по окончании очереди
+        if config.get("search_mode", "full") == "neuro" or config.get("split_results", False):
+            return
+
+        target_file = self._queue_target_file(idx, config)
+        rewrite = config.get("rewrite_duplicates", False)
+        if target_file != self.current_json_file:
+            self._merge_into_store(batch, target_file, rewrite)
+            return
+
+        known_ids = {str(i.get("id", "")) for i in self.current_results}
+        merged, added, updated, _ = self._merge_results(batch, self.current_results, rewrite)
+        if not added and not updated:
+            return
+        self.current_results = merged
+
+        if updated or not known_ids:
+            self.results_area.load_full_history(self.current_results)
+        else:
+            # Новые товары (уже в компактном виде) дописаны в конец merged
+            self.results_area.results_table.add_items(merged[len(merged) - added:])
+
+        batch_ids = {str(i.get("id", "")) for i in batch}
+        self._store_items([i for i in merged if str(i.get("id", "")) in batch_ids])
+
+        basename = os.path.basename(self.current_json_file).replace("avito_", "").replace(".json", "")
+        self.results_area.update_header(
+            table_name=basename,
+            full_date=time.strftime("%d.%m.%Y %H:%M"),
+            count=len(self.current_results)
+        )
+
+    def _queue_target_file(self, idx: int, config: Dict) -> str:
+        """Файл, куда пишутся результаты очереди idx; выбирается один раз за запуск"""
+        target = self._queue_files.get(idx)
+        if target:
+            return target
+
+        target = config.get('context_table')
+        if not target:
+            if config.get("split_results", False):
+                raw_queue_name = config.get('queue_name') or f"queue_{config.get('original_index', idx) + 1}"
+                target = new_results_path(raw_queue_name)
+            else:
+                if not self.current_json_file:
+                    self._create_new_results_file(queue_name=config.get("queue_name", ""))
+                target = self.current_json_file
+        self._queue_files[idx] = target
+        return target
+
+    def _merge_into_store(self, items: List[Dict], target_file: str, rewrite: bool):
+        """Слияние в таблицу, которая сейчас не открыта: только журнал файла, без загрузки в окно"""
+        store = get_results_store(target_file)
+        is_new = not os.path.exists(target_file)
+        try:
+            fresh = []
+            for item in items:
+                iid = str(item.get("id", ""))
+                if not iid:
+                    continue
+                if iid not in store:
+                    fresh.append(dict(item, starred=item.get("starred", False)))
+                elif rewrite:
+                    # Как в _merge_results: пользовательские отметки при перезаписи сохраняются
+                    fields = {k: v for k, v in item.items() if k != "starred" and (k != "ai_comment" or v)}
+                    store.patch(iid, fields)
+            store.put_many(fresh)
+        except Exception as e:
+            logger.dev(f"Results append error: {e}", level="ERROR")
+        if is_new:
+            self._refresh_merge_targets()
+
+    def _create_new_results_file(self, queue_name: str = ""):
+        self.current_json_file = new_results_path(queue_name)
 
     def _save_results_to_file(self):
         if not self.current_json_file:
@@ -779,14 +896,36 @@ class MainWindow(QWidget):
         self._save_list_to_file(self.current_results, self.current_json_file)
 
     def _save_list_to_file(self, data: list, filepath: str):
-        import gzip
         try:
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            with gzip.open(filepath, 'wt', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            save_results_file(filepath, data)
             self._refresh_merge_targets()
         except Exception as e:
-            pass
+            logger.dev(f"Results save error: {e}", level="ERROR")
+
+    def _results_store(self):
+        return get_results_store(self.current_json_file) if self.current_json_file else None
+
+    def _store_items(self, items: List[Dict]):
+        """Дописывает в журнал текущей таблицы только измененные товары"""
+        store = self._results_store()
+        if store is None or not items:
+            return
+        is_new = not os.path.exists(self.current_json_file)
+        try:
+            store.put_many(items)
+        except Exception as e:
+            logger.dev(f"Results append error: {e}", level="ERROR")
+        if is_new:
+            self._refresh_merge_targets()
+
+    def _patch_stored_item(self, item_id, fields: Dict):
+        store = self._results_store()
+        if store is None:
+            return
+        try:
+            store.patch(item_id, fields)
+        except Exception as e:
+            logger.dev(f"Results patch error: {e}", level="ERROR")
 
     def _on_parser_started_logic(self):
         qs = self.controller.queue_state
@@ -1101,7 +1240,11 @@ class MainWindow(QWidget):
         if 0 <= idx < len(self.current_results):
             self.current_results[idx]["ai_comment"] = json_text
             self.results_area.results_table.update_ai_column(idx, json_text)
-            self._save_results_to_file()
+            item_id = self.current_results[idx].get("id")
+            if item_id:
+                self._patch_stored_item(item_id, {"ai_comment": json_text})
+            else:
+                self._save_results_to_file()
 
     def _on_ai_all_finished(self):
         logger.info(f"ИИ завершил анализ...")
@@ -1155,15 +1298,15 @@ class MainWindow(QWidget):
             
             if self.current_results:
                 item_id = str(src_item.get('id'))
-                found = False
+                found = None
                 for existing in self.current_results:
                     if str(existing.get('id')) == item_id:
                         existing.update(src_item)
-                        found = True
+                        found = existing
                         break
                 
-                if found and self.current_json_file:
-                     self._save_results_to_file()
+                if found is not None and self.current_json_file:
+                     self._store_items([found])
 
             if store_in_memory:
                 try:
@@ -1180,16 +1323,16 @@ class MainWindow(QWidget):
         split_results = config.get("split_results", False)
         rewrite = config.get("rewrite_duplicates", False)
 
+        target_file = self._queue_target_file(idx, config)
+
         if split_results:
-            target_file = config.get('context_table')
-            
-            if target_file and os.path.exists(target_file):
+            if os.path.exists(target_file):
                 base_items = self._load_results_file_silent(target_file)
                 merged, added, updated, skipped = self._merge_results(results, base_items, rewrite)
                 self._save_list_to_file(merged, target_file)
                 
                 if self.current_json_file == target_file:
-                     self.current_results = merged
+                     self.current_results = compact_items(merged)
                      self.results_area.load_full_history(merged)
                 
                 logger.success(f"Очередь '{q_name}': Добавлено {added}, Обновлено {updated} в {os.path.basename(target_file)}")
@@ -1198,33 +1341,26 @@ class MainWindow(QWidget):
                     self.results_area.mini_browser.refresh_files()
 
             else:
-                timestamp = time.strftime('%d%m%Y_%H%M%S')
-                raw_queue_name = config.get('queue_name', '')
-                if not raw_queue_name:
-                    q_num = config.get('original_index', idx) + 1
-                    raw_queue_name = f"queue_{q_num}"
-                
-                safe_name = self._sanitize_filename(raw_queue_name)
-                filename = f"avito_{safe_name}_{timestamp}.json"
-                target_file = os.path.join(RESULTS_DIR, filename)
-
                 base_items: List[Dict] = []
                 merged, added, updated, skipped = self._merge_results(results, base_items, rewrite)
                 self._save_list_to_file(merged, target_file)
                 
-                logger.success(f"Очередь '{raw_queue_name}': Сохранено в {filename} (добавлено {added})...")
+                logger.success(f"Очередь '{q_name}': Сохранено в {os.path.basename(target_file)} (добавлено {added})...")
 
                 if hasattr(self.results_area, "mini_browser"):
                     self.results_area.mini_browser.refresh_files()
 
-        else:
-            if not self.current_json_file:
-                 self._create_new_results_file(queue_name=q_name)
+        elif target_file != self.current_json_file:
+            self._merge_into_store(results, target_file, rewrite)
+            logger.success(f"Очередь '{q_name}': результаты добавлены в {os.path.basename(target_file)}")
 
+        else:
             base_items = self.current_results
             merged, added, updated, skipped = self._merge_results(results, base_items, rewrite)
             self.current_results = merged
-            self._save_results_to_file()
+            if added or updated:
+                result_ids = {str(i.get("id", "")) for i in results}
+                self._store_items([i for i in merged if str(i.get("id", "")) in result_ids])
 
             self.results_area.load_full_history(self.current_results)
 
@@ -1328,13 +1464,32 @@ class MainWindow(QWidget):
         
         self._load_queue_to_ui(new_index)
 
-    def _on_file_loaded(self, path, data):
-        self.current_json_file = path 
-        self.current_results = data
-        self.results_area.load_full_history(data)
+    def _on_file_load_started(self, path):
+        self._streaming_file = path
+        self.current_json_file = path
+        self.current_results = []
+        self.results_area.begin_stream()
+
+    def _on_file_chunk_loaded(self, path, chunk):
+        if path != self._streaming_file:
+            return
+        chunk = compact_items(chunk)
+        self.current_results.extend(chunk)
+        self.results_area.append_items(chunk)
+        basename = os.path.basename(path).replace("avito_", "").replace(".json", "")
+        self.results_area.update_header(table_name=basename, full_date="", count=len(self.current_results))
+
+    def _on_file_loaded(self, path, count):
+        if path != self._streaming_file:
+            # Загрузка уже заменена другой таблицей или таблица закрыта
+            return
+        # Строки уже добавлены порциями
+        self._streaming_file = None
+        if not self.current_results:
+            self.results_area.load_full_history([])
 
-        import os
         from datetime import datetime
+        data = self.current_results
         basename = os.path.basename(path).replace("avito_", "").replace(".json", "")
         if os.path.exists(path):
             fulldate = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%d.%m.%Y %H:%M")
@@ -1381,10 +1536,7 @@ class MainWindow(QWidget):
             QMessageBox.warning(self, "Ошибка", "Таблица пуста!")
             return
 
-        added = 0
-        for item in items:
-            if self.memory_manager.add_item(item):
-                added += 1
+        added = self.memory_manager.add_items(items)
 
         logger.success(f"Добавлено {added} из {len(items)} элементов в память ИИ")
         QMessageBox.information(self, "Успех", f"Добавлено {added} элементов в память ИИ")
@@ -1394,129 +1546,64 @@ class MainWindow(QWidget):
         if not items:
             QMessageBox.warning(self, "Ошибка", "Таблица пуста!")
             return
+        self._start_export(items=list(items), total=len(items))
 
-        from PyQt6.QtWidgets import QFileDialog
-        import csv
+    def _start_export(self, items: List[Dict] = None, path: str = None, total: int = None):
+        """Экспорт в CSV/XLSX в фоновом потоке с прогрессом и отменой"""
+        from PyQt6.QtWidgets import QFileDialog, QProgressDialog
+
+        if self._export_worker is not None and self._export_worker.isRunning():
+            QMessageBox.information(self, "Экспорт", "Предыдущий экспорт еще не завершен")
+            return
 
         filepath, _ = QFileDialog.getSaveFileName(
             self, "Сохранить таблицу", "", "Excel файл (*.xlsx);;CSV файл (*.csv)"
         )
-
         if not filepath:
             return
-
-        try:
-            if filepath.endswith('.csv'):
-                # Для CSV добавляем отдельную колонку со ссылкой
-                fieldnames = ['id', 'price', 'title', 'link', 'views', 'date', 'city', 'description', 'ai_verdict']
-                headers = ['ID', 'Цена', 'Название', 'Ссылка', 'Просмотров', 'Дата', 'Город', 'Описание', 'Вердикт ИИ']
-
-                with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(headers)
-                    for item in items:
-                        # Получить вердикт ИИ
-                        ai_data = item.get('ai', {})
-                        if isinstance(ai_data, str):
-                            import json
-                            try:
-                                ai_data = json.loads(ai_data)
-                            except:
-                                ai_data = {}
-
-                        verdict = ai_data.get('verdict', '')
-                        reason = ai_data.get('reason', '')
-                        ai_text = f"{verdict}: {reason}" if verdict else ""
-
-                        desc = item.get('description', '') or ''
-                        desc_short = desc[:100] + '...' if len(desc) > 100 else desc
-
-                        writer.writerow([
-                            item.get('id', ''),
-                            item.get('price', ''),
-                            item.get('title', ''),
-                            item.get('link', ''),
-                            item.get('views', ''),
-                            item.get('date', ''),
-                            item.get('address', ''),
-                            desc_short,
-                            ai_text
-                        ])
-
-            elif filepath.endswith('.xlsx'):
-                try:
-                    import openpyxl
-                    from openpyxl.styles import Font
-                except ImportError:
-                    QMessageBox.critical(self, "Ошибка", "Для экспорта в Excel установите библиотеку: pip install openpyxl")
-                    return
-
-                headers = ['ID', 'Цена', 'Название (ссылка)', 'Просмотров', 'Дата', 'Город', 'Описание', 'Вердикт ИИ']
-
-                wb = openpyxl.Workbook()
-                ws = wb.active
-                ws.append(headers)
-
-                for cell in ws[1]:
-                    cell.font = Font(bold=True)
-
-                for idx, item in enumerate(items, start=2):
-                    ai_data = item.get('ai', {})
-                    if isinstance(ai_data, str):
-                        import json
-                        try:
-                            ai_data = json.loads(ai_data)
-                        except:
-                            ai_data = {}
-
-                    verdict = ai_data.get('verdict', '')
-                    reason = ai_data.get('reason', '')
-                    ai_text = f"{verdict}: {reason}" if verdict else ""
-
-                    desc = item.get('description', '') or ''
-                    desc_short = desc[:100] + '...' if len(desc) > 100 else desc
-
-                    title = item.get('title', '')
-                    link = item.get('link', '')
-
-                    ws.append([
-                        item.get('id', ''),
-                        item.get('price', ''),
-                        title,
-                        item.get('views', ''),
-                        item.get('date', ''),
-                        item.get('address', ''),
-                        desc_short,
-                        ai_text
-                    ])
-
-                    if link:
-                        cell = ws.cell(row=idx, column=3)
-                        cell.hyperlink = link
-                        cell.font = Font(color="0563C1", underline="single")
-                        cell.value = title
-
-                for column in ws.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if cell.value:
-                                max_length = max(max_length, len(str(cell.value)))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    ws.column_dimensions[column_letter].width = adjusted_width
-
-                wb.save(filepath)
-
-            logger.success(f"Таблица экспортирована: {filepath}")
-            QMessageBox.information(self, "Успех", f"Таблица сохранена:\n{filepath}")
-        except Exception as e:
-            import traceback
-            logger.error(f"Ошибка экспорта: {e}")
-            traceback.print_exc()
-            QMessageBox.critical(self, "Ошибка", f"Не удалось экспортировать:\n{e}")
+        if not filepath.lower().endswith(('.csv', '.xlsx')):
+            filepath += '.xlsx'
+        if filepath.lower().endswith('.xlsx'):
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                QMessageBox.critical(self, "Ошибка", "Для экспорта в Excel установите библиотеку: pip install openpyxl")
+                return
+
+        dialog = QProgressDialog("Экспорт таблицы...", "Отмена", 0, total or 0, self)
+        dialog.setWindowTitle("Экспорт")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+
+        worker = TableExportWorker(filepath, items=items, path=path, total=total, parent=self)
+        worker.progress.connect(lambda done, _total: dialog.setValue(min(done, dialog.maximum())) if dialog.maximum() else None)
+        dialog.canceled.connect(worker.cancel)
+
+        def finish():
+            dialog.close()
+            self._export_worker = None
+
+        def on_finished(path_out, count):
+            finish()
+            logger.success(f"Таблица экспортирована ({count} строк): {path_out}")
+            QMessageBox.information(self, "Успех", f"Таблица сохранена:\n{path_out}")
+
+        def on_cancelled():
+            finish()
+            logger.info("Экспорт таблицы отменен")
+
+        def on_failed(error):
+            finish()
+            logger.error(f"Ошибка экспорта: {error}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось экспортировать:\n{error}")
+
+        worker.finished_ok.connect(on_finished)
+        worker.cancelled.connect(on_cancelled)
+        worker.failed.connect(on_failed)
+        self._export_worker = worker
+        worker.start()
 
     def on_analyze_file_requested(self, filepath: str):
         items = self._load_results_file_silent(filepath)
@@ -1529,9 +1616,12 @@ class MainWindow(QWidget):
             self.on_add_to_memory_requested(items)
 
     def on_export_file_requested(self, filepath: str):
-        items = self._load_results_file_silent(filepath)
-        if items:
-            self.on_export_table_requested(items)
+        # Файл читается порциями в потоке экспорта, а не целиком в GUI
+        if not filepath or not os.path.exists(filepath):
+            QMessageBox.warning(self, "Ошибка", "Файл не найден")
+            return
+        info = get_results_catalog().get_file(filepath) if is_catalogued(filepath) else None
+        self._start_export(path=filepath, total=info["item_count"] if info else None)
 
     def on_analyze_item_requested(self, item: Dict):
         user_criteria = ""
@@ -1555,6 +1645,7 @@ class MainWindow(QWidget):
 
     def _on_results_context_cleared(self):
         self.current_json_file = None
+        self._streaming_file = None
         self.current_results = []
         self.results_area.clear_table()
         self.controls_widget.set_rewrite_controls_enabled(False)
@@ -1571,7 +1662,9 @@ class MainWindow(QWidget):
 
     def _on_table_item_deleted(self, item_id):
         self.current_results = [x for x in self.current_results if str(x.get("id")) != str(item_id)]
-        self._save_results_to_file()
+        store = self._results_store()
+        if store is not None:
+            store.delete([item_id])
 
     def _on_item_starred(self, item_id, is_starred):
         target_item = None
@@ -1580,7 +1673,8 @@ class MainWindow(QWidget):
                 x["starred"] = is_starred
                 target_item = x
                 break
-        self._save_results_to_file()
+        if target_item is not None:
+            self._patch_stored_item(item_id, {"starred": is_starred})
         
         if hasattr(self, 'tracker'):
             if self.current_json_file:
@@ -1597,56 +1691,36 @@ class MainWindow(QWidget):
         source_file = updated_item.get('_source_file')
         item_id = str(updated_item.get('id', ''))
         
+        fields = {k: v for k, v in updated_item.items() if k != '_source_file'}
+
         if self.current_json_file and source_file == self.current_json_file:
             for i, item in enumerate(self.current_results):
                 if str(item.get('id', '')) == item_id:
-                    self.current_results[i].update(updated_item)
+                    self.current_results[i].update(fields)
                     break
             
-            self._save_results_to_file()
+            self._patch_stored_item(item_id, fields)
             self.results_area.load_full_history(self.current_results)
             logger.info(f"Трекер обновил товар {item_id} (в текущем окне).")
 
         elif source_file and os.path.exists(source_file):
             try:
-                import gzip
-                data = []
-                is_gzip = False
-                try:
-                    with open(source_file, 'r', encoding='utf-8') as f: data = json.load(f)
-                except:
-                    with gzip.open(source_file, 'rt', encoding='utf-8') as f: data = json.load(f)
-                    is_gzip = True
-                
-                updated = False
-                for i, item in enumerate(data):
-                    if str(item.get('id', '')) == item_id:
-                        data[i].update(updated_item)
-                        if '_source_file' in data[i]: del data[i]['_source_file']
-                        updated = True
-                        break
+                updated = get_results_store(source_file).patch(item_id, fields)
                 
                 if updated:
-                    if is_gzip:
-                        with gzip.open(source_file, 'wt', encoding='utf-8') as f:
-                            json.dump(data, f, ensure_ascii=False, indent=2)
-                    else:
-                        with open(source_file, 'w', encoding='utf-8') as f:
-                            json.dump(data, f, ensure_ascii=False, indent=2)
                     logger.info(f"Трекер обновил товар {item_id} в фоновом файле: {os.path.basename(source_file)}")
                     
             except Exception as e:
                 logger.error(f"Ошибка фонового обновления файла {source_file}: {e}")
 
-    def _on_ai_batch_finished(self):
+    def _on_ai_batch_finished(self, idx: int):
         self.progress_panel.ai_log.success("AI пакет обработан")
 
         qs = self.controller.queue_state
         if not qs.waiting_for_ai_sequence:
             return
 
-        idx = qs.current_queue_index
-        if idx >= len(qs.queues_config):
+        if not 0 <= idx < len(qs.queues_config):
             return
 
         config = qs.queues_config[idx]
@@ -1693,12 +1767,8 @@ class MainWindow(QWidget):
 
     def _load_results_file_silent(self, path):
         if not path or not os.path.exists(path): return []
-        import gzip
         try:
-            try:
-                with open(path, "r", encoding="utf-8") as f: return json.load(f)
-            except:
-                with gzip.open(path, "rt", encoding="utf-8") as f: return json.load(f)
+            return load_results(path)
         except: return []
 
     def _switch_page(self, index):
@@ -1726,6 +1796,12 @@ class MainWindow(QWidget):
             if hasattr(self, 'tracker'):
                 self.tracker.update_settings(self.app_settings)
 
+            self._apply_parser_settings()
+
+    def _apply_parser_settings(self):
+        self.controller.set_parallelism(self.app_settings.get("queue_parallelism", QUEUE_PARALLELISM))
+        self.controller.set_request_budget(self.app_settings.get("request_budget_per_min", REQUEST_BUDGET_PER_MIN))
+
     def _on_model_downloaded(self, file_path: str):
         self._model_was_just_downloaded = True
 
@@ -1822,8 +1898,13 @@ class MainWindow(QWidget):
 
         if hasattr(self, 'tracker'):
             self.tracker.stop()
-        
+
+        if self._export_worker is not None and self._export_worker.isRunning():
+            self._export_worker.cancel()
+            self._export_worker.wait(5000)
+
         try:
             self.controller.cleanup()
         finally:
+            close_results_stores()
             event.accept()
\ No newline at end of file
@@ -83,7 +83,12 @@ class QueueStateManager(QObject):
             "rewrite_duplicates": False,
             "skip_duplicates": False,
             "allow_rewrite_duplicates": False,
-            "split_results": False
+            "skip_seen_history": False,
+            "split_results": False,
+            "pipeline_ai": True,
+            # Для headless-планировщика (python -m app.cli schedule); GUI эти ключи не использует
+            "schedule": "",
+            "incremental": True
         }
     
     def get_all_queue_indices(self) -> List[int]:
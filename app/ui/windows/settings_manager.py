@@ -10,7 +10,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QPropertyAnimation, QParallelAnimationGroup, QTimer
 from PyQt6.QtGui import QAbstractTextDocumentLayout
 from app.ui.styles import Components, Palette, Typography, Spacing
-from app.config import AI_CTX_SIZE, MODELS_DIR, DEFAULT_MODEL_NAME, BASE_APP_DIR
+from app.config import (
+    AI_CTX_SIZE, MODELS_DIR, DEFAULT_MODEL_NAME, BASE_APP_DIR, QUEUE_PARALLELISM, REQUEST_BUDGET_PER_MIN,
+)
 
 class CollapsibleBox(QWidget):
     """Виджет-аккордеон: Заголовок (кнопка) + Контент"""
@@ -315,6 +317,12 @@ class SettingsDialog(QDialog):
         # Разделитель
         self.content_layout.addWidget(self._create_divider())
         
+        # Блок Парсер
+        self.content_layout.addWidget(self._create_parser_settings())
+
+        # Разделитель
+        self.content_layout.addWidget(self._create_divider())
+
         # Блок Система
         self.content_layout.addWidget(self._create_system_settings())
 
@@ -547,6 +555,27 @@ class SettingsDialog(QDialog):
         return container
 
     # --- SYSTEM ---
+    def _create_parser_settings(self) -> QWidget:
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(Spacing.MD)
+
+        layout.addWidget(self._create_group_header("Парсер"))
+
+        self.parallelism_spin = self._create_spin(1, 8, QUEUE_PARALLELISM)
+        layout.addLayout(self._create_labeled_row("Очередей одновременно:", self.parallelism_spin,
+            "Сколько очередей парсится параллельно.\n"
+            "1 — очереди идут по одной, как раньше."))
+
+        self.request_budget_spin = self._create_spin(10, 600, REQUEST_BUDGET_PER_MIN, step=10)
+        self.request_budget_spin.setSuffix(" в мин")
+        layout.addLayout(self._create_labeled_row("Бюджет запросов:", self.request_budget_spin,
+            "Общий лимит запросов к Avito для всех параллельных очередей.\n"
+            "Меньше — ниже риск блокировки, но дольше поиск."))
+
+        return container
+
     def _create_system_settings(self) -> QWidget:
         container = QWidget()
         layout = QVBoxLayout(container)
@@ -803,6 +832,10 @@ class SettingsDialog(QDialog):
         self.tg_chat_id_input.setText(self.current_settings.get("telegram_chat_id", ""))
         self.tg_interval_spin.setValue(self.current_settings.get("telegram_check_interval", 60))
 
+        # Parser
+        self.parallelism_spin.setValue(self.current_settings.get("queue_parallelism", QUEUE_PARALLELISM))
+        self.request_budget_spin.setValue(int(self.current_settings.get("request_budget_per_min", REQUEST_BUDGET_PER_MIN)))
+
         # Checkboxes
         self.debug_mode_check.setChecked(self.current_settings.get("debug_mode", False))
         self.ai_debug_check.setChecked(self.current_settings.get("ai_debug", False))
@@ -821,7 +854,9 @@ class SettingsDialog(QDialog):
             "parser_debug": self.parser_debug_check.isChecked(),
             "telegram_token": self.tg_token_input.text().strip(),
             "telegram_chat_id": self.tg_chat_id_input.text().strip(),
-            "telegram_check_interval": self.tg_interval_spin.value()
+            "telegram_check_interval": self.tg_interval_spin.value(),
+            "queue_parallelism": self.parallelism_spin.value(),
+            "request_budget_per_min": self.request_budget_spin.value(),
         }
 
         # ВАЖНО: Мы сохраняем старые настройки парсера (которые удалили из UI),
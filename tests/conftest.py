@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общие фикстуры тестов.
+"""
+
+import pytest
+
+from app.core import seen_index
+
+
+@pytest.fixture(autouse=True)
+def isolated_seen_index(tmp_path, monkeypatch):
+    """Глобальный индекс просмотренных объявлений пишет во временный каталог, а не в корень проекта"""
+    monkeypatch.setattr(seen_index, "BASE_APP_DIR", str(tmp_path))
+    monkeypatch.setattr(seen_index, "_seen_index", None)
+    yield
+    if seen_index._seen_index is not None:
+        seen_index._seen_index.close()
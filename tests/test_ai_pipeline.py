@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для конвейерного ИИ-анализа AIManager:
+start_pipeline → feed_pipeline → close_pipeline → finished_signal.
+Сервер нейросети подменяется заглушкой.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from app.core.ai import ai_manager as ai_module
+from app.core.ai.ai_manager import AIManager
+
+# Одно приложение на весь процесс: при его удалении Qt удаляет и QObject-ы вроде logger
+APP = QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakeClient:
+    """LlamaClient без сервера: отвечает фиксированным вердиктом"""
+
+    def __init__(self, port):
+        pass
+
+    async def chat_completion(self, model, messages, params=None):
+        return '{"verdict": "GOOD", "reason": "ok"}'
+
+    async def close(self):
+        pass
+
+
+class FakeMemory:
+    """Память, запоминающая, из каких потоков к ней обращались"""
+
+    def __init__(self):
+        self.threads = set()
+        self.saved = []
+
+    def add_raw_items(self, items, categories=None, product_keys=None):
+        self.threads.add(threading.get_ident())
+        self.saved.extend(item['id'] for item in items)
+        return ["new"] * len(items)
+
+    def get_rag_context_for_item(self, title):
+        self.threads.add(threading.get_ident())
+        return None
+
+    def find_market_stats(self, title):
+        self.threads.add(threading.get_ident())
+        return None
+
+
+@pytest.fixture
+def manager(tmp_path):
+    memory = FakeMemory()
+    with patch.object(ai_module, "MODELS_DIR", str(tmp_path)), \
+            patch.object(ai_module, "LlamaClient", FakeClient), \
+            patch.object(AIManager, "ensure_server"):
+        mgr = AIManager(memory_manager=memory)
+        mgr._server_ready = True
+        yield APP, mgr, memory
+        mgr.close_pipeline()
+        if mgr.processing_worker:
+            mgr.processing_worker.stop()
+            mgr.processing_worker.wait()
+        mgr.analysis_timer.stop()
+
+
+def wait_for(app, condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+class TestPipeline:
+    """Тесты для конвейера AIManager."""
+
+    def test_open_feed_close_finishes(self, manager):
+        """Тест: после close_pipeline воркер дорабатывает очередь и отправляет finished_signal."""
+        app, mgr, memory = manager
+        results, finished = [], []
+        mgr.result_signal.connect(lambda i, text, ctx: results.append(i))
+        mgr.finished_signal.connect(lambda: finished.append(True))
+
+        mgr.start_pipeline({'priority': 1, 'search_mode': 'full'})
+        assert mgr.is_pipeline_open()
+
+        items = [{'id': str(n), 'title': f"RTX 3060 #{n}", 'price': 20000 + n} for n in range(5)]
+        assert mgr.feed_pipeline(items[:3]) == 3
+        assert mgr.feed_pipeline(items[2:]) == 2  # повтор id не подается второй раз
+        assert mgr.pipeline_size() == 5
+
+        mgr.close_pipeline()
+        assert not mgr.is_pipeline_open()
+
+        assert wait_for(app, lambda: finished)
+        assert sorted(results) == [0, 1, 2, 3, 4]
+        assert memory.saved == ['0', '1', '2', '3', '4']
+        assert mgr.pipeline_has_capacity()
+
+    def test_memory_work_is_off_gui_thread(self, manager):
+        """Тест: сохранение в память и сборка промптов идут в потоке воркера."""
+        app, mgr, memory = manager
+        finished = []
+        mgr.finished_signal.connect(lambda: finished.append(True))
+
+        mgr.start_pipeline({'priority': 1, 'search_mode': 'full'})
+        mgr.feed_pipeline([{'id': '1', 'title': "RTX 3060", 'price': 25000}])
+
+        mgr.close_pipeline()
+        assert wait_for(app, lambda: finished)
+        assert memory.threads and threading.get_ident() not in memory.threads
+
+    def test_empty_pipeline_closes_without_finished(self, manager):
+        """Тест: конвейер без поданных товаров не запускает воркер и не шлет finished_signal."""
+        app, mgr, memory = manager
+        finished = []
+        mgr.finished_signal.connect(lambda: finished.append(True))
+
+        mgr.start_pipeline({'priority': 1, 'search_mode': 'full'})
+        mgr.close_pipeline()
+
+        assert not wait_for(app, lambda: finished, timeout=0.5)
+        assert mgr.processing_worker is None
+        assert not mgr.is_pipeline_open()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для headless CLI (app.cli): прогон очереди run-queues
+в отдельном интерпретаторе, где импорт PyQt6 запрещен.
+Вместо AvitoParser работает заглушка.
+"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNNER = r'''
+import sys
+
+
+class BlockQt:
+    """Любой импорт PyQt6 — ошибка: CLI должен работать без Qt"""
+
+    def find_spec(self, name, path=None, target=None):
+        if name == "PyQt6" or name.startswith("PyQt6."):
+            raise ImportError(f"PyQt6 заблокирован: {name}")
+        return None
+
+
+sys.meta_path.insert(0, BlockQt())
+tmp = sys.argv[1]
+
+from app import cli
+from app.core import parser, seen_index
+from app.core.signals import HEADLESS, QObject, pyqtSignal
+
+seen_index.BASE_APP_DIR = tmp
+
+
+class StubParser(QObject):
+    progress_value = pyqtSignal(int)
+    update_requests_count = pyqtSignal(int, int)
+
+    def __init__(self, debug_mode=False):
+        super().__init__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def request_stop(self):
+        pass
+
+    def search_items(self, keywords, ignore_keywords=None, **kwargs):
+        self.update_requests_count.emit(2, 0)
+        self.progress_value.emit(100)
+        return [{"id": str(n), "title": f"{keywords[0]} #{n}", "price": 1000 * n}
+                for n in range(kwargs["max_total_items"])]
+
+
+parser.AvitoParser = StubParser
+code = cli.main(["run-queues", f"{tmp}/queues_state.json", "--no-ai", "--results-dir", f"{tmp}/results"])
+assert HEADLESS and not any(m.startswith("PyQt6") for m in sys.modules)
+sys.exit(code)
+'''
+
+
+class TestRunQueues:
+    """Тесты для команды run-queues."""
+
+    def test_runs_queue_without_qt(self, tmp_path):
+        """Тест: включенная очередь парсится заглушкой и сохраняется в results-dir, PyQt6 не импортируется."""
+        state = {
+            "0": {"name": "gpu", "search_tags": ["rtx 3060"], "max_items": 3, "queue_enabled": True},
+            "1": {"name": "off", "search_tags": ["gtx 1060"], "queue_enabled": False},
+            "2": {"name": "no tags", "search_tags": []},
+        }
+        (tmp_path / "queues_state.json").write_text(json.dumps(state), encoding="utf-8")
+
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env.pop("AVITO_HEADLESS", None)
+        proc = subprocess.run([sys.executable, "-c", RUNNER, str(tmp_path)], cwd=ROOT, env=env,
+                              capture_output=True, text=True, timeout=120)
+
+        assert proc.returncode == 0, proc.stderr
+        line = next(l for l in proc.stdout.splitlines() if l.startswith("OK\t"))
+        fields = line.split("\t")
+        assert fields[1] == "gpu"
+        assert "items=3" in fields and "requests=2" in fields
+
+        files = os.listdir(tmp_path / "results")
+        assert len(files) == 1 and files[0].startswith("avito_gpu_")
+        with gzip.open(tmp_path / "results" / files[0], "rt", encoding="utf-8") as f:
+            assert [item["title"] for item in json.load(f)] == ["rtx 3060 #0", "rtx 3060 #1", "rtx 3060 #2"]
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для ParserController в параллельном режиме:
+сигналы завершения несут индекс своей очереди.
+Парсер подменяется воркером-заглушкой.
+"""
+
+import time
+
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal, pyqtSlot
+
+from app.core.controller import ParserController
+
+APP = QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakeWorker(QObject):
+    """ParserWorker без браузера: отдает одну пачку и итог с тегом своей очереди"""
+
+    finished = pyqtSignal(list)
+    batch_ready = pyqtSignal(list)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    requests_count = pyqtSignal(int, int)
+
+    def __init__(self, tag: str, delay: float):
+        super().__init__()
+        self.tag = tag
+        self.delay = delay
+
+    @pyqtSlot()
+    def run(self):
+        time.sleep(self.delay)
+        items = [{'id': f"{self.tag}-1", 'title': self.tag}]
+        self.batch_ready.emit(items)
+        self.finished.emit(items)
+
+    def request_stop(self):
+        pass
+
+    def ack_batch(self):
+        pass
+
+
+class FakeAIManager:
+    """AIManager без нейросети: запоминает, что пришло в конвейер и на анализ после парсинга"""
+
+    def __init__(self, on_finished):
+        self.on_finished = on_finished
+        self._debug_logs = False
+        self.pipelined = {}
+        self.processed = []
+        self._context = None
+
+    def start_pipeline(self, context, debug_mode=False):
+        self._context = context
+        self.pipelined[context['queue_idx']] = []
+
+    def feed_pipeline(self, items):
+        self.pipelined[self._context['queue_idx']].extend(item['id'] for item in items)
+        return len(items)
+
+    def pipeline_has_capacity(self):
+        return True
+
+    def pipeline_size(self):
+        return len(self.pipelined[self._context['queue_idx']])
+
+    def close_pipeline(self):
+        if self._context is not None and self.pipeline_size():
+            QTimer.singleShot(0, self.on_finished)
+        self._context = None
+
+    def start_processing(self, items, prompt, debug_mode=False, context=None):
+        self.processed.append(context['queue_idx'])
+        QTimer.singleShot(0, self.on_finished)
+
+
+class TestParallelQueues:
+    """Тесты для параллельного запуска очередей."""
+
+    def test_finish_signals_carry_queue_index(self):
+        """Тест: parser_finished и results_batch_ready приходят с индексом своей очереди, а не нулевой."""
+        controller = ParserController()
+        controller.set_parallelism(3)
+        # Очереди заканчиваются в обратном порядке
+        delays = {"a": 0.3, "b": 0.15, "c": 0.0}
+        controller._create_parser_worker = lambda config, request_budget=None: FakeWorker(
+            config['name'], delays[config['name']])
+
+        finished, batches, done = [], [], []
+        controller.parser_finished.connect(lambda res, idx: finished.append((idx, res[0]['title'])))
+        controller.results_batch_ready.connect(lambda batch, idx: batches.append((idx, batch[0]['title'])))
+        controller.sequence_finished.connect(lambda: done.append(True))
+
+        controller.start_sequence([{'name': n, 'search_tags': [n]} for n in "abc"])
+        deadline = time.time() + 10
+        while not done and time.time() < deadline:
+            APP.processEvents()
+            time.sleep(0.01)
+
+        assert done
+        assert [idx for idx, _ in finished] == [2, 1, 0]
+        assert sorted(finished) == [(0, "a"), (1, "b"), (2, "c")]
+        assert sorted(batches) == [(0, "a"), (1, "b"), (2, "c")]
+        controller.cleanup()
+
+    def test_parallel_queue_uses_ai_pipeline(self):
+        """Тест: в параллельном режиме pipeline_ai работает — первая очередь подает пачки в конвейер, остальные идут на анализ после парсинга."""
+        controller = ParserController()
+        controller.set_parallelism(3)
+        controller.ai_manager = FakeAIManager(controller._on_ai_batch_finished)
+        delays = {"a": 0.3, "b": 0.15, "c": 0.0}
+        controller._create_parser_worker = lambda config, request_budget=None: FakeWorker(
+            config['name'], delays[config['name']])
+
+        done = []
+        controller.sequence_finished.connect(lambda: done.append(True))
+
+        controller.start_sequence([{'name': n, 'search_tags': [n], 'include_ai': True} for n in "abc"])
+        deadline = time.time() + 10
+        while not done and time.time() < deadline:
+            APP.processEvents()
+            time.sleep(0.01)
+
+        assert done
+        assert controller.ai_manager.pipelined == {0: ["a-1"]}
+        assert sorted(controller.ai_manager.processed) == [1, 2]
+        controller.cleanup()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для распределенного парсинга:
+JobQueue (аренда, heartbeat, слияние по ad_id) и прогон на localhost
+с несколькими процессами-узлами и replay-драйвером.
+"""
+
+import time
+import multiprocessing as mp
+
+from app.core.distributed.job_queue import JobQueue
+from app.core.distributed.coordinator import Coordinator
+from app.core.distributed.replay import ReplayDriver, build_listing_page
+
+
+def _item(ad_id, price=1000):
+    return {
+        "id": ad_id, "title": f"Видеокарта {ad_id}", "price": price,
+        "link": f"/moskva/tovary_dlya_kompyutera/videokarta_{ad_id}",
+    }
+
+
+def _lease_and_hang(db_path, run_id, leased):
+    """Узел, который взял задачу и завис (его убивает тест)"""
+    queue = JobQueue(db_path=db_path, lease_sec=5.0)
+    queue.lease("doomed", run_id=run_id)
+    leased.set()
+    time.sleep(600)
+
+
+def _replay_tasks(tmp_path, count):
+    pages, tasks, expected = {}, [], set()
+    for t in range(count):
+        base = f"https://www.avito.ru/moskva/videokarty_{t}?q=gpu&s=104"
+        tasks.append((base, f"Категория {t}"))
+        ids = [f"{t}{n}" for n in range(3)]
+        expected.update(ids)
+        pages[f"{base}&p=1"] = build_listing_page([_item(i) for i in ids])
+    replay_dir = str(tmp_path / "replay")
+    ReplayDriver.save_dir(replay_dir, pages)
+    return replay_dir, tasks, expected
+
+
+class TestJobQueue:
+    """Тесты для класса JobQueue."""
+
+    def test_expired_lease_is_taken_over(self, tmp_path):
+        """Тест: задачу умершего узла забирает другой, старый узел теряет аренду."""
+        queue = JobQueue(db_path=str(tmp_path / "jobs.db"), lease_sec=0.2)
+        queue.enqueue("run", [("https://www.avito.ru/a?q=1", "A")])
+
+        first = queue.lease("w1")
+        assert first and first["worker_id"] == "w1"
+        assert queue.lease("w2") is None
+
+        time.sleep(0.3)
+        second = queue.lease("w2")
+        assert second["id"] == first["id"] and second["attempts"] == 2
+        assert queue.heartbeat(first["id"], "w1") is False
+        assert queue.complete(first["id"], "w1") is False
+        assert queue.complete(second["id"], "w2") is True
+        assert queue.is_finished("run")
+        queue.close()
+
+    def test_enqueue_and_merge_are_idempotent(self, tmp_path):
+        """Тест: повторная постановка и повторная отправка товаров не создают дублей."""
+        queue = JobQueue(db_path=str(tmp_path / "jobs.db"))
+        tasks = [("https://www.avito.ru/a?q=1", "A"), ("https://www.avito.ru/b?q=1", "B")]
+        assert queue.enqueue("run", tasks) == 2
+        assert queue.enqueue("run", tasks) == 0
+
+        job = queue.lease("w1")
+        assert queue.submit_items("run", job["id"], "w1", [{"id": "1", "price": 10}]) == 1
+        assert queue.submit_items("run", job["id"], "w1", [{"id": "1", "views": 5}, {"id": "2"}]) == 1
+        results = {r["id"]: r for r in queue.get_results("run")}
+        assert set(results) == {"1", "2"}
+        assert results["1"]["price"] == 10 and results["1"]["views"] == 5
+        queue.close()
+
+    def test_lease_is_scoped_to_run(self, tmp_path):
+        """Тест: узел прогона не берет задачи чужого прогона."""
+        queue = JobQueue(db_path=str(tmp_path / "jobs.db"))
+        queue.enqueue("old", [("https://www.avito.ru/a?q=1", "A")])
+        queue.enqueue("new", [("https://www.avito.ru/b?q=1", "B")])
+
+        job = queue.lease("w1", run_id="new")
+        assert job["run_id"] == "new"
+        assert queue.lease("w1", run_id="new") is None
+        assert queue.lease("w2")["run_id"] == "old"
+        queue.close()
+
+
+class TestLocalCluster:
+    """Прогон координатора с несколькими узлами на localhost."""
+
+    def test_workers_scrape_all_jobs(self, tmp_path):
+        """Тест: два процесса-узла разбирают все задачи, товары сливаются по ad_id."""
+        pages = {}
+        tasks = []
+        expected = set()
+        for t in range(3):
+            base = f"https://www.avito.ru/moskva/videokarty_{t}?q=gpu&s=104"
+            tasks.append((base, f"Категория {t}"))
+            for page in (1, 2):
+                ids = [f"{t}{page}{n}" for n in range(3)] + ["shared"]
+                expected.update(ids)
+                pages[f"{base}&p={page}"] = build_listing_page([_item(i) for i in ids], has_next=page == 1)
+        replay_dir = str(tmp_path / "replay")
+        ReplayDriver.save_dir(replay_dir, pages)
+
+        coordinator = Coordinator(JobQueue(db_path=str(tmp_path / "jobs.db")), run_id="test")
+        assert coordinator.submit_tasks(tasks, search_mode="primary", max_pages=5) == 3
+        coordinator.spawn_local_workers(2, replay_dir=replay_dir, idle_exit_sec=3.0)
+
+        assert coordinator.wait(timeout=120, poll_sec=0.5)
+        coordinator.stop_workers(timeout=30)
+
+        results = coordinator.results()
+        assert {r["id"] for r in results} == expected
+        assert len(results) == len(expected)
+        assert all(j["status"] == "done" for j in coordinator.queue.get_jobs("test"))
+        coordinator.queue.close()
+
+    def test_killed_worker_job_is_finished(self, tmp_path):
+        """Тест: задачу убитого посреди работы узла доделывают, даже если остальные ушли по простою."""
+        replay_dir, tasks, expected = _replay_tasks(tmp_path, 2)
+        db_path = str(tmp_path / "jobs.db")
+        coordinator = Coordinator(JobQueue(db_path=db_path), run_id="test")
+        coordinator.submit_tasks(tasks, search_mode="primary", max_pages=1)
+
+        ctx = mp.get_context("spawn")
+        leased = ctx.Event()
+        doomed = ctx.Process(target=_lease_and_hang, args=(db_path, "test", leased), daemon=True)
+        doomed.start()
+        assert leased.wait(60)
+        doomed.kill()
+        doomed.join(10)
+
+        # Простой меньше аренды: узел доделает вторую задачу и уйдет раньше, чем истечет аренда первой
+        coordinator.spawn_local_workers(1, replay_dir=replay_dir, idle_exit_sec=0.2, lease_sec=1.0)
+        assert coordinator.wait(timeout=120, poll_sec=0.5)
+        coordinator.stop_workers(timeout=30)
+
+        assert {r["id"] for r in coordinator.results()} == expected
+        jobs = coordinator.queue.get_jobs("test")
+        assert all(j["status"] == "done" for j in jobs)
+        assert max(j["attempts"] for j in jobs) == 2
+        coordinator.queue.close()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для пула выходов (EgressPool):
+выбор здорового выхода, остывание после бана, лимиты на выход
+и общее состояние выходов между процессами.
+"""
+
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from app.core.egress import EgressExit, EgressPool, EgressState
+from app.core.parser import PageLoader
+from app.core.distributed.replay import ReplayDriver, ReplayDriverManager
+
+
+class _FailingDriver(ReplayDriver):
+    """Драйвер, у которого каждый переход падает (мертвый прокси)"""
+
+    def get(self, url: str):
+        self.requests.append(url)
+        raise WebDriverException("net::ERR_PROXY_CONNECTION_FAILED")
+
+
+class TestEgressPool:
+    """Тесты для класса EgressPool."""
+
+    def test_routes_to_healthiest_exit(self):
+        """Тест: запрос уходит через выход с лучшей историей."""
+        good = EgressExit("http://good:1", rate_per_min=600, burst=5)
+        bad = EgressExit("http://bad:1", rate_per_min=600, burst=5)
+        good.requests, good.successes = 10, 10
+        bad.requests, bad.successes = 10, 2
+        pool = EgressPool([bad, good])
+
+        assert pool.best() is good
+        assert pool.acquire() is good
+
+    def test_ban_cools_exit_and_rotates(self):
+        """Тест: бан отправляет выход на остывание, очередь идет через другой без ожидания."""
+        a = EgressExit("http://a:1", rate_per_min=600, burst=5)
+        b = EgressExit("http://b:1", rate_per_min=600, burst=5)
+        pool = EgressPool([a, b], cooldown_base=60, cooldown_max=600)
+
+        assert pool.acquire(preferred=a) is a
+        assert pool.report_ban(a) == 60
+        assert a.is_cooling() and a.health() < 0
+
+        t0 = time.time()
+        assert pool.acquire(preferred=a) is b
+        assert time.time() - t0 < 0.5
+        assert pool.best(exclude=[b]) is None
+
+        # Повторный бан подряд — остывание вдвое дольше
+        a.cooldown_until = 0
+        assert pool.report_ban(a) == 120
+
+    def test_per_exit_rate_limit_scales_with_exits(self):
+        """Тест: у каждого выхода свой лимит, несколько выходов дают больше запросов."""
+        def drain(pool, seconds=0.6):
+            count, deadline = 0, time.time() + seconds
+            while time.time() < deadline:
+                if pool.acquire(stop_check=lambda: time.time() >= deadline):
+                    count += 1
+            return count
+
+        single = EgressPool([EgressExit("http://x:1", rate_per_min=60, burst=2)], switch_after=0)
+        triple = EgressPool(
+            [EgressExit(f"http://x{i}:1", rate_per_min=60, burst=2) for i in range(3)], switch_after=0
+        )
+        assert drain(single) == 2
+        assert drain(triple) == 6
+
+
+class TestEgressState:
+    """Тесты для общего состояния выходов (EgressState)."""
+
+    def test_state_is_shared_between_pools(self, tmp_path):
+        """Тест: пулы разных процессов (свой EgressState на один файл) делят баны и токены."""
+        path = str(tmp_path / "egress.db")
+
+        def make_pool():
+            exits = [EgressExit("http://a:1", rate_per_min=1, burst=2), EgressExit("http://b:1", rate_per_min=1, burst=2)]
+            return EgressPool(exits, cooldown_base=60, switch_after=0, state=EgressState(path))
+
+        first, second = make_pool(), make_pool()
+        a1, a2 = first.exits[0], second.exits[0]
+
+        first.report_ban(a1)
+        assert second.best() is second.exits[1]
+        assert a2.is_cooling() and a2.consecutive_bans == 1
+
+        # Оба токена выхода b забирает первый пул, второму остается только ждать
+        assert first.acquire() is first.exits[1]
+        assert first.acquire() is first.exits[1]
+        deadline = time.time() + 0.3
+        assert second.acquire(stop_check=lambda: time.time() >= deadline) is None
+        assert second.snapshot()[1]["requests"] == 2
+        first.state.close()
+        second.state.close()
+
+    def test_load_error_is_reported_to_exit(self):
+        """Тест: ошибка загрузки страницы засчитывается текущему выходу."""
+        manager = ReplayDriverManager(_FailingDriver())
+        manager.egress_pool = EgressPool([EgressExit(None, rate_per_min=600, burst=5)])
+        manager.current_exit = manager.egress_pool.exits[0]
+        manager.set_speed_multiplier(0.1)
+
+        assert not PageLoader.safe_get(manager.driver, "https://www.avito.ru/moskva", driver_manager=manager)
+        assert manager.current_exit.errors == 4
+        assert manager.current_exit.successes == 0
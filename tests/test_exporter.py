@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для экспорта таблиц (CSV/XLSX): потоковая запись, чтение файла
+результатов порциями, прогресс и отмена.
+"""
+
+import csv
+import os
+
+import openpyxl
+import pytest
+
+from app.core.exporter import ExportCancelled, export_table
+from app.core.results_store import ResultsStore
+
+
+def _items(n):
+    return [
+        {"id": str(i), "price": 1000 + i, "title": f"Товар {i}", "link": f"https://www.avito.ru/x_{i}",
+         "views": i, "date_text": "вчера", "city": "Москва", "description": "д" * 150,
+         "ai": {"verdict": "GOOD", "reason": "дешево"}}
+        for i in range(n)
+    ]
+
+
+class TestExporter:
+    """Тесты для модуля exporter."""
+
+    def test_csv_export(self, tmp_path):
+        """Тест: CSV содержит заголовок, строки и обрезанное описание; прогресс сообщается."""
+        out = str(tmp_path / "table.csv")
+        progress = []
+        count = export_table(out, items=_items(1200), total=1200,
+                             on_progress=lambda done, total: progress.append((done, total)))
+        assert count == 1200
+        with open(out, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[0][0] == "ID" and len(rows) == 1201
+        assert rows[1] == ["0", "1000", "Товар 0", "https://www.avito.ru/x_0", "0", "вчера", "Москва",
+                           "д" * 100 + "...", "GOOD: дешево"]
+        assert progress[-1] == (1200, 1200)
+
+    def test_xlsx_from_results_file(self, tmp_path):
+        """Тест: XLSX из файла результатов с гиперссылкой в названии и жирным заголовком."""
+        src = str(tmp_path / "avito_test.json")
+        store = ResultsStore(src)
+        store.rewrite(_items(30))
+        store.close()
+
+        out = str(tmp_path / "table.xlsx")
+        assert export_table(out, path=src) == 30
+
+        ws = openpyxl.load_workbook(out).active
+        assert ws.max_row == 31
+        assert ws["A1"].font.bold and ws["C1"].value == "Название (ссылка)"
+        assert ws["C2"].value == "Товар 0" and ws["C2"].hyperlink.target == "https://www.avito.ru/x_0"
+        assert ws["H2"].value == "GOOD: дешево"
+        assert ws.column_dimensions["G"].width == 50
+
+    def test_cancel_leaves_no_file(self, tmp_path):
+        """Тест: отмена прерывает экспорт и не оставляет файлов."""
+        out = str(tmp_path / "table.xlsx")
+        with pytest.raises(ExportCancelled):
+            export_table(out, items=_items(2000), is_cancelled=lambda: True)
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для компактного представления товаров (CompactItem):
+совместимость с dict, общие с ai поля, сериализация и расход памяти.
+"""
+
+import json
+import random
+import tracemalloc
+
+from app.core.item_store import CompactItem, compact_items
+from app.core.results_store import ResultsStore, load_results
+
+
+def _item(i, with_ai=True):
+    words = "видеокарта отличное состояние торг доставка гарантия чек коробка игровая тихая".split()
+    item = {
+        "id": str(4000000000 + i), "link": f"/moskva/tovary/videokarta_{4000000000 + i}",
+        "price": 20000 + i, "title": f"Видеокарта RTX 3060 #{i}", "date_text": "3 дня назад",
+        "description": " ".join(random.choice(words) for _ in range(60)),
+        "city": random.choice(["Москва", "Казань", "Тверь"]), "condition": "Б/У",
+        "seller_id": "s" * 32, "views": i % 500, "parsed_at": "2025-02-01T10:00:00", "starred": False,
+    }
+    if with_ai:
+        ai = {"verdict": "GOOD", "reason": f"Цена ниже рынка #{i}", "market_position": "below", "defects": []}
+        item.update(ai=ai, ai_comment=json.dumps(ai, ensure_ascii=False),
+                    verdict=ai["verdict"], reason=ai["reason"], market_position="below", defects=[])
+    return item
+
+
+class TestCompactItem:
+    """Тесты для класса CompactItem."""
+
+    def test_behaves_like_dict(self):
+        """Тест: чтение, запись, удаление и копия работают как у словаря."""
+        src = _item(1)
+        src["custom"] = {"x": 1}
+        item = CompactItem.from_dict(src)
+
+        assert item == src and dict(item) == src and item.copy() == src
+        assert item["description"] == src["description"]
+        assert item.get("missing", "-") == "-" and "missing" not in item
+
+        item["starred"] = True
+        item.update({"price": 1, "note": "n"})
+        assert item["starred"] is True and item["price"] == 1 and item["note"] == "n"
+        del item["note"]
+        assert "note" not in item
+        assert item.pop("custom") == {"x": 1}
+        assert item.setdefault("views", 5) == src["views"]
+
+    def test_ai_fields_follow_ai_dict(self):
+        """Тест: поля вердикта не дублируются, но сохраняют значения при замене ai."""
+        item = CompactItem.from_dict(_item(2))
+        assert item["verdict"] == "GOOD" and item["reason"] == "Цена ниже рынка #2"
+
+        item["ai"] = {"verdict": "BAD", "reason": "дорого"}
+        assert item["verdict"] == "GOOD" and item["reason"] == "Цена ниже рынка #2"
+        item["verdict"] = "BAD"
+        assert item["verdict"] == "BAD"
+
+    def test_serialization_through_results_store(self, tmp_path):
+        """Тест: компактные товары сохраняются и читаются как обычные словари."""
+        src = [_item(i) for i in range(5)]
+        path = str(tmp_path / "avito_compact.json")
+        store = ResultsStore(path)
+        store.rewrite(compact_items(src))
+        store.close()
+        assert load_results(path) == src
+
+    def test_memory_is_a_fraction_of_dicts(self):
+        """Тест: компактное представление занимает заметно меньше памяти."""
+        text = json.dumps([_item(i) for i in range(3000)], ensure_ascii=False)
+
+        tracemalloc.start()
+        plain = json.loads(text)
+        plain_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        compact = compact_items(json.loads(text))
+        compact_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        assert len(compact) == len(plain)
+        assert compact_size < plain_size * 0.6
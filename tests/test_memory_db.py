@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для баз памяти ИИ (RawDataManager, KnowledgeManager):
+пул соединений, конкурентный доступ, пакетное добавление, постраничное чтение, счетчики,
+поиск, RAG, история цен, рыночная статистика, экспорт и импорт.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+from PyQt6.QtCore import QThread
+
+from app.core.memory.market_stats import MarketGroup
+from app.core.memory.raw_data_manager import RawDataManager
+from app.core.memory.knowledge_manager import KnowledgeManager
+from app.core.text_utils import FeatureExtractor
+
+
+def _item(i):
+    return {"id": str(1000 + i), "title": f"Видеокарта RTX 3060 #{i}", "price": 20000 + i,
+            "description": "отличное состояние", "city": "Москва", "views": i,
+            "link": f"https://www.avito.ru/moskva/tovary/x_{1000 + i}"}
+
+
+def _db_reads(statements):
+    """Запросы к БД, кроме проверки PRAGMA data_version на записи других процессов"""
+    return [s for s in statements if s != "PRAGMA data_version"]
+
+
+class TestConnectionPool:
+    """Тесты для пула соединений SQLite."""
+
+    def test_connection_is_reused_per_thread(self, tmp_path):
+        """Тест: поток получает одно постоянное соединение в режиме WAL."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        first = raw._pool.connection()
+        raw.get_statistics()
+        assert raw._pool.connection() is first
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert first.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(raw._pool.connection()))
+        t.start()
+        t.join()
+        assert other[0] is not first
+
+        raw.reset_database()
+        assert raw.get_statistics()["total_items"] == 0
+
+    def test_connection_closed_when_thread_exits(self, tmp_path):
+        """Тест: соединение потока (в том числе QThread) закрывается после его завершения."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.get_statistics()
+        conns = []
+
+        class Reader(QThread):
+            def run(self):
+                raw.get_statistics()
+                conns.append(raw._pool.connection())
+
+        reader = Reader()
+        reader.start()
+        reader.wait()
+        t = threading.Thread(target=lambda: conns.append(raw._pool.connection()))
+        t.start()
+        t.join()
+
+        for conn in conns:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        assert len(raw._pool._conns) == 1
+
+    def test_concurrent_readers_and_writers(self, tmp_path):
+        """Тест: параллельные запись и чтение из разных потоков проходят без ошибок блокировки."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        knowledge = KnowledgeManager(db_path=str(tmp_path / "knowledge.db"))
+        errors = []
+        statuses = []
+
+        def writer(offset):
+            try:
+                for i in range(offset, offset + 40):
+                    statuses.append(raw.add_raw_item(_item(i), categories=["gpu"], product_keys=["rtx_3060"]))
+                    knowledge.add_knowledge("PRODUCT", f"key_{i}", f"Chunk {i}")
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(40):
+                    raw.get_raw_items(limit=20)
+                    knowledge.get_statistics()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(k * 100,)) for k in range(3)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert statuses.count("created") == 120
+        assert raw.get_statistics()["total_items"] == 120
+        assert knowledge.get_statistics()["total_chunks"] == 120
+
+
+class TestSharedGeneration:
+    """Тесты для сброса кэшей по записям другого процесса (таблица cache_generation)."""
+
+    def test_other_process_writes_drop_caches(self, tmp_path):
+        """Тест: статистика, рынок и RAG-индекс видят записи второго менеджера той же базы."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        other = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(i) for i in range(3)], categories=["gpu"], product_keys=["rtx_3060"])
+        assert raw.get_statistics()["total_items"] == 3
+        assert raw.get_market_stats("rtx_3060")["count"] == 3
+
+        other.add_raw_items([_item(i) for i in range(3, 5)], categories=["gpu"], product_keys=["rtx_3060"])
+        assert raw.get_statistics()["total_items"] == 5
+        assert raw.get_market_stats("rtx_3060")["count"] == 5
+        assert raw.get_all_categories()[0]["item_count"] == 5
+
+        # Своя запись после чужой тоже замечает чужую
+        other.delete_raw_items([i["id"] for i in other.get_raw_items(limit=1)])
+        raw.add_raw_items([_item(9)], product_keys=["rtx_3060"])
+        assert raw.get_market_stats("rtx_3060")["count"] == 5
+
+        knowledge = KnowledgeManager(db_path=str(tmp_path / "knowledge.db"))
+        assert knowledge.search_chunks("Rtx 3060") == []
+        KnowledgeManager(db_path=str(tmp_path / "knowledge.db")).add_knowledge(
+            "PRODUCT", "rtx_3060", "Анализ рынка: Rtx 3060", status="READY")
+        assert knowledge.search_chunks("Rtx 3060")[0]["chunk_key"] == "rtx_3060"
+        assert knowledge.get_statistics()["total_chunks"] == 1
+
+
+class TestBulkIngest:
+    """Тесты для пакетного добавления товаров (add_raw_items)."""
+
+    def test_statuses_and_relations(self, tmp_path):
+        """Тест: статусы как у add_raw_item, связи создаются один раз на пакет."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        assert raw.add_raw_items([_item(1), _item(2)], categories=["gpu"], product_keys=["rtx_3060"]) \
+            == ["created", "created"]
+
+        same = dict(_item(1), views=0)
+        cheaper = dict(_item(2), price=15000, views=0)
+        statuses = raw.add_raw_items([same, cheaper, _item(3), dict(_item(3), price=1, views=0)],
+                                     item_categories=[["gpu"], ["gpu"], ["misc"], []],
+                                     item_product_keys=[[], [], ["rtx_3060"], []])
+        assert statuses == ["skipped", "updated", "created", "updated"]
+
+        items = {i["ad_id"]: i for i in raw.get_raw_items(limit=10)}
+        assert items["1002"]["price"] == 15000 and items["1003"]["price"] == 1
+        assert sorted(items["1003"]["categories"]) == ["misc"]
+        assert items["1003"]["product_keys"] == ["rtx_3060"]
+        assert {c["name"] for c in raw.get_all_categories()} == {"gpu", "misc"}
+
+    def test_title_and_description_changes_are_saved(self, tmp_path):
+        """Тест: новый заголовок и описание сохраняются в колонки и поисковый индекс."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(1)])
+
+        edited = dict(_item(1), title="Видеокарта RTX 4070", description="обмен не нужен", views=0)
+        assert raw.add_raw_items([edited]) == ["updated"]
+        assert raw.add_raw_items([edited]) == ["skipped"]
+
+        item = raw.get_raw_items(limit=10)[0]
+        assert item["title"] == "Видеокарта RTX 4070" and item["description"] == "обмен не нужен"
+        assert item["price"] == _item(1)["price"]
+        assert [i["ad_id"] for i in raw.get_raw_items(search_query="4070")] == ["1001"]
+
+    def test_bulk_ingest_of_10k_items(self, tmp_path):
+        """Тест: 10 тысяч товаров добавляются одним вызовом вместе со связями."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        items = [_item(i) for i in range(10000)]
+        statuses = raw.add_raw_items(items, categories=["gpu"], product_keys=["rtx_3060"])
+
+        assert statuses.count("created") == 10000
+        assert raw.get_raw_items_count(product_key="rtx_3060") == 10000
+        assert raw.get_statistics()["total_items"] == 10000
+
+
+class TestItemReads:
+    """Тесты для чтения товаров со связями."""
+
+    def test_relations_are_fetched_in_bulk(self, tmp_path):
+        """Тест: страница товаров со связями читается фиксированным числом запросов."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(i) for i in range(300)],
+                          item_categories=[["gpu", "pc"] if i % 2 else ["gpu"] for i in range(300)],
+                          item_product_keys=[["rtx_3060"] for _ in range(300)])
+
+        statements = []
+        raw._pool.connection().set_trace_callback(statements.append)
+        items = raw.get_raw_items(limit=300)
+        assert len(items) == 300 and len(statements) <= 4
+
+        by_ad = {i["ad_id"]: i for i in items}
+        assert sorted(by_ad["1001"]["categories"]) == ["gpu", "pc"]
+        assert by_ad["1002"]["categories"] == ["gpu"] and by_ad["1002"]["product_keys"] == ["rtx_3060"]
+
+        bare = raw.get_items_for_product_key("rtx_3060", with_relations=False)
+        assert len(bare) == 300 and "categories" not in bare[0]
+        assert raw.get_raw_item_by_id(by_ad["1001"]["id"])["product_keys"] == ["rtx_3060"]
+
+    def test_keyset_pages_cover_filtered_items(self, tmp_path):
+        """Тест: постраничное чтение по курсору проходит все товары фильтра без повторов и пропусков."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        for batch in range(3):
+            raw.add_raw_items([_item(batch * 100 + i) for i in range(100)],
+                              item_categories=[["gpu"] if i % 3 else ["pc"] for i in range(100)])
+
+        pages = list(raw.iter_raw_items(category="gpu", page_size=25, with_relations=False))
+        ids = [i["id"] for page in pages for i in page]
+        assert len(ids) == len(set(ids)) == raw.get_raw_items_count(category="gpu") == 198
+        assert ids == [i["id"] for i in raw.get_raw_items(category="gpu", limit=1000, with_relations=False)]
+
+        second = raw.get_raw_items(category="gpu", limit=25, after=raw.page_cursor(pages[0]))
+        assert [i["id"] for i in second] == [i["id"] for i in pages[1]]
+        assert len(raw.get_items_for_product_key("rtx_3060")) == 0
+
+
+class TestCounters:
+    """Тесты для счетчиков товаров и кэша статистики."""
+
+    def _recount(self, raw):
+        with raw._connection() as conn:
+            cats = dict(conn.execute("""
+                SELECT c.name, COUNT(ric.raw_item_id) FROM categories c
+                LEFT JOIN raw_items_categories ric ON ric.category_id = c.id GROUP BY c.id"""))
+            total, avg = conn.execute("SELECT COUNT(*), AVG(CASE WHEN price > 0 THEN price END) FROM raw_items").fetchone()
+        return cats, total, round(avg or 0, 2)
+
+    def test_counters_follow_writes_and_cache_is_invalidated(self, tmp_path):
+        """Тест: счетчики совпадают с пересчетом, повторное чтение идет из кэша до следующей записи."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(i) for i in range(30)],
+                          item_categories=[["gpu", "pc"] if i % 2 else ["gpu"] for i in range(30)],
+                          product_keys=["rtx_3060"])
+        raw.add_raw_items([dict(_item(1), price=5000), dict(_item(2), price=0)])
+        raw.delete_raw_items([i["id"] for i in raw.get_raw_items(category="pc", limit=5)])
+
+        cats, total, avg = self._recount(raw)
+        assert {c["name"]: c["item_count"] for c in raw.get_all_categories()} == cats == {"gpu": 25, "pc": 10}
+        assert raw.get_all_product_keys()[0]["item_count"] == 25
+        stats = raw.get_statistics()
+        assert (stats["total_items"], stats["avg_price"]) == (total, avg)
+
+        statements = []
+        raw._pool.connection().set_trace_callback(statements.append)
+        raw.get_all_categories()
+        raw.get_statistics()
+        assert _db_reads(statements) == []
+        raw.add_raw_items([_item(100)], categories=["gpu"])
+        assert raw.get_statistics()["total_items"] == total + 1
+
+    def test_migration_fills_counters(self, tmp_path):
+        """Тест: база версии 5 получает счетчики по уже сохраненным товарам."""
+        db = str(tmp_path / "raw.db")
+        raw = RawDataManager(db_path=db)
+        raw.add_raw_items([_item(i) for i in range(7)], categories=["gpu"])
+        with raw._connection() as conn:
+            conn.execute("UPDATE categories SET item_count = 0")
+            conn.execute("UPDATE raw_stats SET item_count = 0, priced_count = 0, price_sum = 0")
+            conn.execute("UPDATE schema_version SET version = 5")
+            conn.commit()
+        raw._pool.close_all()
+
+        migrated = RawDataManager(db_path=db)
+        assert migrated.get_all_categories()[0]["item_count"] == 7
+        assert migrated.get_statistics()["total_items"] == 7
+
+
+class TestFullTextSearch:
+    """Тесты для полнотекстового поиска (FTS5)."""
+
+    def test_search_ranks_and_follows_changes(self, tmp_path):
+        """Тест: поиск по префиксам слов, ранжирование bm25, сниппеты и синхронизация триггерами."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([
+            {"id": "1", "title": "Видеокарта RTX 3060", "description": "почти новая", "city": "Москва", "price": 1},
+            {"id": "2", "title": "Игровой компьютер", "description": "внутри видеокарта rtx 3060", "city": "Казань",
+             "price": 1},
+            {"id": "3", "title": "Монитор", "description": "без битых пикселей", "city": "Москва", "price": 1},
+        ])
+
+        found = raw.get_raw_items(search_query="видеокарт rtx")
+        assert [i["ad_id"] for i in found] == ["1", "2"]
+        assert found[0]["rank"] < found[1]["rank"]
+        assert "[Видеокарта]" in found[0]["snippet"]
+        assert sorted(i["ad_id"] for i in raw.get_raw_items(search_query="москв")) == ["1", "3"]
+
+        with raw._connection() as conn:
+            conn.execute("UPDATE raw_items SET title = 'Монитор 4K' WHERE ad_id = '1'")
+            conn.commit()
+        raw.delete_raw_items([i["id"] for i in raw.get_raw_items(search_query="компьютер")])
+        assert raw.get_raw_items(search_query="видеокарт rtx") == []
+        assert sorted(i["ad_id"] for i in raw.get_raw_items(search_query="монитор")) == ["1", "3"]
+
+    def test_search_pages_by_cursor(self, tmp_path):
+        """Тест: поиск с курсором after идет по страницам без повторов и пропусков."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(i) for i in range(30)] +
+                          [dict(_item(i), title="Монитор", description="без битых пикселей") for i in range(30, 40)])
+
+        pages, after = [], None
+        while True:
+            page = raw.get_raw_items(search_query="видеокарт", limit=7, with_relations=False, after=after)
+            if not page:
+                break
+            pages.append(page)
+            after = raw.page_cursor(page)
+        ids = [i["id"] for page in pages for i in page]
+        assert len(pages) == 5 and len(ids) == len(set(ids)) == 30
+        assert ids == [i["id"] for i in raw.get_raw_items(search_query="видеокарт", limit=100, with_relations=False)]
+
+    def test_migration_indexes_existing_items(self, tmp_path):
+        """Тест: база версии 2 получает индекс по уже сохраненным товарам."""
+        db = str(tmp_path / "raw.db")
+        raw = RawDataManager(db_path=db)
+        raw.add_raw_items([_item(i) for i in range(5)])
+        with raw._connection() as conn:
+            for name in ("raw_items_fts_ai", "raw_items_fts_ad", "raw_items_fts_au"):
+                conn.execute(f"DROP TRIGGER {name}")
+            conn.execute("DROP TABLE raw_items_fts")
+            conn.execute("UPDATE schema_version SET version = 2")
+            conn.commit()
+        raw._pool.close_all()
+
+        migrated = RawDataManager(db_path=db)
+        assert len(migrated.search_raw_items("видеокарта")) == 5
+
+
+class TestRagIndex:
+    """Тесты для RAG-поиска чанков знаний."""
+
+    def _ready(self, knowledge, chunk_key, title, median):
+        chunk_id = knowledge.add_knowledge("PRODUCT", chunk_key, title)
+        knowledge.update_chunk_content(chunk_id, {"summary": title, "analysis": {
+            "price_analysis": {"median": median, "avg": median}, "sample_count": 10}})
+        return chunk_id
+
+    def test_finds_matching_chunk_and_follows_updates(self, tmp_path):
+        """Тест: по заголовку товара находится свой чанк, индекс обновляется при изменении чанков."""
+        knowledge = KnowledgeManager(db_path=str(tmp_path / "knowledge.db"))
+        self._ready(knowledge, "rtx_3060", "Анализ рынка: Rtx 3060", 25000)
+        self._ready(knowledge, "rtx 3070 gaming", "Анализ рынка: Rtx 3070 Gaming", 35000)
+        washer = self._ready(knowledge, "стиральная машина samsung", "Анализ рынка: Стиральная Машина Samsung", 15000)
+        knowledge.add_knowledge("DATABASE", "general", "Глобальная аналитика базы", status="READY")
+
+        rag = knowledge.get_rag_context_for_item("Видеокарта MSI GeForce RTX 3060 Ventus 2X 12GB")
+        assert rag["chunk_key"] == "rtx_3060" and rag["median_price"] == 25000
+
+        top = knowledge.search_chunks("Стиральные машины Samsung", top_k=2)
+        assert top[0]["id"] == washer and top[0]["score"] > 0.5
+        assert knowledge.get_rag_context_for_item("Холодильник Атлант") is None
+
+        knowledge.update_chunk_status(washer, "PENDING")
+        assert all(c["id"] != washer for c in knowledge.search_chunks("Стиральные машины Samsung"))
+
+
+    def test_accessory_titles_do_not_match_product_chunk(self, tmp_path):
+        """Тест: чехол и кабель не получают рынок самого iPhone 12 и PlayStation 5, лишние слова снижают сходство."""
+        knowledge = KnowledgeManager(db_path=str(tmp_path / "knowledge.db"))
+        self._ready(knowledge, "iphone 12", "Анализ рынка: Iphone 12", 30000)
+        self._ready(knowledge, "playstation 5", "Анализ рынка: Playstation 5", 45000)
+        self._ready(knowledge, "чехол iphone", "Анализ рынка: Чехол Iphone", 500)
+
+        assert knowledge.get_rag_context_for_item("Apple iPhone 12 128GB")["chunk_key"] == "iphone 12"
+        assert knowledge.get_rag_context_for_item("Sony PlayStation 5 Digital Edition")["chunk_key"] == "playstation 5"
+        assert knowledge.get_rag_context_for_item("Чехол силиконовый для iPhone 12 Pro Max")["chunk_key"] \
+            == "чехол iphone"
+        assert knowledge.get_rag_context_for_item("Кабель HDMI 2.1 для PlayStation 5") is None
+
+        short = knowledge.search_chunks("iPhone 12", top_k=1)[0]["score"]
+        long = knowledge.search_chunks("iPhone 12 Pro Max 256GB Graphite", top_k=1)[0]["score"]
+        assert long < short - 0.2
+
+
+class TestPriceHistory:
+    """Тесты для истории цен (price_observations, price_daily)."""
+
+    def test_observations_daily_aggregates_and_trend(self, tmp_path, monkeypatch):
+        """Тест: изменения цен пишутся в историю, дневные агрегаты и тренд считаются по ним."""
+        import app.core.memory.raw_data_manager as rdm
+
+        today = {"value": datetime(2025, 3, 1, 12, 0)}
+
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return today["value"]
+
+        monkeypatch.setattr(rdm, "datetime", FakeDatetime)
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+
+        def ingest(prices):
+            items = [dict(_item(i), price=p, views=0) for i, p in enumerate(prices)]
+            return raw.add_raw_items(items, product_keys=["rtx_3060"])
+
+        ingest([20000, 22000, 24000])
+        today["value"] = datetime(2025, 3, 10, 12, 0)
+        assert ingest([20000, 25000, 27000]) == ["skipped", "updated", "updated"]
+        today["value"] = datetime(2025, 3, 20, 12, 0)
+        ingest([26000, 28000, 30000])
+
+        history = raw.get_price_history("1001")
+        assert [h["price"] for h in history] == [22000, 25000, 28000]
+        assert [h["price"] for h in raw.get_price_history("1000")] == [20000, 26000]
+
+        daily = raw.get_daily_prices("rtx_3060")
+        assert [d["day"] for d in daily] == ["2025-03-01", "2025-03-10", "2025-03-20"]
+        assert (daily[0]["min_price"], daily[0]["median_price"], daily[0]["max_price"]) == (20000, 22000, 24000)
+        assert daily[1]["sample_count"] == 2 and daily[1]["median_price"] == 26000
+
+        trend = raw.get_price_trend("rtx_3060")
+        assert trend["trend"] == "up" and trend["trend_percent"] > 10 and trend["days"] == 3
+        assert raw.get_price_trend("unknown") is None
+
+
+class TestMarketStats:
+    """Тесты для рыночной статистики в памяти (MarketStatsCache)."""
+
+    def test_stats_follow_ingest_and_deletes(self, tmp_path):
+        """Тест: статистика ключа и категории совпадает с пересчетом по БД после добавлений и удалений."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([dict(_item(i), price=p) for i, p in enumerate([10000, 20000, 30000, 40000])],
+                          categories=["gpu"], product_keys=["rtx_3060"])
+
+        stats = raw.get_market_stats("rtx_3060")
+        assert (stats["count"], stats["mean"], stats["median"]) == (4, 25000, 25000)
+        assert (stats["q25"], stats["q75"], stats["min"], stats["max"]) == (17500, 32500, 10000, 40000)
+
+        raw.add_raw_items([dict(_item(0), price=50000), dict(_item(9), price=0)], product_keys=["rtx_3060"])
+        statements = []
+        raw._pool.connection().set_trace_callback(statements.append)
+        stats = raw.get_market_stats("rtx_3060")
+        assert _db_reads(statements) == []
+        assert (stats["count"], stats["min"], stats["max"], stats["median"]) == (4, 20000, 50000, 35000)
+        assert raw.get_category_market_stats("gpu")["max"] == 50000
+
+        top = [i for i in raw.get_raw_items(product_key="rtx_3060", limit=10) if i["price"] == 50000]
+        raw.delete_raw_items([top[0]["id"]])
+        assert raw.get_market_stats("rtx_3060")["max"] == 40000
+        assert [s["product_key"] for s in raw.get_all_market_stats()] == ["rtx_3060"]
+        assert raw.get_market_stats("unknown") is None
+
+    def test_weighted_median_prefers_recent_prices(self, tmp_path):
+        """Тест: взвешенная медиана смещается к свежим ценам."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([dict(_item(i), price=10000) for i in range(3)], product_keys=["rtx_3060"])
+        with raw._connection() as conn:
+            conn.execute("UPDATE raw_items SET analyzed_at = '2024-01-01T00:00:00'")
+            conn.commit()
+        raw._market.invalidate()
+        raw.add_raw_items([dict(_item(i), price=30000) for i in range(3, 5)], product_keys=["rtx_3060"])
+
+        stats = raw.get_market_stats("rtx_3060")
+        assert stats["median"] == 10000 and stats["weighted_median"] == 30000
+
+
+    def test_batches_match_full_recount(self):
+        """Тест: слияние пачек изменений дает ту же статистику, что пересчет с нуля."""
+        rng = random.Random(7)
+        group = MarketGroup(half_life_days=14)
+        state = {}
+        for _ in range(30):
+            changes = {}
+            for _ in range(rng.randint(1, 20)):
+                ad_id = str(rng.randint(0, 60))
+                value = None if rng.random() < 0.2 else (rng.randint(1, 50) * 1000, 1.7e9 + rng.randint(0, 90) * 86400)
+                changes[ad_id] = value
+            group.apply(changes)
+            for ad_id, value in changes.items():
+                if value is None:
+                    state.pop(ad_id, None)
+                else:
+                    state[ad_id] = value
+            if not state:
+                continue
+            fresh = MarketGroup(half_life_days=14)
+            fresh.apply(dict(state))
+            assert group.snapshot() == fresh.snapshot()
+            assert [p for p, _ in group.entries] == sorted(p for p, _ in state.values())
+
+    def test_free_text_is_matched_to_known_key_in_memory(self, tmp_path):
+        """Тест: заголовок без своего ключа получает статистику известного ключа без запросов к БД."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(i) for i in range(3)], product_keys=["iphone_12"])
+        raw.add_raw_items([_item(i) for i in range(3, 8)], product_keys=["iphone_12_pro"])
+        raw.get_market_stats("iphone_12")
+
+        statements = []
+        raw._pool.connection().set_trace_callback(statements.append)
+        stats = raw.match_market_stats(FeatureExtractor.normalize_for_hash("Apple iPhone 12 Pro, 128GB"))
+        assert stats["product_key"] == "iphone_12_pro" and stats["count"] == 5
+        assert raw.match_market_stats(["apple", "iphone", "12"])["product_key"] == "iphone_12"
+        assert raw.match_market_stats(["iphone"]) is None
+        assert _db_reads(statements) == []
+
+
+class TestExportImport:
+    """Тесты для потокового экспорта и пакетного импорта памяти."""
+
+    def test_raw_data_round_trip(self, tmp_path):
+        """Тест: JSON Lines экспорт и импорт переносят товары, связи и историю цен; старый формат читается."""
+        raw = RawDataManager(db_path=str(tmp_path / "raw.db"))
+        raw.add_raw_items([_item(i) for i in range(50)],
+                          item_categories=[["gpu", "pc"] if i % 2 else ["gpu"] for i in range(50)],
+                          product_keys=["rtx_3060"])
+        path = str(tmp_path / "raw.jsonl")
+        progress = []
+        assert raw.export_to_json(path, on_progress=lambda done, total: progress.append((done, total))) == 53
+        assert progress[-1] == (53, 50)
+
+        restored = RawDataManager(db_path=str(tmp_path / "restored.db"))
+        assert restored.import_from_json(path, on_progress=lambda done, total: progress.append(done)) == 50
+        assert restored.import_from_json(path) == 0
+        assert {c["name"]: c["item_count"] for c in restored.get_all_categories()} == {"gpu": 50, "pc": 25}
+        assert restored.get_raw_items_count(product_key="rtx_3060") == 50
+        assert restored.get_market_stats("rtx_3060")["count"] == 50
+        assert len(restored.get_daily_prices("rtx_3060")) == 1
+
+        legacy = tmp_path / "legacy.json"
+        legacy.write_text(json.dumps({"items": [dict(raw.get_raw_items(limit=1)[0], ad_id="legacy")]}),
+                          encoding="utf-8")
+        assert restored.import_from_json(str(legacy)) == 1
+        assert restored.get_raw_items(product_key="rtx_3060", limit=1)[0]["ad_id"] == "legacy"
+
+    def test_knowledge_round_trip(self, tmp_path):
+        """Тест: чанки знаний переносятся пакетными upsert без потери summary и статуса."""
+        knowledge = KnowledgeManager(db_path=str(tmp_path / "knowledge.db"))
+        for i in range(30):
+            chunk_id = knowledge.add_knowledge("PRODUCT", f"key_{i}", f"Chunk {i}", content={"n": i})
+            knowledge.update_chunk_content(chunk_id, {"n": i}, summary=f"summary {i}")
+        path = str(tmp_path / "knowledge.jsonl")
+        assert knowledge.export_to_json(path) == 30
+
+        restored = KnowledgeManager(db_path=str(tmp_path / "restored.db"))
+        restored.add_knowledge("PRODUCT", "key_0", "Old title")
+        assert restored.import_from_json(path) == 30
+        chunk = restored.get_chunk_by_key_and_type("key_0", "PRODUCT")
+        assert (chunk["title"], chunk["summary"], chunk["content"]) == ("Chunk 0", "summary 0", {"n": 0})
+        assert restored.get_statistics()["total_chunks"] == 30
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для обхода выдачи AvitoParser.process_region:
+пропуск дубликатов, индекс просмотренных объявлений
+и остановка на водяном знаке.
+Страницы подставляются заглушкой, браузер не запускается.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.core.parser import AvitoParser, PageLoader
+from app.core.seen_index import SeenIdIndex
+
+
+def make_item(ad_id, title="Видеокарта RTX 3060", price=25000):
+    return {"id": ad_id, "title": title, "price": price, "link": f"https://avito.ru/{ad_id}", "seller_id": ""}
+
+
+@pytest.fixture
+def run_region():
+    """Прогон process_region по заданным страницам, возвращает (results, номер последней загруженной страницы)"""
+    def run(pages, **kwargs):
+        parser = AvitoParser()
+        parser.driver_manager = Mock()
+        loaded = []
+
+        def parse_page():
+            loaded.append(len(loaded) + 1)
+            return [dict(item) for item in pages[len(loaded) - 1]] if len(loaded) <= len(pages) else []
+
+        parser._parse_page = parse_page
+        parser._has_next_page = lambda page: page < len(pages)
+        blacklist = Mock()
+        blacklist.get_active_seller_ids.return_value = set()
+        results = []
+        with patch.object(PageLoader, "safe_get", return_value=True), \
+                patch.object(PageLoader, "scroll_page"), \
+                patch("app.core.parser.get_blacklist_manager", return_value=blacklist):
+            parser.process_region("https://avito.ru/rossiya?q=rtx", set(), results,
+                                  search_mode="primary", **kwargs)
+        return results, len(loaded)
+    return run
+
+
+class TestSeenHistory:
+    """Тесты для учета прошлых сессий через SeenIdIndex."""
+
+    def test_history_is_recorded_but_not_skipped_by_default(self, run_region, tmp_path):
+        """Тест: skip_duplicates без skip_seen_history не отбрасывает объявления прошлых сессий."""
+        index = SeenIdIndex(db_path=str(tmp_path / "seen.db"))
+        index.mark_seen(["1", "2"])
+
+        results, _ = run_region([[make_item("1"), make_item("2"), make_item("3")]],
+                                skip_duplicates=True, seen_index=index)
+
+        assert [item["id"] for item in results] == ["1", "2", "3"]
+        assert "3" in index
+        index.close()
+
+    def test_history_skip_is_opt_in(self, run_region, tmp_path):
+        """Тест: со skip_seen_history объявления прошлых сессий пропускаются."""
+        index = SeenIdIndex(db_path=str(tmp_path / "seen.db"))
+        index.mark_seen(["1", "2"])
+
+        results, _ = run_region([[make_item("1"), make_item("2"), make_item("3")]],
+                                skip_duplicates=True, skip_seen_history=True, seen_index=index)
+
+        assert [item["id"] for item in results] == ["3"]
+        index.close()
+
+
+class TestIncrementalStop:
+    """Тесты для остановки на водяном знаке прошлого запуска."""
+
+    def test_filtered_ads_do_not_break_known_streak(self, run_region):
+        """Тест: водяной знак из listed_ids (с отфильтрованными объявлениями) останавливает обход на первой странице."""
+        old = [make_item(f"a{n}", price=500 if n % 2 == 0 else 25000) for n in range(1, 9)]
+        listed = []
+        first, _ = run_region([old[:4], old[4:]], min_price=1000, listed_ids=listed)
+        assert [item["id"] for item in first] == ["a1", "a3", "a5", "a7"]
+        assert listed == [item["id"] for item in old]
+
+        pages = [[make_item("n1")] + old[:4], old[4:], [make_item("a9")]]
+        incremental = dict(min_price=1000, incremental_stop_after=3)
+
+        _, loaded = run_region(pages, watermark_ids=set(listed), **incremental)
+        assert loaded == 1
+
+        # Водяной знак только из принятых товаров: дешевые объявления рвут серию, обход идет до конца
+        _, loaded = run_region(pages, watermark_ids={item["id"] for item in first}, **incremental)
+        assert loaded == 3
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для ProcessParserWorker: парсер в дочернем процессе (spawn)
+и обмен сообщениями (тип, данные) с GUI-стороной.
+Вместо AvitoParser в дочернем процессе работает заглушка.
+"""
+
+from app.core import process_worker
+from app.core.log_manager import logger
+from app.core.process_worker import ProcessParserWorker, _parser_process_main
+from app.core.signals import QObject, pyqtSignal
+
+
+class FakeParser(QObject):
+    """AvitoParser без браузера: две страницы товаров по ключевым словам"""
+
+    progress_value = pyqtSignal(int)
+    update_requests_count = pyqtSignal(int, int)
+
+    def __init__(self, debug_mode=False):
+        super().__init__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def request_stop(self):
+        pass
+
+    def search_items(self, keywords, ignore_keywords, existing_ids_base=None, seen_index=None,
+                     on_page_items=None, request_budget=None, **params):
+        logger.info(f"stub: {params['queue_name']}", token="stub")
+        results = []
+        for page in range(2):
+            page_items = [{"id": f"{page}{n}", "title": f"{keywords[0]} #{n}", "price": 1000 * n}
+                          for n in range(3) if f"{page}{n}" not in existing_ids_base]
+            self.update_requests_count.emit(1, 0)
+            self.progress_value.emit(50 * (page + 1))
+            on_page_items(page_items)
+            results.extend(page_items)
+        return results
+
+
+def stub_process_main(params, out_q, stop_event, batch_slots, request_budget=None):
+    """Настоящая точка входа дочернего процесса, но с FakeParser вместо AvitoParser"""
+    from app.core import parser
+    parser.AvitoParser = FakeParser
+    _parser_process_main(params, out_q, stop_event, batch_slots, request_budget)
+
+
+def crash_process_main(params, out_q, stop_event, batch_slots, request_budget=None):
+    import os
+    os._exit(3)
+
+
+def make_worker(**kwargs):
+    params = dict(keywords=["rtx 3060"], ignore_keywords=[], max_pages=1, max_total_items=None,
+                  min_price=None, max_price=None, sort_type="date", search_all_regions=False,
+                  queue_name="gpu")
+    params.update(kwargs)
+    return ProcessParserWorker(**params)
+
+
+class TestProcessParserWorker:
+    """Тесты для класса ProcessParserWorker."""
+
+    def test_spawn_round_trip(self, monkeypatch):
+        """Тест: прогресс, запросы, пачки, логи и итог доходят из процесса до сигналов воркера."""
+        monkeypatch.setattr(process_worker, "_parser_process_main", stub_process_main)
+        worker = make_worker(existing_ids=["01"], max_pending_batches=1)
+
+        batches, progress, requests, logs, finished = [], [], [], [], []
+        worker.batch_ready.connect(lambda items: (batches.append(items), worker.ack_batch()))
+        worker.progress.connect(progress.append)
+        worker.requests_count.connect(lambda a, b: requests.append((a, b)))
+        worker.finished.connect(finished.append)
+        log_slot = lambda token, text, level, replace: logs.append((token, text))
+        logger.ui_log_signal.connect(log_slot)
+        try:
+            worker.run()
+        finally:
+            logger.ui_log_signal.disconnect(log_slot)
+
+        assert [[i["id"] for i in batch] for batch in batches] == [["00", "02"], ["10", "11", "12"]]
+        assert progress == [50, 100]
+        assert requests == [(1, 0), (1, 0)]
+        assert ("stub", "stub: gpu") in logs
+        assert [i["id"] for i in finished[0]] == ["00", "02", "10", "11", "12"]
+        assert finished[0][0]["title"] == "rtx 3060 #0"
+
+    def test_crashed_process_reports_error(self, monkeypatch):
+        """Тест: аварийный выход процесса дает error и пустой finished, а не зависание."""
+        monkeypatch.setattr(process_worker, "_parser_process_main", crash_process_main)
+        worker = make_worker()
+
+        errors, finished = [], []
+        worker.error.connect(errors.append)
+        worker.finished.connect(finished.append)
+        worker.run()
+
+        assert errors and "код 3" in errors[0]
+        assert finished == [[]]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для общего бюджета запросов параллельных очередей:
+TokenBucket, RequestBudget и его учет в AvitoParser.search_items.
+"""
+
+import multiprocessing as mp
+from unittest.mock import Mock, patch
+
+from app.core.parser import AvitoParser, SearchNavigator
+from app.core.request_budget import TokenBucket, RequestBudget
+
+
+class TestTokenBucket:
+    """Тесты для класса TokenBucket."""
+
+    def test_burst_then_wait(self):
+        """Тест: запас burst выдается сразу, дальше нужно ждать пополнения."""
+        bucket = TokenBucket(rate_per_min=60, burst=3)
+        assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        wait = bucket.try_acquire()
+        assert 0 < wait <= 1.0
+
+    def test_acquire_respects_stop(self):
+        """Тест: ожидание токена прерывается запросом остановки."""
+        bucket = TokenBucket(rate_per_min=1, burst=1)
+        assert bucket.acquire()
+        assert bucket.acquire(stop_check=lambda: True) is False
+
+    def test_shared_memory_bucket(self):
+        """Тест: бакет на spawn-контексте работает так же."""
+        bucket = TokenBucket(rate_per_min=600, burst=2, ctx=mp.get_context("spawn"))
+        assert bucket.acquire(timeout=1)
+        assert bucket.acquire(timeout=1)
+        assert bucket.acquire(timeout=1)
+
+
+class TestRequestBudget:
+    """Тесты для класса RequestBudget."""
+
+    def test_shares_rebalanced(self):
+        """Тест: доля очереди = общий лимит / число активных очередей."""
+        budget = RequestBudget(rate_per_min=120, burst=4)
+        a = budget.lease(0)
+        assert a.share.rate_per_min == 120
+        b = budget.lease(1)
+        assert a.share.rate_per_min == 60 and b.share.rate_per_min == 60
+        budget.release(1)
+        assert a.share.rate_per_min == 120
+        assert budget.active_count() == 1
+
+    def test_total_limit_shared(self):
+        """Тест: все очереди вместе не выходят за общий запас."""
+        budget = RequestBudget(rate_per_min=1, burst=2)
+        a, b = budget.lease(0), budget.lease(1)
+        granted = sum(
+            1 for lease in (a, b, a, b)
+            if lease.acquire(stop_check=lambda: True)
+        )
+        assert granted == 2
+
+
+class TestParserBudget:
+    """Тесты для учета бюджета в AvitoParser."""
+
+    def test_category_search_spends_budget(self):
+        """Тест: переходы при поиске категорий идут через бюджет, до обхода выдачи."""
+        events = []
+        budget = Mock()
+        budget.acquire.side_effect = lambda stop_check=None: events.append("budget") or True
+
+        def smart_search(navigator, query, forced_filters=None):
+            navigator._acquire_request()
+            return []
+
+        parser = AvitoParser()
+        parser.driver_manager = Mock()
+        parser.run_tasks = lambda tasks, **kwargs: events.append("tasks") or []
+        with patch.object(SearchNavigator, "perform_smart_search", smart_search):
+            parser.search_items(["rtx 3060"], request_budget=budget)
+
+        assert events == ["budget", "tasks"]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для каталога файлов результатов (ResultsCatalog):
+сводка по товарам, сверка с папкой и избранное без распаковки файлов.
+"""
+
+import gzip
+import json
+import os
+import time
+
+from app.core.results_catalog import ResultsCatalog, queue_name_from_path
+
+
+def _write(path, items):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+
+
+class TestResultsCatalog:
+    """Тесты для класса ResultsCatalog."""
+
+    def test_sync_indexes_folder(self, tmp_path):
+        """Тест: sync находит новые файлы, считает товары и избранное, убирает удаленные."""
+        results_dir = tmp_path / "results"
+        results_dir.mkdir()
+        catalog = ResultsCatalog(db_path=str(tmp_path / "catalog.db"), results_dir=str(results_dir))
+
+        first = str(results_dir / "avito_rtx 3060_01022025_101500.json")
+        second = str(results_dir / "avito_ноутбук_02022025_120000.json")
+        _write(first, [
+            {"id": "1", "title": "A", "starred": True, "parsed_at": "2025-02-01T10:00:00"},
+            {"id": "2", "title": "B", "starred": False, "parsed_at": "2025-02-01T11:00:00"},
+        ])
+        _write(second, [{"id": "3", "title": "C", "parsed_at": "2025-02-02T12:00:00"}])
+        os.utime(second, (time.time() + 10, time.time() + 10))
+
+        assert catalog.sync() == 2
+        assert catalog.sync() == 0
+
+        files = catalog.list_files()
+        assert [f["path"] for f in files] == [second, first]
+        info = catalog.get_file(first)
+        assert info["queue_name"] == "rtx 3060"
+        assert info["item_count"] == 2 and info["starred_count"] == 1
+        assert info["first_date"] == "2025-02-01T10:00:00" and info["last_date"] == "2025-02-01T11:00:00"
+
+        starred = catalog.get_starred_items()
+        assert [(i["id"], i["_source_file"]) for i in starred] == [("1", first)]
+
+        os.remove(first)
+        catalog.sync()
+        assert [f["path"] for f in catalog.list_files()] == [second]
+        assert catalog.get_starred_items() == []
+        catalog.close()
+
+    def test_foreign_paths_are_ignored(self, tmp_path):
+        """Тест: каталог не учитывает файлы вне своей папки."""
+        catalog = ResultsCatalog(db_path=str(tmp_path / "catalog.db"), results_dir=str(tmp_path / "results"))
+        catalog.record(str(tmp_path / "other" / "avito_x.json"),
+                       {"item_count": 1, "starred_count": 0, "first_date": None, "last_date": None}, [])
+        assert catalog.list_files() == []
+        assert queue_name_from_path("/r/avito_search_01022025_101500.json") == "search"
+        assert queue_name_from_path("/r/avito_моя таблица.json") == "моя таблица"
+        catalog.close()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для хранилища файлов результатов (ResultsStore):
+журнал изменений, восстановление снапшот + журнал, фоновое сжатие
+слияние записей в фоновом писателе (ResultsWriter) и потоковое чтение файлов.
+"""
+
+import gzip
+import io
+import json
+import os
+import threading
+
+from app.core import results_catalog, results_store
+from app.core.results_catalog import ResultsCatalog, summarize_rows
+from app.core.results_store import (
+    ResultsStore, ResultsWriter, load_results, iter_results, iter_json_array, sniff_format, _log_paths,
+)
+
+
+def _items(n, start=0):
+    return [{"id": str(i), "title": f"Товар {i}", "price": 1000 + i, "description": "x" * 200}
+            for i in range(start, start + n)]
+
+
+class TestResultsStore:
+    """Тесты для класса ResultsStore."""
+
+    def test_replay_snapshot_and_log(self, tmp_path):
+        """Тест: новые товары, патчи и удаления восстанавливаются из снапшота и журнала."""
+        path = str(tmp_path / "avito_test.json")
+        store = ResultsStore(path, compact_min_bytes=10 ** 9)
+        store.rewrite(_items(3))
+        store.put_many(_items(2, start=3))
+        assert store.patch("1", {"ai_comment": "ok", "starred": True})
+        assert not store.patch("missing", {"starred": True})
+        assert store.delete(["0"]) == 1
+        store.close()
+
+        items = {i["id"]: i for i in load_results(path)}
+        assert set(items) == {"1", "2", "3", "4"}
+        assert items["1"]["ai_comment"] == "ok" and items["1"]["starred"] is True
+
+    def test_patch_cost_is_proportional_to_change(self, tmp_path):
+        """Тест: патч одного поля дописывает в журнал строку, а не перезаписывает таблицу."""
+        path = str(tmp_path / "avito_big.json")
+        store = ResultsStore(path, compact_min_bytes=10 ** 9)
+        store.rewrite(_items(500))
+        store.flush()
+        mtime_before = os.stat(path).st_mtime_ns
+
+        for i in range(500):
+            store.patch(str(i), {"ai_comment": "{}"})
+        store.close()
+
+        log_size = os.path.getsize(path + ".log")
+        assert os.stat(path).st_mtime_ns == mtime_before
+        assert log_size < 500 * 80
+
+    def test_compaction_folds_log_into_snapshot(self, tmp_path):
+        """Тест: сжатие сворачивает журнал в снапшот без потери данных."""
+        path = str(tmp_path / "avito_compact.json")
+        store = ResultsStore(path, compact_ratio=0.5, compact_min_bytes=1024)
+        store.rewrite(_items(10))
+        for i in range(50):
+            store.patch(str(i % 10), {"price": i})
+        store.put_many(_items(5, start=10))
+        store.compact()
+        expected = store.items()
+        store.close()
+
+        assert _log_paths(path) == []
+        assert load_results(path) == expected
+        assert {i["id"]: i["price"] for i in expected}["9"] == 49
+
+    def test_replay_is_idempotent_after_crash(self, tmp_path):
+        """Тест: журнал, оставшийся после записи снапшота, безопасно проигрывается повторно."""
+        path = str(tmp_path / "avito_crash.json")
+        store = ResultsStore(path, compact_min_bytes=10 ** 9)
+        store.rewrite(_items(3))
+        store.flush()
+        store.patch("1", {"price": 1})
+        store.delete(["2"])
+        store.put_many([{"id": "2", "title": "Снова", "price": 5}])
+        store.flush()
+        log = open(path + ".log", encoding="utf-8").read()
+        store.compact()
+        store.close()
+
+        # Сжатие записало снапшот, но "упало" до удаления журнала
+        with open(path + ".log", "w", encoding="utf-8") as f:
+            f.write(log + '{"op": "patch", "id": "1"')
+
+        items = {i["id"]: i for i in load_results(path)}
+        assert items["1"]["price"] == 1
+        assert items["2"]["title"] == "Снова"
+        assert len(items) == 3
+
+    def test_changes_during_snapshot_go_to_new_log(self, tmp_path):
+        """Тест: снапшот пишется без блокировки, изменения во время записи попадают в новый журнал."""
+        path = str(tmp_path / "avito_race.json")
+        store = ResultsStore(path, compact_min_bytes=10 ** 9)
+        store.rewrite(_items(3))
+        store.flush()
+        write_snapshot = store._write_snapshot
+        patched = []
+
+        def slow_snapshot(rows):
+            # Патч из другого потока во время записи снапшота не должен ждать писателя
+            t = threading.Thread(target=lambda: patched.append(store.patch("1", {"price": 7})))
+            t.start()
+            t.join(5)
+            return write_snapshot(rows)
+
+        store._write_snapshot = slow_snapshot
+        store.compact()
+        assert patched == [True]
+        store.flush()
+        store._close_log()
+
+        assert os.path.getsize(path + ".log") > 0
+        items = {i["id"]: i for i in load_results(path)}
+        assert items["1"]["price"] == 7 and len(items) == 3
+
+    def test_catalog_summary_follows_changes(self, tmp_path, monkeypatch):
+        """Тест: сводка для каталога, которая ведется по изменениям, совпадает с пересчетом всех строк."""
+        catalog = ResultsCatalog(db_path=str(tmp_path / "catalog.db"), results_dir=str(tmp_path))
+        monkeypatch.setattr(results_catalog, "_catalog", catalog)
+        monkeypatch.setattr(results_store, "is_catalogued", lambda path: True)
+        path = str(tmp_path / "avito_summary.json")
+        store = ResultsStore(path, compact_min_bytes=10 ** 9)
+        store.rewrite([dict(item, parsed_at=f"2025-02-0{i + 1}T10:00:00") for i, item in enumerate(_items(4))])
+        store.patch("2", {"starred": True})
+        store.put_many([{"id": "9", "title": "Новый", "starred": True, "parsed_at": "2025-03-01T10:00:00"}])
+        store.delete(["0", "9"])
+        store.patch("2", {"starred": False})
+        store.patch("3", {"starred": True})
+
+        summary, starred = store._catalog_summary()
+        assert (summary, starred) == summarize_rows(store._rows.values())
+        assert summary["item_count"] == 3 and [i["id"] for i in starred] == ["3"]
+        assert (summary["first_date"], summary["last_date"]) == ("2025-02-02T10:00:00", "2025-02-04T10:00:00")
+        store.close()
+        assert catalog.get_file(path)["starred_count"] == 1
+        catalog.close()
+
+
+class TestResultsWriter:
+    """Тесты для фонового писателя ResultsWriter."""
+
+    def test_saves_are_coalesced(self, tmp_path):
+        """Тест: серия сохранений в пределах debounce-окна дает одну запись на диск."""
+        path = str(tmp_path / "avito_batch.json")
+        store = ResultsStore(path, compact_min_bytes=10 ** 9, writer=ResultsWriter(debounce_sec=0.3))
+        store.rewrite(_items(50))
+        store.flush()
+        writes_before = store.writes
+
+        for i in range(50):
+            store.patch(str(i), {"ai_comment": f"анализ {i}"})
+        assert store.writes == writes_before
+        assert not os.path.exists(path + ".log")
+
+        store.close()
+        assert store.writes - writes_before == 1
+        items = {i["id"]: i for i in load_results(path)}
+        assert items["49"]["ai_comment"] == "анализ 49"
+
+
+class _CountingReader(io.StringIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+class TestStreamingLoad:
+    """Тесты для потокового чтения файлов результатов."""
+
+    def test_parser_handles_chunk_boundaries(self):
+        """Тест: разбор не зависит от форматирования и границ кусков чтения."""
+        items = _items(30)
+        for text in (json.dumps(items, ensure_ascii=False, indent=2), json.dumps(items)):
+            for read_size in (7, 64, 10 ** 6):
+                assert list(iter_json_array(io.StringIO(text), read_size=read_size)) == items
+        assert list(iter_json_array(io.StringIO("  [ ]  "))) == []
+
+    def test_first_chunk_before_whole_file(self):
+        """Тест: первая порция отдается до чтения всего файла."""
+        text = json.dumps(_items(2000), ensure_ascii=False, indent=2)
+        reader = _CountingReader(text)
+        first = next(iter_json_array(reader, read_size=4096))
+        assert first["id"] == "0"
+        assert reader.reads * 4096 < len(text) / 10
+
+    def test_gzip_and_plain_files(self, tmp_path):
+        """Тест: формат определяется по сигнатуре, файл отдается порциями с учетом журнала."""
+        gz_path = str(tmp_path / "avito_gz.json")
+        with gzip.open(gz_path, "wt", encoding="utf-8") as f:
+            json.dump(_items(1200), f, ensure_ascii=False, indent=2)
+        plain_path = str(tmp_path / "avito_plain.json")
+        with open(plain_path, "w", encoding="utf-8") as f:
+            json.dump(_items(3), f, ensure_ascii=False)
+        with open(gz_path + ".log", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "patch", "id": "5", "set": {"starred": True}}) + "\n")
+            f.write(json.dumps({"op": "del", "id": "0"}) + "\n")
+            f.write(json.dumps({"op": "put", "item": {"id": "new"}}) + "\n")
+
+        assert sniff_format(gz_path) == "gzip"
+        assert sniff_format(plain_path) == "json"
+        chunks = list(iter_results(gz_path, chunk_size=500))
+        assert [len(c) for c in chunks] == [500, 500, 200]
+        items = [i for c in chunks for i in c]
+        assert items[0]["id"] == "1" and items[-1]["id"] == "new"
+        assert items[4]["id"] == "5" and items[4]["starred"] is True
+        assert [i["id"] for i in load_results(plain_path)] == ["0", "1", "2"]
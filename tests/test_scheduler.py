@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для планировщика очередей:
+CronSchedule, SchedulerStore и QueueScheduler.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.scheduler import CronSchedule, SchedulerStore, QueueScheduler
+
+
+class TestCronSchedule:
+    """Тесты для класса CronSchedule."""
+
+    def test_every_n_minutes(self):
+        """Тест: */20 срабатывает на 0, 20 и 40 минуте."""
+        cron = CronSchedule("*/20 * * * *")
+        assert cron.next_after(datetime(2024, 5, 1, 10, 5)) == datetime(2024, 5, 1, 10, 20)
+        assert cron.next_after(datetime(2024, 5, 1, 10, 40)) == datetime(2024, 5, 1, 11, 0)
+
+    def test_weekdays_and_hours(self):
+        """Тест: будни 9-18, в пятницу вечером переносится на понедельник."""
+        cron = CronSchedule("0 9-18 * * 1-5")
+        friday_evening = datetime(2024, 5, 3, 19, 0)
+        assert cron.next_after(friday_evening) == datetime(2024, 5, 6, 9, 0)
+
+    def test_interval_and_aliases(self):
+        """Тест: интервальная запись и псевдонимы."""
+        start = datetime(2024, 5, 1, 10, 7, 30)
+        assert CronSchedule("every 20m").next_after(start) == start + timedelta(minutes=20)
+        assert CronSchedule("@hourly").next_after(start) == datetime(2024, 5, 1, 11, 0)
+
+    def test_invalid_expression(self):
+        """Тест: неверные выражения отклоняются."""
+        with pytest.raises(ValueError):
+            CronSchedule("61 * * * *")
+        with pytest.raises(ValueError):
+            CronSchedule("* * *")
+
+
+class TestQueueScheduler:
+    """Тесты для класса QueueScheduler."""
+
+    def test_watermark_keeps_newest_first(self, tmp_path):
+        """Тест: водяной знак хранит самые свежие ID без повторов."""
+        store = SchedulerStore(db_path=str(tmp_path / "s.db"))
+        store.update_watermark("q", ["3", "2", "1"])
+        merged = store.update_watermark("q", ["5", "4", "3"], size=4)
+        assert merged == ["5", "4", "3", "2"]
+        store.close()
+
+    def test_incremental_run_and_stats(self, tmp_path):
+        """Тест: второй прогон инкрементальный, статистика сохраняется."""
+        store = SchedulerStore(db_path=str(tmp_path / "s.db"))
+        calls = []
+        outputs = [["1", "2"], ["3", "2"]]
+
+        def run_queue(config, extra):
+            calls.append(extra)
+            return {"requests": 5, "ids": outputs[len(calls) - 1]}
+
+        scheduler = QueueScheduler(run_queue, store=store, jitter_sec=0)
+        scheduler.set_queues([{"queue_name": "gpu", "schedule": "every 1m"}])
+        entry = scheduler.entries["gpu"]
+
+        for _ in range(2):
+            entry.next_run_at = datetime.now() - timedelta(seconds=1)
+            assert scheduler.tick() == ["gpu"]
+            scheduler.join(5)
+
+        assert calls[0] == {}
+        assert calls[1]["sort_type"] == "date"
+        assert calls[1]["watermark_ids"] == {"1", "2"}
+
+        runs = store.get_runs("gpu")
+        assert [r["new_items"] for r in runs] == [1, 2]
+        assert runs[0]["incremental"] == 1 and runs[0]["requests"] == 5
+        assert store.get_watermark("gpu")[:3] == ["3", "2", "1"]
+        store.close()
+
+    def test_watermark_uses_listed_ids(self, tmp_path):
+        """Тест: водяной знак строится из всех просмотренных объявлений, а не только из принятых."""
+        store = SchedulerStore(db_path=str(tmp_path / "s.db"))
+        scheduler = QueueScheduler(lambda config, extra: {"ids": ["1"], "listed_ids": ["1", "cheap", "2"]},
+                                   store=store, jitter_sec=0)
+        scheduler.set_queues([{"queue_name": "gpu", "schedule": "every 1m"}])
+        entry = scheduler.entries["gpu"]
+        entry.next_run_at = datetime.now() - timedelta(seconds=1)
+        scheduler.tick()
+        scheduler.join(5)
+
+        assert store.get_watermark("gpu") == ["1", "cheap", "2"]
+        assert store.get_runs("gpu")[0]["total_items"] == 1
+        store.close()
+
+    def test_explicit_sort_disables_incremental(self, tmp_path):
+        """Тест: очередь с сортировкой по цене идет полностью и сохраняет свою сортировку."""
+        store = SchedulerStore(db_path=str(tmp_path / "s.db"))
+        store.update_watermark("cheap", ["1", "2"])
+        calls = []
+        scheduler = QueueScheduler(lambda config, extra: calls.append(extra) or {"ids": []},
+                                   store=store, jitter_sec=0)
+        scheduler.set_queues([{"queue_name": "cheap", "schedule": "every 1m", "sort_type": "price_asc"}])
+        scheduler.entries["cheap"].next_run_at = datetime.now() - timedelta(seconds=1)
+        scheduler.tick()
+        scheduler.join(5)
+
+        assert calls == [{}]
+        store.close()
+
+    def test_reregistered_running_queue_is_scheduled_again(self, tmp_path):
+        """Тест: очередь, перерегистрированная во время прогона, после него снова запускается."""
+        store = SchedulerStore(db_path=str(tmp_path / "s.db"))
+        release = threading.Event()
+        calls = []
+
+        def run_queue(config, extra):
+            calls.append(config["queue_name"])
+            release.wait(5)
+            return {"ids": []}
+
+        scheduler = QueueScheduler(run_queue, store=store, jitter_sec=0)
+        configs = [{"queue_name": "gpu", "schedule": "every 1m"}]
+        scheduler.set_queues(configs)
+        scheduler.entries["gpu"].next_run_at = datetime.now() - timedelta(seconds=1)
+        assert scheduler.tick() == ["gpu"]
+
+        scheduler.set_queues(configs)
+        scheduler.entries["gpu"].next_run_at = datetime.now() - timedelta(seconds=1)
+        assert scheduler.tick() == []  # прогон еще идет — не дублируется
+        release.set()
+        scheduler.join(5)
+
+        assert not scheduler.is_queue_running("gpu")
+        scheduler.entries["gpu"].next_run_at = datetime.now() - timedelta(seconds=1)
+        assert scheduler.tick() == ["gpu"]
+        scheduler.join(5)
+        assert calls == ["gpu", "gpu"]
+        store.close()
+
+    def test_concurrency_limit(self, tmp_path):
+        """Тест: одновременно выполняется не больше max_concurrent очередей."""
+        store = SchedulerStore(db_path=str(tmp_path / "s.db"))
+        release = threading.Event()
+
+        def run_queue(config, extra):
+            release.wait(5)
+            return {"ids": []}
+
+        scheduler = QueueScheduler(run_queue, store=store, max_concurrent=1, jitter_sec=0)
+        scheduler.set_queues([
+            {"queue_name": "a", "schedule": "every 1m"},
+            {"queue_name": "b", "schedule": "every 1m"},
+        ])
+        past = datetime.now() - timedelta(seconds=1)
+        for e in scheduler.entries.values():
+            e.next_run_at = past
+
+        assert len(scheduler.tick()) == 1
+        assert scheduler.tick() == []
+        release.set()
+        scheduler.stop(wait=True, timeout=5)
+        store.close()
+
+    def test_missed_run_policy(self, tmp_path):
+        """Тест: пропущенный запуск выполняется сразу или пропускается."""
+        path = str(tmp_path / "s.db")
+        store = SchedulerStore(db_path=path)
+        now = datetime(2024, 5, 1, 12, 0)
+        store.set_state("q", next_run_at=now - timedelta(hours=3))
+
+        catch_up = QueueScheduler(lambda c, e: {}, store=store, jitter_sec=0, missed_policy="run_once")
+        catch_up.set_queues([{"queue_name": "q", "schedule": "@hourly"}], now=now)
+        assert catch_up.entries["q"].next_run_at == now
+
+        skip = QueueScheduler(lambda c, e: {}, store=store, jitter_sec=0, missed_policy="skip")
+        skip.set_queues([{"queue_name": "q", "schedule": "@hourly"}], now=now)
+        assert skip.entries["q"].next_run_at == datetime(2024, 5, 1, 13, 0)
+        store.close()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты для постоянного индекса просмотренных объявлений:
+BloomFilter и SeenIdIndex.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+from app.core.seen_index import BloomFilter, SeenIdIndex
+
+
+class TestBloomFilter:
+    """Тесты для класса BloomFilter."""
+
+    def test_added_keys_are_found(self):
+        """Тест: добавленные ключи всегда находятся (нет ложных отрицаний)."""
+        bloom = BloomFilter(capacity=1000)
+        keys = [str(i) for i in range(1000)]
+        for k in keys:
+            bloom.add(k)
+        assert all(k in bloom for k in keys)
+
+    def test_false_positive_rate(self):
+        """Тест: доля ложных срабатываний близка к заданной."""
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f"in_{i}")
+        false_hits = sum(1 for i in range(5000) if f"out_{i}" in bloom)
+        assert false_hits < 5000 * 0.03
+
+
+class TestSeenIdIndex:
+    """Тесты для класса SeenIdIndex."""
+
+    def test_mark_and_contains(self, tmp_path):
+        """Тест: отмеченные ID находятся, неизвестные — нет."""
+        index = SeenIdIndex(db_path=str(tmp_path / "seen.db"))
+        assert index.mark_seen(["100", 200, "", None]) == 2
+        assert "100" in index
+        assert 200 in index
+        assert "300" not in index
+        assert len(index) == 2
+        index.close()
+
+    def test_persists_between_instances(self, tmp_path):
+        """Тест: индекс переживает перезапуск и загружает фильтр Блума из БД."""
+        path = str(tmp_path / "seen.db")
+        first = SeenIdIndex(db_path=path)
+        first.mark_seen(["1", "2"], queue_name="gpu")
+        first.close()
+
+        second = SeenIdIndex(db_path=path)
+        assert "1" in second and "2" in second
+        assert second.get_record("1")["queue_name"] == "gpu"
+        second.close()
+
+    def test_last_seen_updates_first_seen_kept(self, tmp_path):
+        """Тест: повторная отметка обновляет last_seen, но не first_seen."""
+        path = str(tmp_path / "seen.db")
+        index = SeenIdIndex(db_path=path)
+        index.mark_seen(["42"])
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE seen_ids SET first_seen = '2020-01-01T00:00:00', last_seen = '2020-01-01T00:00:00'")
+        index.mark_seen(["42"])
+        record = index.get_record("42")
+        assert record["first_seen"] == "2020-01-01T00:00:00"
+        assert record["last_seen"] > record["first_seen"]
+        assert record["seen_count"] == 2
+        index.close()
+
+    def test_new_since(self, tmp_path):
+        """Тест: выборка "новые за последнюю неделю"."""
+        path = str(tmp_path / "seen.db")
+        index = SeenIdIndex(db_path=path)
+        index.mark_seen(["old", "fresh"])
+        old_ts = (datetime.now() - timedelta(days=30)).isoformat(timespec="seconds")
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE seen_ids SET first_seen = ? WHERE ad_id = 'old'", (old_ts,))
+
+        assert index.new_since_days(7) == ["fresh"]
+        items = [{"id": "old"}, {"id": "fresh"}, {"id": "unknown"}]
+        since = datetime.now() - timedelta(days=7)
+        assert [i["id"] for i in index.filter_new(items, since)] == ["fresh", "unknown"]
+        assert [i["id"] for i in index.filter_new(items)] == ["unknown"]
+        index.close()